@@ -0,0 +1,64 @@
+# BridgeDispatcher.py
+# Runs iframe-event handlers off the event that delivered them, in per-lane queues.
+#
+# Each handler is bound to a lane with a concurrency limit. A job is started in
+# its own browser task (setTimeout 0), so when it blocks on anvil.server.call the
+# other lanes keep running: a slow DXF preview no longer holds up antenna
+# updates or live-RSRP fetches. Handlers still answer through
+# App._send_to_iframe with the requestId they were given; an uncaught exception
+# is routed back the same way via the lane's error callback.
+from anvil import js
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BridgeDispatcher:
+  def __init__(self, lanes, on_error=None):
+    """`lanes` maps lane name -> max concurrent jobs.
+
+    `on_error(response_type, error, request_id)` is called when a job raises.
+    """
+    self._limits = dict(lanes)
+    self._active = {lane: 0 for lane in self._limits}
+    self._queues = {lane: [] for lane in self._limits}
+    self._on_error = on_error
+
+  def listen(self, event_name, handler, lane, response_type=None):
+    """Add a window listener for `event_name` that queues `handler(event)` on `lane`."""
+    if lane not in self._limits:
+      raise ValueError(f"Unknown bridge lane: {lane}")
+
+    def _on_event(event):
+      self.submit(lane, handler, event, response_type=response_type)
+
+    js.window.addEventListener(event_name, _on_event)
+
+  def submit(self, lane, handler, event=None, response_type=None):
+    self._queues[lane].append((handler, event, response_type))
+    self._pump(lane)
+
+  def pending(self, lane):
+    """Queued + running jobs on a lane."""
+    return len(self._queues[lane]) + self._active[lane]
+
+  def _pump(self, lane):
+    queue = self._queues[lane]
+    while queue and self._active[lane] < self._limits[lane]:
+      job = queue.pop(0)
+      self._active[lane] += 1
+      js.window.setTimeout(lambda job=job: self._run(lane, job), 0)
+
+  def _run(self, lane, job):
+    handler, event, response_type = job
+    try:
+      handler(event)
+    except Exception as e:
+      logger.error(f"[BRIDGE] {lane} handler {getattr(handler, '__name__', handler)} failed: {e}")
+      if self._on_error and response_type:
+        detail = getattr(event, "detail", None)
+        request_id = detail.get("requestId") if detail else None
+        self._on_error(response_type, str(e), request_id)
+    finally:
+      self._active[lane] -= 1
+      self._pump(lane)
@@ -8,12 +8,54 @@ import json
 import base64
 import time
 import logging
+from .BridgeDispatcher import BridgeDispatcher
 
 logger = logging.getLogger(__name__)
 
+# Preferred RSRP grid transport: "int16" (dBm x10) or "float32", XOR-delta + deflate (server_code/RsrpGridCodec.py)
+RSRP_ENCODING = {"dtype": "int16", "delta": True, "compress": True}
+# Seconds the backend may hold a wait_live_optimization call before returning empty (server_code/OptimizationChannel.py)
+OPT_LONG_POLL_TIMEOUT = 10
+# During optimization only the newest RSRP grid per poll is delivered; actions and compliance all arrive
+OPT_LATEST_RSRP_ONLY = True
+# Window over which antenna_status_update messages are coalesced into one backend call
+ANTENNA_COALESCE_MS = 150
+# Seconds between grid fetches while a batch runs on the backend pool (server_code/BatchAntennaPool.py)
+BATCH_STREAM_POLL_S = 0.5
+# Longest a batch is streamed before the App gives up polling (the baseline fetch still follows)
+BATCH_STREAM_TIMEOUT_S = 600
+
+# Seconds between status polls of a server-side coverage report (server_code/CoverageReport.py)
+REPORT_POLL_S = 1.0
+# Longest the App waits for a coverage report; the backend drops unread reports on its own TTL
+REPORT_TIMEOUT_S = 1800
+
+# Binary slice size for chunked pattern/DXF uploads (server_code/ChunkedUpload.py)
+UPLOAD_CHUNK_BYTES = 2 * 1024 * 1024
+
+# Bridge lanes and their concurrency limits (BridgeDispatcher). Antenna updates stay
+# in order on one lane; DXF work runs on its own so it cannot starve the live-RSRP path.
+# Settings are last-writer-wins, so they apply one at a time in arrival order. Session
+# reset and the app-version query both retry while the backend connects, so each has
+# its own lane and neither waits out the other's retries.
+BRIDGE_LANES = {
+  "antenna": 1,
+  "batch": 1,
+  "baseline": 1,
+  "optimization": 1,
+  "pattern": 2,
+  "upload": 3,
+  "dxf": 1,
+  "settings": 1,
+  "session": 1,
+  "version": 1,
+  "report": 1,
+}
+
 class App(AppTemplate):
   def __init__(self, **properties):
     self.init_components(**properties)
+    self._opt_trace_seq = 0     # optimization trace ids ("opt_<n>"), unique for the page's lifetime
     self.reset_session()
 
     filepath = "_/theme/src/index.html"
@@ -41,6 +83,30 @@ class App(AppTemplate):
                         }}
                     }};
 
+                    // RSRP frames arrive from Python as base64 strings or Uint8Arrays; post them
+                    // as transferable ArrayBuffers so the iframe decodes without copying.
+                    window.sendPackedToIframe = function(messageData) {{
+                        var iframe = document.getElementById('ips-studio');
+                        if (!iframe || !iframe.contentWindow) return;
+                        var transfer = [];
+                        function toBuffer(frame) {{
+                            if (typeof frame === 'string') {{
+                                var bin = atob(frame);
+                                var bytes = new Uint8Array(bin.length);
+                                for (var i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+                                frame = bytes;
+                            }}
+                            var buf = frame.buffer.slice(frame.byteOffset, frame.byteOffset + frame.byteLength);
+                            transfer.push(buf);
+                            return buf;
+                        }}
+                        ['new_bsrv_rsrp_packed', 'rsrpPacked'].forEach(function(field) {{
+                            var packed = messageData[field];
+                            if (packed && packed.frames) packed.frames = Array.from(packed.frames).map(toBuffer);
+                        }});
+                        iframe.contentWindow.postMessage(messageData, '*', transfer);
+                    }};
+
                     window.addEventListener('message', function(event) {{
                         console.log('Message received from iframe:', event.data);
 
@@ -93,6 +159,12 @@ class App(AppTemplate):
                             window.dispatchEvent(new CustomEvent('anvilSetOptimizationParams', {{detail: event.data}}));
                         if (event.data && event.data.type === 'set_weight_params')
                             window.dispatchEvent(new CustomEvent('anvilSetWeightParams', {{detail: event.data}}));
+                        if (event.data && event.data.type === 'request_rsrp_tiles')
+                            window.dispatchEvent(new CustomEvent('anvilRequestRsrpTiles', {{detail: event.data}}));
+                        if (event.data && event.data.type === 'generate_coverage_report')
+                            window.dispatchEvent(new CustomEvent('anvilGenerateCoverageReport', {{detail: event.data}}));
+                        if (event.data && event.data.type === 'fetch_rsrp_grids')
+                            window.dispatchEvent(new CustomEvent('anvilFetchRsrpGrids', {{detail: event.data}}));
                     }});
 
                     function triggerMessageCheck() {{
@@ -114,20 +186,25 @@ class App(AppTemplate):
             """)
 
     self.add_component(html_panel)
-    js.window.addEventListener("anvilStartOptimizationAndPoll", self.start_optimization)
-    js.window.addEventListener("anvilStartAccurateBaseline", self.get_accurate_baseline)
+    self.bridge = BridgeDispatcher(BRIDGE_LANES, on_error=self._send_error)
+    self.bridge.listen("anvilStartOptimizationAndPoll", self.start_optimization, "optimization", "optimization_error")
+    self.bridge.listen("anvilStartAccurateBaseline", self.get_accurate_baseline, "baseline", "baseline_error")
+    self.bridge.listen("anvilRequestRsrpTiles", self.send_rsrp_tiles, "baseline", "rsrp_tiles")
+    self.bridge.listen("anvilFetchRsrpGrids", self.fetch_rsrp_grids, "antenna", "rsrp_grids_ready")
+    self.bridge.listen("anvilGenerateCoverageReport", self.generate_coverage_report, "report", "coverage_report_status")
+    # Only queues the update; the coalesced flush runs on the "antenna" lane
     js.window.addEventListener("anvilAntennaStatusUpdate", self.send_antenna_config)
-    js.window.addEventListener("anvilAntennasBatchStatusUpdate", self.add_batch_antennas)
-    js.window.addEventListener("anvilUploadAntennaPattern", self.send_pattern_to_server)
-    js.window.addEventListener("anvilPreviewDxf", self.preview_dxf)
-    js.window.addEventListener("anvilGenerateDxf", self.generate_dxf)
-    js.window.addEventListener("anvilParseDxf", self.parse_dxf)
-    js.window.addEventListener("anvilComplianceSettings", self.update_compliance_settings)
-    js.window.addEventListener("anvilRestartSession", self.reset_session)
-    js.window.addEventListener("anvilGetAppVersion", self.send_app_version)
-    js.window.addEventListener("anvilSetSendLiveRsrp", self.set_send_live_rsrp)
-    js.window.addEventListener("anvilSetOptimizationParams", self.set_optimization_params)
-    js.window.addEventListener("anvilSetWeightParams", self.set_weight_params)
+    self.bridge.listen("anvilAntennasBatchStatusUpdate", self.add_batch_antennas, "batch", "antennas_batch_status_response")
+    self.bridge.listen("anvilUploadAntennaPattern", self.send_pattern_to_server, "pattern", "upload_antenna_pattern_response")
+    self.bridge.listen("anvilPreviewDxf", self.preview_dxf, "dxf", "dxf_preview_error")
+    self.bridge.listen("anvilGenerateDxf", self.generate_dxf, "dxf", "dxf_error")
+    self.bridge.listen("anvilParseDxf", self.parse_dxf, "dxf", "dxf_parsed_response")
+    self.bridge.listen("anvilComplianceSettings", self.update_compliance_settings, "settings", "compliance_settings_response")
+    self.bridge.listen("anvilRestartSession", self.reset_session, "session")
+    self.bridge.listen("anvilGetAppVersion", self.send_app_version, "version")
+    self.bridge.listen("anvilSetSendLiveRsrp", self.set_send_live_rsrp, "settings")
+    self.bridge.listen("anvilSetOptimizationParams", self.set_optimization_params, "settings", "optimization_params_response")
+    self.bridge.listen("anvilSetWeightParams", self.set_weight_params, "settings", "weight_params_response")
 
     # ========== Core Iframe Communication ==========
   def _send_to_iframe(self, msg_type, success=None, **kwargs):
@@ -138,6 +215,79 @@ class App(AppTemplate):
     data.update(kwargs)
     js.window.sendMessageToIframe(data)
 
+  def _send_rsrp_to_iframe(self, msg_type, result, grids_field="new_bsrv_rsrp", **kwargs):
+    """Forward backend RSRP to the iframe, packed when the backend sent packed frames.
+
+    `result` is a get_live_* response. Packed responses carry
+    `new_bsrv_rsrp_packed = {"stream", "frames"}` (see RsrpGridCodec) and are posted
+    as transferable ArrayBuffers; list responses go through _send_to_iframe unchanged.
+    """
+    packed = result.get("new_bsrv_rsrp_packed")
+    if not packed:
+      kwargs[grids_field] = result.get("new_bsrv_rsrp", [])
+      self._stamp_traces(kwargs.get("traces"), self._grid_bytes(kwargs[grids_field]))
+      self._send_to_iframe(msg_type, **kwargs)
+      return
+    frames = [f if isinstance(f, str) else f.get_bytes() for f in packed.get("frames", [])]
+    self._stamp_traces(kwargs.get("traces"), sum(len(f) for f in frames))
+    data = {"type": msg_type}
+    data.update(kwargs)
+    data["rsrpPacked" if grids_field == "rsrp" else "new_bsrv_rsrp_packed"] = {"stream": packed.get("stream"), "frames": frames}
+    js.window.sendPackedToIframe(data)
+
+  # ========== Tracing ==========
+  # Spans for the iframe's LatencyTracer (theme/assets/src/system/LatencyTracer.js):
+  # each traced message carries traces=[{"id", "start", "received", "sent", "spans"}], spans being
+  # {"stage", "start", "end", "bytes"} in epoch ms on the browser's clock (the App and the
+  # iframe share it). Backend timestamps are on the server's clock and never enter these spans.
+
+  def _now_ms(self):
+    return js.window.performance.timeOrigin + js.window.performance.now()
+
+  def _open_trace(self, detail):
+    """Trace context for an iframe request that carries a traceId; None otherwise."""
+    trace_id = detail.get("traceId") if detail else None
+    if not trace_id:
+      return None
+    trace = {"id": trace_id, "received": self._now_ms(), "spans": []}
+    if detail.get("sentAt") is not None:
+      trace["spans"].append({"stage": "bridge", "start": detail.get("sentAt"), "end": trace["received"],
+                             "bytes": detail.get("bytes")})
+    return trace
+
+  def _trace_span(self, traces, stage, start, size=None):
+    end = self._now_ms()
+    for trace in traces or []:
+      trace["spans"].append({"stage": stage, "start": start, "end": end, "bytes": size})
+
+  def _grid_bytes(self, grids):
+    """Size of one grid or a list of grids as posted to the iframe (float64 per bin)."""
+    if not grids:
+      return 0
+    if isinstance(grids[0], (list, tuple)):
+      return 8 * sum(len(g) for g in grids)
+    return 8 * len(grids)
+
+  def _stamp_traces(self, traces, size):
+    """Close the "forward" span (grid ready -> posted to the iframe) just before posting."""
+    now = self._now_ms()
+    for trace in traces or []:
+      ready = trace["spans"][-1]["end"] if trace["spans"] else trace["received"]
+      trace["spans"].append({"stage": "forward", "start": ready, "end": now, "bytes": size})
+      trace["sent"] = now
+
+  def _negotiate_rsrp_encoding(self):
+    """Ask the backend for packed RSRP frames; older backends keep sending float lists."""
+    try:
+      with anvil.server.no_loading_indicator:
+        result = anvil.server.call("set_rsrp_encoding", RSRP_ENCODING)
+      self.rsrp_encoding = result.get("encoding") if result else None
+    except anvil.server.NoServerFunctionError:
+      self.rsrp_encoding = None
+    except Exception as e:
+      logger.error(f"[RSRP] set_rsrp_encoding failed: {e}")
+      self.rsrp_encoding = None
+
   def set_send_live_rsrp(self, event):
     """Called when JS sends set_send_live_rsrp (e.g. Accurate Engine model selected)."""
     enabled = False
@@ -202,12 +352,21 @@ class App(AppTemplate):
       return
 
     for data in event_data['files']:
-
       filename = getattr(data, "filename", None) or (data.get("filename") if hasattr(data, "get") else "uploaded_pattern.txt")
       if not (filename.lower().endswith(".txt") or filename.lower().endswith(".msi")):
         self._send_error("upload_antenna_pattern_response", f"Unsupported file type: {filename}")
         return
 
+    # One job per file on the "upload" lane, so several patterns upload in parallel
+    for data in event_data['files']:
+      self.bridge.submit("upload", self._upload_pattern_file, data, response_type="upload_antenna_pattern_response")
+
+  def _upload_pattern_file(self, data):
+    filename = getattr(data, "filename", None) or (data.get("filename") if hasattr(data, "get") else "uploaded_pattern.txt")
+    js_file = data.get("file") if hasattr(data, "get") else None
+    if js_file:
+      result = self._upload_file(js_file, filename, "pattern", "text/plain", "upload_antenna_pattern")
+    else:
       file_content = getattr(data, "content", None) or (data.get("content") if hasattr(data, "get") else None)
       if not file_content:
         self._send_error("upload_antenna_pattern_response", "No file content received for pattern upload")
@@ -224,12 +383,52 @@ class App(AppTemplate):
       with anvil.server.no_loading_indicator:
         result = anvil.server.call("upload_antenna_pattern", media_obj)
 
-      if result.get("status") == "success":
-        print(f"[SUCCESS] Pattern {result.get('pattern_name')} uploaded.")
-        self._send_to_iframe("upload_antenna_pattern_response", success=True, pattern_name=result.get("pattern_name"), filename=result.get("filename"))
-      else:
-        self._send_error("upload_antenna_pattern_response", result.get("message", "Unknown error during upload"))
+    if result.get("status") == "success":
+      print(f"[SUCCESS] Pattern {result.get('pattern_name')} uploaded.")
+      # New pattern content: the next batch is not a repeat of the last one
+      self._pattern_rev += 1
+      self._send_to_iframe("upload_antenna_pattern_response", success=True, pattern_name=result.get("pattern_name"), filename=result.get("filename"))
+    else:
+      self._send_error("upload_antenna_pattern_response", result.get("message", "Unknown error during upload"))
+
+  def _upload_file(self, js_file, filename, kind, content_type, legacy_function, legacy_args=(), options=None, on_chunk=None):
+    """Upload a browser File to the backend as binary chunks and return the backend result.
+
+    Chunks are UPLOAD_CHUNK_BYTES slices of the File, converted with js.to_media (no
+    base64). The upload id is stable for the same name/size/mtime, so a retry resumes
+    from the chunks the backend already holds. Backends without begin_upload get the
+    whole file as one BlobMedia via `legacy_function(media, *legacy_args)`.
+    `on_chunk(response)` sees every upload_chunk response (e.g. streamed DXF walls).
+    """
+    size = int(js_file.size)
+    if self.chunked_upload_supported:
+      upload_id = f"{kind}:{filename}:{size}:{js_file.lastModified}"
+      try:
+        with anvil.server.no_loading_indicator:
+          begun = anvil.server.call("begin_upload", upload_id, filename, size, UPLOAD_CHUNK_BYTES, kind)
+      except anvil.server.NoServerFunctionError:
+        self.chunked_upload_supported = False
+    if self.chunked_upload_supported:
+      total = begun.get("total", 1)
+      received = set(begun.get("received", []))
+      for index in range(total):
+        if index in received:
+          continue
+        start = index * UPLOAD_CHUNK_BYTES
+        chunk = js.to_media(js_file.slice(start, min(size, start + UPLOAD_CHUNK_BYTES)),
+                            content_type="application/octet-stream", name=f"{filename}.{index}")
+        with anvil.server.no_loading_indicator:
+          response = anvil.server.call("upload_chunk", upload_id, index, chunk)
+        if on_chunk and response:
+          on_chunk(response)
+        if total > 1:
+          self._send_to_iframe("upload_progress", filename=filename, kind=kind, sent=index + 1, total=total)
+      with anvil.server.no_loading_indicator:
+        return anvil.server.call("finish_upload", upload_id, options or {})
 
+    media_obj = js.to_media(js_file, content_type=content_type, name=filename)
+    with anvil.server.no_loading_indicator:
+      return anvil.server.call(legacy_function, media_obj, *legacy_args)
 
     # ========== Antenna Config / Batch ==========
 
@@ -251,9 +450,14 @@ class App(AppTemplate):
       "Y_antenna": antenna_data.get("y", ""),
       "Z_antenna": antenna_data.get("z", 2.5),
       "Turning_ON_OFF": enabled_value,
+      # RsrpSnapshot fingerprint of this config; the backend echoes it with the grid
+      # (RsrpCache.FINGERPRINT_FIELD) and leaves it out of its cache keys
+      "RSRP_Fingerprint": antenna_data.get("fingerprint") or "",
     }
 
   def send_antenna_config(self, event):
+    """Queue one antenna update; updates arriving within ANTENNA_COALESCE_MS go out as one batch."""
+    trace = self._open_trace(event.detail) if hasattr(event, "detail") else None
     antenna_data = event.detail.get("antenna") if hasattr(event, "detail") else event.detail
     request_id = event.detail.get("requestId") if hasattr(event, "detail") else None
     ant_id = antenna_data.get("id") if antenna_data else None
@@ -270,53 +474,230 @@ class App(AppTemplate):
 
     ant_config = self._transform_antenna_data(antenna_data)
     print(f"Antenna update: {ant_id} - enabled: {ant_config.get('Turning_ON_OFF')}")
-
-    with anvil.server.no_loading_indicator:
-      result = anvil.server.call("enqueue_antenna", ant_id, ant_config)
-
-    if not result:
-      self._send_error("antenna_status_response", "No response from backend", request_id=request_id)
-      return
-
-    state = result.get("state")
-    if state == "optimization_running":
-      self._send_error("antenna_status_response", f"Optimization is running - cannot modify antenna {ant_id}", request_id=request_id)
+    # Walls/floor planes the update is meant for (RsrpSnapshot.geometryFingerprint)
+    geometry_rev = (event.detail.get("geometryRev") or "") if hasattr(event, "detail") else ""
+
+    # Last writer wins per antenna; every superseded requestId is answered with the merged result
+    previous = self._pending_antennas.pop(ant_id, None)
+    request_ids = (previous["request_ids"] if previous else []) + [request_id]
+    traces = (previous["traces"] if previous else []) + ([trace] if trace else [])
+    self._pending_antennas[ant_id] = {"config": ant_config, "request_ids": request_ids, "traces": traces,
+                                      "geometry_rev": geometry_rev}
+
+    if not self._antenna_flush_scheduled:
+      self._antenna_flush_scheduled = True
+      js.window.setTimeout(lambda: self.bridge.submit("antenna", self._flush_antenna_updates, response_type="antenna_status_response"), ANTENNA_COALESCE_MS)
+
+  def _flush_antenna_updates(self, event=None):
+    """Send every pending antenna update in one enqueue_antenna_batch call.
+
+    The backend answers {"results": {ant_id: {"state", "error"}}} plus the changed grids in
+    get_antenna_rsrp form ("grids" / "rsrp_packed"), so N edits cost one round-trip.
+    """
+    self._antenna_flush_scheduled = False
+    pending, self._pending_antennas = self._pending_antennas, {}
+    if not pending:
       return
-    elif state == "update_failed":
-      self._send_error("antenna_status_response", f"Update failed: {result.get('error', 'Unknown error')}", request_id=request_id)
+    # Backend antenna set now differs from the last batch, so the same batch is no longer a duplicate
+    self._last_batch_fingerprint = None
+
+    ant_ids = list(pending.keys())
+    ant_configs = [pending[ant_id]["config"] for ant_id in ant_ids]
+    traces = {ant_id: pending[ant_id]["traces"] for ant_id in ant_ids}
+    # Updates queued within one window share the geometry; the latest revision names it
+    geometry_rev = next((pending[ant_id]["geometry_rev"] for ant_id in reversed(ant_ids) if pending[ant_id]["geometry_rev"]), "")
+    all_traces = [trace for ant_id in ant_ids for trace in traces[ant_id]]
+    flush_at = self._now_ms()
+    for trace in all_traces:
+      trace["spans"].append({"stage": "coalesce", "start": trace["received"], "end": flush_at, "bytes": None})
+    if self.antenna_batch_supported:
+      try:
+        with anvil.server.no_loading_indicator:
+          result = anvil.server.call("enqueue_antenna_batch", ant_ids, ant_configs, self.enable_live_rsrp,
+                                     geometry_rev=geometry_rev)
+        if all_traces:
+          self._trace_span(all_traces, "enqueue", flush_at, len(json.dumps(ant_configs)))
+      except anvil.server.NoServerFunctionError:
+        logger.warning("enqueue_antenna_batch not available, sending antenna updates one by one")
+        self.antenna_batch_supported = False
+      except Exception as e:
+        # The flush runs without an event, so the bridge could not answer for us
+        self._fail_antenna_updates(pending.values(), e)
+        return
+    if not self.antenna_batch_supported:
+      for ant_id in ant_ids:
+        try:
+          self._enqueue_single_antenna(ant_id, pending[ant_id])
+        except Exception as e:
+          self._fail_antenna_updates([pending[ant_id]], e)
       return
 
-    print(f"[SUCCESS] Antenna {ant_id} {state}")
-    self._send_to_iframe("antenna_status_response", success=True, requestId=request_id)
+    result = result or {}
+    results = result.get("results") or {}
+    print(f"[BATCH] Flushed {len(ant_ids)} coalesced antenna update(s)")
+    live_ids = []
+    for ant_id in ant_ids:
+      entry = pending[ant_id]
+      state = self._answer_antenna_update(ant_id, entry, results.get(ant_id))
+      if self._wants_live_rsrp(ant_id, entry, state):
+        live_ids.append(ant_id)
+    if live_ids and not (result.get("grids") or result.get("rsrp_packed")):
+      if not self._fetch_antenna_rsrp(live_ids, traces):
+        # Legacy backend: get_live_rsrp cannot tell coalesced antennas apart, so send them
+        # (and every later update) one at a time, each followed by its own fetch
+        self.antenna_batch_supported = False
+        for ant_id in live_ids:
+          try:
+            self._enqueue_single_antenna(ant_id, pending[ant_id], answered=True)
+          except Exception as e:
+            logger.error(f"enqueue_antenna failed for ant_id={ant_id}: {e}")
+    else:
+      self._forward_antenna_rsrp(result, live_ids, traces)
 
-    if not self.enable_live_rsrp or state not in ("added", "updated"):
-      return
+  def _fail_antenna_updates(self, entries, error):
+    """Answer every requestId folded into `entries` with `error`."""
+    for entry in entries:
+      for request_id in entry["request_ids"]:
+        self._send_error("antenna_status_response", f"Antenna update failed: {error}", request_id=request_id)
 
-      # Antenna turned off — evict from frontend cache immediately, no RSRP to fetch
-    if not ant_config.get('Turning_ON_OFF'):
-      self._send_to_iframe("live_rsrp", ant_id=ant_id, rsrp=None)
+  def _answer_antenna_update(self, ant_id, entry, result):
+    """Reply to every requestId folded into `entry`; returns the backend state or None on failure."""
+    if not result:
+      error = "No response from backend"
+    elif result.get("state") == "optimization_running":
+      error = f"Optimization is running - cannot modify antenna {ant_id}"
+    elif result.get("state") == "update_failed":
+      error = f"Update failed: {result.get('error', 'Unknown error')}"
+    else:
+      print(f"[SUCCESS] Antenna {ant_id} {result.get('state')}")
+      for request_id in entry["request_ids"]:
+        self._send_to_iframe("antenna_status_response", success=True, requestId=request_id)
+      return result.get("state")
+    for request_id in entry["request_ids"]:
+      self._send_error("antenna_status_response", error, request_id=request_id)
+    return None
+
+  def _wants_live_rsrp(self, ant_id, entry, state):
+    """True when a fresh grid should be forwarded; evicts turned-off antennas right away."""
+    if not self.enable_live_rsrp or state not in ("added", "updated"):
+      return False
+    # Antenna turned off — evict from frontend cache immediately, no RSRP to fetch
+    if not entry["config"].get('Turning_ON_OFF'):
+      self._stamp_traces(entry["traces"], 0)
+      self._send_to_iframe("live_rsrp", ant_id=ant_id, rsrp=None, traces=entry["traces"])
       print(f"[RSRP] Antenna {ant_id} turned OFF — evicted from cache")
+      return False
+    return True
+
+  def _enqueue_single_antenna(self, ant_id, entry, answered=False):
+    """Per-antenna path for backends without enqueue_antenna_batch (or without keyed grids).
+
+    `answered`: the entry's requestIds already had their reply from a batch flush.
+    """
+    start = self._now_ms()
+    with anvil.server.no_loading_indicator:
+      result = anvil.server.call("enqueue_antenna", ant_id, entry["config"], geometry_rev=entry["geometry_rev"])
+    self._trace_span(entry["traces"], "enqueue", start, len(json.dumps(entry["config"])))
+
+    if answered:
+      state = (result or {}).get("state")
+    else:
+      state = self._answer_antenna_update(ant_id, entry, result)
+    if not self._wants_live_rsrp(ant_id, entry, state):
       return
 
       # enqueue_antenna is a blocking server.call — by the time it returned the backend
-      # has already computed RSRP and appended it to bl_rsrp. Fetch it inline immediately.
-      # No timer, no pending flags, no polling delay.
+      # has already computed RSRP. Fetch this antenna's grid inline immediately.
+    self._fetch_antenna_rsrp([ant_id], {ant_id: entry["traces"]})
+
+  def _fetch_antenna_rsrp(self, ant_ids, traces=None):
+    """Fetch only the grids of `ant_ids` that changed since the versions we hold.
+
+    Returns False, without fetching, when only the legacy get_live_rsrp is available
+    and `ant_ids` has several antennas: its latest grid belongs to just one of them.
+    """
+    traces = traces or {}
+    start = self._now_ms()
+    if self.keyed_rsrp_supported:
+      try:
+        since = {ant_id: self._rsrp_versions.get(ant_id, 0) for ant_id in ant_ids}
+        with anvil.server.no_loading_indicator:
+          response = anvil.server.call("get_antenna_rsrp", ant_ids, since)
+        self._trace_span([t for ant_id in ant_ids for t in traces.get(ant_id, [])], "fetch_rsrp", start)
+        self._forward_antenna_rsrp(response, ant_ids, traces)
+        return True
+      except anvil.server.NoServerFunctionError:
+        logger.warning("get_antenna_rsrp not available, falling back to get_live_rsrp")
+        self.keyed_rsrp_supported = False
+      except Exception as e:
+        logger.error(f"get_antenna_rsrp failed for ant_ids={ant_ids}: {e}")
+        return True
+
+    # Legacy backends: whole history from index zero, last entry assumed to be ours
+    if len(ant_ids) > 1:
+      return False
+    ant_id = ant_ids[0]
     try:
       with anvil.server.no_loading_indicator:
         rsrp_result = anvil.server.call("get_live_rsrp", 0, 0)
+      ant_traces = traces.get(ant_id)
+      self._trace_span(ant_traces, "fetch_rsrp", start)
+      packed = rsrp_result.get("new_bsrv_rsrp_packed")
       new_rsrp = rsrp_result.get("new_bsrv_rsrp", [])
-      if new_rsrp:
+      if packed and packed.get("frames"):
+        # Whole stream is forwarded so delta frames keep their base; the iframe keeps the last one
+        self._send_rsrp_to_iframe("live_rsrp", rsrp_result, grids_field="rsrp", ant_id=ant_id, traces=ant_traces)
+        print(f"Sent packed live_rsrp: ant_id={ant_id}, frames={len(packed['frames'])}")
+      elif new_rsrp:
         rsrp_grid = new_rsrp[-1]  # last entry is always this antenna's fresh grid
-        self._send_to_iframe("live_rsrp", ant_id=ant_id, rsrp=rsrp_grid)
+        self._stamp_traces(ant_traces, self._grid_bytes(rsrp_grid))
+        self._send_to_iframe("live_rsrp", ant_id=ant_id, rsrp=rsrp_grid, traces=ant_traces)
         print(f"Sent live_rsrp: ant_id={ant_id}, bins={len(rsrp_grid) if rsrp_grid else 0}")
       else:
         print(f"get_live_rsrp returned empty for ant_id={ant_id}")
     except Exception as e:
       logger.error(f"get_live_rsrp failed for ant_id={ant_id}: {e}")
+    return True
+
+  def _forward_antenna_rsrp(self, response, ant_ids, traces=None):
+    """Send keyed grids ({"grids": {ant_id: {"version", "fingerprint", "rsrp"}}, "rsrp_packed", "removed"}) as live_rsrp.
+
+    `fingerprint` is the config fingerprint the backend computed the grid for, passed on
+    so the iframe tags the grid with it (None from backends that do not echo it).
+    """
+    grids = response.get("grids") or {}
+    packed_grids = response.get("rsrp_packed") or {}
+    traces = traces or {}
+    for ant_id in ant_ids:
+      entry = grids.get(ant_id)
+      fingerprint = entry.get("fingerprint") if entry else None
+      if ant_id in packed_grids:
+        self._send_rsrp_to_iframe("live_rsrp", {"new_bsrv_rsrp_packed": packed_grids[ant_id]}, grids_field="rsrp", ant_id=ant_id,
+                                  fingerprint=fingerprint, traces=traces.get(ant_id))
+      elif entry and entry.get("rsrp"):
+        self._stamp_traces(traces.get(ant_id), self._grid_bytes(entry["rsrp"]))
+        self._send_to_iframe("live_rsrp", ant_id=ant_id, rsrp=entry["rsrp"], fingerprint=fingerprint, traces=traces.get(ant_id))
+      else:
+        continue
+      if entry and entry.get("version"):
+        self._rsrp_versions[ant_id] = entry["version"]
+      print(f"Sent live_rsrp: ant_id={ant_id}, version={self._rsrp_versions.get(ant_id)}")
+    for ant_id in response.get("removed") or []:
+      self._rsrp_versions.pop(ant_id, None)
+      self._send_to_iframe("live_rsrp", ant_id=ant_id, rsrp=None)
 
   def add_batch_antennas(self, event):
     request_id = event.detail.get("requestId") if hasattr(event, "detail") else None
     antennas = event.detail.get("antennas") if hasattr(event, "detail") else []
+    # Antennas whose grid the iframe restored from the saved project (fingerprint unchanged)
+    cached_ids = set(event.detail.get("cachedIds") or []) if hasattr(event, "detail") else set()
+    # Walls/floor planes the batch is meant for (RsrpSnapshot.geometryFingerprint), and the
+    # fingerprint of each antenna's config, echoed back with its grid
+    geometry_rev = (event.detail.get("geometryRev") or "") if hasattr(event, "detail") else ""
+    fingerprints = (event.detail.get("fingerprints") or {}) if hasattr(event, "detail") else {}
+    if hasattr(event, "detail") and event.detail.get("source") == "project_load":
+      # A loaded project is a new starting point, even if it repeats the last batch
+      self._last_batch_fingerprint = None
 
     if not antennas:
       self._send_error("antennas_batch_status_response", "No antennas in configs update", request_id=request_id)
@@ -329,6 +710,7 @@ class App(AppTemplate):
         continue
       ants_ids.append(ant_id)
       ant_config = self._transform_antenna_data(ant)
+      ant_config["RSRP_Fingerprint"] = fingerprints.get(ant_id) or ""
       if pattern is None:
         pattern = ant_config["Antenna_Pattern_Name"].replace(".txt", "")
       ants_configs.append(ant_config)
@@ -337,25 +719,101 @@ class App(AppTemplate):
       self._send_error("antennas_batch_status_response", "No valid antennas or pattern for batch update", request_id=request_id)
       return
 
-    now = time.time()
-    last = getattr(self, "_last_batch_time", 0)
-    if now - last < 2.0 and getattr(self, "_last_batch_count", 0) == len(ants_ids):
-      print("[BATCH] Skipping duplicate batch (%s antennas) within 2s", len(ants_ids))
+    # Exact dedupe: same ids + same transformed configs, on the same walls and pattern
+    # uploads, as the last batch the backend accepted
+    fingerprint = json.dumps([geometry_rev, self._pattern_rev,
+                              sorted(zip(ants_ids, [json.dumps(c, sort_keys=True) for c in ants_configs]))])
+    if fingerprint == self._last_batch_fingerprint:
+      print(f"[BATCH] Skipping duplicate batch ({len(ants_ids)} antennas)")
       self._send_to_iframe("antennas_batch_status_response", success=True, requestId=request_id)
       return
 
-    self._last_batch_time = now
-    self._last_batch_count = len(ants_ids)
-
-    with anvil.server.no_loading_indicator:
-      anvil.server.call("process_batch_antennas", pattern, ants_ids, ants_configs)
+    job_id = None
+    if self.batch_stream_supported:
+      try:
+        with anvil.server.no_loading_indicator:
+          job_id = anvil.server.call("process_batch_antennas_async", pattern, ants_ids, ants_configs,
+                                     geometry_rev=geometry_rev).get("job")
+      except anvil.server.NoServerFunctionError:
+        logger.warning("process_batch_antennas_async not available, falling back to process_batch_antennas")
+        self.batch_stream_supported = False
+    if job_id is None:
+      with anvil.server.no_loading_indicator:
+        anvil.server.call("process_batch_antennas", pattern, ants_ids, ants_configs, geometry_rev=geometry_rev)
+    self._last_batch_fingerprint = fingerprint
 
     self._send_to_iframe("antennas_batch_status_response", success=True, requestId=request_id)
     print("[BATCH] Added %s antenna(s) from batch update", len(ants_ids))
 
     if self.enable_live_rsrp and ants_ids:
+      if job_id is not None:
+        self._stream_batch_rsrp(job_id, [ant_id for ant_id in ants_ids if ant_id not in cached_ids])
       self.get_accurate_baseline()
 
+  def _stream_batch_rsrp(self, job_id, ant_ids):
+    """Forward each antenna's grid as the backend pool finishes it, until the job ends."""
+    pending = list(ant_ids)
+    deadline = time.time() + BATCH_STREAM_TIMEOUT_S
+    while True:
+      with anvil.server.no_loading_indicator:
+        status = anvil.server.call("get_batch_status", job_id)
+      if pending and self.keyed_rsrp_supported:
+        before = {ant_id: self._rsrp_versions.get(ant_id) for ant_id in pending}
+        self._fetch_antenna_rsrp(pending)
+        pending = [ant_id for ant_id in pending if self._rsrp_versions.get(ant_id) == before[ant_id]]
+      if status.get("status") != "running":
+        if status.get("status") == "error":
+          logger.error(f"[BATCH] job {job_id} failed: {status.get('message')}")
+        for ant_id, message in (status.get("failed") or {}).items():
+          logger.warning(f"[BATCH] antenna {ant_id} failed: {message}")
+        break
+      if time.time() > deadline:
+        logger.warning(f"[BATCH] job {job_id} still running after {BATCH_STREAM_TIMEOUT_S}s, stopped streaming")
+        break
+      time.sleep(BATCH_STREAM_POLL_S)
+    print(f"[BATCH] job {job_id} {status.get('status')}: {status.get('completed')}/{status.get('total')} antennas")
+
+  def generate_coverage_report(self, event):
+    """Bulk coverage report for saved projects, built on the backend pool and downloaded as .xlsx."""
+    request_id = event.detail.get("requestId")
+    projects = list(event.detail.get("projects") or [])
+    names = list(event.detail.get("names") or [])
+    if not projects:
+      self._send_error("coverage_report_status", "No projects for the coverage report", request_id=request_id)
+      return
+    try:
+      with anvil.server.no_loading_indicator:
+        job_id = anvil.server.call("generate_coverage_report_async", projects, names).get("job")
+    except anvil.server.NoServerFunctionError:
+      self._send_error("coverage_report_status", "Coverage reports are not available on this backend", request_id=request_id)
+      return
+
+    deadline = time.time() + REPORT_TIMEOUT_S
+    while True:
+      with anvil.server.no_loading_indicator:
+        status = anvil.server.call("get_report_status", job_id)
+      self._send_to_iframe("coverage_report_status", success=status.get("status") != "error", requestId=request_id,
+                           status=status.get("status"), completed=status.get("completed"),
+                           total=status.get("total"), stage=status.get("stage"), message=status.get("message"))
+      if status.get("status") != "running":
+        break
+      if time.time() > deadline:
+        logger.warning(f"[REPORT] job {job_id} still running after {REPORT_TIMEOUT_S}s, stopped waiting")
+        self._send_error("coverage_report_status", f"Coverage report timed out after {REPORT_TIMEOUT_S // 60} minutes",
+                         request_id=request_id)
+        break
+      time.sleep(REPORT_POLL_S)
+
+    if status.get("status") == "finished":
+      with anvil.server.no_loading_indicator:
+        media = anvil.server.call("get_coverage_report", job_id)
+      if media is None:
+        self._send_error("coverage_report_status", "Coverage report is no longer available", request_id=request_id)
+        return
+      from anvil.media import download
+      download(media)
+    print(f"[REPORT] job {job_id} {status.get('status')}: {status.get('completed')}/{status.get('total')} antennas")
+
     # ========== Optimization ==========
   def get_accurate_baseline(self, event=None):
     if self.opt_running:
@@ -372,21 +830,82 @@ class App(AppTemplate):
       result = anvil.server.call("get_accurate_baseline")
 
     status = result.get("status")
+    viewport = self._viewport_from_event(event)
+    if status == "success" and viewport and self.rsrp_tiles_supported:
+      # Large floorplan: fetch only the LOD level/tiles the iframe can show
+      tiles = self._fetch_rsrp_tiles("baseline", viewport, [])
+      if tiles is not None:
+        self._send_to_iframe("baseline_rsrp", rsrp_tiles=tiles,
+                             new_compliance=tiles.get("new_compliance", []),
+                             message="Accurate baseline calculated successfully")
+        return
     if status == "success":
       with anvil.server.no_loading_indicator:
         live_baseline = anvil.server.call("get_live_rsrp", 0, 0)
-      self._send_to_iframe("baseline_rsrp",
-                           new_bsrv_rsrp=live_baseline.get("new_bsrv_rsrp", []),
-                           new_compliance=live_baseline.get("new_compliance", []),
-                           message="Accurate baseline calculated successfully")
+      self._send_rsrp_to_iframe("baseline_rsrp", live_baseline,
+                                new_compliance=live_baseline.get("new_compliance", []),
+                                message="Accurate baseline calculated successfully")
     else:
       self._send_error("baseline_error", result.get("message", "Error calculating accurate baseline"))
 
+  @staticmethod
+  def _viewport_from_event(event):
+    """Plain dict of the iframe viewport ({x0, y0, x1, y1} in metres, pixels_w/h), or None."""
+    viewport = event.detail.get("viewport") if event is not None and hasattr(event, "detail") and event.detail else None
+    if not viewport:
+      return None
+    return {k: float(viewport.get(k) or 0) for k in ("x0", "y0", "x1", "y1", "pixels_w", "pixels_h")}
+
+  def _fetch_rsrp_tiles(self, key, viewport, have):
+    """LOD tiles of grid `key` for `viewport` (RsrpPyramid); None on older backends."""
+    try:
+      with anvil.server.no_loading_indicator:
+        tiles = anvil.server.call("get_rsrp_tiles", key, viewport, list(have or []))
+    except anvil.server.NoServerFunctionError:
+      self.rsrp_tiles_supported = False
+      return None
+    tiles["key"] = key
+    return tiles
+
+  def send_rsrp_tiles(self, event):
+    """Finer/missing tiles after the iframe viewport changed (resize, 3D zoom)."""
+    viewport = self._viewport_from_event(event)
+    if not viewport or not self.rsrp_tiles_supported:
+      self._send_to_iframe("rsrp_tiles", success=False)
+      return
+    key = event.detail.get("key") or "baseline"
+    tiles = self._fetch_rsrp_tiles(key, viewport, event.detail.get("have"))
+    if tiles is None:
+      self._send_to_iframe("rsrp_tiles", success=False)
+      return
+    self._send_to_iframe("rsrp_tiles", success=True, tiles=tiles)
+
+  def fetch_rsrp_grids(self, event):
+    """Re-send full per-antenna grids (as live_rsrp) for a coverage export missing them."""
+    ant_ids = list(event.detail.get("antIds") or [])
+    for ant_id in ant_ids:
+      self._rsrp_versions.pop(ant_id, None)    # force full grids, not "unchanged"
+    if ant_ids:
+      self._fetch_antenna_rsrp(ant_ids)
+    self._send_to_iframe("rsrp_grids_ready", success=True, requestId=event.detail.get("requestId"), antIds=ant_ids)
+
   @handle("opt_timer", "tick")
   def opt_timer_tick(self, **event_args):
-    """Optimization polling: fetches live actions/RSRP/compliance while optimization runs."""
-    if self.opt_running:
+    """Optimization polling: fetches live actions/RSRP/compliance while optimization runs.
+
+    With a long-poll backend one tick drives the whole loop: each call is held
+    server-side until there is progress, so round-trips follow the optimizer,
+    not the timer. Older backends get one get_live_optimization per tick.
+    """
+    if not self.opt_running or self._opt_poll_active:
+      return
+    self._opt_poll_active = True
+    try:
       self.poll_optimization_data(**event_args)
+      while self.opt_running and self.long_poll_supported:
+        self.poll_optimization_data(**event_args)
+    finally:
+      self._opt_poll_active = False
 
   def start_optimization(self, event):
     if self.opt_running:
@@ -426,17 +945,59 @@ class App(AppTemplate):
       self.opt_running = False
       self._reset_indexes()
 
-  def poll_optimization_data(self, **event_args):
+  def _fetch_live_optimization(self):
+    """Long-poll for news past the cursors; falls back to the non-blocking read.
+
+    Backends with a bounded optimization history take one unified cursor and
+    may answer with a skip-to-latest snapshot; older ones take the three indexes.
+    """
+    if self.cursor_poll_supported:
+      try:
+        with anvil.server.no_loading_indicator:
+          return anvil.server.call("wait_live_optimization_cursor", self.opt_cursor, OPT_LONG_POLL_TIMEOUT,
+                                   OPT_LATEST_RSRP_ONLY)
+      except anvil.server.NoServerFunctionError:
+        logger.warning("wait_live_optimization_cursor not available, using per-stream indexes")
+        self.cursor_poll_supported = False
+    cursors = (self.last_action_idx, self.last_rsrp_idx, self.last_compliance_idx)
+    if self.long_poll_supported:
+      try:
+        with anvil.server.no_loading_indicator:
+          return anvil.server.call("wait_live_optimization", *cursors, OPT_LONG_POLL_TIMEOUT)
+      except anvil.server.NoServerFunctionError:
+        logger.warning("wait_live_optimization not available, falling back to timer polling")
+        self.long_poll_supported = False
     with anvil.server.no_loading_indicator:
-      result = anvil.server.call("get_live_optimization", self.last_action_idx, self.last_rsrp_idx, self.last_compliance_idx)
+      return anvil.server.call("get_live_optimization", *cursors)
+
+  def _open_poll_trace(self, fetch_start):
+    """Trace context for one optimization poll, from the fetch call to the iframe's heatmap paint."""
+    self._opt_trace_seq += 1
+    received = self._now_ms()
+    return {"id": "opt_%d" % self._opt_trace_seq, "start": fetch_start, "received": received,
+            "spans": [{"stage": "fetch", "start": fetch_start, "end": received, "bytes": None}]}
+
+  def poll_optimization_data(self, **event_args):
+    fetch_start = self._now_ms()
+    result = self._fetch_live_optimization()
+    traces = [self._open_poll_trace(fetch_start)]
 
     new_actions = result.get("new_action_configs", [])
-    new_bsrv_rsrp = result.get("new_bsrv_rsrp", [])
+    new_bsrv_rsrp = result.get("new_bsrv_rsrp") or (result.get("new_bsrv_rsrp_packed") or {}).get("frames", [])
     new_compliance = result.get("new_compliance", [])
     status = result.get("state", "idle")
     message = result.get("message", "")
+    if result.get("snapshot"):
+      print(f"[INFO] Behind by {result.get('skipped', 0)} optimization step(s), skipped to latest")
+    rsrp_skipped = result.get("rsrp_skipped", 0)
+    if OPT_LATEST_RSRP_ONLY and len(new_bsrv_rsrp) > 1 and not result.get("new_bsrv_rsrp_packed"):
+      # Backend without latest-only reads: drop stale list grids here (packed frames are delta-chained)
+      rsrp_skipped += len(new_bsrv_rsrp) - 1
+      result["new_bsrv_rsrp"] = new_bsrv_rsrp = new_bsrv_rsrp[-1:]
+    self.opt_rsrp_skipped += rsrp_skipped
 
     def _update_indexes():
+      self.opt_cursor = result.get("cursor", self.opt_cursor)
       self.last_action_idx = result.get("last_action_idx", self.last_action_idx)
       self.last_rsrp_idx = result.get("last_rsrp_idx", self.last_rsrp_idx)
       self.last_compliance_idx = result.get("last_compliance_idx", self.last_compliance_idx)
@@ -451,9 +1012,12 @@ class App(AppTemplate):
       if new_actions or new_bsrv_rsrp or new_compliance:
         print(f"     final batch: {len(new_actions)} action(s), {len(new_bsrv_rsrp)} rsrp, {len(new_compliance)} compliance")
         print("[BACK] last compliance: ", new_compliance[-1])
-      self._send_to_iframe("optimization_update", new_action_configs=new_actions, new_bsrv_rsrp=new_bsrv_rsrp, new_compliance=new_compliance, status=status, message=message, rsrp_send_timestamp_sec=result.get("rsrp_send_timestamp_sec"))
+      self._send_rsrp_to_iframe("optimization_update", result, new_action_configs=new_actions, new_compliance=new_compliance, status=status, message=message, skipped=result.get("skipped", 0), rsrp_skipped=rsrp_skipped, rsrp_send_timestamp_sec=result.get("rsrp_send_timestamp_sec"), traces=traces)
       _update_indexes()
-      print(f"[+] OPTIMIZATION COMPLETED — actions={self.last_action_idx}, rsrp={self.last_rsrp_idx}, compliance={self.last_compliance_idx}")
+      if self.cursor_poll_supported:
+        print(f"[+] OPTIMIZATION COMPLETED — steps={self.opt_cursor}, rsrp frames skipped={self.opt_rsrp_skipped}")
+      else:
+        print(f"[+] OPTIMIZATION COMPLETED — actions={self.last_action_idx}, rsrp={self.last_rsrp_idx}, compliance={self.last_compliance_idx}")
       self._send_to_iframe("optimization_finished", success=True)
       self.opt_running = False
       self._reset_indexes()
@@ -468,10 +1032,41 @@ class App(AppTemplate):
     if new_actions or new_bsrv_rsrp or new_compliance:
       print(f"[DEBUG] Sending {len(new_actions)} action(s), {len(new_bsrv_rsrp)} rsrp, {len(new_compliance)} compliance to HTML display")
 
-    self._send_to_iframe("optimization_update", new_action_configs=new_actions, new_bsrv_rsrp=new_bsrv_rsrp, new_compliance=new_compliance, status=status, message=message, rsrp_send_timestamp_sec=result.get("rsrp_send_timestamp_sec"))
+    self._send_rsrp_to_iframe("optimization_update", result, new_action_configs=new_actions, new_compliance=new_compliance, status=status, message=message, skipped=result.get("skipped", 0), rsrp_skipped=rsrp_skipped, rsrp_send_timestamp_sec=result.get("rsrp_send_timestamp_sec"), traces=traces)
     _update_indexes()
 
     # ========== DXF ==========
+  def _floorplan_media(self, data):
+    """The floorplan image as BlobMedia: the File itself when the iframe sent one, else the data URL decoded."""
+    js_file = data.get("imageFile")
+    if js_file:
+      return js.to_media(js_file, content_type=js_file.type or "image/png", name=js_file.name)
+    image = data.get("image")
+    header, encoded = image.split(",", 1) if "," in image else ("", image)
+    content_type = header[5:].split(";")[0] if header.startswith("data:") else "image/png"
+    return anvil.BlobMedia(content_type, base64.b64decode(encoded), "floorplan")
+
+  def _preview_floorplan_cached(self, data, params):
+    """Preview through the backend's image-hash cache; None on backends without it.
+
+    The handle from the last preview is tried first, so an unchanged image is not
+    uploaded again; the image is sent only if the backend no longer holds it.
+    """
+    if not self.floorplan_cache_supported:
+      return None
+    try:
+      result = None
+      if data.get("handle"):
+        with anvil.server.no_loading_indicator:
+          result = anvil.server.call("preview_floorplan_cached", data.get("handle"), None, params)
+      if not result or result.get("status") == "unknown_handle":
+        with anvil.server.no_loading_indicator:
+          result = anvil.server.call("preview_floorplan_cached", None, self._floorplan_media(data), params)
+      return result
+    except anvil.server.NoServerFunctionError:
+      self.floorplan_cache_supported = False
+      return None
+
   def preview_dxf(self, event):
     print("Iframe sent DXF preview request...")
     request_id = event.detail.get("requestId") if hasattr(event, "detail") else None
@@ -484,8 +1079,10 @@ class App(AppTemplate):
       return
 
     try:
-      with anvil.server.no_loading_indicator:
-        result = anvil.server.call("preview_floorplan", image_base64, params)
+      result = self._preview_floorplan_cached(data, params)
+      if result is None:
+        with anvil.server.no_loading_indicator:
+          result = anvil.server.call("preview_floorplan", image_base64, params)
 
       if not result:
         self._send_error("dxf_preview_error", "Backend returned no preview data", request_id=request_id)
@@ -496,7 +1093,8 @@ class App(AppTemplate):
                            predictions=result["predictions"],
                            counts=result["counts"],
                            vizImage=result["viz_image"],
-                           imageHeight=result["image_height"]
+                           imageHeight=result["image_height"],
+                           handle=result.get("handle")
                           )
     except Exception as e:
       self._send_error("dxf_preview_error", str(e), request_id=request_id)
@@ -509,14 +1107,26 @@ class App(AppTemplate):
     params = data.get("params")
     predictions = data.get("predictions")
     image_height = data.get("imageHeight")
+    handle = data.get("handle")
 
     if not image_base64 and not predictions:
       self._send_error("dxf_error", "No image provided for DXF generation", request_id=request_id)
       return
 
     try:
-      with anvil.server.no_loading_indicator:
-        dxf_media = anvil.server.call("generate_dxf_from_floorplan", image_base64, params, predictions, image_height)
+      dxf_media = None
+      if handle and self.floorplan_cache_supported:
+        # The backend still holds the previewed image: no re-upload
+        try:
+          with anvil.server.no_loading_indicator:
+            dxf_media = anvil.server.call("generate_dxf_from_floorplan_cached", handle, params, predictions)
+        except anvil.server.NoServerFunctionError:
+          self.floorplan_cache_supported = False
+        if isinstance(dxf_media, dict):
+          dxf_media = None
+      if dxf_media is None:
+        with anvil.server.no_loading_indicator:
+          dxf_media = anvil.server.call("generate_dxf_from_floorplan", image_base64, params, predictions, image_height)
 
       if not dxf_media:
         self._send_error("dxf_error", "Backend failed to generate DXF", request_id=request_id)
@@ -532,26 +1142,44 @@ class App(AppTemplate):
     print("Iframe sent DXF parsing request...")
     request_id = event.detail.get("requestId") if hasattr(event, "detail") else None
     data = event.detail
+    js_file = data.get("file")
     file_content = data.get("content")
     filename = data.get("filename", "floorplan.dxf")
 
-    if not file_content:
+    if not js_file and not file_content:
       self._send_error("dxf_parsed_response", "No file content provided for DXF parsing", request_id=request_id)
       return
 
-    if "," in file_content:
-      _, encoded = file_content.split(",", 1)
-      decoded = base64.b64decode(encoded)
-    else:
-      decoded = base64.b64decode(file_content)
-
-    dxf_media = anvil.BlobMedia("application/dxf", decoded, filename)
-
     target_w = data.get("targetWidthM")
     target_h = data.get("targetHeightM")
 
-    with anvil.server.no_loading_indicator:
-      project_data = anvil.server.call("parse_dxf_file", dxf_media, target_w, target_h)
+    if js_file:
+      # Walls parsed so far come back with each chunk (server_code/DxfStream.py) and are drawn right away
+      streamed = [0]
+
+      def _forward_walls(response):
+        dxf = response.get("dxf") or {}
+        for walls in dxf.get("batches", []):
+          streamed[0] += len(walls)
+          self._send_to_iframe("dxf_walls_batch", requestId=request_id, walls=walls,
+                               w=dxf.get("w"), h=dxf.get("h"), stats=dxf.get("stats"))
+
+      project_data = self._upload_file(js_file, filename, "dxf", "application/dxf", "parse_dxf_file",
+                                       (target_w, target_h), {"targetWidthM": target_w, "targetHeightM": target_h},
+                                       on_chunk=_forward_walls)
+      if project_data and streamed[0]:
+        project_data["wallsStreamed"] = streamed[0]
+    else:
+      if "," in file_content:
+        _, encoded = file_content.split(",", 1)
+        decoded = base64.b64decode(encoded)
+      else:
+        decoded = base64.b64decode(file_content)
+
+      dxf_media = anvil.BlobMedia("application/dxf", decoded, filename)
+
+      with anvil.server.no_loading_indicator:
+        project_data = anvil.server.call("parse_dxf_file", dxf_media, target_w, target_h)
 
     if not project_data:
       self._send_error("dxf_parsed_response", "Backend failed to parse DXF", request_id=request_id)
@@ -623,12 +1251,28 @@ class App(AppTemplate):
 
     # ========== Session ==========
   def _reset_indexes(self):
+    self.opt_cursor = 0
+    self.opt_rsrp_skipped = 0
     self.last_action_idx = 0
     self.last_rsrp_idx = 0
     self.last_compliance_idx = 0
 
   def reset_session(self, event=None):
     self.opt_running = False
+    self._opt_poll_active = False
+    self.long_poll_supported = True
+    self.cursor_poll_supported = True
+    self.antenna_batch_supported = True
+    self.keyed_rsrp_supported = True
+    self.batch_stream_supported = True
+    self.rsrp_tiles_supported = True
+    self.chunked_upload_supported = True
+    self.floorplan_cache_supported = True
+    self._rsrp_versions = {}
+    self._last_batch_fingerprint = None
+    self._pattern_rev = 0
+    self._pending_antennas = {}
+    self._antenna_flush_scheduled = False
     self.enable_live_rsrp = False
     self._reset_indexes()
     print("Resetting backend session...")
@@ -639,4 +1283,8 @@ class App(AppTemplate):
         break
       except:
         print(".")
-        time.sleep(1)
\ No newline at end of file
+        time.sleep(1)
+    if event is not None:
+      # Requested by the iframe: its packed-RSRP delta bases belong to the old session
+      self._send_to_iframe("backend_session_reset")
+    self._negotiate_rsrp_encoding()
\ No newline at end of file
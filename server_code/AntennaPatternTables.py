@@ -0,0 +1,215 @@
+# AntennaPatternTables.py
+# Antenna patterns compiled into fixed-resolution gain lookup tables.
+#
+# Mirrors the client (PropagationModel25D.gainTable in
+# theme/assets/src/propagation/PropagationModel25DN.js): each horizontal and
+# vertical cut of an .msi/.txt pattern is parsed like
+# AntennaPatterns.parseAntennaPattern, then sampled every TABLE_STEP_DEG with
+# the same wrap-around linear interpolation into a float32 table, so evaluating
+# gain is an index plus a lerp instead of a search of the sorted points.
+#
+# Backend wiring: `upload_antenna_pattern(media)` calls
+# `PATTERN_TABLES.compile_bytes(media.get_bytes())` and keeps the returned key
+# with the pattern; the propagation engine then calls `PATTERN_TABLES.get(key)`.
+# Tables are cached by the SHA-1 of the file content, so re-uploading the same
+# file (or the same pattern under another name) reuses the compiled tables.
+import hashlib
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+TABLE_STEP_DEG = 0.1
+TABLE_SIZE = int(round(360 / TABLE_STEP_DEG)) + 1   # last entry repeats 0 deg
+DBD_TO_DBI_OFFSET = 2.15
+MAX_CACHED_PATTERNS = 256
+
+
+# ========== Parsing ==========
+
+def _parse_gain_line(text):
+  try:
+    value = float(text.split()[0])
+  except (IndexError, ValueError):
+    return 0.0
+  # "dB"/"dBd" is converted to dBi, "dBi" is taken as is
+  if re.search(r"db(?!i)", text, re.IGNORECASE):
+    return value + DBD_TO_DBI_OFFSET
+  return value
+
+
+def parse_pattern(text):
+  """Parse MSI/Planet text into {name, frequency, gain, horizontal, vertical}.
+
+  `horizontal`/`vertical` are lists of (angle, gain) sorted by angle, with gains
+  forced negative (dB down from peak) as in the client parser.
+  """
+  pattern = {"name": "", "frequency": 0.0, "gain": 0.0, "horizontal": [], "vertical": []}
+  section = None
+  for raw in text.splitlines():
+    line = raw.strip()
+    if not line:
+      continue
+    if line.startswith("NAME "):
+      pattern["name"] = line[5:].strip()
+    elif line.startswith("FREQUENCY "):
+      try:
+        pattern["frequency"] = float(line[10:].split()[0])
+      except (IndexError, ValueError):
+        pass
+    elif line.startswith("GAIN "):
+      pattern["gain"] = _parse_gain_line(line[5:].strip())
+    elif line.startswith("HORIZONTAL"):
+      section = "horizontal"
+      pattern[section] = []
+    elif line.startswith("VERTICAL"):
+      section = "vertical"
+      pattern[section] = []
+    elif section:
+      parts = line.split()
+      if len(parts) < 2:
+        continue
+      try:
+        angle, value = float(parts[0]), float(parts[1])
+      except ValueError:
+        continue
+      pattern[section].append((angle, -value if value > 0 else value))
+  pattern["horizontal"].sort(key=lambda p: p[0])
+  pattern["vertical"].sort(key=lambda p: p[0])
+  return pattern
+
+
+def from_client_pattern(obj):
+  """parse_pattern-shaped dict from an AntennaPatterns.parseAntennaPattern object
+  (as stored in ProjectIO project files: horizontalData/verticalData)."""
+  def points(data):
+    return sorted((float(p["angle"]), float(p["gain"])) for p in data or [])
+  return {"name": obj.get("name") or "", "frequency": float(obj.get("frequency") or 0),
+          "gain": float(obj.get("gain") or 0),
+          "horizontal": points(obj.get("horizontalData")), "vertical": points(obj.get("verticalData"))}
+
+
+# ========== Compilation ==========
+
+def interpolate_sorted(points, angle):
+  """Gain at `angle` from sorted (angle, gain) points, wrapping at 360 deg."""
+  if not points:
+    return 0.0
+  if len(points) == 1:
+    return points[0][1]
+  angle = angle % 360.0
+  upper = next((i for i, p in enumerate(points) if p[0] > angle), -1)
+  if upper <= 0:
+    (a1, g1), (a2, g2) = points[-1], (points[0][0] + 360.0, points[0][1])
+  else:
+    (a1, g1), (a2, g2) = points[upper - 1], points[upper]
+  span = a2 - a1
+  if abs(span) < 1e-9:
+    return g1
+  return g1 + (angle - a1) / span * (g2 - g1)
+
+
+def compile_table(points):
+  """float32 table of the gain every TABLE_STEP_DEG (numpy array, or array('f'))."""
+  values = [interpolate_sorted(points, k * TABLE_STEP_DEG) for k in range(TABLE_SIZE - 1)]
+  values.append(values[0] if values else 0.0)
+  if np is not None:
+    return np.asarray(values, dtype=np.float32)
+  return array("f", values)
+
+
+def lookup(table, angles):
+  """Gain for `angles` in degrees: a scalar, or an ndarray of the same shape."""
+  if np is not None and not isinstance(angles, (int, float)):
+    tbl = np.asarray(table, dtype=np.float32)
+    pos = np.mod(np.asarray(angles, dtype=np.float64), 360.0) / TABLE_STEP_DEG
+    idx = np.minimum(np.floor(pos).astype(np.int64), TABLE_SIZE - 2)
+    frac = (pos - idx).astype(np.float32)
+    return tbl[idx] + frac * (tbl[idx + 1] - tbl[idx])
+  pos = (float(angles) % 360.0) / TABLE_STEP_DEG
+  idx = min(int(pos), TABLE_SIZE - 2)
+  return table[idx] + (pos - idx) * (table[idx + 1] - table[idx])
+
+
+class CompiledPattern:
+  """Parsed pattern header plus compiled horizontal/vertical gain tables."""
+
+  def __init__(self, key, parsed):
+    self.key = key
+    self.name = parsed["name"]
+    self.frequency = parsed["frequency"]
+    self.gain = parsed["gain"]
+    self.has_horizontal = bool(parsed["horizontal"])
+    self.has_vertical = bool(parsed["vertical"])
+    self.horizontal = compile_table(parsed["horizontal"])
+    self.vertical = compile_table(parsed["vertical"])
+
+  def horizontal_gain(self, angles):
+    return lookup(self.horizontal, angles)
+
+  def vertical_gain(self, angles):
+    return lookup(self.vertical, angles)
+
+
+# ========== Cache ==========
+
+class PatternTableCache:
+  """Compiled patterns keyed by content hash, least-recently-used first out."""
+
+  def __init__(self, max_entries=MAX_CACHED_PATTERNS):
+    self.max_entries = max_entries
+    self._lock = threading.Lock()
+    self._entries = OrderedDict()
+
+  @staticmethod
+  def content_key(data):
+    if isinstance(data, str):
+      data = data.encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+  def compile_bytes(self, data):
+    """Compile pattern file content (bytes or str) once; returns its content key."""
+    key = self.content_key(data)
+    with self._lock:
+      if key in self._entries:
+        self._entries.move_to_end(key)
+        return key
+    text = data.decode("utf-8", errors="replace") if isinstance(data, bytes) else data
+    return self._insert(key, lambda: CompiledPattern(key, parse_pattern(text)))
+
+  def compile_client(self, obj):
+    """Compile a client-side pattern object (from_client_pattern) once; returns its key."""
+    parsed = from_client_pattern(obj)
+    key = self.content_key(repr((parsed["gain"], parsed["horizontal"], parsed["vertical"])))
+    with self._lock:
+      if key in self._entries:
+        self._entries.move_to_end(key)
+        return key
+    return self._insert(key, lambda: CompiledPattern(key, parsed))
+
+  def _insert(self, key, build):
+    compiled = build()
+    with self._lock:
+      self._entries[key] = compiled
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+    return key
+
+  def get(self, key):
+    with self._lock:
+      compiled = self._entries.get(key)
+      if compiled is not None:
+        self._entries.move_to_end(key)
+      return compiled
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+
+
+PATTERN_TABLES = PatternTableCache()
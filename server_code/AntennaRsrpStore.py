@@ -0,0 +1,93 @@
+# AntennaRsrpStore.py
+# Per-antenna RSRP grids keyed by antenna id, with a version per entry.
+#
+# Replaces "take the last entry of get_live_rsrp(0, 0)" for live antenna edits:
+# the backend `put`s each freshly computed grid under its antenna id (with
+# `fingerprint=config.get(FINGERPRINT_FIELD)`) and
+# `get_antenna_rsrp(ant_ids, since_version)` answers from `get_since`, so a
+# response holds only the requested antennas whose grid changed. Versions come
+# from one monotonically increasing counter, so concurrent updates of different
+# antennas can never be confused with each other. Each grid keeps the fingerprint
+# of the config it was computed for (RsrpCache.FINGERPRINT_FIELD, sent by the
+# iframe) and hands it back, so the iframe tags a grid with its own configuration
+# rather than with whatever it sent last.
+#
+# Removals are remembered for the last MAX_REMOVED antennas only. A reader whose
+# version predates the oldest forgotten removal gets every requested antenna the
+# store does not hold reported as removed, since it may have missed that removal.
+import threading
+from collections import OrderedDict
+
+MAX_REMOVED = 4096
+
+
+class AntennaRsrpStore:
+  def __init__(self, max_removed=MAX_REMOVED):
+    self._lock = threading.Lock()
+    self._version = 0
+    self._grids = {}      # ant_id -> (version, grid, fingerprint)
+    self._removed = OrderedDict()    # ant_id -> version at which it was removed, oldest first
+    self._removed_floor = 0          # newest removal version already forgotten
+    self.max_removed = max_removed
+
+  @property
+  def version(self):
+    return self._version
+
+  def put(self, ant_id, grid, fingerprint=None):
+    """Store a new grid for `ant_id`, computed for the config `fingerprint`; returns its version."""
+    with self._lock:
+      self._version += 1
+      self._grids[ant_id] = (self._version, grid, fingerprint or None)
+      self._removed.pop(ant_id, None)
+      return self._version
+
+  def remove(self, ant_id):
+    """Drop `ant_id` (turned off / deleted); readers see it in `removed`."""
+    with self._lock:
+      if self._grids.pop(ant_id, None) is not None:
+        self._version += 1
+        self._removed[ant_id] = self._version
+        while len(self._removed) > self.max_removed:
+          _, self._removed_floor = self._removed.popitem(last=False)
+
+  def clear(self):
+    with self._lock:
+      self._grids.clear()
+      self._removed.clear()
+      self._removed_floor = 0
+
+  def get_since(self, ant_ids, since_version=0, encoder=None):
+    """Grids for `ant_ids` newer than `since_version`.
+
+    `since_version` is an int for all antennas or a {ant_id: version} dict.
+    Returns {"version", "grids": {ant_id: {"version", "fingerprint", "rsrp"}}, "removed": [...]};
+    with an RsrpStreamEncoder the grids go out as "rsrp_packed" on stream
+    "live:<ant_id>" instead of float lists.
+    """
+    def _since(ant_id):
+      if isinstance(since_version, dict):
+        return since_version.get(ant_id, 0) or 0
+      return since_version or 0
+
+    with self._lock:
+      if ant_ids is None:
+        ant_ids = list(self._grids.keys())
+      changed = {}
+      removed = []
+      for ant_id in ant_ids:
+        entry = self._grids.get(ant_id)
+        if entry is not None and entry[0] > _since(ant_id):
+          changed[ant_id] = entry
+        elif entry is None and (self._removed.get(ant_id, 0) > _since(ant_id) or
+                                (ant_id not in self._removed and self._removed_floor > _since(ant_id))):
+          removed.append(ant_id)
+      version = self._version
+
+    response = {"version": version, "removed": removed}
+    if encoder is not None:
+      response["grids"] = {ant_id: {"version": v, "fingerprint": fp} for ant_id, (v, _, fp) in changed.items()}
+      response["rsrp_packed"] = {ant_id: encoder.pack(f"live:{ant_id}", [grid]) for ant_id, (_, grid, _) in changed.items()}
+    else:
+      response["grids"] = {ant_id: {"version": v, "fingerprint": fp, "rsrp": grid} for ant_id, (v, grid, fp) in changed.items()}
+    return response
@@ -0,0 +1,240 @@
+# BatchAntennaPool.py
+# Parallel per-antenna RSRP evaluation for process_batch_antennas.
+#
+# A batch (auto-placement, model switch, project load) is fanned out over a
+# process pool. Each worker process receives the floorplan geometry, grid shape
+# and pattern files once, through the pool initializer (inherited copy-on-write
+# under fork), and builds its own PropagationEngine25D; tasks then carry only an
+# antenna config. Finished grids are released strictly in input order: a grid
+# that finishes early waits for its predecessors, so the stream a client sees
+# (and the final list) does not depend on worker count or scheduling. An antenna
+# whose evaluation raises is released in its slot as a failure (`on_error`, and
+# "failed" in status) and the rest of the batch carries on.
+#
+# Cache keys cover the geometry itself (`geometry_digest` of the payload), so a
+# batch resubmitted after a wall edit misses even when the caller passes no
+# revision. When the geometry changes, the pool is replaced; the old one keeps
+# serving the jobs already running on it and is shut down once they drain.
+# Finished jobs are forgotten JOB_TTL_S after they end if nobody collects them.
+#
+# Backend wiring: `process_batch_antennas_async(pattern, ids, configs, geometry_rev="")`
+# calls `BATCH_POOL.submit(...)` with the App's `geometry_rev` (the iframe's geometry
+# fingerprint), `on_result=lambda ant_id, grid: store.put(ant_id, grid, fingerprints[ant_id])`
+# (AntennaRsrpStore; `fingerprints` maps each id to its config's FINGERPRINT_FIELD,
+# echoed back with the grid) and `cache=SNAPSHOTS`
+# (RsrpSnapshotStore, so unchanged antennas are not recomputed after a restart or
+# reset_session) and answers {"job": job_id, "total": n}; `get_batch_status(job_id)`
+# answers `BATCH_POOL.status(job_id)`, whose "failed" maps antennas that could not be
+# evaluated to their error. The App form streams the grids with get_antenna_rsrp
+# while the job runs.
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .AntennaPatternTables import PATTERN_TABLES
+from .PropagationEngine25D import PropagationEngine25D
+from .RsrpCache import antenna_key, geometry_revision, pattern_rev
+
+MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Seconds a finished job's status/results stay available
+JOB_TTL_S = 600
+
+# Per-process state set by _init_worker
+_worker = {}
+
+
+def _init_worker(geometry, engine_params, grid, pattern_texts):
+  engine = PropagationEngine25D(**engine_params)
+  engine.set_geometry(geometry.get("walls"), geometry.get("floor_planes"),
+                      geometry.get("ground_plane"), geometry.get("element_types"))
+  patterns = {name: PATTERN_TABLES.get(PATTERN_TABLES.compile_bytes(text)) for name, text in pattern_texts.items()}
+  _worker.update(engine=engine, grid=grid, patterns=patterns)
+
+
+def _evaluate(index, ant_config):
+  cols, rows, dx, dy = _worker["grid"]
+  pattern = _worker["patterns"].get(ant_config.get("Antenna_Pattern_Name"))
+  grid = _worker["engine"].rsrp_for_config(ant_config, cols, rows, dx, dy, pattern)
+  return index, grid
+
+
+class _Job:
+  def __init__(self, job_id, ant_ids):
+    self.id = job_id
+    self.ant_ids = list(ant_ids)
+    self.results = [None] * len(self.ant_ids)
+    self.failed = {}        # index -> error message
+    self.released = 0       # results [0, released) have gone to on_result / on_error
+    self.completed = 0
+    self.error = None
+    self.done = threading.Event()
+    self.finished_at = None
+
+
+class BatchAntennaPool:
+  """Runs batches on a process pool that is rebuilt only when the geometry changes."""
+
+  def __init__(self, max_workers=MAX_WORKERS):
+    self.max_workers = max_workers
+    self._lock = threading.Lock()
+    self._executor_lock = threading.Lock()
+    self._executor = None
+    self._executor_key = None
+    self._executor_users = {}     # executor -> jobs still submitting to / waiting on it
+    self._jobs = {}
+    self._job_ids = itertools.count(1)
+
+  def _acquire_executor(self, key, init_args):
+    """Executor for `key`, counted as in use until `_release_executor`.
+
+    A pool built for another geometry is retired, not cancelled: it is shut down
+    when the last job using it releases it.
+    """
+    with self._executor_lock:
+      if self._executor is None or self._executor_key != key:
+        old = self._executor
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             initializer=_init_worker, initargs=init_args)
+        self._executor_key = key
+        self._executor_users[self._executor] = 0
+        if old is not None and self._executor_users.get(old, 0) == 0:
+          self._executor_users.pop(old, None)
+          old.shutdown(wait=False)
+      self._executor_users[self._executor] += 1
+      return self._executor
+
+  def _release_executor(self, executor):
+    with self._executor_lock:
+      users = self._executor_users.get(executor, 0) - 1
+      if users > 0 or executor is self._executor:
+        self._executor_users[executor] = max(users, 0)
+        return
+      self._executor_users.pop(executor, None)
+    executor.shutdown(wait=False)
+
+  def _prune_jobs(self):
+    """Forget jobs that finished more than JOB_TTL_S ago (caller holds the lock)."""
+    cutoff = time.monotonic() - JOB_TTL_S
+    for job_id in [j.id for j in self._jobs.values() if j.finished_at is not None and j.finished_at < cutoff]:
+      del self._jobs[job_id]
+
+  def submit(self, ant_ids, ant_configs, geometry, grid, pattern_texts, on_result=None,
+             geometry_rev="", engine_params=None, cache=None, engine_version="", on_error=None):
+    """Start a batch in the background; returns its job id.
+
+    `grid` is (cols, rows, dx, dy); `pattern_texts` maps Antenna_Pattern_Name to
+    file content. `geometry_rev` is the caller's own revision of the geometry
+    (e.g. the iframe's geometry fingerprint); keys always include a digest of
+    `geometry`/`grid` as well, so an omitted or stale revision cannot bring back
+    grids of other walls. `on_result(ant_id, grid)` is called in input order as
+    grids become available; an antenna whose evaluation fails takes its turn as
+    `on_error(ant_id, message)` instead. With an RsrpCache (or RsrpSnapshotStore,
+    which survives restarts), hits skip the pool entirely.
+    """
+    job = _Job(next(self._job_ids), ant_ids)
+    with self._lock:
+      self._prune_jobs()
+      self._jobs[job.id] = job
+    init_args = (geometry, engine_params or {}, tuple(grid), pattern_texts)
+    revision = geometry_revision(geometry, grid, engine_params, geometry_rev)
+    pattern_revs = {name: pattern_rev(text) for name, text in pattern_texts.items()}
+    key = (revision, tuple(sorted(pattern_revs.items())))
+    cache_keys = [antenna_key(config, revision, engine_version, pattern_revs) for config in ant_configs]
+
+    def _run():
+      try:
+        misses = []
+        for i in range(len(ant_configs)):
+          hit = cache.get(cache_keys[i]) if cache else None
+          if hit is not None:
+            self._finish(job, i, hit, on_result, on_error)
+          else:
+            misses.append(i)
+        if misses:
+          executor = self._acquire_executor(key, init_args)
+          try:
+            futures = {executor.submit(_evaluate, i, ant_configs[i]): i for i in misses}
+            for future in as_completed(futures):
+              i = futures[future]
+              try:
+                _, result = future.result()
+              except Exception as e:
+                self._finish(job, i, None, on_result, on_error, error=str(e) or type(e).__name__)
+                continue
+              if cache:
+                cache.put(cache_keys[i], result)
+              self._finish(job, i, result, on_result, on_error)
+          finally:
+            self._release_executor(executor)
+      except Exception as e:
+        job.error = str(e)
+      finally:
+        job.finished_at = time.monotonic()
+        job.done.set()
+
+    threading.Thread(target=_run, daemon=True).start()
+    return job.id
+
+  def _finish(self, job, index, result, on_result, on_error=None, error=None):
+    with self._lock:
+      if error is None:
+        job.results[index] = result
+      else:
+        job.failed[index] = error
+      job.completed += 1
+      ready = []
+      while job.released < len(job.results) and (job.results[job.released] is not None or job.released in job.failed):
+        ready.append(job.released)
+        job.released += 1
+    for i in ready:
+      if i in job.failed:
+        if on_error:
+          on_error(job.ant_ids[i], job.failed[i])
+      elif on_result:
+        on_result(job.ant_ids[i], job.results[i])
+
+  def status(self, job_id):
+    with self._lock:
+      self._prune_jobs()
+      job = self._jobs.get(job_id)
+      if job is None:
+        return {"job": job_id, "status": "unknown"}
+      if job.error:
+        state = "error"
+      elif job.done.is_set():
+        state = "finished"
+      else:
+        state = "running"
+      failed = {job.ant_ids[i]: message for i, message in sorted(job.failed.items())}
+      message = job.error or (f"{len(failed)} antenna(s) failed" if failed else "")
+      return {"job": job_id, "status": state, "completed": job.completed, "released": job.released,
+              "total": len(job.ant_ids), "failed": failed, "message": message}
+
+  def results(self, job_id, timeout=None):
+    """Grids in input order once the job has finished (None on timeout/unknown job).
+
+    Antennas that failed are None in the list; `status` has their messages.
+    """
+    with self._lock:
+      job = self._jobs.get(job_id)
+    if job is None or not job.done.wait(timeout):
+      return None
+    with self._lock:
+      self._jobs.pop(job_id, None)
+    return job.results
+
+  def shutdown(self):
+    with self._executor_lock:
+      executors = list(self._executor_users)
+      if self._executor is not None and self._executor not in executors:
+        executors.append(self._executor)
+      self._executor_users.clear()
+      self._executor = None
+      self._executor_key = None
+    for executor in executors:
+      executor.shutdown(wait=False, cancel_futures=True)
+
+
+BATCH_POOL = BatchAntennaPool()
@@ -0,0 +1,176 @@
+# ChunkedUpload.py
+# Resumable chunked uploads for antenna patterns and DXF files.
+#
+# The App form slices the browser File into fixed-size binary chunks (BlobMedia,
+# no base64) and sends them with upload_chunk. Chunks may arrive out of order or
+# from several files at once; each upload is spooled to a temporary file at
+# index * chunk_size, so memory stays at one chunk regardless of file size.
+# An upload is identified by a client-chosen id (name/size/mtime), and
+# begin_upload answers with the chunk indices already held, so a retried upload
+# after a dropped connection only sends what is missing.
+#
+# A consumer (an object with feed(bytes) and close()) can be attached to an
+# upload: it receives the file as one in-order byte stream while chunks arrive,
+# so parsing overlaps the transfer instead of waiting for the last chunk.
+#
+# Backend wiring: `begin_upload(upload_id, filename, size, chunk_size, kind)`
+# answers `UPLOADS.begin(...)`; `upload_chunk(upload_id, index, media)` calls
+# `UPLOADS.put_chunk(upload_id, index, media.get_bytes())`;
+# `finish_upload(upload_id, options)` calls `UPLOADS.finish(upload_id)` and
+# hands the returned path to the existing upload_antenna_pattern logic
+# ("pattern"), or answers the DXF consumer's project ("dxf", see DxfStream.py),
+# then `UPLOADS.discard(upload_id)`.
+import os
+import tempfile
+import threading
+import time
+
+MAX_UPLOAD_BYTES = 2 * 1024 ** 3
+MAX_CHUNK_BYTES = 16 * 1024 * 1024
+# Uploads untouched for this long are dropped (their spool file deleted)
+UPLOAD_TTL_S = 3600
+
+
+class UploadError(Exception):
+  pass
+
+
+class _Upload:
+  def __init__(self, upload_id, filename, size, chunk_size, kind, spool_dir):
+    self.id = upload_id
+    self.filename = filename
+    self.size = size
+    self.chunk_size = chunk_size
+    self.kind = kind
+    self.total = max(1, -(-size // chunk_size))
+    self.received = set()
+    self.lock = threading.Lock()
+    fd, self.path = tempfile.mkstemp(prefix="upload_", suffix=os.path.splitext(filename)[1], dir=spool_dir)
+    self.file = os.fdopen(fd, "r+b")
+    self.file.truncate(size)
+    self.consumer = None
+    self.fed = 0              # chunks [0, fed) have gone to the consumer
+    self.touched = time.time()
+
+  def expected_length(self, index):
+    if index == self.total - 1:
+      return self.size - index * self.chunk_size
+    return self.chunk_size
+
+  def close(self):
+    if not self.file.closed:
+      self.file.close()
+
+
+class UploadStore:
+  def __init__(self, spool_dir=None, ttl_s=UPLOAD_TTL_S):
+    self.spool_dir = spool_dir
+    self.ttl_s = ttl_s
+    self._lock = threading.Lock()
+    self._uploads = {}
+
+  def begin(self, upload_id, filename, size, chunk_size, kind, consumer=None):
+    """Start (or resume) an upload; returns {"upload_id", "total", "received"}."""
+    size, chunk_size = int(size), int(chunk_size)
+    if size < 0 or size > MAX_UPLOAD_BYTES:
+      raise UploadError(f"File too large: {size} bytes")
+    if not 0 < chunk_size <= MAX_CHUNK_BYTES:
+      raise UploadError(f"Invalid chunk size: {chunk_size}")
+    self._expire()
+    with self._lock:
+      upload = self._uploads.get(upload_id)
+      if upload is not None and (upload.size != size or upload.chunk_size != chunk_size):
+        # Same id, different file layout: start over
+        self._drop(upload)
+        upload = None
+      if upload is None:
+        upload = _Upload(upload_id, filename, size, chunk_size, kind, self.spool_dir)
+        self._uploads[upload_id] = upload
+    with upload.lock:
+      if consumer is not None and upload.consumer is None:
+        upload.consumer = consumer
+        upload.fed = 0
+        self._feed(upload)
+      upload.touched = time.time()
+      return {"upload_id": upload_id, "total": upload.total, "received": sorted(upload.received)}
+
+  def put_chunk(self, upload_id, index, data):
+    """Store chunk `index`; returns {"received", "total"} counts."""
+    upload = self._get(upload_id)
+    index = int(index)
+    if not 0 <= index < upload.total:
+      raise UploadError(f"Chunk {index} out of range (0..{upload.total - 1})")
+    if len(data) != upload.expected_length(index):
+      raise UploadError(f"Chunk {index} has {len(data)} bytes, expected {upload.expected_length(index)}")
+    with upload.lock:
+      if index not in upload.received:
+        upload.file.seek(index * upload.chunk_size)
+        upload.file.write(data)
+        upload.received.add(index)
+        self._feed(upload)
+      upload.touched = time.time()
+      return {"received": len(upload.received), "total": upload.total}
+
+  def _feed(self, upload):
+    # Pass the contiguous run of chunks after the last one fed to the consumer
+    if upload.consumer is None:
+      return
+    while upload.fed in upload.received:
+      upload.file.seek(upload.fed * upload.chunk_size)
+      upload.consumer.feed(upload.file.read(upload.expected_length(upload.fed)))
+      upload.fed += 1
+
+  def missing(self, upload_id):
+    upload = self._get(upload_id)
+    with upload.lock:
+      return [i for i in range(upload.total) if i not in upload.received]
+
+  def finish(self, upload_id):
+    """Check every chunk arrived; returns (path, upload). The consumer, if any, is closed."""
+    upload = self._get(upload_id)
+    with upload.lock:
+      if len(upload.received) != upload.total:
+        missing = upload.total - len(upload.received)
+        raise UploadError(f"Upload {upload_id} incomplete: {missing} chunk(s) missing")
+      upload.file.flush()
+      upload.close()
+      if upload.consumer is not None:
+        upload.consumer.close()
+    return upload.path, upload
+
+  def read_bytes(self, upload_id):
+    """Whole file content of a finished upload (for backends that take one BlobMedia)."""
+    path, _ = self.finish(upload_id)
+    with open(path, "rb") as f:
+      return f.read()
+
+  def discard(self, upload_id):
+    with self._lock:
+      upload = self._uploads.get(upload_id)
+      if upload is not None:
+        self._drop(upload)
+
+  def _get(self, upload_id):
+    with self._lock:
+      upload = self._uploads.get(upload_id)
+    if upload is None:
+      raise UploadError(f"Unknown upload: {upload_id}")
+    return upload
+
+  def _drop(self, upload):
+    # Caller holds self._lock
+    self._uploads.pop(upload.id, None)
+    upload.close()
+    try:
+      os.remove(upload.path)
+    except OSError:
+      pass
+
+  def _expire(self):
+    cutoff = time.time() - self.ttl_s
+    with self._lock:
+      for upload in [u for u in self._uploads.values() if u.touched < cutoff]:
+        self._drop(upload)
+
+
+UPLOADS = UploadStore()
@@ -0,0 +1,690 @@
+# CoverageReport.py
+# Bulk coverage reports for saved projects, without a browser.
+#
+# Takes one or more project files as written by ProjectIO.saveProject (one per
+# floor; .ipsz archives or legacy JSON), evaluates every enabled antenna with
+# PropagationEngine25D on a process pool — one task per antenna, floors
+# interleaved so the pool stays busy — and folds the grids into per-floor
+# best-server RSRP, co-channel SINR, throughput and compliance (best RSRP >=
+# complianceThreshold over the floor, pass when at least compliancePercentage
+# of it is covered). The report is a deflate-compressed .xlsx with a Summary
+# sheet, an Antennas sheet (serving share per antenna) and one bin sheet per
+# floor, streamed sheet by sheet into the zip so no sheet is ever held in
+# memory as XML. Floors are written in input order whatever order the pool
+# finishes them in.
+#
+# Backend wiring: the server callables are defined at the bottom of this module and
+# registered with anvil.server when it is importable (Anvil server modules, uplink):
+# `generate_coverage_report_async(projects, names)` answers
+# {"job": REPORT_JOBS.submit(projects, names), "total": n}; `get_report_status(job_id)`
+# answers `REPORT_JOBS.status(job_id)` — same shape as get_batch_status, so the
+# App form polls it the same way — and `get_coverage_report(job_id)` answers
+# anvil.BlobMedia(XLSX_MIME, REPORT_JOBS.read(job_id), name=REPORT_JOBS.file_name(job_id)),
+# or None once the report has expired. Reports nobody reads are deleted, with their
+# jobs, REPORT_JOB_TTL_S after they finish.
+#
+# Headless: `python -m server_code.CoverageReport floor1.json floor2.json -o report.xlsx`
+# runs the report in-process; add `--uplink KEY` to run it on the backend through
+# the calls above instead, or `--serve KEY` to host the calls from this machine as
+# an uplink server (both need anvil-uplink).
+import argparse
+import io
+import itertools
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from .AntennaPatternTables import PATTERN_TABLES
+from .PropagationEngine25D import DEFAULT_ANTENNA_HEIGHT, PropagationEngine25D
+
+try:
+  import anvil.server
+except ImportError:           # command line without anvil-uplink
+  anvil = None
+
+MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+REPORT_RES_M = 1.0            # report bin size; the client's coverage export spacing
+MIN_RSRP_DBM = -140.0         # weaker bins count as uncovered (as isValidRsrp)
+XLSX_MAX_ROWS = 1_048_575     # bin rows per floor sheet, below the header
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+POLL_INTERVAL_S = 0.5
+REPORT_JOB_TTL_S = 1800       # finished reports (and their files) nobody read are dropped after this
+
+# Same steps as RadioCalculations.throughputFromSinr
+THROUGHPUT_TABLE = ((-5, 0.0), (0, 6.5), (5, 13.0), (10, 26.0), (15, 39.0), (20, 58.5), (25, 72.2))
+
+# Project defaults (theme/assets/src/system/Config.js)
+DEFAULTS = {"freq": 2400, "N": 10, "noise": -92, "complianceThreshold": -85, "compliancePercentage": 80}
+
+# ProjectArchive.js (.ipsz) layout
+ARCHIVE_FORMAT = "ips-project"
+ARCHIVE_WALL_ATTRS = ("loss", "thickness", "height", "width")
+ARCHIVE_NO_INDEX = 0xFFFF
+
+
+# ========== Projects ==========
+
+def load_project(project):
+  """A project dict from a dict, JSON text or bytes, or .ipsz archive bytes."""
+  if isinstance(project, (bytes, bytearray)):
+    project = _project_from_archive(project) if project[:4] == b"PK\x03\x04" else project.decode("utf-8")
+  if isinstance(project, str):
+    project = json.loads(project)
+  if not isinstance(project, dict) or "version" not in project:
+    raise ValueError("Not a project file (missing version)")
+  return project
+
+
+def _project_from_archive(data):
+  """Project dict from a ProjectArchive (.ipsz) zip; the image and RSRP sections are not read."""
+  with zipfile.ZipFile(io.BytesIO(data)) as zf:
+    names = set(zf.namelist())
+
+    def section(name, default=None):
+      return json.loads(zf.read(name)) if name in names else default
+
+    manifest = section("manifest.json") or {}
+    if manifest.get("format") != ARCHIVE_FORMAT:
+      raise ValueError("Not a project archive (bad manifest)")
+    project = section("settings.json", {})
+    antennas = section("antennas.json", {})
+    patterns = antennas.get("patterns") or []
+    project["aps"] = []
+    for ap in antennas.get("aps") or []:
+      ap = dict(ap)
+      index = ap.pop("pattern", None)
+      if index is not None:
+        ap["antennaPattern"] = patterns[index]
+      project["aps"].append(ap)
+    project["antennaPatterns"] = [patterns[i] if i is not None else None for i in antennas.get("antennaPatterns") or []]
+    project["defaultAntennaPatternIndex"] = antennas.get("defaultAntennaPatternIndex")
+    project["floorPlanes"] = section("floorplanes.json", [])
+    project["walls"] = _walls_from_archive(zf, section("walls/meta.json")) if "walls/meta.json" in names else []
+  return project
+
+
+def _walls_from_archive(zf, meta):
+  points = np.frombuffer(zf.read("walls/points.f64"), dtype="<f8").reshape(-1, 2)
+  starts = np.frombuffer(zf.read("walls/starts.u32"), dtype="<u4")
+  kind = np.frombuffer(zf.read("walls/kind.u8"), dtype=np.uint8)
+  attrs = np.frombuffer(zf.read("walls/attrs.f64"), dtype="<f8").reshape(-1, len(ARCHIVE_WALL_ATTRS))
+  style = np.frombuffer(zf.read("walls/style.u16"), dtype="<u2").reshape(-1, 2)
+  walls = []
+  for i in range(meta["count"]):
+    wall = {"id": meta["ids"][i]}
+    for a, key in enumerate(ARCHIVE_WALL_ATTRS):
+      if not math.isnan(attrs[i, a]):
+        wall[key] = float(attrs[i, a])
+    if style[i, 0] != ARCHIVE_NO_INDEX:
+      wall["elementType"] = meta["elementTypes"][style[i, 0]]
+    if style[i, 1] != ARCHIVE_NO_INDEX:
+      wall["color"] = meta["colors"][style[i, 1]]
+    pts = [{"x": float(x), "y": float(y)} for x, y in points[starts[i]:starts[i + 1]]]
+    if kind[i] == 1:
+      wall["points"] = pts
+    else:
+      wall["p1"], wall["p2"] = pts[0], pts[1]
+    walls.append(wall)
+  return walls
+
+
+def _value(project, key):
+  value = project.get(key)
+  return DEFAULTS[key] if value is None else value
+
+
+def floor_from_project(project, name, res=REPORT_RES_M):
+  """Picklable floor description: geometry, grid shape, enabled antennas with compiled patterns."""
+  w, h = float(project.get("w") or 0), float(project.get("h") or 0)
+  if w <= 0 or h <= 0:
+    raise ValueError(f"{name}: project has no floor size")
+  cols, rows = max(1, int(math.ceil(w / res))), max(1, int(math.ceil(h / res)))
+
+  patterns = project.get("antennaPatterns") or []
+  default_idx = project.get("defaultAntennaPatternIndex", -1)
+  default_pattern = patterns[default_idx] if isinstance(default_idx, int) and 0 <= default_idx < len(patterns) else None
+
+  aps = []
+  for ap in project.get("aps") or []:
+    if ap.get("enabled") is False:
+      continue
+    pattern = ap.get("antennaPattern") or default_pattern
+    aps.append({
+      "id": ap.get("id") or f"AP-{len(aps) + 1}",
+      "x": float(ap.get("x") or 0), "y": float(ap.get("y") or 0),
+      "z": float(ap.get("z") or DEFAULT_ANTENNA_HEIGHT),
+      "tx": float(ap.get("tx") if ap.get("tx") is not None else 18),
+      "gt": float(ap.get("gt") or 0), "ch": ap.get("ch", 1),
+      "azimuth": float(ap.get("azimuth") or 0), "tilt": float(ap.get("tilt") or 0),
+      "pattern": PATTERN_TABLES.get(PATTERN_TABLES.compile_client(pattern)) if pattern else None,
+    })
+
+  return {
+    "name": name, "cols": cols, "rows": rows, "dx": w / cols, "dy": h / rows,
+    "walls": project.get("walls") or [], "floor_planes": project.get("floorPlanes") or [],
+    "ground_plane": project.get("groundPlane"),
+    "engine": {"frequency": float(_value(project, "freq")), "N": float(_value(project, "N"))},
+    "model": "p525" if project.get("model") == "p525" else "p25d",
+    "noise": float(_value(project, "noise")),
+    "threshold": float(_value(project, "complianceThreshold")),
+    "target_pct": float(_value(project, "compliancePercentage")),
+    "aps": aps,
+  }
+
+
+# ========== Worker ==========
+
+# Per-process engines by floor key; two so a floor boundary does not thrash
+_engines = {}
+_report_ids = itertools.count(1)
+
+
+def _engine_for(key, geometry):
+  engine = _engines.get(key)
+  if engine is None:
+    if len(_engines) >= 2:
+      _engines.pop(next(iter(_engines)))
+    engine = PropagationEngine25D(**geometry["engine"])
+    engine.set_geometry(geometry["walls"], geometry["floor_planes"], geometry["ground_plane"])
+    _engines[key] = engine
+  return engine
+
+
+def _evaluate(key, geometry, index, ap):
+  engine = _engine_for(key, geometry)
+  grid = engine.rsrp_grid(ap, geometry["cols"], geometry["rows"], geometry["dx"], geometry["dy"],
+                          ap["pattern"], geometry["model"])
+  return key, index, grid
+
+
+# ========== Aggregation ==========
+
+def _throughput(sinr):
+  out = np.zeros(sinr.shape, dtype=np.float32)
+  for threshold, rate in THROUGHPUT_TABLE:
+    out[sinr >= threshold] = rate
+  return out
+
+
+class _FloorAccumulator:
+  """Best server and per-channel received power, folded in one antenna grid at a time."""
+
+  def __init__(self, floor):
+    self.floor = floor
+    n = floor["cols"] * floor["rows"]
+    self.best = np.full(n, -np.inf, dtype=np.float32)
+    self.owner = np.full(n, -1, dtype=np.int32)
+    self.channel_mw = {}
+    self.remaining = len(floor["aps"])
+
+  def add(self, index, grid):
+    # Ties go to the lower antenna index, so the result does not depend on arrival order
+    better = (grid > self.best) | ((grid == self.best) & (index < self.owner))
+    self.best[better] = grid[better]
+    self.owner[better] = index
+    ch = self.floor["aps"][index]["ch"]
+    mw = np.where(grid >= MIN_RSRP_DBM, np.power(10.0, grid.astype(np.float64) / 10.0), 0.0)
+    self.channel_mw[ch] = self.channel_mw[ch] + mw if ch in self.channel_mw else mw
+    self.remaining -= 1
+
+  def finish(self):
+    floor = self.floor
+    covered = (self.owner >= 0) & (self.best >= MIN_RSRP_DBM)
+    best_mw = np.where(covered, np.power(10.0, self.best.astype(np.float64) / 10.0), 0.0)
+    interference = np.zeros(best_mw.shape)
+    for i, ap in enumerate(floor["aps"]):
+      served = self.owner == i
+      interference[served] = self.channel_mw[ap["ch"]][served] - best_mw[served]
+    noise_mw = 10.0 ** (floor["noise"] / 10.0)
+    sinr = (10 * np.log10(np.maximum(best_mw, 1e-30) / (np.maximum(interference, 0.0) + noise_mw))).astype(np.float32)
+    compliant = covered & (self.best >= floor["threshold"])
+    self.channel_mw = {}
+    return {"covered": covered, "sinr": sinr, "throughput": _throughput(sinr), "compliant": compliant}
+
+
+def _summary_row(floor, acc, metrics):
+  covered = metrics["covered"]
+  n = covered.size
+  rsrp, sinr = acc.best[covered], metrics["sinr"][covered]
+  compliance = 100.0 * np.count_nonzero(metrics["compliant"]) / n if n else 0.0
+
+  def stat(values, fn):
+    return round(float(fn(values)), 2) if values.size else ""
+
+  return [
+    floor["name"], len(floor["aps"]), n, round(100.0 * np.count_nonzero(covered) / n, 2) if n else 0.0,
+    stat(rsrp, np.mean), stat(rsrp, lambda v: np.percentile(v, 5)), stat(rsrp, np.median),
+    stat(sinr, np.mean), stat(sinr, lambda v: np.percentile(v, 5)),
+    stat(metrics["throughput"][covered], np.mean),
+    floor["threshold"], round(compliance, 2), floor["target_pct"],
+    "PASS" if compliance >= floor["target_pct"] else "FAIL",
+  ]
+
+
+SUMMARY_HEADER = ["floor", "antennas", "bins", "covered_pct", "rsrp_mean_dbm", "rsrp_p5_dbm", "rsrp_p50_dbm",
+                  "sinr_mean_db", "sinr_p5_db", "throughput_mean_mbps", "threshold_dbm", "compliance_pct",
+                  "target_pct", "result"]
+ANTENNA_HEADER = ["floor", "antenna", "channel", "x", "y", "tx_dbm", "serving_bins", "serving_pct",
+                  "serving_rsrp_mean_dbm"]
+BIN_HEADER = ["X", "Y", "best_ap_id", "rsrp_dbm", "sinr_db", "throughput_mbps", "compliant"]
+
+
+def _antenna_rows(floor, acc, metrics):
+  covered = metrics["covered"]
+  n = covered.size
+  rows = []
+  for i, ap in enumerate(floor["aps"]):
+    served = covered & (acc.owner == i)
+    count = int(np.count_nonzero(served))
+    rows.append([floor["name"], ap["id"], ap["ch"], ap["x"], ap["y"], ap["tx"], count,
+                 round(100.0 * count / n, 2) if n else 0.0,
+                 round(float(acc.best[served].mean()), 2) if count else ""])
+  return rows
+
+
+def _bin_rows(floor, acc, metrics):
+  """Covered bins as sheet rows (bin centres), capped at XLSX_MAX_ROWS."""
+  idx = np.flatnonzero(metrics["covered"])[:XLSX_MAX_ROWS]
+  cols = floor["cols"]
+  xs = np.round((idx % cols + 0.5) * floor["dx"], 3)
+  ys = np.round((idx // cols + 0.5) * floor["dy"], 3)
+  ids = [ap["id"] for ap in floor["aps"]]
+  rsrp = np.round(acc.best[idx], 2)
+  sinr = np.round(metrics["sinr"][idx], 2)
+  thr = metrics["throughput"][idx]
+  owner = acc.owner[idx]
+  compliant = metrics["compliant"][idx]
+  for k in range(idx.size):
+    yield [float(xs[k]), float(ys[k]), ids[owner[k]], float(rsrp[k]), float(sinr[k]), float(thr[k]), int(compliant[k])]
+
+
+# ========== XLSX ==========
+
+def _column_name(c):
+  name = ""
+  c += 1
+  while c:
+    c, rem = divmod(c - 1, 26)
+    name = chr(65 + rem) + name
+  return name
+
+
+def _cell(ref, value):
+  if isinstance(value, (int, float)) and not isinstance(value, bool):
+    return f'<c r="{ref}"><v>{value}</v></c>'
+  return f'<c r="{ref}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+class XlsxStream:
+  """Minimal .xlsx writer: inline-string sheets streamed into a deflate zip, one at a time."""
+
+  def __init__(self, path, reserved=()):
+    """`reserved` names are held back for add_sheet(..., reserved=True); other sheets get a suffix."""
+    self.zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6)
+    self.sheets = []          # (sheet name, part number)
+    self._reserved = {name.lower() for name in reserved}
+    self._names = set(self._reserved)
+
+  def _sheet_name(self, name, reserved=False):
+    if reserved:
+      self._reserved.remove(name.lower())
+      return name
+    name = "".join("_" if ch in '[]:*?/\\' else ch for ch in str(name)).strip() or "Sheet"
+    base, n = name[:31], 2
+    while base.lower() in self._names:
+      suffix = f" ({n})"
+      base, n = name[:31 - len(suffix)] + suffix, n + 1
+    self._names.add(base.lower())
+    return base
+
+  def add_sheet(self, name, header, rows, reserved=False):
+    """Stream one sheet; returns the (sanitised, de-duplicated) name it was given."""
+    part = len(self.sheets) + 1
+    name = self._sheet_name(name, reserved)
+    self.sheets.append((name, part))
+    refs = [_column_name(c) for c in range(len(header))]
+    with self.zip.open(f"xl/worksheets/sheet{part}.xml", "w") as out:
+      out.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/>'
+                b'</sheetView></sheetViews><sheetData>')
+      buf = []
+      for r, row in enumerate(itertools.chain([header], rows), start=1):
+        buf.append(f'<row r="{r}">' + "".join(_cell(f"{refs[c]}{r}", v) for c, v in enumerate(row) if v != "") + "</row>")
+        if len(buf) >= 2000:
+          out.write("".join(buf).encode("utf-8"))
+          buf = []
+      out.write(("".join(buf) + "</sheetData></worksheet>").encode("utf-8"))
+    return name
+
+  def close(self, order=None):
+    """Write the workbook parts; `order` lists sheet names in tab order (default: as added)."""
+    by_name = dict(self.sheets)
+    tabs = [(name, by_name[name]) for name in order] if order else self.sheets
+    sheets = "".join(f'<sheet name="{escape(name)}" sheetId="{part}" r:id="rId{part}"/>' for name, part in tabs)
+    self.zip.writestr("xl/workbook.xml",
+                      '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                      '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                      'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                      f'<sheets>{sheets}</sheets></workbook>')
+    rels = "".join(f'<Relationship Id="rId{part}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                   f'relationships/worksheet" Target="worksheets/sheet{part}.xml"/>' for _, part in self.sheets)
+    self.zip.writestr("xl/_rels/workbook.xml.rels",
+                      '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                      '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                      f'{rels}</Relationships>')
+    overrides = "".join(f'<Override PartName="/xl/worksheets/sheet{part}.xml" ContentType="application/'
+                        f'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' for _, part in self.sheets)
+    self.zip.writestr("[Content_Types].xml",
+                      '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                      '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                      '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                      '<Default Extension="xml" ContentType="application/xml"/>'
+                      '<Override PartName="/xl/workbook.xml" ContentType="application/'
+                      'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                      f'{overrides}</Types>')
+    self.zip.writestr("_rels/.rels",
+                      '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                      '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                      '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                      'relationships/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+    self.zip.close()
+
+
+# ========== Report ==========
+
+def generate_report(floors, path, executor=None, on_progress=None):
+  """Evaluate `floors` (floor_from_project) and write the report to `path`.
+
+  `on_progress(completed, total, stage)` is called as antenna grids come back
+  and as floors are written. Returns the Summary rows.
+  """
+  total = sum(len(f["aps"]) for f in floors)
+  accs = [_FloorAccumulator(f) for f in floors]
+  xlsx = XlsxStream(path, reserved=("Summary", "Antennas"))
+  summary, antennas, floor_sheets = [], [], []
+  written = 0
+  completed = 0
+
+  def write_ready():
+    nonlocal written
+    while written < len(floors) and accs[written].remaining == 0:
+      floor, acc = floors[written], accs[written]
+      metrics = acc.finish()
+      summary.append(_summary_row(floor, acc, metrics))
+      antennas.extend(_antenna_rows(floor, acc, metrics))
+      floor_sheets.append(xlsx.add_sheet(floor["name"], BIN_HEADER, _bin_rows(floor, acc, metrics)))
+      accs[written] = None    # release the floor's arrays
+      written += 1
+      if on_progress:
+        on_progress(completed, total, f"wrote {floor['name']}")
+
+  own_executor = executor is None
+  if own_executor:
+    executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+  try:
+    # Geometry without the antenna list: each task pickles only what its engine needs
+    geometries = [{k: v for k, v in f.items() if k != "aps"} for f in floors]
+    report_id = (os.getpid(), next(_report_ids))
+    futures = [executor.submit(_evaluate, (report_id, fi), geometries[fi], i, ap)
+               for fi, floor in enumerate(floors) for i, ap in enumerate(floor["aps"])]
+    write_ready()   # floors without antennas
+    for future in as_completed(futures):
+      (_, fi), index, grid = future.result()
+      accs[fi].add(index, grid)
+      completed += 1
+      if on_progress:
+        on_progress(completed, total, f"evaluated {floors[fi]['name']}")
+      write_ready()
+  except BaseException:
+    xlsx.zip.close()
+    raise
+  finally:
+    if own_executor:
+      executor.shutdown(wait=False, cancel_futures=True)
+
+  order = [xlsx.add_sheet("Summary", SUMMARY_HEADER, summary, reserved=True),
+           xlsx.add_sheet("Antennas", ANTENNA_HEADER, antennas, reserved=True)]
+  xlsx.close(order=order + floor_sheets)
+  return summary
+
+
+class _ReportJob:
+  def __init__(self, job_id, floors, path):
+    self.id = job_id
+    self.floors = floors
+    self.path = path
+    self.total = sum(len(f["aps"]) for f in floors)
+    self.completed = 0
+    self.stage = "queued"
+    self.error = None
+    self.done = threading.Event()
+    self.finished_at = None
+
+
+class CoverageReportJobs:
+  """Background report jobs sharing one process pool; status() matches BatchAntennaPool.status."""
+
+  def __init__(self, max_workers=MAX_WORKERS, out_dir=None):
+    self.max_workers = max_workers
+    self.out_dir = out_dir or tempfile.gettempdir()
+    self._lock = threading.Lock()
+    self._executor = None
+    self._jobs = {}
+    self._job_ids = itertools.count(1)
+
+  def _executor_or_new(self):
+    with self._lock:
+      if self._executor is None:
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+      return self._executor
+
+  def submit(self, projects, names=None, res=REPORT_RES_M):
+    """Start a report for one project or a list (dicts or JSON text); returns its job id.
+
+    Projects are parsed here, so a malformed file fails the call instead of the job.
+    """
+    if not isinstance(projects, (list, tuple)):
+      projects = [projects]
+    names = list(names or [])
+    floors = [floor_from_project(load_project(p), names[i] if i < len(names) and names[i] else f"Floor {i + 1}", res)
+              for i, p in enumerate(projects)]
+    self._prune_jobs()
+    job_id = next(self._job_ids)
+    job = _ReportJob(job_id, floors, os.path.join(self.out_dir, f"coverage_report_{os.getpid()}_{job_id}.xlsx"))
+    with self._lock:
+      self._jobs[job_id] = job
+
+    def _progress(completed, total, stage):
+      job.completed, job.stage = completed, stage
+
+    def _run():
+      try:
+        job.stage = "running"
+        generate_report(job.floors, job.path, self._executor_or_new(), _progress)
+        job.stage = "done"
+      except Exception as e:
+        job.error = str(e)
+      finally:
+        job.floors = None
+        job.finished_at = time.monotonic()
+        job.done.set()
+
+    threading.Thread(target=_run, daemon=True).start()
+    return job_id
+
+  def _prune_jobs(self):
+    """Drop jobs finished more than REPORT_JOB_TTL_S ago that were never read, with their files."""
+    cutoff = time.monotonic() - REPORT_JOB_TTL_S
+    with self._lock:
+      expired = [job for job in self._jobs.values() if job.finished_at is not None and job.finished_at < cutoff]
+      for job in expired:
+        del self._jobs[job.id]
+    for job in expired:
+      if os.path.exists(job.path):
+        os.remove(job.path)
+
+  def status(self, job_id):
+    self._prune_jobs()
+    with self._lock:
+      job = self._jobs.get(job_id)
+    if job is None:
+      return {"job": job_id, "status": "unknown"}
+    if job.error:
+      state = "error"
+    elif job.done.is_set():
+      state = "finished"
+    else:
+      state = "running"
+    return {"job": job_id, "status": state, "completed": job.completed, "released": job.completed,
+            "total": job.total, "stage": job.stage, "message": job.error or ""}
+
+  def file_name(self, job_id):
+    return f"coverage_report_{time.strftime('%Y%m%d_%H%M%S')}_{job_id}.xlsx"
+
+  def read(self, job_id, timeout=None):
+    """Report bytes once the job has finished; the job and its file are dropped (None on error/timeout)."""
+    with self._lock:
+      job = self._jobs.get(job_id)
+    if job is None or not job.done.wait(timeout):
+      return None
+    with self._lock:
+      self._jobs.pop(job_id, None)
+    try:
+      if job.error:
+        return None
+      with open(job.path, "rb") as f:
+        return f.read()
+    finally:
+      if os.path.exists(job.path):
+        os.remove(job.path)
+
+  def shutdown(self):
+    with self._lock:
+      if self._executor is not None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+
+REPORT_JOBS = CoverageReportJobs()
+
+
+# ========== Server calls ==========
+
+def _callable(fn):
+  return anvil.server.callable(fn) if anvil is not None else fn
+
+
+def _project_payload(project):
+  """Project as sent by the App: dict, JSON text, or archive/JSON bytes (plain or Media)."""
+  return project.get_bytes() if hasattr(project, "get_bytes") else project
+
+
+@_callable
+def generate_coverage_report_async(projects, names=None):
+  if not isinstance(projects, (list, tuple)):
+    projects = [projects]
+  job_id = REPORT_JOBS.submit([_project_payload(p) for p in projects], names)
+  return {"job": job_id, "total": REPORT_JOBS.status(job_id)["total"]}
+
+
+@_callable
+def get_report_status(job_id):
+  return REPORT_JOBS.status(job_id)
+
+
+@_callable
+def get_coverage_report(job_id):
+  data = REPORT_JOBS.read(job_id, timeout=0)
+  if data is None:
+    return None
+  import anvil
+  return anvil.BlobMedia(XLSX_MIME, data, name=REPORT_JOBS.file_name(job_id))
+
+
+# ========== Command line ==========
+
+def _print_progress(completed, total, stage):
+  print(f"\r[{completed}/{total}] {stage:<60}", end="", file=sys.stderr, flush=True)
+
+
+def _run_uplink(key, projects, names, out):
+  try:
+    import anvil.server
+  except ImportError:
+    raise SystemExit("--uplink needs the anvil-uplink package (pip install anvil-uplink)")
+  anvil.server.connect(key)
+  try:
+    job = anvil.server.call("generate_coverage_report_async", projects, names)["job"]
+    while True:
+      status = anvil.server.call("get_report_status", job)
+      _print_progress(status.get("completed", 0), status.get("total", 0), status.get("stage", ""))
+      if status.get("status") != "running":
+        break
+      time.sleep(POLL_INTERVAL_S)
+    print(file=sys.stderr)
+    if status.get("status") != "finished":
+      raise SystemExit(f"Report failed: {status.get('message') or status.get('status')}")
+    media = anvil.server.call("get_coverage_report", job)
+    with open(out, "wb") as f:
+      f.write(media.get_bytes())
+  finally:
+    anvil.server.disconnect()
+
+
+def _serve_uplink(key):
+  if anvil is None:
+    raise SystemExit("--serve needs the anvil-uplink package (pip install anvil-uplink)")
+  anvil.server.connect(key)
+  print("Serving coverage reports over the uplink (Ctrl+C to stop)", file=sys.stderr)
+  try:
+    anvil.server.wait_forever()
+  finally:
+    REPORT_JOBS.shutdown()
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description="Coverage report (.xlsx) for saved project files, one per floor.")
+  parser.add_argument("projects", nargs="*", help="project .ipsz/.json files (ProjectIO.saveProject)")
+  parser.add_argument("-o", "--out", default="coverage_report.xlsx")
+  parser.add_argument("--res", type=float, default=REPORT_RES_M, help="bin size in metres")
+  parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+  parser.add_argument("--uplink", metavar="KEY", help="run on the backend through anvil-uplink")
+  parser.add_argument("--serve", metavar="KEY", help="host the report calls as an anvil-uplink server")
+  args = parser.parse_args(argv)
+  if args.serve:
+    _serve_uplink(args.serve)
+    return
+  if not args.projects:
+    parser.error("no project files given")
+
+  names = [os.path.splitext(os.path.basename(p))[0] for p in args.projects]
+  projects = []
+  for p in args.projects:
+    with open(p, "rb") as f:
+      projects.append(load_project(f.read()))
+
+  start = time.perf_counter()
+  if args.uplink:
+    _run_uplink(args.uplink, projects, names, args.out)
+  else:
+    floors = [floor_from_project(project, n, args.res) for project, n in zip(projects, names)]
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+      summary = generate_report(floors, args.out, executor, _print_progress)
+    print(file=sys.stderr)
+    for row in summary:
+      print(f"{row[0]}: compliance {row[11]}% (target {row[12]}%) {row[13]}")
+  print(f"Wrote {args.out} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,324 @@
+# DxfStream.py
+# Streaming DXF -> walls parser.
+#
+# DxfWallStream is a ChunkedUpload consumer: it is fed the DXF as raw bytes while
+# the chunks arrive, tokenizes group-code/value line pairs incrementally, and
+# turns LINE / LWPOLYLINE / POLYLINE segments into wall dicts in the same shape
+# ProjectIO.loadProjectFromData reads. Everything else is rejected as early as
+# the format allows: non-geometry sections (BLOCKS, OBJECTS, ...) are scanned
+# for ENDSEC only, and an entity is dropped at its type (code 0) or its layer
+# (code 8) without building anything.
+#
+# Walls go out in batches of BATCH_WALLS as soon as the plan transform is known,
+# which is when the HEADER's $EXTMIN/$EXTMAX have been read (AutoCAD always
+# writes them). Files without usable extents are buffered and emitted on close.
+#
+# Backend wiring: `begin_upload(..., kind="dxf")` attaches
+# `DxfWallStream(target_w, target_h)` as the upload consumer; `upload_chunk`
+# adds `"dxf": stream.drain()` to its response so the App form can forward wall
+# batches while the upload continues; `finish_upload` answers
+# `stream.project()` (remaining walls under "walls", counts under "dxfStats").
+import math
+import re
+import time
+
+BATCH_WALLS = 500
+
+WALL_ENTITIES = ("LINE", "LWPOLYLINE", "POLYLINE")
+# Layers that never hold walls in architectural drawings
+DEFAULT_EXCLUDE_LAYERS = r"dim|text|anno|hatch|furn|grid|defpoints|title|symb|revision|viewport"
+DOOR_LAYERS = re.compile(r"door", re.IGNORECASE)
+WINDOW_LAYERS = re.compile(r"window|glaz", re.IGNORECASE)
+
+# $INSUNITS -> metres
+UNIT_SCALE = {0: 1.0, 1: 0.0254, 2: 0.3048, 4: 0.001, 5: 0.01, 6: 1.0, 14: 0.1}
+
+
+class DxfError(Exception):
+  pass
+
+
+class GroupCodeTokenizer:
+  """Incremental (code, value) pairs from ASCII DXF bytes fed in arbitrary pieces."""
+
+  def __init__(self, encoding="utf-8"):
+    self.encoding = encoding
+    self._tail = b""
+    self._code = None
+    self.bytes_seen = 0
+
+  def feed(self, data):
+    if self.bytes_seen == 0 and data.startswith(b"AutoCAD Binary DXF"):
+      raise DxfError("Binary DXF is not supported; save the drawing as ASCII DXF")
+    self.bytes_seen += len(data)
+    lines = (self._tail + data).split(b"\n")
+    self._tail = lines.pop()
+    return self._pairs(lines)
+
+  def close(self):
+    lines, self._tail = ([self._tail] if self._tail else []), b""
+    return self._pairs(lines)
+
+  def _pairs(self, lines):
+    out = []
+    code = self._code
+    for raw in lines:
+      if code is None:
+        try:
+          code = int(raw)
+        except ValueError:
+          raise DxfError(f"Invalid group code: {raw[:20]!r}")
+      else:
+        out.append((code, raw.rstrip(b"\r").decode(self.encoding, errors="replace").strip()))
+        code = None
+    self._code = code
+    return out
+
+
+class DxfWallStream:
+  """Walls from a DXF stream; use as `feed(bytes)` ... `close()`, then `project()`."""
+
+  def __init__(self, target_w=None, target_h=None, include_layers=None,
+               exclude_layers=DEFAULT_EXCLUDE_LAYERS, entity_types=WALL_ENTITIES, batch_walls=BATCH_WALLS):
+    self.target_w = float(target_w) if target_w else None
+    self.target_h = float(target_h) if target_h else None
+    self.include = re.compile(include_layers, re.IGNORECASE) if include_layers else None
+    self.exclude = re.compile(exclude_layers, re.IGNORECASE) if exclude_layers else None
+    self.entity_types = set(entity_types)
+    self.batch_walls = batch_walls
+    self.tokens = GroupCodeTokenizer()
+
+    self._section = None
+    self._expect_section_name = False
+    self._header_var = None
+    self._header = {}
+    self._entity = None           # {"type", "layer", "points", "x", "closed"} of the entity being read
+    self._polyline = None         # open POLYLINE collecting VERTEX points
+    self._layer_ok = {}
+
+    self._transform = None        # (min_x, max_y, scale, (w, h)) once extents are known
+    self._raw = []                # segments in drawing units, before the transform is known
+    self._ready = []              # transformed walls not yet drained
+    self._wall_count = 0
+    self._bounds = [math.inf, math.inf, -math.inf, -math.inf]
+    self.stats = {"entities": {}, "kept": 0, "skipped_type": 0, "skipped_layer": 0, "walls": 0,
+                  "bytes": 0, "seconds": 0.0, "mb_per_s": 0.0}
+    self._parse_seconds = 0.0
+    self.closed = False
+
+  # ========== Consumer interface ==========
+
+  def feed(self, data):
+    started = time.perf_counter()
+    for code, value in self.tokens.feed(data):
+      self._token(code, value)
+    self._update_stats(time.perf_counter() - started)
+
+  def close(self):
+    if self.closed:
+      return
+    started = time.perf_counter()
+    for code, value in self.tokens.close():
+      self._token(code, value)
+    self._end_entity()
+    if self._polyline is not None:
+      self._emit_points(self._polyline)
+      self._polyline = None
+    if self._transform is None:
+      self._transform = self._transform_from(*self._bounds) or (0.0, 0.0, 1.0, (0.0, 0.0))
+    self._flush_raw()
+    self.closed = True
+    self._update_stats(time.perf_counter() - started)
+
+  def drain(self):
+    """Walls ready since the last drain in batches of batch_walls, with the plan size and running stats."""
+    walls, self._ready = self._ready, []
+    batches = [walls[i:i + self.batch_walls] for i in range(0, len(walls), self.batch_walls)]
+    out = {"batches": batches, "stats": dict(self.stats)}
+    if self._transform is not None:
+      out["w"], out["h"] = self._size
+    return out
+
+  def project(self):
+    """Project dict for loadProjectFromData; walls not yet drained are included."""
+    if not self.closed:
+      self.close()
+    w, h = self._size if self._transform else (0.0, 0.0)
+    walls = [wall for batch in self.drain()["batches"] for wall in batch]
+    return {"version": "1.0", "w": w, "h": h, "walls": walls, "floorPlanes": [],
+            "aps": [], "dxfStats": dict(self.stats)}
+
+  # ========== Tokens ==========
+
+  def _token(self, code, value):
+    if code == 0:
+      self._end_entity()
+      if value == "SECTION":
+        self._expect_section_name = True
+      elif value == "ENDSEC":
+        self._section = None
+        self._end_polyline()
+      elif self._section == "ENTITIES":
+        self._start_entity(value)
+      return
+    if self._expect_section_name and code == 2:
+      self._section = value
+      self._expect_section_name = False
+      return
+    try:
+      if self._section == "HEADER":
+        self._header_token(code, value)
+      elif self._section == "ENTITIES" and self._entity is not None:
+        self._entity_token(code, value)
+    except ValueError:
+      raise DxfError(f"Invalid value for group code {code}: {value[:20]!r}")
+
+  def _header_token(self, code, value):
+    if code == 9:
+      self._header_var = value
+      return
+    var = self._header_var
+    if var == "$INSUNITS" and code == 70:
+      self._header["units"] = int(value)
+    elif var in ("$EXTMIN", "$EXTMAX") and code in (10, 20):
+      self._header[(var, code)] = float(value)
+      if len([k for k in self._header if isinstance(k, tuple)]) == 4:
+        self._transform_from_header()
+
+  def _start_entity(self, kind):
+    counts = self.stats["entities"]
+    counts[kind] = counts.get(kind, 0) + 1
+    if kind in ("VERTEX", "SEQEND") and self._polyline is not None:
+      if kind == "SEQEND":
+        self._end_polyline()
+      else:
+        self._entity = {"type": "VERTEX", "layer": None, "points": [], "x": None, "closed": False}
+      return
+    self._end_polyline()
+    if kind not in self.entity_types:
+      self.stats["skipped_type"] += 1
+      return
+    self._entity = {"type": kind, "layer": None, "points": [], "x": None, "closed": False}
+
+  def _entity_token(self, code, value):
+    entity = self._entity
+    if code == 8:
+      entity["layer"] = value
+      if not self._layer_allowed(value):
+        self.stats["skipped_layer"] += 1
+        self._entity = None
+      return
+    if code == 10:
+      entity["x"] = float(value)
+    elif code == 20 and entity["x"] is not None:
+      entity["points"].append((entity["x"], float(value)))
+      entity["x"] = None
+    elif code == 11:
+      entity["x"] = float(value)
+    elif code == 21 and entity["x"] is not None:
+      entity["points"].append((entity["x"], float(value)))
+      entity["x"] = None
+    elif code == 70 and entity["type"] in ("LWPOLYLINE", "POLYLINE"):
+      entity["closed"] = bool(int(value) & 1)
+
+  def _layer_allowed(self, layer):
+    ok = self._layer_ok.get(layer)
+    if ok is None:
+      ok = not (self.exclude and self.exclude.search(layer)) and not (self.include and not self.include.search(layer))
+      self._layer_ok[layer] = ok
+    return ok
+
+  def _end_entity(self):
+    entity, self._entity = self._entity, None
+    if entity is None:
+      return
+    if entity["type"] == "VERTEX":
+      if entity["points"] and self._polyline is not None:
+        self._polyline["points"].append(entity["points"][0])
+      return
+    if entity["type"] == "POLYLINE":
+      # Points follow as VERTEX entities; the POLYLINE's own 10/20 is a dummy origin
+      entity["points"] = []
+      self._polyline = entity
+      return
+    self.stats["kept"] += 1
+    self._emit_points(entity)
+
+  def _end_polyline(self):
+    if self._polyline is not None:
+      polyline, self._polyline = self._polyline, None
+      self.stats["kept"] += 1
+      self._emit_points(polyline)
+
+  # ========== Geometry ==========
+
+  def _emit_points(self, entity):
+    points = entity["points"]
+    if entity["closed"] and len(points) > 2:
+      points = points + [points[0]]
+    for a, b in zip(points, points[1:]):
+      if a == b:
+        continue
+      self._add_segment(a, b, entity["layer"] or "")
+
+  def _add_segment(self, a, b, layer):
+    bounds = self._bounds
+    bounds[0] = min(bounds[0], a[0], b[0])
+    bounds[1] = min(bounds[1], a[1], b[1])
+    bounds[2] = max(bounds[2], a[0], b[0])
+    bounds[3] = max(bounds[3], a[1], b[1])
+    if self._transform is None:
+      self._raw.append((a, b, layer))
+      return
+    self._ready.append(self._wall(a, b, layer))
+
+  def _transform_from(self, min_x, min_y, max_x, max_y):
+    if not all(math.isfinite(v) for v in (min_x, min_y, max_x, max_y)) or max_x <= min_x or max_y <= min_y:
+      return None
+    scale = UNIT_SCALE.get(self._header.get("units", 0), 1.0)
+    width, height = (max_x - min_x) * scale, (max_y - min_y) * scale
+    if self.target_w:
+      scale *= self.target_w / width
+    elif self.target_h:
+      scale *= self.target_h / height
+    return (min_x, max_y, scale, ((max_x - min_x) * scale, (max_y - min_y) * scale))
+
+  def _transform_from_header(self):
+    h = self._header
+    # Unset extents are written as +/-1e20; those leave the transform to close()
+    if all(abs(h[(var, code)]) < 1e19 for var in ("$EXTMIN", "$EXTMAX") for code in (10, 20)):
+      self._transform = self._transform_from(h[("$EXTMIN", 10)], h[("$EXTMIN", 20)],
+                                             h[("$EXTMAX", 10)], h[("$EXTMAX", 20)])
+
+  @property
+  def _size(self):
+    return self._transform[3]
+
+  def _flush_raw(self):
+    raw, self._raw = self._raw, []
+    for a, b, layer in raw:
+      self._ready.append(self._wall(a, b, layer))
+
+  def _wall(self, a, b, layer):
+    min_x, max_y, scale, _ = self._transform
+    # Plan y grows downwards, DXF y upwards
+    p1 = {"x": round((a[0] - min_x) * scale, 4), "y": round((max_y - a[1]) * scale, 4)}
+    p2 = {"x": round((b[0] - min_x) * scale, 4), "y": round((max_y - b[1]) * scale, 4)}
+    self._wall_count += 1
+    wall = {"id": f"wall_{self._wall_count}", "p1": p1, "p2": p2, "elementType": "wall"}
+    if DOOR_LAYERS.search(layer):
+      wall["elementType"] = "door"
+      wall["width"] = round(math.hypot(p2["x"] - p1["x"], p2["y"] - p1["y"]), 4)
+    elif WINDOW_LAYERS.search(layer):
+      wall["elementType"] = "window"
+    return wall
+
+  def _update_stats(self, elapsed):
+    # Parse time only; time spent waiting for the next chunk is not counted
+    stats = self.stats
+    self._parse_seconds += elapsed
+    stats["walls"] = self._wall_count + len(self._raw)
+    stats["bytes"] = self.tokens.bytes_seen
+    stats["seconds"] = round(self._parse_seconds, 3)
+    if self._parse_seconds > 0:
+      stats["mb_per_s"] = round(stats["bytes"] / 1e6 / self._parse_seconds, 2)
@@ -0,0 +1,227 @@
+# FloorplanPreviewCache.py
+# Content-addressed cache for floorplan detection (Preview Detection / Generate DXF).
+#
+# An uploaded floorplan image is keyed by the SHA-256 of its bytes; the key is
+# the handle the App form keeps, so the image crosses the network once per
+# floorplan instead of once per preview and again for generate_dxf. Per handle
+# the cache keeps the decoded image and the raw detector output for each set of
+# inference parameters (mode, slice size, overlap, split grid). Raw output is
+# produced at a low confidence floor without NMS, so changing the confidence or
+# NMS IoU in `params` only re-runs post_process on cached boxes.
+#
+# Large images are cut into overlapping tiles (slice size / overlap ratio from
+# params) and the detector is called on batches of tiles; tile boxes are shifted
+# back to image coordinates and duplicates across tile seams are removed by the
+# NMS in post_process.
+#
+# Backend wiring: `preview_floorplan_cached(handle, image_media, params)` —
+# with an unknown handle and no image it answers {"status": "unknown_handle"};
+# otherwise `PREVIEWS.register(image_media.get_bytes(), decode)` (when an image
+# is given), then `PREVIEWS.preview(handle, params, detect_batch)` and renders
+# viz_image from the returned predictions, answering {"handle", "predictions",
+# "counts", "viz_image", "image_height"}.
+# `generate_dxf_from_floorplan_cached(handle, params, predictions)` builds the
+# DXF from `PREVIEWS.image(handle)` (or {"status": "unknown_handle"}).
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+RAW_CONFIDENCE = 0.05
+DEFAULT_SLICE = 1024
+DEFAULT_OVERLAP = 0.2
+TILE_BATCH = 8
+MAX_CACHE_BYTES = 1024 * 1024 * 1024
+# Parameters that change what the detector sees; everything else is post-processing
+INFERENCE_PARAMS = ("inferenceMode", "sliceSize", "overlapRatio", "splitCols", "splitRows")
+LABELS = ("wall", "door", "window")
+
+
+def image_key(data):
+  return hashlib.sha256(data).hexdigest()
+
+
+def inference_key(params):
+  params = params or {}
+  return tuple((name, params.get(name)) for name in INFERENCE_PARAMS)
+
+
+# ========== Tiling ==========
+
+def tile_boxes(width, height, tile, overlap_ratio):
+  """(x0, y0, x1, y1) tiles covering the image; the last row/column is shifted in to stay full size."""
+  tile = max(1, int(tile))
+  if width <= tile and height <= tile:
+    return [(0, 0, width, height)]
+  step = max(1, int(tile * (1.0 - overlap_ratio)))
+
+  def starts(size):
+    if size <= tile:
+      return [0]
+    out = list(range(0, size - tile, step))
+    out.append(size - tile)
+    return out
+
+  return [(x, y, min(x + tile, width), min(y + tile, height)) for y in starts(height) for x in starts(width)]
+
+
+def infer_tiled(image, detect_batch, tile=DEFAULT_SLICE, overlap_ratio=DEFAULT_OVERLAP, batch_size=TILE_BATCH):
+  """Run `detect_batch(list_of_tiles)` over the image in batches of tiles.
+
+  `detect_batch` returns, per tile, a list of {"box": [x0, y0, x1, y1], "score", "label"}
+  in tile coordinates. Returns (boxes (N, 4) float32, scores (N,), labels (N,) int)
+  in image coordinates, keeping scores >= RAW_CONFIDENCE.
+  """
+  height, width = image.shape[:2]
+  tiles = tile_boxes(width, height, tile, overlap_ratio)
+  boxes, scores, labels = [], [], []
+  for i in range(0, len(tiles), batch_size):
+    batch = tiles[i:i + batch_size]
+    results = detect_batch([image[y0:y1, x0:x1] for x0, y0, x1, y1 in batch])
+    for (x0, y0, _, _), detections in zip(batch, results):
+      for det in detections:
+        if det["score"] < RAW_CONFIDENCE:
+          continue
+        bx0, by0, bx1, by1 = det["box"]
+        boxes.append((bx0 + x0, by0 + y0, bx1 + x0, by1 + y0))
+        scores.append(det["score"])
+        labels.append(LABELS.index(det["label"]) if det["label"] in LABELS else len(LABELS))
+  return (np.asarray(boxes, dtype=np.float32).reshape(-1, 4), np.asarray(scores, dtype=np.float32),
+          np.asarray(labels, dtype=np.int32))
+
+
+# ========== Post-processing ==========
+
+def nms(boxes, scores, iou_threshold):
+  """Indices kept by greedy non-maximum suppression, highest score first."""
+  order = np.argsort(-scores)
+  areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+  keep = []
+  while order.size:
+    i = order[0]
+    keep.append(i)
+    rest = order[1:]
+    xx0 = np.maximum(boxes[i, 0], boxes[rest, 0])
+    yy0 = np.maximum(boxes[i, 1], boxes[rest, 1])
+    xx1 = np.minimum(boxes[i, 2], boxes[rest, 2])
+    yy1 = np.minimum(boxes[i, 3], boxes[rest, 3])
+    inter = np.clip(xx1 - xx0, 0, None) * np.clip(yy1 - yy0, 0, None)
+    iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+    order = rest[iou <= iou_threshold]
+  return np.asarray(keep, dtype=np.int64)
+
+
+def _float_param(params, name, default):
+  """params[name] as float; `default` only when it is missing or empty (0 is a valid value)."""
+  value = params.get(name)
+  return default if value is None or value == "" else float(value)
+
+
+def post_process(raw, params):
+  """Confidence filter + per-label NMS on cached raw boxes; returns (predictions, counts)."""
+  params = params or {}
+  boxes, scores, labels = raw
+  confidence = _float_param(params, "confidence", 0.25)
+  iou = _float_param(params, "nmsIou", 0.5)
+  mask = scores >= confidence
+  boxes, scores, labels = boxes[mask], scores[mask], labels[mask]
+  predictions = []
+  counts = {"walls": 0, "doors": 0, "windows": 0, "total": 0}
+  for label_id, label in enumerate(LABELS):
+    idx = np.nonzero(labels == label_id)[0]
+    if not idx.size:
+      continue
+    for k in idx[nms(boxes[idx], scores[idx], iou)]:
+      predictions.append({"box": [round(float(v), 1) for v in boxes[k]], "score": round(float(scores[k]), 4),
+                          "label": label})
+      counts[label + "s"] += 1
+  counts["total"] = len(predictions)
+  return predictions, counts
+
+
+# ========== Cache ==========
+
+class _Entry:
+  def __init__(self, key, image):
+    self.key = key
+    self.image = image
+    self.raw = {}             # inference_key(params) -> (boxes, scores, labels)
+    self.lock = threading.Lock()
+
+  @property
+  def nbytes(self):
+    return self.image.nbytes + sum(b.nbytes + s.nbytes + l.nbytes for b, s, l in self.raw.values())
+
+
+class FloorplanPreviewCache:
+  """Decoded images and raw detections by image hash, least-recently-used out."""
+
+  def __init__(self, max_bytes=MAX_CACHE_BYTES):
+    self.max_bytes = max_bytes
+    self._lock = threading.Lock()
+    self._entries = OrderedDict()
+
+  def register(self, image_bytes, decode):
+    """Cache the image once (decoded with `decode(bytes) -> ndarray`); returns its handle."""
+    key = image_key(image_bytes)
+    with self._lock:
+      if key in self._entries:
+        self._entries.move_to_end(key)
+        return key
+    entry = _Entry(key, decode(image_bytes))
+    with self._lock:
+      self._entries.setdefault(key, entry)
+      self._evict()
+    return key
+
+  def has(self, handle):
+    with self._lock:
+      return handle in self._entries
+
+  def _entry(self, handle):
+    with self._lock:
+      entry = self._entries.get(handle)
+      if entry is not None:
+        self._entries.move_to_end(handle)
+      return entry
+
+  def image(self, handle):
+    entry = self._entry(handle)
+    return entry.image if entry is not None else None
+
+  def raw_detections(self, handle, params, detect_batch):
+    """Raw detections for the inference params, running the tiled detector only on a miss."""
+    entry = self._entry(handle)
+    if entry is None:
+      return None
+    params = params or {}
+    key = inference_key(params)
+    with entry.lock:
+      raw = entry.raw.get(key)
+      if raw is None:
+        raw = infer_tiled(entry.image, detect_batch, params.get("sliceSize") or DEFAULT_SLICE,
+                          params.get("overlapRatio") if params.get("overlapRatio") is not None else DEFAULT_OVERLAP)
+        entry.raw[key] = raw
+    with self._lock:
+      self._evict()
+    return raw
+
+  def preview(self, handle, params, detect_batch):
+    """{"handle", "predictions", "counts", "image_height"} or None for an unknown handle."""
+    raw = self.raw_detections(handle, params, detect_batch)
+    if raw is None:
+      return None
+    predictions, counts = post_process(raw, params)
+    return {"handle": handle, "predictions": predictions, "counts": counts,
+            "image_height": int(self.image(handle).shape[0])}
+
+  def _evict(self):
+    # Caller holds self._lock; the newest entry always stays
+    total = sum(e.nbytes for e in self._entries.values())
+    while total > self.max_bytes and len(self._entries) > 1:
+      _, entry = self._entries.popitem(last=False)
+      total -= entry.nbytes
+
+
+PREVIEWS = FloorplanPreviewCache()
@@ -0,0 +1,181 @@
+# OptimizationChannel.py
+# Long-poll channel for optimization progress (backend -> App form).
+#
+# The optimizer publishes actions, RSRP grids and compliance values into an
+# OptimizationChannel; `wait_since` holds the caller until something exists past
+# its cursors (or the run reaches a terminal state, or the timeout expires) and
+# returns everything new in one batch, shaped like a get_live_optimization
+# response. The App form calls it as `wait_live_optimization`, so round-trips
+# track optimizer progress instead of the opt_timer rate.
+#
+# Steps are stored in a bounded OptimizationHistory (see OptimizationHistory.py).
+# `wait_cursor` is the unified-cursor variant: the App form passes the last
+# sequence number it saw to
+# `wait_live_optimization_cursor(cursor, timeout, latest_only)` and gets the new steps, or a skip-to-latest snapshot when it fell behind.
+# The three-index calls stay for older App forms. Every read takes
+# `latest_only`: all actions and compliance values, but only the newest grid,
+# with "rsrp_skipped" counting the grids left out.
+#
+# Run `python -m server_code.OptimizationChannel` to benchmark long-poll against
+# fixed-interval polling with a FakeOptimizer emitting at a controlled rate.
+import threading
+import time
+import random
+
+from .OptimizationHistory import OptimizationHistory
+
+LONG_POLL_TIMEOUT = 10.0   # seconds; stays well under the Anvil server-call timeout
+TERMINAL_STATES = ("finished", "error", "idle")
+
+
+class OptimizationChannel:
+  """Optimization history (OptimizationHistory) guarded by a condition variable."""
+
+  def __init__(self, history=None):
+    self._cond = threading.Condition()
+    self.history = history or OptimizationHistory()
+    self.reset(state="idle")
+
+  def reset(self, state="starting", message=""):
+    with self._cond:
+      self.history.reset()
+      self.state = state
+      self.message = message
+      self.rsrp_send_timestamp_sec = None
+      self._cond.notify_all()
+
+  def publish(self, action=None, rsrp=None, compliance=None, state=None, message=None):
+    """Append whatever the optimizer produced this step and wake waiting readers."""
+    with self._cond:
+      if action is not None or rsrp is not None or compliance is not None:
+        if rsrp is not None:
+          self.rsrp_send_timestamp_sec = time.time()
+        self.history.append(action, rsrp, compliance, self.rsrp_send_timestamp_sec)
+      if state is not None:
+        self.state = state
+      if message is not None:
+        self.message = message
+      self._cond.notify_all()
+
+  def _has_news(self, last_action_idx, last_rsrp_idx, last_compliance_idx):
+    counts = self.history.counts
+    return (counts["actions"] > last_action_idx or counts["rsrp"] > last_rsrp_idx
+            or counts["compliance"] > last_compliance_idx or self.state in TERMINAL_STATES)
+
+  def _status(self, result):
+    result.update(state=self.state, message=self.message, rsrp_send_timestamp_sec=self.rsrp_send_timestamp_sec)
+    return result
+
+  def read_since(self, last_action_idx, last_rsrp_idx, last_compliance_idx, latest_only=False):
+    """Non-blocking read; same response shape as get_live_optimization."""
+    with self._cond:
+      return self._status(self.history.read_indexes(last_action_idx, last_rsrp_idx, last_compliance_idx, latest_only))
+
+  def wait_since(self, last_action_idx, last_rsrp_idx, last_compliance_idx, timeout=LONG_POLL_TIMEOUT,
+                 latest_only=False):
+    """Block until there is news past the cursors or `timeout` seconds pass, then read."""
+    deadline = time.monotonic() + max(0.0, min(float(timeout), LONG_POLL_TIMEOUT))
+    with self._cond:
+      while not self._has_news(last_action_idx, last_rsrp_idx, last_compliance_idx):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          break
+        self._cond.wait(remaining)
+      return self.read_since(last_action_idx, last_rsrp_idx, last_compliance_idx, latest_only)
+
+  def read_cursor(self, cursor, latest_only=False):
+    """Non-blocking read past the unified cursor (a snapshot if the reader fell behind)."""
+    with self._cond:
+      return self._status(self.history.read(cursor, latest_only))
+
+  def wait_cursor(self, cursor, timeout=LONG_POLL_TIMEOUT, latest_only=False):
+    """wait_since for the unified cursor; answers wait_live_optimization_cursor."""
+    deadline = time.monotonic() + max(0.0, min(float(timeout), LONG_POLL_TIMEOUT))
+    with self._cond:
+      while not self.history.has_news(cursor + 1) and self.state not in TERMINAL_STATES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+          break
+        self._cond.wait(remaining)
+      return self.read_cursor(cursor, latest_only)
+
+
+# ========== Benchmark ==========
+
+class FakeOptimizer(threading.Thread):
+  """Publishes `iterations` steps at `rate_hz` into a channel, then finishes.
+
+  Each step carries one action, one RSRP grid of `bins` values and one
+  compliance value; publish times are kept for latency measurement.
+  """
+
+  def __init__(self, channel, rate_hz=20.0, iterations=100, bins=60000):
+    super().__init__(daemon=True)
+    self.channel = channel
+    self.period = 1.0 / rate_hz
+    self.iterations = iterations
+    self.bins = bins
+    self.publish_times = []
+
+  def run(self):
+    self.channel.reset(state="running")
+    grid = [-90.0] * self.bins
+    next_at = time.monotonic()
+    for i in range(self.iterations):
+      next_at += self.period
+      delay = next_at - time.monotonic()
+      if delay > 0:
+        time.sleep(delay)
+      action = {"antenna_id": f"ANT{i % 8}", "action_type": "power", "X_antenna": 1.0, "Y_antenna": 1.0}
+      self.publish_times.append(time.monotonic())
+      self.channel.publish(action=action, rsrp=grid, compliance=random.uniform(50, 100), message=f"step {i}")
+    self.channel.publish(state="finished", message="done")
+
+
+def _consume(channel, fake, poll_interval=None):
+  """Drain the channel like the App form would; returns per-action latencies and call count."""
+  a = r = c = 0
+  calls = 0
+  latencies = []
+  while True:
+    if poll_interval is None:
+      result = channel.wait_since(a, r, c)
+    else:
+      time.sleep(poll_interval)
+      result = channel.read_since(a, r, c)
+    calls += 1
+    now = time.monotonic()
+    for idx in range(a, result["last_action_idx"]):
+      latencies.append(now - fake.publish_times[idx])
+    a, r, c = result["last_action_idx"], result["last_rsrp_idx"], result["last_compliance_idx"]
+    if result["state"] in TERMINAL_STATES and a >= fake.iterations:
+      return latencies, calls
+
+
+def benchmark(rate_hz=20.0, iterations=100, bins=60000, poll_interval=None):
+  """Run a FakeOptimizer against long-poll (poll_interval=None) or fixed polling."""
+  channel = OptimizationChannel()
+  fake = FakeOptimizer(channel, rate_hz, iterations, bins)
+  start = time.monotonic()
+  fake.start()
+  while not fake.publish_times and fake.is_alive():
+    time.sleep(0.0005)
+  latencies, calls = _consume(channel, fake, poll_interval)
+  elapsed = time.monotonic() - start
+  fake.join()
+  latencies.sort()
+  pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000.0
+  return {
+    "mode": "long_poll" if poll_interval is None else f"poll_{poll_interval * 1000:g}ms",
+    "events": len(latencies),
+    "calls": calls,
+    "events_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+    "latency_p50_ms": pct(0.50),
+    "latency_p95_ms": pct(0.95),
+    "latency_max_ms": latencies[-1] * 1000.0,
+  }
+
+
+if __name__ == "__main__":
+  for interval in (None, 0.001, 0.1):
+    print(benchmark(rate_hz=20.0, iterations=60, bins=1000, poll_interval=interval))
@@ -0,0 +1,319 @@
+# OptimizationHistory.py
+# Bounded, memory-budgeted history of one optimization run.
+#
+# Every optimizer step is one record with a run-wide sequence number; that
+# number is the single cursor a client reads from (replacing the separate
+# action / RSRP / compliance indexes). Records hold:
+#   - the action as compact JSON bytes and the compliance as a float,
+#   - the RSRP grid as an RsrpGridCodec frame: every KEYFRAME_INTERVAL-th grid
+#     is a keyframe, the others are XOR deltas against their keyframe (not the
+#     previous grid), deflated — any grid decodes from itself plus one keyframe.
+#     A keyframe record keeps no frame of its own: its grid is the keyframe body.
+# Frames and keyframe bodies stay in memory up to `memory_budget` bytes; older
+# ones are appended to a spool file and read back through mmap. At most `max_records` records are
+# kept (a ring): older ones are dropped along with keyframes nothing refers to.
+# Spool space of dropped records is reclaimed by compacting the file once less
+# than half of it is still referenced, so the spool stays bounded like the ring.
+#
+# A reader whose cursor fell out of the ring, or that is more than
+# `max_batch` records behind, gets a "skip to latest" snapshot instead: the
+# latest action per antenna (plus the latest one without an antenna id), the
+# latest grid and the latest compliance.
+#
+# Readers that only paint the newest heatmap pass `latest_only`: they still get
+# every action and compliance value, but only the newest grid, so intermediate
+# grids are never decoded or serialized. The newest grid's frame is never
+# spilled, so that read stays in memory. "rsrp_skipped" counts the grids left
+# out of a response; `frames_skipped` totals them for the run.
+#
+# Backend wiring: OptimizationChannel keeps one OptimizationHistory per run;
+# `wait_live_optimization_cursor(cursor, timeout, latest_only)` answers
+# `channel.wait_cursor(cursor, timeout, latest_only)` (see OptimizationChannel.py).
+import json
+import mmap
+import os
+import tempfile
+import threading
+from collections import deque
+
+from .RsrpGridCodec import DTYPE_FLOAT32, body_values, decode_frame, encode_frame
+
+KEYFRAME_INTERVAL = 16
+MEMORY_BUDGET = 256 * 1024 * 1024
+MAX_RECORDS = 5000
+MAX_BATCH = 32
+# The spool is rewritten when it is at least this large and over half of it is dead
+SPOOL_COMPACT_MIN_BYTES = 16 * 1024 * 1024
+
+
+class _Record:
+  __slots__ = ("seq", "action", "action_i", "frame", "spill", "keyframe_seq", "rsrp_i", "compliance",
+               "compliance_i", "time")
+
+  def __init__(self, seq):
+    self.seq = seq
+    self.action = self.frame = self.spill = self.keyframe_seq = self.compliance = self.time = None
+    self.action_i = self.rsrp_i = self.compliance_i = None
+
+
+class OptimizationHistory:
+  def __init__(self, memory_budget=MEMORY_BUDGET, max_records=MAX_RECORDS, max_batch=MAX_BATCH,
+               keyframe_interval=KEYFRAME_INTERVAL, dtype=DTYPE_FLOAT32, spool_dir=None):
+    self.memory_budget = memory_budget
+    self.max_records = max_records
+    self.max_batch = max_batch
+    self.keyframe_interval = keyframe_interval
+    self.dtype = dtype
+    self.spool_dir = spool_dir
+    self._lock = threading.Lock()
+    self._spool = None
+    self._map = None
+    self.reset()
+
+  def reset(self):
+    with self._lock:
+      self._records = deque()
+      self._keyframes = {}        # keyframe seq -> (seq, body) for the codec
+      self._spilled_keyframes = {}  # keyframe seq -> (offset, length) in the spool
+      self._keyframe_refs = {}    # keyframe seq -> number of retained records using it
+      self._current_keyframe = None
+      self._since_keyframe = 0
+      self._memory = 0
+      self.next_seq = 1
+      self.counts = {"actions": 0, "rsrp": 0, "compliance": 0}
+      self.latest_actions = {}    # antenna id -> latest action (for snapshots); None holds the latest keyless one
+      self.latest_rsrp_seq = None
+      self.latest_compliance = None
+      self.frames_skipped = 0
+      self._close_spool()
+      self._spool_size = 0        # bytes written to the spool file
+      self._spool_live = 0        # bytes of it still referenced
+
+  # ========== Writing ==========
+
+  def append(self, action=None, rsrp=None, compliance=None, timestamp=None):
+    """Record one optimizer step; returns its sequence number."""
+    with self._lock:
+      record = _Record(self.next_seq)
+      self.next_seq += 1
+      record.time = timestamp
+      if action is not None:
+        record.action = json.dumps(action, separators=(",", ":")).encode("utf-8")
+        record.action_i = self.counts["actions"]
+        self.counts["actions"] += 1
+        key = action.get("antenna_id") if isinstance(action, dict) else None
+        self.latest_actions[key] = record.action
+      if rsrp is not None:
+        self._store_grid(record, rsrp)
+        record.rsrp_i = self.counts["rsrp"]
+        self.counts["rsrp"] += 1
+        self.latest_rsrp_seq = record.seq
+      if compliance is not None:
+        record.compliance = float(compliance)
+        record.compliance_i = self.counts["compliance"]
+        self.counts["compliance"] += 1
+        self.latest_compliance = record.compliance
+      self._records.append(record)
+      self._trim()
+      return record.seq
+
+  def _store_grid(self, record, values):
+    keyframe = self._keyframes.get(self._current_keyframe)
+    if keyframe is not None and self._since_keyframe < self.keyframe_interval:
+      frame, body = encode_frame(values, self.dtype, record.seq, keyframe)
+      if len(body) != len(keyframe[1]):
+        keyframe = None       # grid size changed: start a new keyframe
+    if keyframe is None or self._since_keyframe >= self.keyframe_interval:
+      _, body = encode_frame(values, self.dtype, record.seq, None, compress=False)
+      if self._keyframe_refs.get(self._current_keyframe) == 0:
+        self._free_keyframe(self._current_keyframe)
+      self._keyframes[record.seq] = (record.seq, body)
+      self._keyframe_refs[record.seq] = 0
+      self._current_keyframe = record.seq
+      self._since_keyframe = 0
+      self._memory += len(body)
+      frame = None            # the keyframe body is this record's grid
+    self._since_keyframe += 1
+    record.frame = frame
+    record.keyframe_seq = self._current_keyframe
+    self._keyframe_refs[self._current_keyframe] += 1
+    if frame is not None:
+      self._memory += len(frame)
+
+  def _trim(self):
+    while len(self._records) > self.max_records:
+      self._drop(self._records.popleft())
+    # Spill the oldest in-memory frames until under budget (the newest always stays in memory)
+    for record in self._records:
+      if self._memory <= self.memory_budget:
+        break
+      if record.frame is not None and record.seq != self.latest_rsrp_seq:
+        record.spill = self._spill(record.frame)
+        self._memory -= len(record.frame)
+        record.frame = None
+    for seq in list(self._keyframes):
+      if self._memory <= self.memory_budget:
+        break
+      if seq != self._current_keyframe:
+        body = self._keyframes.pop(seq)[1]
+        self._spilled_keyframes[seq] = self._spill(body)
+        self._memory -= len(body)
+    if self._spool_size >= SPOOL_COMPACT_MIN_BYTES and self._spool_live * 2 < self._spool_size:
+      self._compact_spool()
+
+  def _drop(self, record):
+    if record.frame is not None:
+      self._memory -= len(record.frame)
+    if record.spill is not None:
+      self._spool_live -= record.spill[1]
+    if record.keyframe_seq is not None:
+      refs = self._keyframe_refs[record.keyframe_seq] - 1
+      self._keyframe_refs[record.keyframe_seq] = refs
+      if refs == 0 and record.keyframe_seq != self._current_keyframe:
+        self._free_keyframe(record.keyframe_seq)
+
+  def _free_keyframe(self, seq):
+    del self._keyframe_refs[seq]
+    if seq in self._keyframes:
+      self._memory -= len(self._keyframes.pop(seq)[1])
+    else:
+      spill = self._spilled_keyframes.pop(seq, None)
+      if spill is not None:
+        self._spool_live -= spill[1]
+
+  # ========== Spool ==========
+
+  def _new_spool(self):
+    fd, path = tempfile.mkstemp(prefix="opt_history_", suffix=".bin", dir=self.spool_dir)
+    os.remove(path)         # unlinked: the space goes away with the handle
+    return os.fdopen(fd, "w+b")
+
+  def _spill(self, frame):
+    if self._spool is None:
+      self._spool = self._new_spool()
+    self._spool.seek(0, os.SEEK_END)
+    offset = self._spool.tell()
+    self._spool.write(frame)
+    self._spool_size = offset + len(frame)
+    self._spool_live += len(frame)
+    return offset, len(frame)
+
+  def _compact_spool(self):
+    """Copy the still-referenced spool ranges into a fresh file and drop the old one."""
+    spool = self._new_spool()
+    offset = 0
+
+    def _copy(spill):
+      nonlocal offset
+      spool.write(self._read_spilled(*spill))
+      moved = (offset, spill[1])
+      offset += spill[1]
+      return moved
+
+    for record in self._records:
+      if record.spill is not None:
+        record.spill = _copy(record.spill)
+    for seq, spill in list(self._spilled_keyframes.items()):
+      self._spilled_keyframes[seq] = _copy(spill)
+    self._close_spool()
+    self._spool = spool
+    self._spool_size = self._spool_live = offset
+
+  def _read_spilled(self, offset, length):
+    if self._map is None or len(self._map) < offset + length:
+      self._spool.flush()
+      if self._map is not None:
+        self._map.close()
+      self._map = mmap.mmap(self._spool.fileno(), 0, access=mmap.ACCESS_READ)
+    return self._map[offset:offset + length]
+
+  def _close_spool(self):
+    if self._map is not None:
+      self._map.close()
+      self._map = None
+    if self._spool is not None:
+      self._spool.close()
+      self._spool = None
+
+  # ========== Reading ==========
+
+  def _grid(self, record):
+    keyframe = self._keyframes.get(record.keyframe_seq)
+    if keyframe is None:
+      keyframe = (record.keyframe_seq, self._read_spilled(*self._spilled_keyframes[record.keyframe_seq]))
+    if record.keyframe_seq == record.seq:
+      return body_values(keyframe[1], self.dtype)
+    frame = record.frame if record.frame is not None else self._read_spilled(*record.spill)
+    return decode_frame(frame, keyframe)[1]
+
+  @property
+  def oldest_seq(self):
+    return self._records[0].seq if self._records else self.next_seq
+
+  def has_news(self, cursor):
+    return self.next_seq > cursor
+
+  def _grids(self, records, latest_only):
+    with_grid = [r for r in records if r.keyframe_seq is not None]
+    skipped = len(with_grid) - 1 if latest_only and with_grid else 0
+    self.frames_skipped += skipped
+    return [self._grid(r) for r in with_grid[skipped:]], skipped
+
+  def read(self, cursor, latest_only=False):
+    """Everything after `cursor` (the last seq the client has), or a snapshot.
+
+    Returns the get_live_optimization fields plus "cursor" (pass it back next
+    time), "skipped" (records replaced by the snapshot, 0 otherwise) and
+    "rsrp_skipped" (grids left out by `latest_only` or the snapshot).
+    """
+    with self._lock:
+      pending = self.next_seq - 1 - cursor
+      records = [r for r in self._records if r.seq > cursor]
+      if pending > 0 and (cursor + 1 < self.oldest_seq or pending > self.max_batch):
+        return self._snapshot(records, pending)
+      grids, rsrp_skipped = self._grids(records, latest_only)
+      return {
+        "new_action_configs": [json.loads(r.action) for r in records if r.action is not None],
+        "new_bsrv_rsrp": grids,
+        "new_compliance": [r.compliance for r in records if r.compliance is not None],
+        "cursor": self.next_seq - 1,
+        "skipped": 0,
+        "rsrp_skipped": rsrp_skipped,
+      }
+
+  def _snapshot(self, records, pending):
+    # Grids that fell out of the ring are not counted in rsrp_skipped
+    grids, rsrp_skipped = self._grids(records, True)
+    return {
+      "new_action_configs": [json.loads(a) for a in self.latest_actions.values()],
+      "new_bsrv_rsrp": grids,
+      "new_compliance": [self.latest_compliance] if self.latest_compliance is not None else [],
+      "cursor": self.next_seq - 1,
+      "skipped": pending,
+      "rsrp_skipped": rsrp_skipped,
+      "snapshot": True,
+    }
+
+  def read_indexes(self, last_action_idx, last_rsrp_idx, last_compliance_idx, latest_only=False):
+    """Legacy three-index read over the retained records."""
+    with self._lock:
+      records = list(self._records)
+      grids, rsrp_skipped = self._grids([r for r in records if r.rsrp_i is not None and r.rsrp_i >= last_rsrp_idx],
+                                        latest_only)
+      return {
+        "new_action_configs": [json.loads(r.action) for r in records
+                               if r.action is not None and r.action_i >= last_action_idx],
+        "new_bsrv_rsrp": grids,
+        "rsrp_skipped": rsrp_skipped,
+        "new_compliance": [r.compliance for r in records
+                           if r.compliance is not None and r.compliance_i >= last_compliance_idx],
+        "last_action_idx": self.counts["actions"],
+        "last_rsrp_idx": self.counts["rsrp"],
+        "last_compliance_idx": self.counts["compliance"],
+      }
+
+  def memory_usage(self):
+    with self._lock:
+      return {"memory_bytes": self._memory, "spooled_bytes": self._spool_size, "spooled_live_bytes": self._spool_live,
+              "records": len(self._records),
+              "keyframes": len(self._keyframes) + len(self._spilled_keyframes), "frames_skipped": self.frames_skipped}
@@ -0,0 +1,265 @@
+# PropagationEngine25D.py
+# Vectorised 2.5D propagation over a whole bin grid (NumPy).
+#
+# Mirrors PropagationModel25D in theme/assets/src/propagation/PropagationModel25DN.js
+# term for term — reference FSPL + N*log10(d), wall loss, ground-plane loss,
+# floor-plane loss, vertical factor and pattern gain with the same shape factor —
+# but evaluates every bin of an antenna's grid at once. Wall crossings use the
+# same orientation test as segmentsIntersect, batched over (bins x segments)
+# blocks, and each wall's loss is counted once however many of its segments the
+# ray crosses.
+#
+# Grids are row-major, rows*cols float32, bin (c, r) sampled at
+# ((c + 0.5) * dx, (r + 0.5) * dy) — the layout AccurateEngineRsrp.js reads.
+#
+# Backend wiring: get_accurate_baseline / enqueue_antenna / process_batch_antennas
+# build one engine per floorplan revision (`set_geometry`) and call
+# `rsrp_for_config(ant_config, cols, rows, dx, dy, pattern)` per antenna, with
+# the pattern from AntennaPatternTables.PATTERN_TABLES.
+import math
+
+import numpy as np
+
+# Bins x segments evaluated per block in the wall test (bounds temporary memory)
+BLOCK_ELEMENTS = 4_000_000
+
+# Side (m) of the bin tiles used to cull wall segments per block
+WALL_TILE_M = 4.0
+
+TARGET_HEIGHT = 1.5
+DEFAULT_ANTENNA_HEIGHT = 2.5
+
+
+def wall_loss_value(wall, element_types=None):
+  """Loss of one wall in dB (explicit loss, else from element_types) — as wallLossValue."""
+  loss = wall.get("loss") or 0
+  if loss == 0 and element_types:
+    elem_type = wall.get("elementType") or wall.get("type")
+    if elem_type and elem_type in element_types:
+      loss = element_types[elem_type].get("loss") or 0
+    elif wall.get("type") and wall["type"] in (element_types.get("wall") or {}):
+      loss = element_types["wall"][wall["type"]].get("loss") or 0
+  return float(loss)
+
+
+def wall_segments(wall):
+  points = wall.get("points") or []
+  if len(points) >= 2:
+    return [(points[i], points[i + 1]) for i in range(len(points) - 1)]
+  if wall.get("p1") and wall.get("p2"):
+    return [(wall["p1"], wall["p2"])]
+  return []
+
+
+def _orient(px, py, qx, qy, rx, ry):
+  """Sign of the orientation value: 0 collinear, +1/-1 for the two turn directions
+  (segmentsIntersect's 0/1/2, relabelled)."""
+  return np.sign((qy - py) * (rx - qx) - (qx - px) * (ry - qy))
+
+
+def _on_segment(px, py, qx, qy, rx, ry):
+  return ((qx <= np.maximum(px, rx)) & (qx >= np.minimum(px, rx)) &
+          (qy <= np.maximum(py, ry)) & (qy >= np.minimum(py, ry)))
+
+
+def segments_intersect(tx, ty, rx, ry, ax, ay, bx, by):
+  """Vectorised segmentsIntersect((tx,ty)-(rx,ry), (ax,ay)-(bx,by)); broadcasts."""
+  o1 = _orient(tx, ty, rx, ry, ax, ay)
+  o2 = _orient(tx, ty, rx, ry, bx, by)
+  o3 = _orient(ax, ay, bx, by, tx, ty)
+  o4 = _orient(ax, ay, bx, by, rx, ry)
+  hit = (o1 != o2) & (o3 != o4)
+  # Collinear cases are rare; only evaluate them when some exist
+  for o, (px, py, qx, qy, sx, sy) in (
+      (o1, (tx, ty, ax, ay, rx, ry)),
+      (o2, (tx, ty, bx, by, rx, ry)),
+      (o3, (ax, ay, tx, ty, bx, by)),
+      (o4, (ax, ay, rx, ry, bx, by))):
+    collinear = o == 0
+    if np.any(collinear):
+      hit |= collinear & _on_segment(px, py, qx, qy, sx, sy)
+  return hit
+
+
+class PropagationEngine25D:
+  def __init__(self, frequency=2400, N=10, vertical_factor=2.0, shape_factor=3.0, reference_offset=0.0):
+    self.freq = frequency
+    self.N = N
+    self.vertical_factor = vertical_factor
+    self.shape_factor = shape_factor
+    self.reference_offset = reference_offset
+    self.min_distance = 0.5
+    self.set_geometry([], [], None, None)
+
+  # ========== Geometry ==========
+
+  def set_geometry(self, walls, floor_planes, ground_plane=None, element_types=None):
+    """Pack walls/floor planes (JS state shapes) into arrays; call once per revision."""
+    seg_coords, seg_wall, wall_loss = [], [], []
+    for wall in walls or []:
+      segments = wall_segments(wall)
+      if not segments:
+        continue
+      w = len(wall_loss)
+      wall_loss.append(wall_loss_value(wall, element_types))
+      for a, b in segments:
+        seg_coords.append((a["x"], a["y"], b["x"], b["y"]))
+        seg_wall.append(w)
+    self.seg = np.asarray(seg_coords, dtype=np.float64).reshape(-1, 4)
+    self.seg_wall = np.asarray(seg_wall, dtype=np.int64)   # segments are stored wall by wall
+    self.wall_loss = np.asarray(wall_loss, dtype=np.float64)
+
+    planes = []
+    for fp in floor_planes or []:
+      corners = [fp["p1"], fp["p2"], fp["p3"], fp["p4"]]
+      planes.append(([(p["x"], p["y"]) for p in corners], float(fp.get("attenuation") or 0)))
+    self.floor_planes = planes
+    self.ground_plane = ground_plane
+
+  # ========== Loss terms ==========
+
+  def fspl(self, freq_mhz, d):
+    d = np.maximum(d, self.min_distance)
+    return 20 * np.log10(max(freq_mhz, 1e-10)) + 20 * np.log10(np.maximum(d, 1e-10)) - 27.55
+
+  def ground_plane_loss(self, dist):
+    gp = self.ground_plane
+    if not gp or not gp.get("enabled"):
+      return 0.0
+    base = gp.get("attenuation") or 3.0
+    return base * (0.7 + 0.3 * np.minimum(1.0, dist / 10.0))
+
+  def walls_loss(self, tx, ty, X, Y):
+    """Sum of wall losses crossed by each tx -> (X, Y) ray; X/Y are flat bin arrays.
+
+    Bins are grouped into WALL_TILE_M squares; a tile only tests segments whose
+    bounding box overlaps the box spanned by tx and the tile, which holds every
+    ray into it, so the culling never drops a crossing.
+    """
+    total = np.zeros(X.shape, dtype=np.float64)
+    if len(self.wall_loss) == 0 or X.size == 0:
+      return total
+    seg = self.seg
+    seg_min_x, seg_max_x = np.minimum(seg[:, 0], seg[:, 2]), np.maximum(seg[:, 0], seg[:, 2])
+    seg_min_y, seg_max_y = np.minimum(seg[:, 1], seg[:, 3]), np.maximum(seg[:, 1], seg[:, 3])
+
+    tile_keys = np.floor(X / WALL_TILE_M) * 1e6 + np.floor(Y / WALL_TILE_M)
+    _, tile_of = np.unique(tile_keys, return_inverse=True)
+    order = np.argsort(tile_of, kind="stable")
+    bounds = np.flatnonzero(np.r_[True, np.diff(tile_of[order]) != 0, True])
+
+    for t in range(len(bounds) - 1):
+      idx = order[bounds[t]:bounds[t + 1]]
+      xs, ys = X[idx], Y[idx]
+      box_min_x, box_max_x = min(tx, xs.min()), max(tx, xs.max())
+      box_min_y, box_max_y = min(ty, ys.min()), max(ty, ys.max())
+      sel = np.flatnonzero((seg_min_x <= box_max_x) & (seg_max_x >= box_min_x) &
+                           (seg_min_y <= box_max_y) & (seg_max_y >= box_min_y))
+      if sel.size == 0:
+        continue
+      sub_wall = self.seg_wall[sel]
+      starts = np.flatnonzero(np.r_[True, sub_wall[1:] != sub_wall[:-1]])
+      losses = self.wall_loss[sub_wall[starts]]
+      ax, ay, bx, by = (seg[sel, k][None, :] for k in range(4))
+      step = max(1, BLOCK_ELEMENTS // sel.size)
+      for start in range(0, idx.size, step):
+        block = idx[start:start + step]
+        hit = segments_intersect(tx, ty, X[block, None], Y[block, None], ax, ay, bx, by)
+        # A wall counts once if any of its segments is crossed
+        total[block] = np.logical_or.reduceat(hit, starts, axis=1) @ losses
+    return total
+
+  def floor_planes_loss(self, tx, ty, X, Y):
+    total = np.zeros(X.shape, dtype=np.float64)
+    for corners, attenuation in self.floor_planes:
+      xs = [p[0] for p in corners]
+      ys = [p[1] for p in corners]
+      min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+      tx_inside = min_x <= tx <= max_x and min_y <= ty <= max_y
+      if tx_inside:
+        total += attenuation
+        continue
+      hit = (X >= min_x) & (X <= max_x) & (Y >= min_y) & (Y <= max_y)
+      for i in range(4):
+        (e1x, e1y), (e2x, e2y) = corners[i], corners[(i + 1) % 4]
+        hit |= segments_intersect(tx, ty, X, Y, e1x, e1y, e2x, e2y)
+      total += np.where(hit, attenuation, 0.0)
+    return total
+
+  def path_loss(self, tx, ty, X, Y, model="p25d"):
+    """Total path loss (dB) from (tx, ty) to every bin, for "p25d" or "p525"."""
+    dist = np.hypot(X - tx, Y - ty)
+    ground = self.ground_plane_loss(dist)
+    floor = self.floor_planes_loss(tx, ty, X, Y)
+    if model == "p525":
+      return self.fspl(self.freq, np.maximum(dist, 0.5)) + ground + floor
+    d = np.maximum(dist, self.min_distance)
+    ref_loss_1m = self.fspl(self.freq, 1.0)
+    base = ref_loss_1m + self.N * np.log10(np.maximum(d, 1e-10))
+    return base + self.walls_loss(tx, ty, X, Y) + ground + floor + self.vertical_factor
+
+  # ========== Gain ==========
+
+  def angle_dependent_gain(self, ap, X, Y, pattern=None):
+    """getAngleDependentGain over all bins. `pattern` is an AntennaPatternTables.CompiledPattern."""
+    tx, ty = ap["x"], ap["y"]
+    static_gain = ap.get("gt") or ap.get("gain") or 0
+    dxs, dys = X - tx, Y - ty
+    angle_to_point = np.arctan2(dys, dxs)
+    azimuth = ap.get("azimuth") or ap.get("heading") or 0
+    ap_angle = ((-azimuth - 90) * math.pi) / 180
+    angle_diff = angle_to_point - ap_angle
+
+    if pattern is not None and pattern.has_horizontal:
+      h_deg = np.mod(angle_diff * 180 / math.pi + 360, 360)
+      elevation = np.zeros(X.shape, dtype=np.float64)
+      horizontal_dist = np.hypot(dxs, dys)
+      if pattern.has_vertical:
+        antenna_height = ap.get("z") or DEFAULT_ANTENNA_HEIGHT
+        tilt = ((ap.get("tilt") or 0) * math.pi) / 180
+        elev = np.degrees(np.arctan2(antenna_height - TARGET_HEIGHT, horizontal_dist) - tilt)
+        elevation = np.where(horizontal_dist > 0.1, np.clip(elev, -90, 90), 0.0)
+      h_gain = pattern.horizontal_gain(h_deg).astype(np.float64)
+      gain = h_gain
+      if pattern.has_vertical:
+        v_gain = pattern.vertical_gain(np.mod(-elevation, 360)).astype(np.float64)
+        combined = np.sqrt(np.maximum(1e-10, 10 ** (h_gain / 10)) * np.maximum(1e-10, 10 ** (v_gain / 10)))
+        gain = np.where(np.abs(elevation) > 0.1, 10 * np.log10(np.maximum(combined, 1e-10)), h_gain)
+      result = pattern.gain + gain * self.shape_factor
+    else:
+      if pattern is None:
+        angle_diff = angle_diff + math.pi   # dummy pattern points backwards
+      angle_diff = np.mod(angle_diff + math.pi, 2 * math.pi) - math.pi
+      beamwidth = (60 * math.pi) / 180
+      attenuation = -np.minimum(12 * (angle_diff / beamwidth) ** 2, 25)
+      result = static_gain + attenuation
+    return np.where((dxs == 0) & (dys == 0), static_gain, result)
+
+  # ========== Grids ==========
+
+  @staticmethod
+  def bin_centres(cols, rows, dx, dy):
+    xs = (np.arange(cols, dtype=np.float64) + 0.5) * dx
+    ys = (np.arange(rows, dtype=np.float64) + 0.5) * dy
+    X, Y = np.meshgrid(xs, ys)
+    return X.ravel(), Y.ravel()
+
+  def rsrp_grid(self, ap, cols, rows, dx, dy, pattern=None, model="p25d"):
+    """float32 RSRP grid (rows*cols, dBm) for one antenna dict {x, y, z, tx, gt, azimuth, tilt}."""
+    X, Y = self.bin_centres(cols, rows, dx, dy)
+    loss = self.path_loss(ap["x"], ap["y"], X, Y, model)
+    gain = self.angle_dependent_gain(ap, X, Y, pattern)
+    return (ap["tx"] + gain - loss - self.reference_offset).astype(np.float32)
+
+  def rsrp_for_config(self, ant_config, cols, rows, dx, dy, pattern=None, model="p25d"):
+    """rsrp_grid for a `_transform_antenna_data` config from the App form."""
+    ap = {
+      "x": float(ant_config["X_antenna"]),
+      "y": float(ant_config["Y_antenna"]),
+      "z": float(ant_config.get("Z_antenna") or DEFAULT_ANTENNA_HEIGHT),
+      "tx": float(ant_config.get("power(antenna)_BL", 18)),
+      "azimuth": float(ant_config.get("Az_BL") or 0),
+      "tilt": float(ant_config.get("Tilt_BL") or 0),
+      "gt": float(ant_config.get("gt") or 0),
+    }
+    return self.rsrp_grid(ap, cols, rows, dx, dy, pattern, model)
@@ -0,0 +1,160 @@
+# RsrpCache.py
+# Content-addressed cache of per-antenna RSRP grids.
+#
+# Keys are a canonical hash of the antenna's `_transform_antenna_data` config
+# (position, Az/Tilt, power, pattern name) plus the floorplan/wall revision
+# (`geometry_digest` of the geometry itself), the engine version and a digest of
+# the pattern file's content, so
+# moving an antenna back, toggling Turning_ON_OFF off and on again, or
+# re-sending an identical batch returns the stored grid instead of recomputing.
+# `antenna_key` is the one key function for every path (batch pool, single
+# antenna enqueue), so a grid stored by one is found by the other.
+# Entries are evicted least-recently-used once the memory budget is exceeded.
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUDGET_BYTES = 512 * 1024 * 1024
+
+# Fields of a transformed antenna config that affect its grid. Turning_ON_OFF is
+# deliberately absent: an OFF antenna has no grid, and turning it back ON should hit.
+KEY_FIELDS = ("X_antenna", "Y_antenna", "Z_antenna", "Az_BL", "Tilt_BL", "power(antenna)_BL", "Antenna_Pattern_Name")
+
+# Config field carrying the iframe's fingerprint of the config (RsrpSnapshot.js). Not part
+# of the key: it is echoed back with the grid so the iframe knows what the grid belongs to.
+FINGERPRINT_FIELD = "RSRP_Fingerprint"
+
+# Positions/angles are rounded before hashing so float noise from the canvas
+# (e.g. 12.300000001 vs 12.3) does not produce distinct keys.
+KEY_DECIMALS = 3
+
+
+def _canonical(value):
+  if isinstance(value, bool) or value is None:
+    return value
+  try:
+    return round(float(value), KEY_DECIMALS)
+  except (TypeError, ValueError):
+    return str(value)
+
+
+def pattern_rev(pattern_text):
+  """Digest of a pattern file's content, so an edited file under the same name misses."""
+  if pattern_text is None:
+    return ""
+  if isinstance(pattern_text, str):
+    pattern_text = pattern_text.encode("utf-8")
+  return hashlib.sha1(pattern_text).hexdigest()
+
+
+def _json_default(value):
+  tolist = getattr(value, "tolist", None)
+  if tolist is not None:
+    return tolist()
+  return str(value)
+
+
+def geometry_digest(geometry, grid, engine_params=None):
+  """Digest of what every grid of a batch is computed on: walls, floor planes,
+  ground plane, element types, grid shape and engine parameters."""
+  payload = {"geometry": geometry or {}, "grid": list(grid), "engine": engine_params or {}}
+  blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=_json_default)
+  return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def geometry_revision(geometry, grid, engine_params=None, geometry_rev=""):
+  """Revision keys are built on: the payload digest, plus the caller's revision when given."""
+  digest = geometry_digest(geometry, grid, engine_params)
+  return f"{digest}:{geometry_rev}" if geometry_rev else digest
+
+
+def config_key(ant_config, geometry_rev="", engine_version="", pattern_rev=""):
+  """Stable hex key for one antenna config on one floorplan/wall revision."""
+  payload = {field: _canonical(ant_config.get(field)) for field in KEY_FIELDS}
+  payload["_geometry"] = str(geometry_rev)
+  payload["_engine"] = str(engine_version)
+  payload["_pattern"] = str(pattern_rev)
+  blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+  return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def antenna_key(ant_config, revision, engine_version, pattern_revs):
+  """Key of one antenna's grid: `revision` from geometry_revision, `pattern_revs` maps
+  Antenna_Pattern_Name to pattern_rev of the file's content."""
+  return config_key(ant_config, revision, engine_version, pattern_revs.get(ant_config.get("Antenna_Pattern_Name"), ""))
+
+
+def _grid_nbytes(grid):
+  nbytes = getattr(grid, "nbytes", None)
+  if nbytes is not None:
+    return int(nbytes)
+  # A list of Python floats costs a pointer plus a float object per bin
+  return len(grid) * 32 + 64
+
+
+class RsrpCache:
+  """LRU grid cache bounded by an approximate memory budget."""
+
+  def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+    self.budget_bytes = budget_bytes
+    self._lock = threading.Lock()
+    self._entries = OrderedDict()   # key -> (grid, nbytes)
+    self._bytes = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def get(self, key):
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        self.misses += 1
+        return None
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return entry[0]
+
+  def put(self, key, grid):
+    nbytes = _grid_nbytes(grid)
+    with self._lock:
+      old = self._entries.pop(key, None)
+      if old is not None:
+        self._bytes -= old[1]
+      if nbytes > self.budget_bytes:
+        return
+      self._entries[key] = (grid, nbytes)
+      self._bytes += nbytes
+      while self._bytes > self.budget_bytes and self._entries:
+        _, (_, evicted) = self._entries.popitem(last=False)
+        self._bytes -= evicted
+        self.evictions += 1
+
+  def get_or_compute(self, ant_config, compute, geometry_rev="", engine_version="", pattern_rev=""):
+    """Return (grid, hit). `compute(ant_config)` runs only on a miss."""
+    key = config_key(ant_config, geometry_rev, engine_version, pattern_rev)
+    grid = self.get(key)
+    if grid is not None:
+      return grid, True
+    grid = compute(ant_config)
+    if grid is not None:
+      self.put(key, grid)
+    return grid, False
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self._bytes = 0
+
+  def stats(self):
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        "entries": len(self._entries),
+        "bytes": self._bytes,
+        "budget_bytes": self.budget_bytes,
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "hit_rate": self.hits / lookups if lookups else 0.0,
+      }
@@ -0,0 +1,202 @@
+# RsrpGridCodec.py
+# Packed binary transport for RSRP grids (backend -> App form -> iframe).
+#
+# Frame layout (little-endian, 20-byte header + body):
+#   0  4s  magic "RSG1"
+#   4  B   dtype   (1 = int16 dBm x10, 2 = float32)
+#   5  B   flags   (bit0 = XOR delta against base frame, bit1 = zlib body)
+#   6  H   reserved
+#   8  I   count   (number of bins)
+#  12  I   seq     (frame number within its stream, starts at 1)
+#  16  I   base_seq (seq of the frame the delta was taken against, 0 for keyframes)
+#
+# A frame with count 0 and seq 0 is an explicit empty grid (antenna without
+# coverage / no result): it keeps its position in a packed list, so frame i still
+# belongs to antenna i, and it is not part of the stream's delta chain.
+#
+# The 0.0 "no coverage" value used by the grids maps to 0 in the int16 form, so
+# the JS side keeps treating 0 as an empty bin. Decoding lives in
+# theme/assets/src/optimization/RsrpGridCodec.js.
+#
+# Backend wiring: `set_rsrp_encoding(options)` stores
+# `RsrpStreamEncoder.from_options(options)` on the session and answers
+# {"encoding": options} (or {"encoding": None} to decline); get_live_rsrp /
+# get_live_optimization then return `new_bsrv_rsrp_packed = encoder.pack(...)`
+# in place of `new_bsrv_rsrp`.
+import base64
+import struct
+import zlib
+from array import array
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+MAGIC = b"RSG1"
+HEADER = struct.Struct("<4sBBHIII")
+
+DTYPE_INT16 = 1
+DTYPE_FLOAT32 = 2
+
+FLAG_DELTA = 0x01
+FLAG_DEFLATE = 0x02
+
+INT16_SCALE = 10.0
+KEYFRAME_INTERVAL = 16
+
+
+def _to_body(values, dtype):
+  """Flat list/ndarray of dBm floats -> raw little-endian body bytes."""
+  if np is not None:
+    arr = np.asarray(values, dtype=np.float64).ravel()
+    arr = np.where(np.isfinite(arr), arr, 0.0)
+    if dtype == DTYPE_INT16:
+      q = np.clip(np.rint(arr * INT16_SCALE), -32767, 32767)
+      return q.astype("<i2").tobytes(), arr.size
+    return arr.astype("<f4").tobytes(), arr.size
+
+  if dtype == DTYPE_INT16:
+    out = array("h")
+    for v in values:
+      v = float(v)
+      if v != v or v in (float("inf"), float("-inf")):
+        out.append(0)
+      else:
+        out.append(max(-32767, min(32767, int(round(v * INT16_SCALE)))))
+  else:
+    out = array("f", (float(v) if float(v) == float(v) else 0.0 for v in values))
+  if struct.pack("=H", 1) != struct.pack("<H", 1):
+    out.byteswap()
+  return out.tobytes(), len(out)
+
+
+def _xor(a, b):
+  """Bytewise XOR of two equal-length buffers."""
+  n = len(a)
+  return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(n, "little")
+
+
+def encode_frame(values, dtype=DTYPE_INT16, seq=1, base=None, compress=True):
+  """Pack one grid.
+
+  `base` is the (seq, body) of the last frame the receiver holds on this
+  stream; when given and the bin count matches, the body is XOR-ed against it.
+  Returns (frame_bytes, body) so callers can keep `body` as the next base.
+  """
+  body, count = _to_body(values, dtype)
+  flags = 0
+  base_seq = 0
+  payload = body
+  if base is not None and len(base[1]) == len(body):
+    base_seq, base_body = base
+    payload = _xor(body, base_body)
+    flags |= FLAG_DELTA
+  if compress:
+    payload = zlib.compress(payload, 1)
+    flags |= FLAG_DEFLATE
+  header = HEADER.pack(MAGIC, dtype, flags, 0, count, seq, base_seq)
+  return header + payload, body
+
+
+def empty_frame(dtype=DTYPE_INT16):
+  """Placeholder frame for a missing grid (count 0, seq 0)."""
+  return HEADER.pack(MAGIC, dtype, 0, 0, 0, 0, 0)
+
+
+def decode_frame(frame, base=None):
+  """Inverse of encode_frame. Returns (seq, list_of_floats, body).
+
+  An empty frame decodes to (0, [], None); callers keep their base for it.
+  A delta frame needs `base` = (base_seq, raw body of that frame), i.e. the seq
+  and body returned when the base was decoded.
+
+  OptimizationHistory decodes its stored delta frames with this when a read or
+  snapshot needs the grids; the browser has its own decoder.
+  """
+  magic, dtype, flags, _, count, seq, base_seq = HEADER.unpack_from(frame, 0)
+  if magic != MAGIC:
+    raise ValueError("Not an RSRP grid frame")
+  if count == 0 and seq == 0:
+    return 0, [], None
+  body = bytes(frame[HEADER.size:])
+  if flags & FLAG_DEFLATE:
+    body = zlib.decompress(body)
+  if flags & FLAG_DELTA:
+    if base is None or base[0] != base_seq:
+      raise ValueError(f"Delta frame {seq} needs base frame {base_seq}")
+    body = _xor(body, base[1])
+  values = body_values(body, dtype)
+  if len(values) != count:
+    raise ValueError("RSRP grid frame length mismatch")
+  return seq, values, body
+
+
+def body_values(body, dtype=DTYPE_INT16):
+  """Raw (un-XOR-ed, inflated) frame body -> list of dBm floats."""
+  raw = array("h" if dtype == DTYPE_INT16 else "f")
+  raw.frombytes(body)
+  if struct.pack("=H", 1) != struct.pack("<H", 1):
+    raw.byteswap()
+  if dtype == DTYPE_INT16:
+    return [v / INT16_SCALE for v in raw]
+  return list(raw)
+
+
+class RsrpStreamEncoder:
+  """Per-session encoder that remembers the last frame sent on each stream.
+
+  Streams are named by the caller ("baseline", "optimization", "live:<ant_id>")
+  and mirror the stream keys the iframe decoder keeps its base frames under.
+  """
+
+  def __init__(self, dtype=DTYPE_INT16, delta=True, compress=True, keyframe_interval=KEYFRAME_INTERVAL):
+    self.dtype = dtype
+    self.delta = delta
+    self.compress = compress
+    self.keyframe_interval = keyframe_interval
+    self._last = {}
+
+  @classmethod
+  def from_options(cls, options):
+    """Build from the dict the App form sends to `set_rsrp_encoding`.
+
+    Returns None for unknown dtypes so the backend keeps sending float lists.
+    """
+    options = options or {}
+    dtype = {"int16": DTYPE_INT16, "float32": DTYPE_FLOAT32}.get(options.get("dtype"))
+    if dtype is None:
+      return None
+    return cls(dtype=dtype, delta=bool(options.get("delta", True)), compress=bool(options.get("compress", True)))
+
+  def reset(self, stream=None):
+    if stream is None:
+      self._last.clear()
+    else:
+      self._last.pop(stream, None)
+
+  def encode(self, stream, values):
+    """Pack one grid on `stream` and return the frame as bytes (an empty frame for None/[])."""
+    if values is None or not len(values):
+      return empty_frame(self.dtype)
+    last = self._last.get(stream)
+    seq = last[0] + 1 if last else 1
+    base = last if (self.delta and last and (seq - 1) % self.keyframe_interval) else None
+    frame, body = encode_frame(values, self.dtype, seq, base, self.compress)
+    self._last[stream] = (seq, body)
+    return frame
+
+  def pack(self, stream, grids, as_media=False):
+    """Pack a list of grids for one response field (`new_bsrv_rsrp_packed`).
+
+    One frame per grid, in order; None or empty grids become empty frames.
+    Frames are base64 strings by default so they cross the Anvil serializer as
+    a single value each; with `as_media=True` they are BlobMedia objects.
+    """
+    frames = [self.encode(stream, g) for g in grids]
+    if as_media:
+      import anvil
+      frames = [anvil.BlobMedia("application/octet-stream", f, name=f"{stream}.rsg") for f in frames]
+    else:
+      frames = [base64.b64encode(f).decode("ascii") for f in frames]
+    return {"stream": stream, "frames": frames}
@@ -0,0 +1,133 @@
+# RsrpPyramid.py
+# Multi-resolution tiles of an RSRP grid for large floorplans.
+#
+# Level 0 is the grid as computed (one bin per metre for DXF imports); each level
+# above halves both axes by pooling 2x2 blocks — "max" keeps the strongest bin
+# (what a coverage map should never hide), "mean" averages. No-coverage bins
+# (0.0 in the grids the iframe reads) are ignored while pooling. Every level is
+# cut into TILE_SIZE x TILE_SIZE tiles, so a client only downloads the level that
+# matches its on-screen resolution and the tiles that intersect its viewport.
+#
+# Backend wiring: after get_accurate_baseline, the backend calls
+# `PYRAMIDS.put("baseline", grid, cols, rows, dx, dy)`; the App form's
+# `get_rsrp_tiles(key, viewport, have)` callable answers
+# `PYRAMIDS.get_tiles(key, viewport, have, encoder)`, adding the latest
+# compliance as "new_compliance".
+import math
+import threading
+import warnings
+
+import numpy as np
+
+TILE_SIZE = 128
+# Pick the coarsest level that still has at least this many bins per screen pixel
+MIN_BINS_PER_PIXEL = 1.0
+
+
+def _pool(level, reducer):
+  rows, cols = level.shape
+  padded = np.full((rows + rows % 2, cols + cols % 2), np.nan, dtype=np.float32)
+  padded[:rows, :cols] = level
+  blocks = padded.reshape(padded.shape[0] // 2, 2, padded.shape[1] // 2, 2)
+  with warnings.catch_warnings():
+    # All-NaN blocks (no coverage) stay NaN
+    warnings.simplefilter("ignore", category=RuntimeWarning)
+    if reducer == "mean":
+      return np.nanmean(blocks, axis=(1, 3)).astype(np.float32)
+    return np.nanmax(blocks, axis=(1, 3)).astype(np.float32)
+
+
+class RsrpPyramid:
+  def __init__(self, grid, cols, rows, dx=1.0, dy=1.0, reducer="max", tile_size=TILE_SIZE):
+    base = np.asarray(grid, dtype=np.float32).reshape(rows, cols).copy()
+    base[~np.isfinite(base) | (base == 0)] = np.nan
+    self.dx, self.dy = float(dx), float(dy)
+    self.tile_size = tile_size
+    self.reducer = reducer
+    self.levels = [base]
+    while max(self.levels[-1].shape) > tile_size:
+      self.levels.append(_pool(self.levels[-1], reducer))
+
+  def describe(self):
+    """Shape of every level: [{"level", "cols", "rows", "dx", "dy"}]."""
+    return [{"level": i, "cols": lv.shape[1], "rows": lv.shape[0],
+             "dx": self.dx * (2 ** i), "dy": self.dy * (2 ** i)} for i, lv in enumerate(self.levels)]
+
+  def level_for(self, viewport):
+    """Coarsest level whose bins across the viewport still cover its pixel width."""
+    width_m = max(viewport["x1"] - viewport["x0"], 1e-6)
+    pixels = max(int(viewport.get("pixels_w") or 1), 1)
+    for i in range(len(self.levels) - 1, -1, -1):
+      if width_m / (self.dx * (2 ** i)) >= pixels * MIN_BINS_PER_PIXEL:
+        return i
+    return 0
+
+  def tile_keys(self, level, viewport):
+    """(tx, ty) of the tiles of `level` intersecting the viewport (metres)."""
+    lv = self.levels[level]
+    span_x, span_y = self.dx * (2 ** level) * self.tile_size, self.dy * (2 ** level) * self.tile_size
+    n_tx = math.ceil(lv.shape[1] / self.tile_size)
+    n_ty = math.ceil(lv.shape[0] / self.tile_size)
+    tx0 = max(0, int(viewport["x0"] // span_x))
+    tx1 = min(n_tx - 1, int(viewport["x1"] // span_x))
+    ty0 = max(0, int(viewport["y0"] // span_y))
+    ty1 = min(n_ty - 1, int(viewport["y1"] // span_y))
+    return [(tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)]
+
+  def tile(self, level, tx, ty):
+    """One tile as a flat float32 array, no-coverage bins back to 0.0."""
+    t = self.tile_size
+    block = self.levels[level][ty * t:(ty + 1) * t, tx * t:(tx + 1) * t]
+    return np.nan_to_num(block, nan=0.0).astype(np.float32), block.shape
+
+
+class PyramidStore:
+  """Latest pyramid per grid key ("baseline", "optimization", ...) with a version."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._pyramids = {}
+    self._version = 0
+
+  def put(self, key, grid, cols, rows, dx=1.0, dy=1.0, reducer="max"):
+    pyramid = RsrpPyramid(grid, cols, rows, dx, dy, reducer)
+    with self._lock:
+      self._version += 1
+      self._pyramids[key] = (self._version, pyramid)
+      return self._version
+
+  def get_tiles(self, key, viewport, have=None, encoder=None):
+    """Tiles of the level matching `viewport` ({x0, y0, x1, y1, pixels_w}).
+
+    `have` lists "version:level:tx:ty" ids the client already holds; those are
+    skipped. With an RsrpStreamEncoder each tile goes out as "rsrp_packed".
+    """
+    with self._lock:
+      entry = self._pyramids.get(key)
+    if entry is None:
+      return {"version": 0, "tiles": []}
+    version, pyramid = entry
+    level = pyramid.level_for(viewport)
+    info = pyramid.describe()[level]
+    have = set(have or [])
+    tiles = []
+    for tx, ty in pyramid.tile_keys(level, viewport):
+      tile_id = f"{version}:{level}:{tx}:{ty}"
+      if tile_id in have:
+        continue
+      data, (t_rows, t_cols) = pyramid.tile(level, tx, ty)
+      item = {"id": tile_id, "tx": tx, "ty": ty, "c0": tx * pyramid.tile_size, "r0": ty * pyramid.tile_size,
+              "cols": t_cols, "rows": t_rows}
+      if encoder is not None:
+        # Tiles are sent once, so each is a keyframe on a throwaway stream
+        stream = f"tile:{tile_id}"
+        item["rsrp_packed"] = encoder.pack(stream, [data])
+        encoder.reset(stream)
+      else:
+        item["rsrp"] = data.tolist()
+      tiles.append(item)
+    return {"version": version, "level": level, "cols": info["cols"], "rows": info["rows"],
+            "dx": info["dx"], "dy": info["dy"], "reducer": pyramid.reducer, "tiles": tiles}
+
+
+PYRAMIDS = PyramidStore()
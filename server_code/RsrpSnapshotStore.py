@@ -0,0 +1,168 @@
+# RsrpSnapshotStore.py
+# RSRP grids persisted on disk, so a restarted backend or a reset session does
+# not recompute antennas that have not changed.
+#
+# Per-antenna grids are stored under their RsrpCache `antenna_key`, which already
+# fingerprints everything a grid depends on: the antenna config, the floorplan/
+# wall revision, the engine version and the pattern file's content. A merged
+# (best-server) grid is stored under the fingerprint of the set of per-antenna
+# keys it was built from, so an unchanged project gets its baseline back without
+# a merge either. Each grid is one float32 .npy file, written to a temp name and
+# renamed into place, so a crash never leaves a half-written snapshot. An
+# in-memory RsrpCache sits in front of the disk; the directory is trimmed
+# oldest-first once it exceeds its byte budget.
+#
+# The store has the same get/put interface as RsrpCache, so it can be passed as
+# `cache=` wherever an RsrpCache is.
+#
+# Backend wiring: `process_batch_antennas_async` passes `cache=SNAPSHOTS` and the
+# App's `geometry_rev` to `BATCH_POOL.submit(...)`. `enqueue_antenna` /
+# `enqueue_antenna_batch` (which receive the same `geometry_rev`) look up
+# `SNAPSHOTS.get(antenna_key(config, geometry_revision(geometry, grid, engine_params,
+# geometry_rev), ENGINE_VERSION, pattern_revs))` before computing and `put` under that
+# key after — the batch pool's key for the same antenna, so either path reuses the
+# other's grids. `get_accurate_baseline` collects the antenna_key of every enabled
+# antenna and answers from `SNAPSHOTS.get_merged(keys)` when it has a grid, otherwise
+# it merges as before and calls `SNAPSHOTS.put_merged(keys, grid)`. `reset_session`
+# leaves the store alone: that is what makes the next batch cheap.
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from .RsrpCache import RsrpCache
+
+DEFAULT_DIR = os.environ.get("IPS_RSRP_SNAPSHOT_DIR") or os.path.join(tempfile.gettempdir(), "ips_rsrp_snapshots")
+DEFAULT_DISK_BUDGET_BYTES = 4 * 1024 * 1024 * 1024
+DEFAULT_MEMORY_BUDGET_BYTES = 256 * 1024 * 1024
+
+
+def merged_key(keys):
+  """Fingerprint of a set of per-antenna keys (order does not matter)."""
+  blob = "\n".join(sorted(keys)).encode("ascii")
+  return "merged-" + hashlib.sha1(blob).hexdigest()
+
+
+class RsrpSnapshotStore:
+  """Disk-backed grid store keyed by antenna_key / merged_key."""
+
+  def __init__(self, directory=DEFAULT_DIR, disk_budget_bytes=DEFAULT_DISK_BUDGET_BYTES,
+               memory_budget_bytes=DEFAULT_MEMORY_BUDGET_BYTES):
+    self.directory = directory
+    self.disk_budget_bytes = disk_budget_bytes
+    self._memory = RsrpCache(memory_budget_bytes)
+    self._lock = threading.Lock()
+    self._disk_bytes = None     # measured lazily on the first write
+    self.disk_hits = 0
+    self.writes = 0
+
+  def _path(self, key):
+    return os.path.join(self.directory, key[:2], key + ".npy")
+
+  def get(self, key):
+    """Grid for `key` (float32 ndarray), or None."""
+    grid = self._memory.get(key)
+    if grid is not None:
+      return grid
+    try:
+      grid = np.load(self._path(key), allow_pickle=False)
+    except (OSError, ValueError):
+      return None
+    try:
+      os.utime(self._path(key))    # trimming is oldest-first; reads count as use
+    except OSError:
+      pass
+    with self._lock:
+      self.disk_hits += 1
+    self._memory.put(key, grid)
+    return grid
+
+  def put(self, key, grid):
+    if grid is None:
+      return
+    grid = np.asarray(grid, dtype=np.float32)
+    self._memory.put(key, grid)
+    path = self._path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+      with os.fdopen(fd, "wb") as f:
+        np.save(f, grid, allow_pickle=False)
+      os.replace(tmp, path)
+    except OSError:
+      if os.path.exists(tmp):
+        os.remove(tmp)
+      raise
+    with self._lock:
+      self.writes += 1
+      if self._disk_bytes is None:
+        self._disk_bytes = self._measure()
+      else:
+        self._disk_bytes += os.path.getsize(path)
+      over = self._disk_bytes > self.disk_budget_bytes
+    if over:
+      self.trim()
+
+  def get_merged(self, keys):
+    return self.get(merged_key(keys))
+
+  def put_merged(self, keys, grid):
+    self.put(merged_key(keys), grid)
+
+  def _files(self):
+    if not os.path.isdir(self.directory):
+      return []
+    files = []
+    for sub in os.listdir(self.directory):
+      folder = os.path.join(self.directory, sub)
+      if not os.path.isdir(folder):
+        continue
+      for name in os.listdir(folder):
+        if name.endswith(".npy"):
+          path = os.path.join(folder, name)
+          try:
+            st = os.stat(path)
+          except OSError:
+            continue
+          files.append((st.st_mtime, st.st_size, path))
+    return files
+
+  def _measure(self):
+    return sum(size for _, size, _ in self._files())
+
+  def trim(self):
+    """Delete least recently used snapshots until the directory fits its budget."""
+    with self._lock:
+      files = sorted(self._files())
+      total = sum(size for _, size, _ in files)
+      for _, size, path in files:
+        if total <= self.disk_budget_bytes:
+          break
+        try:
+          os.remove(path)
+          total -= size
+        except OSError:
+          pass
+      self._disk_bytes = total
+
+  def clear(self):
+    """Drop every snapshot (engine upgrade that does not bump engine_version, tests)."""
+    self._memory.clear()
+    with self._lock:
+      for _, _, path in self._files():
+        try:
+          os.remove(path)
+        except OSError:
+          pass
+      self._disk_bytes = 0
+
+  def stats(self):
+    memory = self._memory.stats()
+    with self._lock:
+      return {"directory": self.directory, "disk_bytes": self._disk_bytes, "disk_budget_bytes": self.disk_budget_bytes,
+              "disk_hits": self.disk_hits, "writes": self.writes, "memory": memory}
+
+
+SNAPSHOTS = RsrpSnapshotStore()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# server_code modules use package-relative imports; make the repository root importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
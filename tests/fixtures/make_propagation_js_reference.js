@@ -0,0 +1,54 @@
+// Writes propagation_js_reference.json: node tests/fixtures/make_propagation_js_reference.js <out.json>
+const path = require('path');
+const fs = require('fs');
+const { PropagationModel25D } = require(path.join(__dirname, '..', '..', 'theme', 'assets', 'src', 'propagation', 'PropagationModel25DN.js'));
+
+let seed = 12345;
+const rand = () => { seed = (seed * 1103515245 + 12345) % 2147483648; return seed / 2147483648; };
+const r2 = v => Math.round(v * 100) / 100;
+
+const walls = [];
+for (let i = 0; i < 22; i++) {
+    const x = r2(rand() * 15), y = r2(rand() * 10);
+    const len = 1 + rand() * 5, ang = rand() * Math.PI;
+    walls.push({ p1: { x, y }, p2: { x: r2(x + len * Math.cos(ang)), y: r2(y + len * Math.sin(ang)) }, loss: r2(3 + rand() * 12) });
+}
+walls.push({ points: [{ x: 1, y: 8 }, { x: 4, y: 8 }, { x: 4, y: 9.5 }], loss: 6 });
+walls.push({ p1: { x: 10, y: 1 }, p2: { x: 10, y: 6 }, elementType: "concrete" });
+walls.push({ p1: { x: 12, y: 2 }, p2: { x: 14, y: 2 }, type: "drywall" });
+const elementTypes = { concrete: { loss: 15 }, wall: { drywall: { loss: 4 } } };
+const floorPlanes = [{ p1: { x: 6, y: 3 }, p2: { x: 9, y: 3 }, p3: { x: 9, y: 6 }, p4: { x: 6, y: 6 }, attenuation: 7 }];
+const groundPlane = { enabled: true, attenuation: 4 };
+
+const cut = width => {
+    const pts = [];
+    for (let a = 0; a < 360; a += 10) {
+        const off = Math.min(a, 360 - a);
+        pts.push({ angle: a, gain: r2(-Math.min(25, 12 * Math.pow(off / width, 2))) });
+    }
+    return pts;
+};
+const pattern = { name: "panel", frequency: 2400, gain: 8, horizontalData: cut(65), verticalData: cut(30) };
+
+const grid = { cols: 30, rows: 20, dx: 0.5, dy: 0.5 };
+const antennas = [
+    { x: 3.2, y: 4.1, z: 3.0, tx: 18, gt: 0, azimuth: 45, tilt: 5, pattern: true },
+    { x: 11.7, y: 7.3, z: 2.5, tx: 20, gt: 5, azimuth: 200, tilt: 0, pattern: false }
+];
+
+const model = new PropagationModel25D({});
+const expected = antennas.map(a => {
+    const ap = Object.assign({}, a, { antennaPattern: a.pattern ? pattern : null });
+    const out = [];
+    for (let r = 0; r < grid.rows; r++) {
+        for (let c = 0; c < grid.cols; c++) {
+            const rx = { x: (c + 0.5) * grid.dx, y: (r + 0.5) * grid.dy };
+            out.push(Math.round(model.calculateRSSI(ap, rx, walls, floorPlanes, groundPlane, elementTypes, null) * 1e4) / 1e4);
+        }
+    }
+    return out;
+});
+
+const fixture = { source: "PropagationModel25D.calculateRSSI (theme/assets/src/propagation/PropagationModel25DN.js)",
+                  grid, walls, floorPlanes, groundPlane, elementTypes, pattern, antennas, expected };
+fs.writeFileSync(process.argv[2], JSON.stringify(fixture) + "\n");
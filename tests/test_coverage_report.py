@@ -0,0 +1,48 @@
+import re
+import time
+import zipfile
+
+import pytest
+
+from server_code import CoverageReport
+from server_code.CoverageReport import CoverageReportJobs, floor_from_project
+
+PROJECT = {"version": "1.0", "w": 10, "h": 8, "aps": [{"id": "AP-1", "x": 2, "y": 2, "ch": 6}]}
+
+
+def test_floor_from_project_skips_disabled_antennas():
+  project = dict(PROJECT, aps=PROJECT["aps"] + [{"id": "AP-2", "x": 5, "y": 5, "enabled": False}])
+  floor = floor_from_project(project, "Ground", res=1.0)
+  assert (floor["cols"], floor["rows"]) == (10, 8)
+  assert [ap["id"] for ap in floor["aps"]] == ["AP-1"]
+  assert floor["noise"] == CoverageReport.DEFAULTS["noise"]
+  with pytest.raises(ValueError, match="no floor size"):
+    floor_from_project({"version": "1.0"}, "Empty")
+
+
+def test_unread_reports_expire_with_their_files(tmp_path, monkeypatch):
+  jobs = CoverageReportJobs(max_workers=1, out_dir=str(tmp_path))
+  try:
+    job_id = jobs.submit([PROJECT], ["Ground"])
+    deadline = time.time() + 120
+    while jobs.status(job_id)["status"] == "running" and time.time() < deadline:
+      time.sleep(0.1)
+    assert jobs.status(job_id)["status"] == "finished"
+    assert list(tmp_path.iterdir())
+    monkeypatch.setattr(CoverageReport, "REPORT_JOB_TTL_S", 0)
+    assert jobs.status(job_id)["status"] == "unknown"
+    assert not list(tmp_path.iterdir())
+    assert jobs.read(job_id, timeout=0) is None
+  finally:
+    jobs.shutdown()
+
+
+def test_floor_named_like_a_report_sheet_keeps_names_unique(tmp_path):
+  floors = [floor_from_project(PROJECT, "Summary", res=1.0), floor_from_project(PROJECT, "F2", res=1.0)]
+  path = tmp_path / "report.xlsx"
+  CoverageReport.generate_report(floors, str(path))
+  with zipfile.ZipFile(path) as z:
+    workbook = z.read("xl/workbook.xml").decode("utf-8")
+  names = re.findall(r'<sheet name="([^"]*)" sheetId="(\d+)"', workbook)
+  assert [name for name, _ in names] == ["Summary", "Antennas", "Summary (2)", "F2"]
+  assert len({part for _, part in names}) == len(names)
@@ -0,0 +1,93 @@
+import pytest
+
+from server_code.DxfStream import DxfError, DxfWallStream
+
+
+def _dxf(pairs):
+  return "".join(f"{code}\n{value}\n" for code, value in pairs).encode("ascii")
+
+
+def _header(min_x=0, min_y=0, max_x=10, max_y=5, units=6):
+  return [(0, "SECTION"), (2, "HEADER"),
+          (9, "$INSUNITS"), (70, units),
+          (9, "$EXTMIN"), (10, min_x), (20, min_y), (30, 0),
+          (9, "$EXTMAX"), (10, max_x), (20, max_y), (30, 0),
+          (0, "ENDSEC")]
+
+
+def _line(x1, y1, x2, y2, layer="WALLS"):
+  return [(0, "LINE"), (8, layer), (10, x1), (20, y1), (11, x2), (21, y2)]
+
+
+def _drawing(header, entities):
+  return _dxf(header + [(0, "SECTION"), (2, "ENTITIES")] + entities + [(0, "ENDSEC"), (0, "EOF")])
+
+
+def _feed_in_pieces(stream, data, size):
+  for i in range(0, len(data), size):
+    stream.feed(data[i:i + size])
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_chunk_boundaries_do_not_change_the_walls(size):
+  data = _drawing(_header(), _line(0, 5, 10, 5) + _line(0, 0, 0, 5, layer="DOORS"))
+  stream = DxfWallStream()
+  _feed_in_pieces(stream, data, size)
+  project = stream.project()
+  assert (project["w"], project["h"]) == (10.0, 5.0)
+  walls = project["walls"]
+  assert [(w["p1"], w["p2"]) for w in walls] == [
+    ({"x": 0.0, "y": 0.0}, {"x": 10.0, "y": 0.0}),     # plan y grows downwards
+    ({"x": 0.0, "y": 5.0}, {"x": 0.0, "y": 0.0}),
+  ]
+  assert walls[1]["elementType"] == "door" and walls[1]["width"] == 5.0
+
+
+def test_walls_stream_once_the_header_extents_are_known():
+  stream = DxfWallStream()
+  stream.feed(_dxf(_header() + [(0, "SECTION"), (2, "ENTITIES")] + _line(0, 0, 10, 0) + [(0, "LINE")]))
+  drained = stream.drain()
+  assert drained["w"] == 10.0
+  assert sum(len(batch) for batch in drained["batches"]) == 1
+
+
+def test_excluded_layers_and_types_are_skipped():
+  entities = _line(0, 0, 1, 1, layer="DIMENSIONS") + [(0, "CIRCLE"), (8, "WALLS"), (10, 1), (20, 1), (40, 2)]
+  entities += _line(0, 0, 10, 0)
+  stream = DxfWallStream()
+  stream.feed(_drawing(_header(), entities))
+  project = stream.project()
+  assert len(project["walls"]) == 1
+  assert project["dxfStats"]["skipped_layer"] == 1
+  assert project["dxfStats"]["skipped_type"] == 1
+
+
+def test_unset_y_extents_fall_back_to_the_drawing_bounds():
+  stream = DxfWallStream()
+  stream.feed(_drawing(_header(min_y=1e20, max_y=-1e20), _line(0, 0, 4, 2)))
+  assert "w" not in stream.drain()       # transform waits for close()
+  project = stream.project()
+  assert (project["w"], project["h"]) == (4.0, 2.0)
+
+
+def test_target_width_scales_the_plan():
+  stream = DxfWallStream(target_w=20)
+  stream.feed(_drawing(_header(), _line(0, 0, 10, 0)))
+  project = stream.project()
+  assert (project["w"], project["h"]) == (20.0, 10.0)
+
+
+def test_malformed_value_is_a_dxf_error():
+  stream = DxfWallStream()
+  with pytest.raises(DxfError, match="group code 10"):
+    stream.feed(_drawing(_header(), _line("abc", 0, 1, 1)))
+
+
+def test_malformed_group_code_is_a_dxf_error():
+  with pytest.raises(DxfError):
+    DxfWallStream().feed(b"0\nSECTION\nxx\nHEADER\n")
+
+
+def test_binary_dxf_is_rejected():
+  with pytest.raises(DxfError, match="Binary DXF"):
+    DxfWallStream().feed(b"AutoCAD Binary DXF\r\n\x1a\x00")
@@ -0,0 +1,104 @@
+import random
+
+import pytest
+
+from server_code import OptimizationHistory as history_module
+from server_code.OptimizationHistory import OptimizationHistory
+
+
+def _grid(rng, n=200):
+  return [rng.uniform(-110.0, -40.0) for _ in range(n)]
+
+
+def _assert_retained(history, grids):
+  for record in history._records:
+    assert history._grid(record) == pytest.approx(grids[record.seq], abs=1e-4)
+
+
+def test_read_returns_steps_after_the_cursor():
+  history = OptimizationHistory()
+  history.append(action={"antenna_id": "a", "tilt": 2}, rsrp=[-50.0, -60.0], compliance=80.0)
+  history.append(action={"antenna_id": "b", "tilt": 4}, compliance=82.5)
+  result = history.read(1)
+  assert result["new_action_configs"] == [{"antenna_id": "b", "tilt": 4}]
+  assert result["new_bsrv_rsrp"] == []
+  assert result["new_compliance"] == [82.5]
+  assert result["cursor"] == 2
+
+
+def test_latest_only_skips_intermediate_grids():
+  history = OptimizationHistory()
+  for value in (-50.0, -51.0, -52.0):
+    history.append(rsrp=[value, value])
+  result = history.read(0, latest_only=True)
+  assert result["new_bsrv_rsrp"] == [pytest.approx([-52.0, -52.0])]
+  assert result["rsrp_skipped"] == 2
+
+
+def test_cursor_behind_the_ring_gets_a_snapshot():
+  history = OptimizationHistory(max_records=4)
+  for i in range(10):
+    history.append(action={"antenna_id": "a", "step": i}, rsrp=[-50.0 - i], compliance=float(i))
+  result = history.read(0)
+  assert result["snapshot"] is True
+  assert result["skipped"] == 10
+  assert result["new_action_configs"] == [{"antenna_id": "a", "step": 9}]
+  assert result["new_bsrv_rsrp"] == [pytest.approx([-59.0])]
+  assert history.memory_usage()["records"] == 4
+
+
+def test_snapshot_keeps_only_the_latest_keyless_action():
+  history = OptimizationHistory(max_records=4)
+  for i in range(10):
+    history.append(action={"step": i})
+  history.append(action={"antenna_id": "a", "step": 10})
+  assert len(history.latest_actions) == 2
+  assert history.read(0)["new_action_configs"] == [{"step": 9}, {"antenna_id": "a", "step": 10}]
+
+
+def test_keyframe_records_store_no_separate_frame():
+  history = OptimizationHistory(keyframe_interval=4)
+  history.append(rsrp=[-50.0] * 100)
+  record = history._records[0]
+  assert record.keyframe_seq == record.seq and record.frame is None
+  assert history._grid(record) == pytest.approx([-50.0] * 100)
+
+
+def test_spilled_grids_decode_from_the_spool():
+  rng = random.Random(1)
+  history = OptimizationHistory(memory_budget=4000, max_records=50, keyframe_interval=5)
+  grids = {}
+  for _ in range(40):
+    values = _grid(rng)
+    grids[history.append(rsrp=values)] = values
+  usage = history.memory_usage()
+  assert usage["spooled_bytes"] > 0
+  assert usage["memory_bytes"] <= 4000 + 4 * 200 * 2    # newest frame and current keyframe stay in memory
+  _assert_retained(history, grids)
+
+
+def test_spool_is_compacted_as_the_ring_turns(monkeypatch):
+  monkeypatch.setattr(history_module, "SPOOL_COMPACT_MIN_BYTES", 20000)
+  rng = random.Random(2)
+  history = OptimizationHistory(memory_budget=4000, max_records=20, keyframe_interval=5)
+  grids = {}
+  peak = 0
+  for _ in range(400):
+    values = _grid(rng)
+    grids[history.append(rsrp=values)] = values
+    peak = max(peak, history.memory_usage()["spooled_bytes"])
+  usage = history.memory_usage()
+  # Dropped records' spool space is reclaimed: the file never grows past twice its live data (plus slack)
+  assert peak < 2 * 20000 + 4 * 200 * 6
+  assert usage["spooled_live_bytes"] <= usage["spooled_bytes"]
+  _assert_retained(history, grids)
+
+
+def test_reset_releases_the_spool():
+  history = OptimizationHistory(memory_budget=1000)
+  for i in range(20):
+    history.append(rsrp=[-50.0 - i] * 100)
+  history.reset()
+  usage = history.memory_usage()
+  assert usage["spooled_bytes"] == 0 and usage["records"] == 0
+  assert history._spool is None
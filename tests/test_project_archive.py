@@ -0,0 +1,74 @@
+import io
+import json
+import math
+import zipfile
+
+import numpy as np
+import pytest
+
+from server_code.CoverageReport import ARCHIVE_NO_INDEX, load_project
+
+PROJECT = {"version": "1.0", "w": 10, "h": 8, "aps": [{"id": "AP-1", "x": 2, "y": 2, "ch": 6}]}
+
+
+def _archive(walls, settings=None, antennas=None, fmt="ips-project"):
+  """A .ipsz zip in the ProjectArchive.js layout."""
+  points, starts, kind, attrs, style = [], [0], [], [], []
+  element_types, colors = [], []
+  for wall in walls:
+    pts = wall.get("points") or [wall["p1"], wall["p2"]]
+    points += [(p["x"], p["y"]) for p in pts]
+    starts.append(len(points))
+    kind.append(1 if "points" in wall else 0)
+    attrs.append([wall.get(key, math.nan) for key in ("loss", "thickness", "height", "width")])
+    element = ARCHIVE_NO_INDEX
+    if "elementType" in wall:
+      if wall["elementType"] not in element_types:
+        element_types.append(wall["elementType"])
+      element = element_types.index(wall["elementType"])
+    style.append([element, ARCHIVE_NO_INDEX])
+  buf = io.BytesIO()
+  with zipfile.ZipFile(buf, "w") as zf:
+    zf.writestr("manifest.json", json.dumps({"format": fmt, "version": 1}))
+    zf.writestr("settings.json", json.dumps(settings or {"version": "1.0", "w": 10, "h": 8}))
+    zf.writestr("antennas.json", json.dumps(antennas or {"aps": [], "patterns": []}))
+    zf.writestr("floorplanes.json", "[]")
+    zf.writestr("walls/meta.json", json.dumps({"count": len(walls), "ids": [w["id"] for w in walls],
+                                               "elementTypes": element_types, "colors": colors}))
+    zf.writestr("walls/points.f64", np.asarray(points, dtype="<f8").tobytes())
+    zf.writestr("walls/starts.u32", np.asarray(starts, dtype="<u4").tobytes())
+    zf.writestr("walls/kind.u8", np.asarray(kind, dtype=np.uint8).tobytes())
+    zf.writestr("walls/attrs.f64", np.asarray(attrs, dtype="<f8").tobytes())
+    zf.writestr("walls/style.u16", np.asarray(style, dtype="<u2").tobytes())
+  return buf.getvalue()
+
+
+def test_load_project_accepts_dicts_json_and_bytes():
+  assert load_project(PROJECT) is PROJECT
+  assert load_project(json.dumps(PROJECT)) == PROJECT
+  assert load_project(json.dumps(PROJECT).encode("utf-8")) == PROJECT
+  with pytest.raises(ValueError):
+    load_project({"w": 10})
+
+
+def test_archive_walls_and_antennas_are_restored():
+  walls = [
+    {"id": "w1", "p1": {"x": 0, "y": 0}, "p2": {"x": 5, "y": 0}, "loss": 8, "elementType": "door", "width": 0.9},
+    {"id": "w2", "points": [{"x": 1, "y": 1}, {"x": 2, "y": 1}, {"x": 2, "y": 3}], "thickness": 0.2},
+  ]
+  pattern = {"name": "omni", "horizontal": [0] * 4}
+  antennas = {"aps": [{"id": "AP-1", "x": 3, "y": 4, "pattern": 0}, {"id": "AP-2", "x": 1, "y": 1}],
+              "patterns": [pattern], "antennaPatterns": [0, None], "defaultAntennaPatternIndex": 0}
+  project = load_project(_archive(walls, antennas=antennas))
+  assert project["walls"] == [
+    {"id": "w1", "loss": 8.0, "width": 0.9, "elementType": "door", "p1": {"x": 0.0, "y": 0.0}, "p2": {"x": 5.0, "y": 0.0}},
+    {"id": "w2", "thickness": 0.2, "points": [{"x": 1.0, "y": 1.0}, {"x": 2.0, "y": 1.0}, {"x": 2.0, "y": 3.0}]},
+  ]
+  assert project["aps"] == [{"id": "AP-1", "x": 3, "y": 4, "antennaPattern": pattern}, {"id": "AP-2", "x": 1, "y": 1}]
+  assert project["antennaPatterns"] == [pattern, None]
+  assert project["defaultAntennaPatternIndex"] == 0
+
+
+def test_archive_with_a_foreign_manifest_is_rejected():
+  with pytest.raises(ValueError, match="bad manifest"):
+    load_project(_archive([], fmt="something-else"))
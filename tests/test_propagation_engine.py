@@ -0,0 +1,23 @@
+import json
+import os
+
+import numpy as np
+
+from server_code.AntennaPatternTables import CompiledPattern, from_client_pattern
+from server_code.PropagationEngine25D import PropagationEngine25D
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "propagation_js_reference.json")
+
+
+def test_grids_match_the_js_model():
+  # Expected grids come from PropagationModel25D.calculateRSSI in node, per bin centre
+  with open(FIXTURE) as f:
+    scene = json.load(f)
+  engine = PropagationEngine25D()
+  engine.set_geometry(scene["walls"], scene["floorPlanes"], scene["groundPlane"], scene["elementTypes"])
+  pattern = CompiledPattern("reference", from_client_pattern(scene["pattern"]))
+  grid = scene["grid"]
+  for ap, expected in zip(scene["antennas"], scene["expected"]):
+    rsrp = engine.rsrp_grid(ap, grid["cols"], grid["rows"], grid["dx"], grid["dy"], pattern if ap["pattern"] else None)
+    assert rsrp.shape == (grid["cols"] * grid["rows"],)
+    assert np.max(np.abs(rsrp - np.asarray(expected))) < 1e-3
@@ -0,0 +1,74 @@
+import base64
+
+import pytest
+
+from server_code.RsrpGridCodec import (DTYPE_FLOAT32, DTYPE_INT16, HEADER, RsrpStreamEncoder, decode_frame,
+                                       empty_frame, encode_frame)
+
+
+def _decode_stream(frames):
+  """Decode a packed list the way the iframe does: empty frames keep their slot, not the base."""
+  base, out = None, []
+  for frame in frames:
+    seq, values, body = decode_frame(base64.b64decode(frame), base)
+    if body is not None:
+      base = (seq, body)
+    out.append(values or None)
+  return out
+
+
+def test_int16_round_trip_keeps_tenth_db():
+  values = [-50.04, -120.0, 0.0, -33.36]
+  seq, decoded, _ = decode_frame(encode_frame(values, DTYPE_INT16, 1)[0])
+  assert seq == 1
+  assert decoded == pytest.approx([-50.0, -120.0, 0.0, -33.4])
+
+
+def test_float32_delta_frame_needs_its_base():
+  first, body = encode_frame([-50.0, -60.0], DTYPE_FLOAT32, 1)
+  delta, _ = encode_frame([-51.0, -60.0], DTYPE_FLOAT32, 2, (1, body))
+  assert decode_frame(delta, (1, body))[1] == pytest.approx([-51.0, -60.0])
+  with pytest.raises(ValueError):
+    decode_frame(delta, None)
+
+
+def test_non_finite_values_become_no_coverage():
+  _, decoded, _ = decode_frame(encode_frame([float("nan"), float("inf"), -70.0])[0])
+  assert decoded == pytest.approx([0.0, 0.0, -70.0])
+
+
+def test_empty_frame_is_a_placeholder():
+  frame = empty_frame()
+  assert len(frame) == HEADER.size
+  assert decode_frame(frame) == (0, [], None)
+
+
+def test_pack_keeps_positions_of_missing_grids():
+  encoder = RsrpStreamEncoder()
+  packed = encoder.pack("baseline", [[-50.0, -60.0], None, [], [-51.0, -61.0]])
+  assert packed["stream"] == "baseline"
+  assert _decode_stream(packed["frames"]) == [pytest.approx([-50.0, -60.0]), None, None,
+                                              pytest.approx([-51.0, -61.0])]
+
+
+def test_empty_grid_does_not_break_the_delta_chain():
+  encoder = RsrpStreamEncoder(dtype=DTYPE_FLOAT32)
+  frames = encoder.pack("live:a", [[-50.0, -60.0]])["frames"]
+  frames += encoder.pack("live:a", [None])["frames"]
+  frames += encoder.pack("live:a", [[-52.0, -60.0]])["frames"]
+  header = HEADER.unpack_from(base64.b64decode(frames[2]))
+  assert header[5:] == (2, 1)     # seq 2 is a delta against seq 1
+  assert _decode_stream(frames)[2] == pytest.approx([-52.0, -60.0])
+
+
+def test_keyframe_interval_restarts_the_chain():
+  encoder = RsrpStreamEncoder(dtype=DTYPE_FLOAT32, keyframe_interval=2)
+  frames = encoder.pack("t", [[-50.0], [-51.0], [-52.0]])["frames"]
+  base_seqs = [HEADER.unpack_from(base64.b64decode(f))[6] for f in frames]
+  assert base_seqs == [0, 1, 0]
+
+
+def test_from_options_declines_unknown_dtypes():
+  assert RsrpStreamEncoder.from_options({"dtype": "int8"}) is None
+  encoder = RsrpStreamEncoder.from_options({"dtype": "float32", "delta": False})
+  assert encoder.dtype == DTYPE_FLOAT32 and not encoder.delta
@@ -0,0 +1,123 @@
+import time
+
+import numpy as np
+import pytest
+
+from server_code.AntennaRsrpStore import AntennaRsrpStore
+from server_code.BatchAntennaPool import BatchAntennaPool
+from server_code.RsrpCache import (FINGERPRINT_FIELD, RsrpCache, antenna_key, config_key, geometry_digest,
+                                   geometry_revision, pattern_rev)
+from server_code.RsrpSnapshotStore import RsrpSnapshotStore, merged_key
+
+CONFIG = {"X_antenna": 2.0, "Y_antenna": 3.0, "Z_antenna": 2.5, "Az_BL": 90, "Tilt_BL": 0,
+          "power(antenna)_BL": 18, "Antenna_Pattern_Name": "omni.xlsx", "Turning_ON_OFF": True}
+GEOMETRY = {"walls": [{"p1": {"x": 0, "y": 0}, "p2": {"x": 5, "y": 0}, "loss": 8}], "floor_planes": []}
+GRID = (10, 8, 1.0, 1.0)
+
+
+def test_config_key_ignores_float_noise_on_off_and_the_fingerprint():
+  noisy = dict(CONFIG, X_antenna=2.0000000001, Turning_ON_OFF=False)
+  noisy[FINGERPRINT_FIELD] = "abc"
+  assert config_key(noisy, "g") == config_key(CONFIG, "g")
+  assert config_key(dict(CONFIG, Tilt_BL=4), "g") != config_key(CONFIG, "g")
+  assert config_key(CONFIG, "g", pattern_rev="p1") != config_key(CONFIG, "g", pattern_rev="p2")
+
+
+def test_geometry_revision_follows_the_walls():
+  moved = {"walls": [{"p1": {"x": 0, "y": 0}, "p2": {"x": 6, "y": 0}, "loss": 8}], "floor_planes": []}
+  assert geometry_digest(GEOMETRY, GRID) == geometry_digest(dict(GEOMETRY), list(GRID))
+  assert geometry_digest(moved, GRID) != geometry_digest(GEOMETRY, GRID)
+  digest = geometry_digest(GEOMETRY, GRID)
+  assert geometry_revision(GEOMETRY, GRID) == digest
+  assert geometry_revision(GEOMETRY, GRID, geometry_rev="client") == f"{digest}:client"
+
+
+def test_antenna_key_uses_the_pattern_content():
+  revision = geometry_revision(GEOMETRY, GRID, geometry_rev="client")
+  key = antenna_key(CONFIG, revision, "v1", {"omni.xlsx": pattern_rev("a,b,c")})
+  assert key == config_key(CONFIG, revision, "v1", pattern_rev("a,b,c"))
+  assert key != antenna_key(CONFIG, revision, "v1", {"omni.xlsx": pattern_rev("a,b,d")})
+  assert pattern_rev(b"a,b,c") == pattern_rev("a,b,c") and pattern_rev(None) == ""
+
+
+def test_batch_pool_and_single_antenna_path_share_keys():
+  pool = BatchAntennaPool(max_workers=1)
+  cache = RsrpCache()
+  results = []
+  try:
+    job = pool.submit(["a"], [CONFIG], GEOMETRY, GRID, {}, on_result=lambda ant_id, grid: results.append(ant_id),
+                      geometry_rev="client", cache=cache, engine_version="v1")
+    assert pool.results(job, timeout=120) is not None
+  finally:
+    pool.shutdown()
+  assert results == ["a"]
+  key = antenna_key(CONFIG, geometry_revision(GEOMETRY, GRID, geometry_rev="client"), "v1", {})
+  assert cache.get(key) is not None
+
+
+def test_snapshot_store_survives_a_new_instance(tmp_path):
+  store = RsrpSnapshotStore(str(tmp_path), memory_budget_bytes=1024)
+  key = config_key(CONFIG, "g")
+  store.put(key, [-50.0, -60.0])
+  store.put_merged([key, "other"], [-50.0, -55.0])
+  reopened = RsrpSnapshotStore(str(tmp_path))
+  assert reopened.get(key) == pytest.approx(np.array([-50.0, -60.0], dtype=np.float32))
+  assert reopened.get_merged(["other", key]) is not None
+  assert reopened.get(config_key(CONFIG, "h")) is None
+  assert merged_key(["b", "a"]) == merged_key(["a", "b"])
+
+
+def test_snapshot_store_trims_to_its_budget(tmp_path):
+  store = RsrpSnapshotStore(str(tmp_path), disk_budget_bytes=2000)
+  for i in range(10):
+    store.put(f"{i:02d}" + "0" * 38, np.zeros(100, dtype=np.float32))
+  assert store.stats()["disk_bytes"] <= 2000
+
+
+def test_antenna_store_echoes_the_fingerprint():
+  store = AntennaRsrpStore()
+  store.put("a", [-50.0], fingerprint="fp-a")
+  version = store.put("b", [-60.0])
+  response = store.get_since(["a", "b"])
+  assert response["grids"]["a"] == {"version": 1, "fingerprint": "fp-a", "rsrp": [-50.0]}
+  assert response["grids"]["b"]["fingerprint"] is None
+  store.remove("a")
+  assert store.get_since(["a", "b"], version)["removed"] == ["a"]
+
+
+def test_batch_pool_releases_in_order_past_a_failed_antenna():
+  pool = BatchAntennaPool(max_workers=2)
+  cache = RsrpCache()
+  later = dict(CONFIG, X_antenna=7.0)
+  revision = geometry_revision(GEOMETRY, GRID)
+  cache.put(antenna_key(later, revision, "", {}), np.full(GRID[0] * GRID[1], -70.0, dtype=np.float32))
+  broken = {k: v for k, v in CONFIG.items() if k != "X_antenna"}
+  released = []
+  try:
+    # "c" is a cache hit and finishes first; it must wait for "a" and the failure of "b"
+    job = pool.submit(["a", "b", "c"], [CONFIG, broken, later], GEOMETRY, GRID, {}, cache=cache,
+                      on_result=lambda ant_id, grid: released.append(ant_id),
+                      on_error=lambda ant_id, message: released.append(f"{ant_id}!"))
+    deadline = time.time() + 120
+    while pool.status(job)["status"] == "running" and time.time() < deadline:
+      time.sleep(0.05)
+    status = pool.status(job)
+    grids = pool.results(job, timeout=0)
+  finally:
+    pool.shutdown()
+  assert released == ["a", "b!", "c"]
+  assert grids[0] is not None and grids[1] is None and grids[2] is not None
+  assert list(status["failed"]) == ["b"]
+
+
+def test_antenna_store_forgets_old_removals_but_still_reports_them():
+  store = AntennaRsrpStore(max_removed=2)
+  for ant_id in "abcd":
+    store.put(ant_id, [-50.0])
+  version = store.version
+  for ant_id in "abc":
+    store.remove(ant_id)
+  assert len(store._removed) == 2
+  # "a" was forgotten: a reader from before its removal is told to drop it anyway
+  assert store.get_since(["a", "b", "d"], version)["removed"] == ["a", "b"]
+  assert store.get_since(["a", "b", "c"], store.version)["removed"] == []
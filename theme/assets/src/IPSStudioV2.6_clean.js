@@ -272,6 +272,10 @@
       window.drawHeatmapOverlay(ctx, off, transition);
     }
 
+    if (typeof window.drawContours === 'function') {
+      window.drawContours();
+    }
+
     // Legacy canvas rendering (2D + legacy 3D).
     // IMPORTANT: When Three.js is active in 3D mode, skip 3D elements (walls, antennas, floor planes)
     // but keep 2D elements (calibration lines, etc.)
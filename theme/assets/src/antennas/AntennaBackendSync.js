@@ -1,5 +1,6 @@
 // AntennaBackendSync.js - Antenna config sync, live RSRP cache, and backend communication (Anvil)
-// Depends on: global state, draw(), renderAPs(), renderApDetails(), NotificationSystem, CoordinateSystem (worldToCanvasPixels)
+// Depends on: global state, draw(), renderAPs(), renderApDetails(), NotificationSystem, CoordinateSystem (worldToCanvasPixels),
+//             LatencyTracer, RsrpSnapshot
 
 var BackendSync = (function () {
   
@@ -7,6 +8,7 @@ var BackendSync = (function () {
   var antennaPositionHistory = [];
   var currentAntennaDataFileName = null; // Track the JSON filename for the current project
   var enqueueDebounceTimers = {};
+  var enqueueBurstStart = {};      // first edit time of the pending debounced burst, per antenna
   var inputChangeDebounceTimers = {};
   var pendingInputChanges = {};
 
@@ -101,8 +103,9 @@ var BackendSync = (function () {
     antennaPositionHistory.push(entry);
   }
 
-  // Function to send antenna status update (enabled/disabled) to backend immediately
-  function sendAntennaStatusUpdate(antenna) {
+  // Function to send antenna status update (enabled/disabled) to backend immediately.
+  // `queuedAt` (LatencyTracer time of the first edit in a debounced burst) starts the trace there.
+  function sendAntennaStatusUpdate(antenna, queuedAt) {
     if (!antenna) {
       console.warn("sendAntennaStatusUpdate: No antenna provided");
       return;
@@ -129,6 +132,12 @@ var BackendSync = (function () {
     // Generate a unique request ID
     var requestId = "antenna_status_" + Date.now() + "_" + Math.random().toString(36).substr(2, 9);
     console.log("[RSRP] Sending antenna status update to backend:", antennaDetails.id, antennaDetails);
+    if (antenna.enabled) antennaDetails.fingerprint = RsrpSnapshot.noteSent([antenna])[antenna.id];
+
+    // One trace per edit: the App and the live_rsrp reply carry its id back (LatencyTracer)
+    var sentAt = LatencyTracer.now();
+    var traceId = LatencyTracer.start("antenna_edit", { ant_id: antennaDetails.id }, queuedAt != null ? queuedAt : sentAt);
+    if (queuedAt != null) LatencyTracer.span(traceId, "debounce", queuedAt, sentAt);
 
     // Send message to parent window (Anvil app)
     window.parent.postMessage(
@@ -136,6 +145,10 @@ var BackendSync = (function () {
         type: "antenna_status_update",
         requestId: requestId,
         antenna: antennaDetails,
+        geometryRev: RsrpSnapshot.geometryFingerprint(),
+        traceId: traceId,
+        sentAt: sentAt,
+        bytes: JSON.stringify(antennaDetails).length
       },
       "*"
     ); // '*' allows any origin - in production, specify your Anvil app origin
@@ -172,9 +185,12 @@ var BackendSync = (function () {
     if (enqueueDebounceTimers[id]) {
       clearTimeout(enqueueDebounceTimers[id]);
     }
+    if (enqueueBurstStart[id] == null) enqueueBurstStart[id] = LatencyTracer.now();
     enqueueDebounceTimers[id] = setTimeout(function () {
+      var queuedAt = enqueueBurstStart[id];
+      enqueueBurstStart[id] = null;
       try {
-        sendAntennaStatusUpdate(antenna);
+        sendAntennaStatusUpdate(antenna, queuedAt);
       } finally {
         enqueueDebounceTimers[id] = null;
       }
@@ -261,9 +277,13 @@ var BackendSync = (function () {
     applyInputChange(antennaId);
   }
 
-  /** When switching to accurate engine: send current antenna configs so backend computes and returns RSRP.
-   *  One antenna: send individually. Multiple: send as batch (like auto-place). */
-  function requestRsrpForCurrentConfigs() {
+  /** When switching to accurate engine (or after a project load): send current antenna configs so backend
+   *  computes and returns RSRP. One antenna: send individually. Multiple: send as batch (like auto-place),
+   *  naming the antennas whose cached grid is still current (restored from the project) in `cachedIds`
+   *  so their grids are not sent back. `geometryRev` lets the App form tell a repeat batch from one
+   *  on changed walls and becomes the backend's geometry_rev; `fingerprints` ({antId: fingerprint})
+   *  come back with the grids; `source` "project_load" makes it forget the last batch it sent. */
+  function requestRsrpForCurrentConfigs(source) {
     if (window.parent === window) return;
     var aps = (state.aps || []).filter(function (ap) { return ap.enabled !== false; });
     if (aps.length === 0) return;
@@ -273,13 +293,18 @@ var BackendSync = (function () {
       console.log("[RSRP] Model switch to accurate: sent 1 antenna for RSRP");
     } else {
       var requestId = "antennas_batch_status_" + Date.now() + "_" + Math.random().toString(36).substr(2, 9);
+      var cachedIds = RsrpSnapshot.currentIds(aps);
       window.parent.postMessage({
         type: "antennas_batch_status_update",
         requestId: requestId,
         antennas: state.aps,
-        source: "model_switch"
+        cachedIds: cachedIds,
+        fingerprints: RsrpSnapshot.noteSent(aps),
+        geometryRev: RsrpSnapshot.geometryFingerprint(),
+        source: source || "model_switch"
       }, "*");
-      console.log("[RSRP] Model switch to accurate: sent batch of", aps.length, "antennas for RSRP");
+      console.log("[RSRP] Model switch to accurate: sent batch of", aps.length, "antennas for RSRP (" +
+                  cachedIds.length + " already cached)");
     }
   }
 
@@ -488,6 +513,65 @@ var BackendSync = (function () {
     }
   }
 
+  // Dispatch a (decoded) RSRP-carrying message from Anvil
+  /** App-side spans of the edits answered by this reply, plus the bridge back and decode. */
+  function recordReplySpans(data) {
+    var traces = data.traces || [];
+    var ids = [];
+    for (var i = 0; i < traces.length; i++) {
+      var trace = traces[i];
+      if (!trace || !trace.id) continue;
+      LatencyTracer.addSpans(trace.id, trace.spans);
+      if (trace.sent != null && data.receivedAt != null) LatencyTracer.span(trace.id, "bridge_back", trace.sent, data.receivedAt);
+      if (data.decodedAt != null) LatencyTracer.span(trace.id, "decode", data.receivedAt, data.decodedAt);
+      ids.push(trace.id);
+    }
+    return ids;
+  }
+
+  function handleRsrpMessage(data) {
+    // Handle baseline RSRP (Calculate Accurate Baseline, batch antennas, auto-place with accurate engine)
+    if (data.type === "baseline_rsrp") {
+      console.log("Received baseline RSRP from Anvil");
+      if (typeof window.handleBaselineRsrpUpdate === 'function') {
+        window.handleBaselineRsrpUpdate(data);
+      }
+    }
+
+    // Handle optimization status updates (for streaming mode)
+    if (data.type === "optimization_update") {
+      console.log("Received optimization update from Anvil");
+      if (typeof window.handleOptimizationUpdate === 'function') {
+        window.handleOptimizationUpdate(data);
+      }
+    }
+
+    // Live RSRP from backend (Sionna) after antenna add/update. Cache per antenna, merge as best-server.
+    // rsrp=null when antenna turned off — evicts from cache and re-merges.
+    if (data.type === "live_rsrp") {
+      if (data.rsrpDropped) return;
+      var rsrp = data.rsrp;
+      var ant_id = data.ant_id;
+      console.log("[RSRP] Received live_rsrp:", ant_id, "| len:", rsrp ? rsrp.length : "null");
+      var traceIds = recordReplySpans(data);
+      var mergeAt = LatencyTracer.now();
+      if (typeof window.cacheLiveRsrpAndMergeBestServer === "function") {
+        window.cacheLiveRsrpAndMergeBestServer(ant_id, rsrp);
+      }
+      RsrpSnapshot.noteReceived(ant_id, !!(rsrp && rsrp.length), data.fingerprint);
+      var mergedAt = LatencyTracer.now();
+      for (var t = 0; t < traceIds.length; t++) {
+        LatencyTracer.span(traceIds[t], "merge", mergeAt, mergedAt, rsrp ? rsrp.length * 4 : 0);
+      }
+      if (state.showVisualization && typeof window.generateHeatmapAsync === "function") {
+        LatencyTracer.finishOnPaint(traceIds);
+        window.generateHeatmapAsync(null, true);
+      } else {
+        for (var f = 0; f < traceIds.length; f++) LatencyTracer.finish(traceIds[f], mergedAt);
+      }
+    }
+  }
+
   // Set up message listener for Anvil events
   window.addEventListener("message", function (event) {
     if (event.data && event.data.type === "anvil_ready") {
@@ -499,6 +583,12 @@ var BackendSync = (function () {
       if (badge && event.data.version) {
         badge.textContent = "V" + event.data.version;
       }
+      state.backendVersion = event.data.version || "";    // part of every RSRP grid fingerprint
+    }
+
+    // Backend session was reset: its RSRP encoder starts new streams, so drop our delta bases
+    if (event.data && event.data.type === "backend_session_reset" && typeof window.resetRsrpStreams === "function") {
+      window.resetRsrpStreams();
     }
 
     // Handle CSV data from Anvil backend
@@ -525,34 +615,28 @@ var BackendSync = (function () {
       }
     }
 
-    // Handle baseline RSRP (Calculate Accurate Baseline, batch antennas, auto-place with accurate engine)
-    if (event.data && event.data.type === "baseline_rsrp") {
-      console.log("Received baseline RSRP from Anvil");
-      if (typeof window.handleBaselineRsrpUpdate === 'function') {
-        window.handleBaselineRsrpUpdate(event.data);
-      }
-    }
-
-    // Handle optimization status updates (for streaming mode)
-    if (event.data && event.data.type === "optimization_update") {
-      console.log("Received optimization update from Anvil");
-      if (typeof window.handleOptimizationUpdate === 'function') {
-        window.handleOptimizationUpdate(event.data);
-      }
+    // RSRP-carrying messages may hold packed binary frames (RsrpGridCodec) — decode first.
+    if (event.data && (event.data.type === "baseline_rsrp" ||
+                       event.data.type === "optimization_update" ||
+                       event.data.type === "live_rsrp")) {
+      event.data.receivedAt = LatencyTracer.now();
+      var unpack = typeof window.unpackRsrpMessage === "function"
+        ? window.unpackRsrpMessage(event.data) : Promise.resolve(event.data);
+      unpack.then(function (data) {
+        data.decodedAt = LatencyTracer.now();
+        handleRsrpMessage(data);
+      }, function (err) {
+        console.error("[RSRP] Failed to decode packed grid:", err);
+      });
     }
 
-    // Live RSRP from backend (Sionna) after antenna add/update. Cache per antenna, merge as best-server.
-    // rsrp=null when antenna turned off — evicts from cache and re-merges.
-    if (event.data && event.data.type === "live_rsrp") {
-      var rsrp = event.data.rsrp;
-      var ant_id = event.data.ant_id;
-      console.log("[RSRP] Received live_rsrp:", ant_id, "| len:", rsrp ? rsrp.length : "null");
-      if (typeof window.cacheLiveRsrpAndMergeBestServer === "function") {
-        window.cacheLiveRsrpAndMergeBestServer(ant_id, rsrp);
-      }
-      if (state.showVisualization && typeof window.generateHeatmapAsync === "function") {
-        window.generateHeatmapAsync(null, true);
-      }
+    // Finer / missing LOD tiles after a viewport change (large floorplans)
+    if (event.data && event.data.type === "rsrp_tiles" && event.data.success && typeof window.applyRsrpTiles === "function") {
+      window.applyRsrpTiles(event.data.tiles).then(function (updated) {
+        if (!updated) return;
+        state.cachedHeatmap = null;
+        if (typeof window.generateHeatmapAsync === "function") window.generateHeatmapAsync(null, true);
+      });
     }
 
     // Handle baseline calculation
@@ -600,6 +684,7 @@ var BackendSync = (function () {
     if (event.data && event.data.type === "optimization_started") {
       console.log("Optimization started");
       window.optimizationLastIndex = 0;
+      window.optimizationFramesSkipped = 0;
       window.optimizationBounds = null;
     }
 
@@ -484,7 +484,8 @@
       window.parent.postMessage({
           type  : "upload_antenna_pattern",
           files : uniqueItems.map(function (item) {
-              return { filename: item.file.name, content: item.rawContent };
+              // The File itself: the App uploads it in binary chunks
+              return { filename: item.file.name, file: item.file };
           }),
       }, PARENT_ORIGIN);
     }
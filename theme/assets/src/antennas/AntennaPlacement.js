@@ -442,6 +442,8 @@
       type:      "antennas_batch_status_update",
       requestId: requestId,
       antennas:  state.aps,
+      fingerprints: RsrpSnapshot.noteSent(state.aps),
+      geometryRev: RsrpSnapshot.geometryFingerprint(),
       source:    "auto_place"
     }, PARENT_ORIGIN);
   }
@@ -0,0 +1,513 @@
+// CoverageExport.js — streaming coverage exports (CSV, XLSX, NumPy .npy / .npz)
+// Points are read from grids that are already computed whenever one exists:
+//   1. accurate engine: the per-antenna cache (state.backendRsrpPerAntenna), antennas
+//      missing from it re-fetched from the server through the App bridge
+//      (fetch_rsrp_grids) — full metrics including best AP and co-channel CCI; antennas
+//      still without a grid are filled in from the local model on the same bins;
+//   2. the active grid (optimization / merged accurate engine / model grid) — rssi, snr;
+//      the detailed export takes best AP and CCI (hence SINR, throughput) from the local model;
+//   3. no grid: the local model per point (RadioCalculations), in time-sliced chunks.
+// The detailed export always has the full column set; `source` says where each part came from.
+// Grid points are bin centres, so `spacing` only applies to the local-model path.
+// Columns are built in CoverageExportWorker.js; CSV text is generated there in chunks
+// and streamed into a file writer (File System Access, for large user exports) or
+// Blob parts, never joined into one string.
+// Depends: global state, RadioCalculations, NotificationSystem, DataExportSystem (downloadBlob),
+//          AccurateEngineRsrp (getRsrpGridForAntenna / getActiveRsrpGrid), ZipStore, XLSX (SheetJS)
+// Used by: DataExportSystem.exportDetailedCoverageData / exportAntennaRsrp
+
+var CoverageExport = (function () {
+  'use strict';
+
+  var CSV_CHUNK_ROWS = 50000;
+  var NPY_BLOCK_ROWS = 65536;
+  var LOCAL_CHUNK_POINTS = 20000;       // points per main-thread slice on the local-model path
+  var XLSX_MAX_ROWS = 1048575;          // sheet row limit minus the header
+  var PICKER_MIN_POINTS = 1000000;      // user exports this large stream into a chosen file
+  var GRID_FETCH_TIMEOUT_MS = 30000;
+
+  var MIME = {
+    csv: 'text/csv;charset=utf-8;',
+    xlsx: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    npy: 'application/octet-stream',
+    npz: 'application/zip'
+  };
+
+  // Column layouts: `order` names the columns, `labels` columns hold indices into a string list
+  var DETAILED_TABLE = {
+    order: ['x', 'y', 'best_ap', 'rssi_dbm', 'snr_db', 'cci_dbm', 'sinr_db', 'throughput_mbps'],
+    header: 'X,Y,best_ap_id,rssi_dbm,snr_db,cci_dbm,sinr_db,throughput_mbps',
+    decimals: { rssi_dbm: 2, snr_db: 2, cci_dbm: 2, sinr_db: 2, throughput_mbps: 3 }
+  };
+  var GRID_TABLE = {
+    order: ['x', 'y', 'rssi_dbm', 'snr_db'],
+    header: 'X,Y,rssi_dbm,snr_db',
+    decimals: { rssi_dbm: 2, snr_db: 2 }
+  };
+  var ANTENNA_TABLE = {
+    order: ['x', 'y', 'rssi_dbm'],
+    header: 'X,Y,RSRP',
+    decimals: { rssi_dbm: 6 }
+  };
+
+  // ─── Worker ──────────────────────────────────────────────────────────────────
+
+  var worker = null;
+  var jobs = Object.create(null);
+  var nextJobId = 1;
+
+  function runWorker(msg, onChunk) {
+    if (!worker) {
+      worker = new Worker("io/CoverageExportWorker.js");
+      worker.onmessage = function (e) {
+        var job = jobs[e.data.jobId];
+        if (!job) return;
+        if (e.data.type === "chunk") {
+          job.onChunk(e.data);
+          return;
+        }
+        delete jobs[e.data.jobId];
+        job.resolve(e.data);
+      };
+      worker.onerror = function (err) {
+        for (var id in jobs) jobs[id].reject(err);
+        jobs = Object.create(null);
+        worker = null;
+      };
+    }
+    return new Promise(function (resolve, reject) {
+      msg.jobId = nextJobId++;
+      jobs[msg.jobId] = { resolve: resolve, reject: reject, onChunk: onChunk || function () {} };
+      worker.postMessage(msg);
+    });
+  }
+
+  // ─── Sinks ───────────────────────────────────────────────────────────────────
+
+  /** {write(part), close()} over a user-chosen file when `usePicker`, else Blob parts + download.
+   *  Must be called synchronously from the click so the picker still has user activation. */
+  function openSink(fileName, mime, usePicker) {
+    if (usePicker && typeof window.showSaveFilePicker === "function") {
+      return window.showSaveFilePicker({ suggestedName: fileName }).then(function (handle) {
+        return handle.createWritable();
+      }).then(function (writable) {
+        var pending = Promise.resolve();
+        return {
+          write: function (part) { pending = pending.then(function () { return writable.write(part); }); },
+          close: function () { return pending.then(function () { return writable.close(); }); }
+        };
+      });
+    }
+    var parts = [];
+    return Promise.resolve({
+      write: function (part) { parts.push(part); },
+      close: function () {
+        DataExportSystem.downloadBlob(new Blob(parts, { type: mime }), fileName);
+        parts = [];
+        return Promise.resolve();
+      }
+    });
+  }
+
+  // ─── Sources ─────────────────────────────────────────────────────────────────
+
+  function enabledAps() {
+    return state.aps.filter(function (ap) { return ap.enabled !== false; });
+  }
+
+  function apLabel(ap) {
+    return ap.id || ('AP-' + ap.antennaId);
+  }
+
+  function usesServerGrids() {
+    return (state.model || "p25d") === "accurateEngine" && !state.optimizationRsrpGrid;
+  }
+
+  function waitForCache(antIds, timeoutMs) {
+    var until = Date.now() + timeoutMs;
+    return new Promise(function (resolve) {
+      (function check() {
+        var cache = state.backendRsrpPerAntenna || {};
+        var ready = antIds.every(function (id) { return cache[id]; });
+        if (ready || Date.now() > until) resolve();
+        else setTimeout(check, 50);
+      })();
+    });
+  }
+
+  /** Ask the App to re-send the server grids of `antIds` (as live_rsrp) and wait for the cache. */
+  function fetchServerGrids(antIds) {
+    if (!antIds.length || window.parent === window) return Promise.resolve();
+    var requestId = "rsrp_grids_" + Date.now() + "_" + Math.random().toString(36).substr(2, 6);
+    return new Promise(function (resolve) {
+      var done = false;
+      function finish() {
+        if (done) return;
+        done = true;
+        window.removeEventListener("message", onReply);
+        resolve();
+      }
+      function onReply(event) {
+        if (!event.data || event.data.type !== "rsrp_grids_ready" || event.data.requestId !== requestId) return;
+        // live_rsrp replies decode asynchronously; give them a moment to land in the cache
+        waitForCache(antIds, 2000).then(finish);
+      }
+      window.addEventListener("message", onReply);
+      setTimeout(finish, GRID_FETCH_TIMEOUT_MS);
+      window.parent.postMessage({ type: "fetch_rsrp_grids", requestId: requestId, antIds: antIds }, "*");
+    });
+  }
+
+  /** Run fn(i) for i in [0, n) in LOCAL_CHUNK_POINTS slices, yielding to the UI in between. */
+  function sliced(n, fn) {
+    var p = 0;
+    return new Promise(function (resolve) {
+      (function slice() {
+        var end = Math.min(n, p + LOCAL_CHUNK_POINTS);
+        for (; p < end; p++) fn(p);
+        if (p < n) { setTimeout(slice, 0); return; }
+        resolve();
+      })();
+    });
+  }
+
+  /**
+   * Worker input for per-antenna grids, or null when no antenna has one. Antennas without a
+   * grid (or with one on other bins) get the local model at the bin centres; `modelled` lists them.
+   */
+  function perAntennaInput(aps) {
+    var grids = [], ref = null, modelled = [];
+    for (var i = 0; i < aps.length; i++) {
+      var grid = window.getRsrpGridForAntenna(aps[i].id);
+      grids.push(grid ? grid.data : null);
+      ref = ref || grid;
+    }
+    if (!ref) return Promise.resolve(null);
+    var filled = Promise.resolve();
+    grids.forEach(function (data, k) {
+      if (data && data.length === ref.data.length) return;
+      var ap = aps[k], out = grids[k] = new Float32Array(ref.data.length);
+      modelled.push(apLabel(ap));
+      filled = filled.then(function () {
+        return sliced(out.length, function (b) {
+          out[b] = RadioCalculations.rssiFrom(ap, (b % ref.cols + 0.5) * ref.dx, (Math.floor(b / ref.cols) + 0.5) * ref.dy);
+        });
+      });
+    });
+    return filled.then(function () {
+      return {
+        input: {
+          type: "columns", detailed: true, cols: ref.cols, rows: ref.rows, dx: ref.dx, dy: ref.dy,
+          grids: grids, channels: aps.map(function (ap) { return ap.ch; }), noise: state.noise
+        },
+        modelled: modelled
+      };
+    });
+  }
+
+  function gridInput(grid, noise) {
+    return { type: "columns", detailed: false, cols: grid.cols, rows: grid.rows, dx: grid.dx, dy: grid.dy,
+             grids: [grid.data], noise: noise };
+  }
+
+  /** Local model per point on the original spacing lattice, yielding to the UI between slices. */
+  function localColumns(spacing, table, pointFn) {
+    var nx = Math.floor(state.w / spacing + 1e-9) + 1;
+    var ny = Math.floor(state.h / spacing + 1e-9) + 1;
+    var n = nx * ny, columns = {};
+    for (var c = 0; c < table.order.length; c++) {
+      columns[table.order[c]] = table.order[c] === 'best_ap' ? new Int16Array(n) : new Float32Array(n);
+    }
+    var count = 0, p = 0;
+    return new Promise(function (resolve) {
+      (function slice() {
+        var end = Math.min(n, p + LOCAL_CHUNK_POINTS);
+        for (; p < end; p++) {
+          var xx = Math.round((p % nx) * spacing * 1000) / 1000;
+          var yy = Math.round(Math.floor(p / nx) * spacing * 1000) / 1000;
+          if (pointFn(xx, yy, columns, count)) {
+            columns.x[count] = xx;
+            columns.y[count] = yy;
+            count++;
+          }
+        }
+        if (p < n) { setTimeout(slice, 0); return; }
+        for (var name in columns) columns[name] = columns[name].slice(0, count);
+        resolve({ count: count, columns: columns });
+      })();
+    });
+  }
+
+  function localDetailedPoint(aps) {
+    var index = new Map();
+    aps.forEach(function (ap, i) { index.set(ap, i); });
+    return function (xx, yy, col, k) {
+      var best = RadioCalculations.bestApAt(xx, yy);
+      if (!best || !best.ap) return false;
+      var rssi = best.rssiDbm;
+      var cci = RadioCalculations.cciAt(xx, yy, best.ap);
+      var sinr = RadioCalculations.sinrAt(rssi, cci);
+      col.best_ap[k] = index.get(best.ap);
+      col.rssi_dbm[k] = rssi;
+      col.snr_db[k] = RadioCalculations.snrAt(rssi);
+      col.cci_dbm[k] = cci;
+      col.sinr_db[k] = sinr;
+      col.throughput_mbps[k] = RadioCalculations.throughputFromSinr(sinr);
+      return true;
+    };
+  }
+
+  /** Complete grid columns (x, y, rssi, snr) to DETAILED_TABLE: serving AP and CCI from the local model. */
+  function addLocalServing(data, aps) {
+    var c = data.columns, n = data.count;
+    var index = new Map();
+    aps.forEach(function (ap, i) { index.set(ap, i); });
+    c.best_ap = new Int16Array(n);
+    c.cci_dbm = new Float32Array(n);
+    c.sinr_db = new Float32Array(n);
+    c.throughput_mbps = new Float32Array(n);
+    return sliced(n, function (k) {
+      var best = RadioCalculations.bestApAt(c.x[k], c.y[k]);
+      var cci = best.ap ? RadioCalculations.cciAt(c.x[k], c.y[k], best.ap) : -200;
+      var sinr = RadioCalculations.sinrAt(c.rssi_dbm[k], cci);
+      c.best_ap[k] = best.ap ? index.get(best.ap) : 0;
+      c.cci_dbm[k] = cci;
+      c.sinr_db[k] = sinr;
+      c.throughput_mbps[k] = RadioCalculations.throughputFromSinr(sinr);
+    }).then(function () { return data; });
+  }
+
+  // ─── Formats ─────────────────────────────────────────────────────────────────
+
+  function npyHeader(descr, count) {
+    var dict = "{'descr': " + descr + ", 'fortran_order': False, 'shape': (" + count + ",), }";
+    var pad = (64 - (10 + dict.length + 1) % 64) % 64;
+    dict += new Array(pad + 1).join(" ") + "\n";
+    var bytes = new Uint8Array(10 + dict.length);
+    bytes.set([0x93, 0x4E, 0x55, 0x4D, 0x50, 0x59, 1, 0, dict.length & 0xFF, dict.length >> 8]);
+    for (var i = 0; i < dict.length; i++) bytes[10 + i] = dict.charCodeAt(i);
+    return bytes;
+  }
+
+  function typeCode(column) {
+    return column instanceof Int16Array ? '<i2' : '<f4';
+  }
+
+  function labelWidth(labels) {
+    var width = 1;
+    for (var i = 0; i < labels.length; i++) width = Math.max(width, labels[i].length);
+    return width;
+  }
+
+  /** Fixed-width UTF-32LE strings (NumPy '<U{width}'). */
+  function unicodeBytes(strings, width) {
+    var out = new Uint32Array(strings.length * width);
+    for (var i = 0; i < strings.length; i++) {
+      for (var j = 0; j < strings[i].length && j < width; j++) out[i * width + j] = strings[i].charCodeAt(j);
+    }
+    return new Uint8Array(out.buffer);
+  }
+
+  function asBytes(column) {
+    return new Uint8Array(column.buffer, column.byteOffset, column.byteLength);
+  }
+
+  /** .npz: one .npy per column (np.load gives a dict of arrays); labels go to `<column>_ids.npy`. */
+  function writeNpz(data, table, sink) {
+    var entries = [];
+    table.order.forEach(function (name) {
+      var column = data.columns[name];
+      entries.push({ name: name + '.npy', parts: [npyHeader("'" + typeCode(column) + "'", data.count), asBytes(column)] });
+      if (data.labels && data.labels[name]) {
+        var labels = data.labels[name], width = labelWidth(labels);
+        entries.push({ name: name + '_ids.npy',
+                       parts: [npyHeader("'<U" + width + "'", labels.length), unicodeBytes(labels, width)] });
+      }
+    });
+    ZipStore.build(entries).forEach(function (part) { sink.write(part); });
+  }
+
+  /** .npy: one structured record per point; label columns become '<U' string fields. */
+  function writeNpy(data, table, sink) {
+    var fields = table.order.map(function (name) {
+      var labels = data.labels && data.labels[name];
+      var width = labels ? labelWidth(labels) : 0;
+      return { name: labels ? name + '_id' : name, column: data.columns[name], labels: labels, width: width,
+               size: labels ? 4 * width : data.columns[name].BYTES_PER_ELEMENT };
+    });
+    var descr = '[' + fields.map(function (f) {
+      return "('" + f.name + "', '" + (f.labels ? '<U' + f.width : typeCode(f.column)) + "')";
+    }).join(', ') + ']';
+    var recordSize = fields.reduce(function (sum, f) { return sum + f.size; }, 0);
+    sink.write(npyHeader(descr, data.count));
+    for (var start = 0; start < data.count; start += NPY_BLOCK_ROWS) {
+      var end = Math.min(data.count, start + NPY_BLOCK_ROWS);
+      var view = new DataView(new ArrayBuffer((end - start) * recordSize));
+      var off = 0;
+      for (var r = start; r < end; r++) {
+        for (var f = 0; f < fields.length; f++) {
+          var field = fields[f], v = field.column[r];
+          if (field.labels) {
+            var label = field.labels[v] || '';
+            for (var j = 0; j < field.width; j++) view.setUint32(off + 4 * j, j < label.length ? label.charCodeAt(j) : 0, true);
+          } else if (field.column instanceof Int16Array) {
+            view.setInt16(off, v, true);
+          } else {
+            view.setFloat32(off, v, true);
+          }
+          off += field.size;
+        }
+      }
+      sink.write(new Uint8Array(view.buffer));
+    }
+  }
+
+  function writeXlsx(data, table, sink) {
+    if (data.count > XLSX_MAX_ROWS) {
+      throw new Error(data.count + ' points exceed the XLSX row limit — export as CSV, .npy or .npz');
+    }
+    var rows = [table.header.split(',')];
+    for (var r = 0; r < data.count; r++) {
+      var row = new Array(table.order.length);
+      for (var c = 0; c < table.order.length; c++) {
+        var name = table.order[c], v = data.columns[name][r];
+        if (data.labels && data.labels[name]) row[c] = data.labels[name][v];
+        else if (table.decimals[name] == null) row[c] = Math.round(v * 1000) / 1000;
+        else row[c] = +v.toFixed(table.decimals[name]);
+      }
+      rows.push(row);
+    }
+    var wb = XLSX.utils.book_new();
+    XLSX.utils.book_append_sheet(wb, XLSX.utils.aoa_to_sheet(rows), 'Coverage');
+    sink.write(new Uint8Array(XLSX.write(wb, { bookType: 'xlsx', type: 'array' })));
+  }
+
+  function writeCsv(data, table, sink) {
+    return runWorker({
+      type: "csv", header: table.header, columns: data.columns, order: table.order,
+      decimals: table.decimals, labels: data.labels || {}, chunkRows: CSV_CHUNK_ROWS
+    }, function (chunk) { sink.write(chunk.bytes); });
+  }
+
+  function writeTable(data, table, format, sink) {
+    if (format === 'csv') return writeCsv(data, table, sink);
+    if (format === 'xlsx') writeXlsx(data, table, sink);
+    else if (format === 'npy') writeNpy(data, table, sink);
+    else writeNpz(data, table, sink);
+    return Promise.resolve();
+  }
+
+  // ─── Export pipeline ─────────────────────────────────────────────────────────
+
+  function resolveFormat(fileName, opts) {
+    var ext = fileName && /\.(\w+)$/.exec(fileName);
+    var format = (opts && opts.format) || (ext && ext[1].toLowerCase()) || 'csv';
+    return MIME[format] ? format : 'csv';
+  }
+
+  function withExtension(fileName, format) {
+    return fileName.replace(/\.\w+$/, '') + '.' + format;
+  }
+
+  /** Open the sink now (user activation), then build the table and stream it out. */
+  function run(fileName, estimatedPoints, opts, buildTable) {
+    var format = resolveFormat(fileName, opts);
+    fileName = withExtension(fileName, format);
+    var usePicker = !(opts && opts.silent) && estimatedPoints >= PICKER_MIN_POINTS;
+    var sinkPromise = openSink(fileName, MIME[format], usePicker);
+    return sinkPromise.then(function (sink) {
+      return buildTable().then(function (result) {
+        return writeTable(result.data, result.table, format, sink).then(function () {
+          return sink.close();
+        }).then(function () {
+          return { fileName: fileName, count: result.data.count, source: result.source };
+        });
+      });
+    }).catch(function (err) {
+      if (err && err.name === 'AbortError') return null;     // save dialog cancelled
+      console.error('[CoverageExport] export failed:', err);
+      NotificationSystem.error('Export failed: ' + (err && err.message ? err.message : err));
+      return null;
+    });
+  }
+
+  /** Best-server coverage with per-point metrics (exportDetailedCoverageData). */
+  function exportCoverage(fileName, spacing, opts) {
+    spacing = spacing || 1.0;
+    var aps = enabledAps();
+    var estimate = Math.round(state.w) * Math.round(state.h) / (usesServerGrids() ? 1 : spacing * spacing);
+    return run(fileName, estimate, opts, function () {
+      var ready = Promise.resolve();
+      if (usesServerGrids() && aps.length) {
+        var cache = state.backendRsrpPerAntenna || {};
+        ready = fetchServerGrids(aps.filter(function (ap) { return !cache[ap.id]; }).map(function (ap) { return ap.id; }));
+      }
+      return ready.then(function () {
+        return usesServerGrids() && aps.length ? perAntennaInput(aps) : null;
+      }).then(function (perAntenna) {
+        var labels = { best_ap: aps.map(apLabel) };
+        if (perAntenna) {
+          var source = 'antenna grids';
+          if (perAntenna.modelled.length) {
+            console.warn('[CoverageExport] No server grid for ' + perAntenna.modelled.join(', ') + ', using the local model');
+            source += ', local model for ' + perAntenna.modelled.join(', ');
+          }
+          return runWorker(perAntenna.input).then(function (data) {
+            data.labels = labels;
+            return { data: data, table: DETAILED_TABLE, source: source };
+          });
+        }
+        var grid = typeof window.getActiveRsrpGrid === 'function' ? window.getActiveRsrpGrid() : null;
+        if (grid && !aps.length) {
+          return runWorker(gridInput(grid, state.noise)).then(function (data) {
+            return { data: data, table: GRID_TABLE, source: 'coverage grid' };
+          });
+        }
+        if (grid) {
+          return runWorker(gridInput(grid, state.noise)).then(function (data) {
+            return addLocalServing(data, aps);
+          }).then(function (data) {
+            data.labels = labels;
+            return { data: data, table: DETAILED_TABLE, source: 'coverage grid, best AP / CCI from local model' };
+          });
+        }
+        return localColumns(spacing, DETAILED_TABLE, localDetailedPoint(aps)).then(function (data) {
+          data.labels = labels;
+          return { data: data, table: DETAILED_TABLE, source: 'local model' };
+        });
+      });
+    });
+  }
+
+  /** One antenna's RSRP map (exportAntennaRsrp). */
+  function exportAntenna(antenna, fileName, spacing, opts) {
+    spacing = spacing || 1.0;
+    var estimate = Math.round(state.w) * Math.round(state.h) / (usesServerGrids() ? 1 : spacing * spacing);
+    return run(fileName, estimate, opts, function () {
+      var cached = (state.backendRsrpPerAntenna || {})[antenna.id];
+      var ready = !cached && usesServerGrids() ? fetchServerGrids([antenna.id]) : Promise.resolve();
+      return ready.then(function () {
+        var grid = typeof window.getRsrpGridForAntenna === 'function' ? window.getRsrpGridForAntenna(antenna.id) : null;
+        if (grid) {
+          return runWorker(gridInput(grid, null)).then(function (data) {
+            return { data: data, table: ANTENNA_TABLE, source: 'antenna grid' };
+          });
+        }
+        return localColumns(spacing, ANTENNA_TABLE, function (xx, yy, col, k) {
+          col.rssi_dbm[k] = RadioCalculations.rssiFrom(antenna, xx, yy);
+          return true;
+        }).then(function (data) {
+          return { data: data, table: ANTENNA_TABLE, source: 'local model' };
+        });
+      });
+    });
+  }
+
+  return {
+    exportCoverage: exportCoverage,
+    exportAntenna: exportAntenna,
+    formats: Object.keys(MIME)
+  };
+})();
+
+window.CoverageExport = CoverageExport;
@@ -0,0 +1,144 @@
+//
+// CoverageExportWorker.js
+// Web worker for CoverageExport.js. Turns RSRP grids that are already
+// computed (per-antenna cache, merged / optimization grid) into export
+// columns, and formats columns as CSV text in chunks, so exports of 10^6+
+// points never block the main thread.
+//
+// Messages in:
+//   { type: "columns", jobId, cols, rows, dx, dy, grids: [Float32Array],
+//     channels: [ch], noise, detailed }
+//       — one point per covered bin centre. `detailed` (one grid per antenna)
+//         adds best_ap / cci / sinr / throughput; otherwise grids[0] is a
+//         single grid exported as rssi (+ snr when noise is given).
+//   { type: "csv", jobId, header, columns: {name: TypedArray}, order: [name],
+//     decimals: {name: n}, labels: {name: [string]}, chunkRows }
+//
+// Messages out:
+//   { type: "columns", jobId, count, columns }   — buffers transferred.
+//   { type: "chunk", jobId, bytes: Uint8Array, rows }  — CSV text, transferred.
+//   { type: "done", jobId, rows }
+//
+
+var THROUGHPUT_TABLE = [
+  { t: -5, r: 0 }, { t: 0, r: 6.5 }, { t: 5, r: 13 }, { t: 10, r: 26 },
+  { t: 15, r: 39 }, { t: 20, r: 58.5 }, { t: 25, r: 72.2 }
+];
+var LOG10 = Math.log(10);
+
+// Same rules as AccurateEngineRsrp (0 = no coverage) and RadioCalculations
+function isValidRsrp(v) { return v !== 0 && v >= -140 && v < 0; }
+function dbmToLin(dBm) { return Math.pow(10, dBm / 10); }
+function linToDbm(lin) { return 10 * Math.log(Math.max(lin, 1e-12)) / LOG10; }
+
+function throughputFromSinr(sinr) {
+  var rate = 0;
+  for (var i = 0; i < THROUGHPUT_TABLE.length; i++) {
+    if (sinr >= THROUGHPUT_TABLE[i].t) rate = THROUGHPUT_TABLE[i].r;
+  }
+  return rate;
+}
+
+// ─── Columns ───
+
+function detailedColumns(msg) {
+  var grids = msg.grids, channels = msg.channels, n = msg.cols * msg.rows;
+  var noiseLin = dbmToLin(msg.noise);
+  var out = {
+    x: new Float32Array(n), y: new Float32Array(n), best_ap: new Int16Array(n),
+    rssi_dbm: new Float32Array(n), snr_db: new Float32Array(n), cci_dbm: new Float32Array(n),
+    sinr_db: new Float32Array(n), throughput_mbps: new Float32Array(n)
+  };
+  var count = 0;
+  for (var i = 0; i < n; i++) {
+    var best = -Infinity, owner = -1, k;
+    for (k = 0; k < grids.length; k++) {
+      var v = grids[k][i];
+      if (isValidRsrp(v) && v > best) { best = v; owner = k; }
+    }
+    if (owner < 0) continue;
+    var interference = 0;
+    for (k = 0; k < grids.length; k++) {
+      if (k === owner || channels[k] !== channels[owner]) continue;
+      var p = grids[k][i];
+      if (isValidRsrp(p)) interference += dbmToLin(p);
+    }
+    var cci = interference > 0 ? linToDbm(interference) : -200;
+    var sinrLin = dbmToLin(best) / Math.max((cci < -150 ? 0 : interference) + noiseLin, 1e-12);
+    var sinr = 10 * Math.log(sinrLin) / LOG10;
+    out.x[count] = (i % msg.cols + 0.5) * msg.dx;
+    out.y[count] = (Math.floor(i / msg.cols) + 0.5) * msg.dy;
+    out.best_ap[count] = owner;
+    out.rssi_dbm[count] = best;
+    out.snr_db[count] = best - msg.noise;
+    out.cci_dbm[count] = cci;
+    out.sinr_db[count] = sinr;
+    out.throughput_mbps[count] = throughputFromSinr(sinr);
+    count++;
+  }
+  return trim(out, count);
+}
+
+function gridColumns(msg) {
+  var grid = msg.grids[0], n = msg.cols * msg.rows;
+  var withSnr = msg.noise != null;
+  var out = { x: new Float32Array(n), y: new Float32Array(n), rssi_dbm: new Float32Array(n) };
+  if (withSnr) out.snr_db = new Float32Array(n);
+  var count = 0;
+  for (var i = 0; i < n; i++) {
+    var v = grid[i];
+    if (!isValidRsrp(v)) continue;
+    out.x[count] = (i % msg.cols + 0.5) * msg.dx;
+    out.y[count] = (Math.floor(i / msg.cols) + 0.5) * msg.dy;
+    out.rssi_dbm[count] = v;
+    if (withSnr) out.snr_db[count] = v - msg.noise;
+    count++;
+  }
+  return trim(out, count);
+}
+
+function trim(columns, count) {
+  var out = {};
+  for (var name in columns) out[name] = columns[name].slice(0, count);
+  return { count: count, columns: out };
+}
+
+// ─── CSV ───
+
+function formatCsv(msg) {
+  var order = msg.order, columns = msg.columns, decimals = msg.decimals || {}, labels = msg.labels || {};
+  var n = columns[order[0]].length;
+  var chunkRows = msg.chunkRows || 50000;
+  var encoder = new TextEncoder();
+  var first = true;
+  for (var start = 0; start < n || first; start += chunkRows) {
+    var end = Math.min(n, start + chunkRows);
+    var lines = first ? [msg.header] : [];
+    first = false;
+    for (var r = start; r < end; r++) {
+      var fields = new Array(order.length);
+      for (var c = 0; c < order.length; c++) {
+        var name = order[c], v = columns[name][r];
+        if (labels[name]) fields[c] = labels[name][v];
+        else if (decimals[name] == null) fields[c] = Math.round(v * 1000) / 1000;  // coordinates
+        else fields[c] = v.toFixed(decimals[name]);
+      }
+      lines.push(fields.join(","));
+    }
+    var bytes = encoder.encode(lines.join("\n") + "\n");
+    self.postMessage({ type: "chunk", jobId: msg.jobId, bytes: bytes, rows: end }, [bytes.buffer]);
+  }
+  self.postMessage({ type: "done", jobId: msg.jobId, rows: n });
+}
+
+self.onmessage = function (e) {
+  var msg = e.data;
+  if (msg.type === "columns") {
+    var result = msg.detailed ? detailedColumns(msg) : gridColumns(msg);
+    var transfer = [];
+    for (var name in result.columns) transfer.push(result.columns[name].buffer);
+    self.postMessage({ type: "columns", jobId: msg.jobId, count: result.count, columns: result.columns }, transfer);
+  } else if (msg.type === "csv") {
+    formatCsv(msg);
+  }
+};
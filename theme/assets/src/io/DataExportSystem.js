@@ -2,15 +2,20 @@
 // DataExportSystem.js
 // Refactored CSV export system.
 //
-// Depends on: RadioCalculations.js (must be loaded & initialized first)
+// Depends on: RadioCalculations.js (must be loaded & initialized first), CoverageExport.js, ProjectArchive.js
 //
 // Methods:
 //   DataExportSystem.init({ state })
-//   DataExportSystem.exportAntennaRsrp(antenna, fileName, spacing)
+//   DataExportSystem.exportAntennaRsrp(antenna, fileName, spacing, opts)
 //   DataExportSystem.exportCoverageMap(fileName, spacing)
-//   DataExportSystem.exportDetailedCoverageData(finalFileName, spacing)  // filename: cm_<timestamp>.csv
+//   DataExportSystem.exportDetailedCoverageData(finalFileName, spacing, opts)  // filename: cm_<timestamp>.csv
 //   DataExportSystem.exportOptimizationRsrpGrid(fileName)
 //   DataExportSystem.exportAntennaConfiguration(fileName)
+//   DataExportSystem.exportTracesAsJsonl(jsonl, fileName, count)   // LatencyTracer export
+//   DataExportSystem.exportCoverageReport(files)   // project .json/.ipsz files → server .xlsx report
+//   DataExportSystem.downloadBlob(blob, filename)
+//
+// Coverage exports stream through CoverageExport.js (worker + cached grids).
 // 
 
 var DataExportSystem = (function () {
@@ -19,18 +24,21 @@ var DataExportSystem = (function () {
   // ── Dependency (injected via init) ──
   var _state = null;
 
-  function downloadCSV(csvData, filename) {
-    var blob = new Blob([csvData], { type: 'text/csv;charset=utf-8;' });
+  function downloadBlob(blob, filename) {
     var url = URL.createObjectURL(blob);
     var link = document.createElement('a');
     link.href = url;
-    link.download = filename || 'export.csv';
+    link.download = filename;
     document.body.appendChild(link);
     link.click();
     document.body.removeChild(link);
     URL.revokeObjectURL(url);
   }
 
+  function downloadCSV(csvData, filename) {
+    downloadBlob(new Blob([csvData], { type: 'text/csv;charset=utf-8;' }), filename || 'export.csv');
+  }
+
   function getCurrentTimestamp() {
     return new Date().toISOString().replace(/[:.]/g, '-').slice(0, -5);
   }
@@ -44,11 +52,13 @@ var DataExportSystem = (function () {
       console.log('DataExportSystem initialized.');
     },
 
+    downloadBlob: downloadBlob,
+
     // 
     // EXPORT ANTENNA-SPECIFIC RSRP
     // Per-antenna signal strength map
     // 
-    exportAntennaRsrp: function (antenna, fileName, spacing) {
+    exportAntennaRsrp: function (antenna, fileName, spacing, opts) {
       if (!_state) {
         console.error('DataExportSystem not initialized. Call DataExportSystem.init() first.');
         return;
@@ -58,47 +68,28 @@ var DataExportSystem = (function () {
         return;
       }
 
-      spacing = spacing || 1.0;
-      var rows = ['X,Y,RSRP'];
-      var count = 0;
-      var minRsrp = Infinity;
-      var maxRsrp = -Infinity;
-
-      for (var x = 0; x <= _state.w + 1e-9; x += spacing) {
-        for (var y = 0; y <= _state.h + 1e-9; y += spacing) {
-          var xx = Math.round(x * 1000) / 1000;
-          var yy = Math.round(y * 1000) / 1000;
-
-          var rsrp = RadioCalculations.rssiFrom(antenna, xx, yy);
-
-          rows.push(xx + ',' + yy + ',' + rsrp.toFixed(6));
-          count++;
-
-          if (rsrp > maxRsrp) maxRsrp = rsrp;
-          if (rsrp < minRsrp) minRsrp = rsrp;
-        }
-      }
-
-      var csvData = rows.join('\n');
-
       // Generate filename
       var baseFileName = antenna.id || ('antenna_' + Date.now());
       var finalFileName = fileName || (baseFileName + '_rsrp_' + getCurrentTimestamp() + '.csv');
 
-      downloadCSV(csvData, finalFileName);
-
-      NotificationSystem.toast(' Per-antenna RSRP exported successfully', 'success');
-      console.log('Antenna RSRP CSV exported:', {
-        antennaId: antenna.id,
-        points: count,
-        minRsrp: minRsrp.toFixed(2),
-        maxRsrp: maxRsrp.toFixed(2),
-        filename: finalFileName
+      // Streams from the antenna's cached grid when there is one (see CoverageExport.js)
+      return CoverageExport.exportAntenna(antenna, finalFileName, spacing, opts).then(function (result) {
+        if (!result) return;
+        if (!opts || !opts.silent) {
+          NotificationSystem.toast(' Per-antenna RSRP exported successfully', 'success');
+        }
+        console.log('Antenna RSRP exported:', {
+          antennaId: antenna.id,
+          points: result.count,
+          source: result.source,
+          filename: result.fileName
+        });
       });
     },
 
     // EXPORT DETAILED RSRP DATA
     // Extended coverage data with multiple metrics per point
+    // Format follows the extension (.csv / .xlsx / .npy / .npz) or opts.format
     // 
     exportDetailedCoverageData: function (finalFileName, spacing, opts) {
       if (!_state) {
@@ -106,91 +97,70 @@ var DataExportSystem = (function () {
         return;
       }
 
-      spacing = spacing || 1.0;
-      var rows = ['X,Y,best_ap_id,rssi_dbm,snr_db,cci_dbm,sinr_db,throughput_mbps'];
-      var count = 0;
+      finalFileName = finalFileName || ('cm_' + getCurrentTimestamp() + '.csv');
 
-      for (var y = 0; y <= _state.h + 1e-9; y += spacing) {
-        for (var x = 0; x <= _state.w + 1e-9; x += spacing) {
-          // var xx = (x + 0.5) * grid.dx;
-          // var yy = (y + 0.5) * grid.dy;
-          var xx = Math.round(x * 1000) / 1000;
-          var yy = Math.round(y * 1000) / 1000;
-
-          var best = RadioCalculations.bestApAt(xx, yy);
-          if (!best || !best.ap) continue;
-
-          var ap = best.ap;
-          var rssiVal = best.rssiDbm;
-          var snrVal = RadioCalculations.snrAt(rssiVal);
-          var cciVal = RadioCalculations.cciAt(xx, yy, ap);
-          var sinrVal = RadioCalculations.sinrAt(rssiVal, cciVal);
-          var thrVal = RadioCalculations.throughputFromSinr(sinrVal);
-
-          rows.push(
-            xx + ',' + yy + ',' +
-            (ap.id || 'AP-' + ap.antennaId) + ',' +
-            rssiVal.toFixed(2) + ',' +
-            snrVal.toFixed(2) + ',' +
-            cciVal.toFixed(2) + ',' +
-            sinrVal.toFixed(2) + ',' +
-            thrVal.toFixed(3)
-          );
-          count++;
+      return CoverageExport.exportCoverage(finalFileName, spacing, opts).then(function (result) {
+        if (!result) return;
+        if (!opts || !opts.silent) {
+          NotificationSystem.toast(' Detailed coverage data exported (' + result.count + ' points, ' + result.source + ')', 'success');
+        } else {
+          console.log('[Export] ' + result.fileName + ': ' + result.count + ' points (' + result.source + ')');
         }
-      }
-
-      var csvData = rows.join('\n');
-      var finalFileName = finalFileName || ('cm_' + getCurrentTimestamp() + '.csv');
-
-      downloadCSV(csvData, finalFileName);
-
-      if (!opts || !opts.silent) {
-        NotificationSystem.toast(' Detailed coverage data exported (' + count + ' points)', 'success');
-      }
+      });
     },
-    /** Export RSRP timing as .xlsx. Loads SheetJS from cdnjs on demand; falls back to CSV if unreachable. */
-    exportTimingRowsAsXlsx: function (rows, fileName) {
-      if (!rows || rows.length === 0) return;
-      var cols = ['#', 'Server Send Time', 'Client Receive Time', 'Heatmap Time', 'Server Client Time (sec)', 'Receive Heatmap Time (sec)', 'Server Heatmap Time (sec)'];
-      var dataRows = [cols];
-      for (var i = 0; i < rows.length; i++) {
-        var r = rows[i];
-        dataRows.push([r.index, r.serverSendTime, r.clientReceiveTime, r.heatmapTime, r.serverToClientSec, r.receiveToHeatmapSec, r.serverToHeatmapSec]);
-      }
-      var finalFileName = fileName || ('rsrp_timing_' + getCurrentTimestamp() + '.xlsx');
-      var doExport = function () {
-        if (typeof XLSX !== 'undefined') {
-          try {
-            var ws = XLSX.utils.aoa_to_sheet(dataRows);
-            var wb = XLSX.utils.book_new();
-            XLSX.utils.book_append_sheet(wb, ws, 'Timing');
-            XLSX.writeFile(wb, finalFileName);
-            NotificationSystem.toast('RSRP timing exported (' + rows.length + ' rows)', 'success');
-          } catch (e) {
-            var csvData = dataRows.map(function (row) { return row.join(','); }).join('\n');
-            downloadCSV(csvData, finalFileName.replace(/\.xlsx$/, '.csv'));
-            NotificationSystem.toast('RSRP timing exported as CSV (XLSX failed)', 'success');
+    // 
+    // SERVER COVERAGE REPORT
+    // Saved project files (one per floor) → one .xlsx built by the backend (CoverageReport.py)
+    // 
+    exportCoverageReport: function (files) {
+      if (!files || !files.length) return Promise.resolve(null);
+      var requestId = 'coverage_report_' + Date.now();
+      var names = Array.prototype.map.call(files, function (file) { return file.name.replace(/\.[^.]+$/, ''); });
+
+      return Promise.all(Array.prototype.map.call(files, function (file) {
+        return ProjectArchive.isArchive(file).then(function (isArchive) {
+          // Archives keep the image and grids in their own sections, which are never read here
+          if (isArchive) return ProjectArchive.toProjectData(file);
+          return file.text().then(JSON.parse);
+        }).then(function (project) {
+          // Not used by propagation, and often most of the file
+          delete project.backgroundImage;
+          delete project.csvCoverageData;
+          return project;
+        });
+      })).then(function (projects) {
+        return new Promise(function (resolve) {
+          function onStatus(event) {
+            var data = event.data;
+            if (!data || data.type !== 'coverage_report_status' || data.requestId !== requestId) return;
+            if (data.status === 'running') {
+              console.log('[CoverageReport] ' + data.completed + '/' + data.total + ' ' + (data.stage || ''));
+              return;
+            }
+            window.removeEventListener('message', onStatus);
+            if (data.status === 'finished') {
+              NotificationSystem.toast(' Coverage report ready (' + projects.length + ' floors)', 'success');
+            } else {
+              NotificationSystem.error('Coverage report failed: ' + (data.message || data.status));
+            }
+            resolve(data);
           }
-        } else {
-          var csvData = dataRows.map(function (row) { return row.join(','); }).join('\n');
-          downloadCSV(csvData, finalFileName.replace(/\.xlsx$/, '.csv'));
-          NotificationSystem.toast('RSRP timing exported as CSV (SheetJS unavailable)', 'success');
-        }
-      };
-      if (typeof XLSX !== 'undefined') {
-        doExport();
-        return;
-      }
-      var script = document.createElement('script');
-      script.src = 'https://cdnjs.cloudflare.com/ajax/libs/xlsx/0.18.5/xlsx.full.min.js';
-      script.onload = doExport;
-      script.onerror = function () {
-        var csvData = dataRows.map(function (row) { return row.join(','); }).join('\n');
-        downloadCSV(csvData, finalFileName.replace(/\.xlsx$/, '.csv'));
-        NotificationSystem.toast('RSRP timing exported as CSV (CDN unreachable)', 'success');
-      };
-      document.head.appendChild(script);
+          window.addEventListener('message', onStatus);
+          window.parent.postMessage({ type: 'generate_coverage_report', requestId: requestId, projects: projects, names: names }, '*');
+          NotificationSystem.toast('Coverage report started for ' + projects.length + ' floor(s)', 'info');
+        });
+      }).catch(function (err) {
+        NotificationSystem.error('Coverage report failed: ' + err.message);
+        return null;
+      });
+    },
+
+    /** Download latency traces (LatencyTracer.toJsonl) as a .jsonl file. */
+    exportTracesAsJsonl: function (jsonl, fileName, count) {
+      if (!jsonl) return;
+      downloadBlob(new Blob([jsonl + '\n'], { type: 'application/x-ndjson' }),
+                   fileName || ('latency_traces_' + getCurrentTimestamp() + '.jsonl'));
+      NotificationSystem.toast('Latency traces exported (' + count + ' traces)', 'success');
     },
     
     // 
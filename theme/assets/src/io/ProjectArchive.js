@@ -0,0 +1,347 @@
+// ProjectArchive.js — versioned binary project container (.ipsz, a zip)
+// Sections (one zip entry each):
+//   manifest.json      {format: "ips-project", version, sections, counts, image}
+//   settings.json      everything saveProject writes except the sections below
+//   antennas.json      {aps, patterns, antennaPatterns, defaultAntennaPatternIndex};
+//                      patterns are stored once, aps/antennaPatterns refer to them by index
+//   floorplanes.json
+//   walls/meta.json    {count, points, ids, elementTypes, colors}
+//   walls/points.f64   x,y of every wall point, wall after wall
+//   walls/starts.u32   index of each wall's first point (count + 1 entries)
+//   walls/kind.u8      0 = p1/p2 wall, 1 = polyline (points)
+//   walls/attrs.f64    loss, thickness, height, width per wall (NaN = not set)
+//   walls/style.u16    elementType, color per wall, as indices into meta tables (0xFFFF = not set)
+//   image.bin          background image file bytes, as loaded (stored, not deflated)
+//   rsrp/index.json    {antIds, fingerprints, bins, w, h}; rsrp/<i>.f32 — cached accurate-engine
+//                      grids, each with the RsrpSnapshot fingerprint of what it was computed from
+//   coverage.json      csvCoverageData
+// JSON, wall and grid sections are deflated when the browser has CompressionStream.
+// Geometry and settings are small entries read first; the image and grids are
+// separate entries the loader reads after the plan is on screen.
+// Depends: ZipStore
+// Used by: ProjectIO (saveProject / loadProject), DataExportSystem (coverage report)
+
+var ProjectArchive = (function () {
+
+  var FORMAT = "ips-project";
+  var FORMAT_VERSION = 2;
+  var EXTENSION = ".ipsz";
+  var MIME = "application/zip";
+  var NO_INDEX = 0xFFFF;
+  var WALL_ATTRS = ["loss", "thickness", "height", "width"];
+
+  // Keys that live in their own sections rather than settings.json
+  var SECTION_KEYS = ["aps", "walls", "floorPlanes", "antennaPatterns", "defaultAntennaPatternIndex",
+                      "backgroundImage", "csvCoverageData"];
+
+  function jsonBytes(value) {
+    return new TextEncoder().encode(JSON.stringify(value));
+  }
+
+  function asBytes(view) {
+    return new Uint8Array(view.buffer, view.byteOffset, view.byteLength);
+  }
+
+  // ─── Walls ───────────────────────────────────────────────────────────────────
+
+  function tableIndex(table, lookup, value) {
+    if (value === undefined || value === null) return NO_INDEX;
+    var key = String(value);
+    if (!(key in lookup)) { lookup[key] = table.length; table.push(value); }
+    return lookup[key];
+  }
+
+  /** Walls (saveProject shape) → zip entries of packed typed arrays. */
+  function encodeWalls(walls) {
+    var count = walls.length, pointCount = 0, i;
+    for (i = 0; i < count; i++) pointCount += walls[i].points ? walls[i].points.length : 2;
+    var points = new Float64Array(pointCount * 2);
+    var starts = new Uint32Array(count + 1);
+    var kind = new Uint8Array(count);
+    var attrs = new Float64Array(count * WALL_ATTRS.length);
+    var style = new Uint16Array(count * 2);
+    var ids = new Array(count);
+    var elementTypes = [], colors = [], elementLookup = {}, colorLookup = {};
+    var p = 0;
+    for (i = 0; i < count; i++) {
+      var w = walls[i];
+      var pts = w.points || [w.p1 || { x: 0, y: 0 }, w.p2 || { x: 0, y: 0 }];
+      starts[i] = p;
+      kind[i] = w.points ? 1 : 0;
+      for (var k = 0; k < pts.length; k++, p++) {
+        points[2 * p] = pts[k].x;
+        points[2 * p + 1] = pts[k].y;
+      }
+      for (var a = 0; a < WALL_ATTRS.length; a++) {
+        var v = w[WALL_ATTRS[a]];
+        attrs[i * WALL_ATTRS.length + a] = v === undefined || v === null ? NaN : +v;
+      }
+      style[2 * i] = tableIndex(elementTypes, elementLookup, w.elementType);
+      style[2 * i + 1] = tableIndex(colors, colorLookup, w.color);
+      ids[i] = w.id;
+    }
+    starts[count] = p;
+    var meta = { count: count, points: pointCount, ids: ids, elementTypes: elementTypes, colors: colors };
+    return [
+      { name: "walls/meta.json", parts: [jsonBytes(meta)], compress: true },
+      { name: "walls/points.f64", parts: [asBytes(points)], compress: true },
+      { name: "walls/starts.u32", parts: [asBytes(starts)], compress: true },
+      { name: "walls/kind.u8", parts: [kind], compress: true },
+      { name: "walls/attrs.f64", parts: [asBytes(attrs)], compress: true },
+      { name: "walls/style.u16", parts: [asBytes(style)], compress: true }
+    ];
+  }
+
+  function decodeWalls(archive) {
+    if (!archive.has("walls/meta.json")) return Promise.resolve([]);
+    return Promise.all([
+      archive.json("walls/meta.json"),
+      archive.bytes("walls/points.f64"), archive.bytes("walls/starts.u32"), archive.bytes("walls/kind.u8"),
+      archive.bytes("walls/attrs.f64"), archive.bytes("walls/style.u16")
+    ]).then(function (s) {
+      var meta = s[0];
+      var points = new Float64Array(s[1].buffer, s[1].byteOffset, s[1].byteLength / 8);
+      var starts = new Uint32Array(s[2].buffer, s[2].byteOffset, s[2].byteLength / 4);
+      var kind = s[3];
+      var attrs = new Float64Array(s[4].buffer, s[4].byteOffset, s[4].byteLength / 8);
+      var style = new Uint16Array(s[5].buffer, s[5].byteOffset, s[5].byteLength / 2);
+      var walls = new Array(meta.count);
+      for (var i = 0; i < meta.count; i++) {
+        var w = { id: meta.ids[i] };
+        for (var a = 0; a < WALL_ATTRS.length; a++) {
+          var v = attrs[i * WALL_ATTRS.length + a];
+          if (!isNaN(v)) w[WALL_ATTRS[a]] = v;
+        }
+        if (style[2 * i] !== NO_INDEX) w.elementType = meta.elementTypes[style[2 * i]];
+        if (style[2 * i + 1] !== NO_INDEX) w.color = meta.colors[style[2 * i + 1]];
+        var pts = [];
+        for (var p = starts[i]; p < starts[i + 1]; p++) pts.push({ x: points[2 * p], y: points[2 * p + 1] });
+        if (kind[i] === 1) w.points = pts;
+        else { w.p1 = pts[0]; w.p2 = pts[1]; }
+        walls[i] = w;
+      }
+      return walls;
+    });
+  }
+
+  // ─── Antennas ────────────────────────────────────────────────────────────────
+
+  /** Patterns stored once: aps and the pattern list refer to them by index. */
+  function encodeAntennas(projectData) {
+    var patterns = [], lookup = {};
+    function patternIndex(pattern) {
+      if (!pattern) return null;
+      var key = JSON.stringify(pattern);
+      if (!(key in lookup)) { lookup[key] = patterns.length; patterns.push(pattern); }
+      return lookup[key];
+    }
+    var aps = (projectData.aps || []).map(function (ap) {
+      var out = {};
+      for (var k in ap) if (k !== "antennaPattern") out[k] = ap[k];
+      if (ap.antennaPattern) out.pattern = patternIndex(ap.antennaPattern);
+      return out;
+    });
+    return {
+      aps: aps,
+      patterns: patterns,
+      antennaPatterns: (projectData.antennaPatterns || []).map(patternIndex),
+      defaultAntennaPatternIndex: projectData.defaultAntennaPatternIndex
+    };
+  }
+
+  function decodeAntennas(section) {
+    var patterns = section.patterns || [];
+    return {
+      aps: (section.aps || []).map(function (ap) {
+        var out = {};
+        for (var k in ap) if (k !== "pattern") out[k] = ap[k];
+        if (ap.pattern !== undefined && ap.pattern !== null) out.antennaPattern = patterns[ap.pattern];
+        return out;
+      }),
+      antennaPatterns: (section.antennaPatterns || []).map(function (i) { return patterns[i]; }),
+      defaultAntennaPatternIndex: section.defaultAntennaPatternIndex
+    };
+  }
+
+  // ─── Image ───────────────────────────────────────────────────────────────────
+
+  /** The image's file bytes: the Blob it was loaded from, its data:/blob: URL, or a PNG re-encode. */
+  function imageBlob(img) {
+    if (!img) return Promise.resolve(null);
+    if (img.ipsSourceBlob) return Promise.resolve(img.ipsSourceBlob);
+    var src = img.currentSrc || img.src || "";
+    var fetched = /^(data|blob):/.test(src)
+      ? fetch(src).then(function (r) { return r.blob(); })
+      : Promise.reject(new Error("not a local image"));
+    return fetched.catch(function () {
+      return new Promise(function (resolve) {
+        var canvas = document.createElement("canvas");
+        canvas.width = img.width;
+        canvas.height = img.height;
+        canvas.getContext("2d").drawImage(img, 0, 0);
+        canvas.toBlob(resolve, "image/png");
+      });
+    });
+  }
+
+  // ─── Build ───────────────────────────────────────────────────────────────────
+
+  /**
+   * Archive Blob for `projectData` (saveProject shape, without the base64 image).
+   * `extras.image` is the background HTMLImageElement; `extras.rsrp` the per-antenna
+   * RSRP cache ({antId: values}), `extras.fingerprints` their fingerprints ({antId: string};
+   * grids without one are not saved) and `extras.w/h` the floor size the grids belong to.
+   */
+  function build(projectData, extras) {
+    extras = extras || {};
+    var settings = {};
+    for (var key in projectData) if (SECTION_KEYS.indexOf(key) < 0) settings[key] = projectData[key];
+    var walls = projectData.walls || [];
+    var entries = [
+      { name: "settings.json", parts: [jsonBytes(settings)], compress: true },
+      { name: "antennas.json", parts: [jsonBytes(encodeAntennas(projectData))], compress: true },
+      { name: "floorplanes.json", parts: [jsonBytes(projectData.floorPlanes || [])], compress: true }
+    ].concat(encodeWalls(walls));
+    if (projectData.csvCoverageData) {
+      entries.push({ name: "coverage.json", parts: [jsonBytes(projectData.csvCoverageData)], compress: true });
+    }
+
+    var rsrpIds = [], rsrpFingerprints = [];
+    var cache = extras.rsrp || {};
+    var fingerprints = extras.fingerprints || {};
+    for (var antId in cache) {
+      var values = cache[antId];
+      if (!values || !values.length || !fingerprints[antId]) continue;
+      var grid = values instanceof Float32Array ? values : Float32Array.from(values);
+      entries.push({ name: "rsrp/" + rsrpIds.length + ".f32", parts: [asBytes(grid)], compress: true });
+      rsrpIds.push(antId);
+      rsrpFingerprints.push(fingerprints[antId]);
+    }
+    if (rsrpIds.length) {
+      entries.push({ name: "rsrp/index.json", compress: true,
+                     parts: [jsonBytes({ antIds: rsrpIds, fingerprints: rsrpFingerprints,
+                                         bins: cache[rsrpIds[0]].length, w: extras.w, h: extras.h })] });
+    }
+
+    return imageBlob(extras.image).then(function (image) {
+      var manifest = {
+        format: FORMAT, version: FORMAT_VERSION, savedAt: new Date().toISOString(),
+        counts: { aps: (projectData.aps || []).length, walls: walls.length,
+                  floorPlanes: (projectData.floorPlanes || []).length, rsrp: rsrpIds.length },
+        image: image ? { type: image.type || "image/png", size: image.size } : null
+      };
+      var imageEntry = image
+        ? image.arrayBuffer().then(function (buf) { return [{ name: "image.bin", parts: [new Uint8Array(buf)] }]; })
+        : Promise.resolve([]);
+      return imageEntry.then(function (imageEntries) {
+        var all = entries.concat(imageEntries);
+        manifest.sections = all.map(function (e) { return e.name; });
+        // Manifest first, so a reader can check the format before anything else
+        return ZipStore.buildAsync([{ name: "manifest.json", parts: [jsonBytes(manifest)] }].concat(all));
+      });
+    }).then(function (parts) {
+      return new Blob(parts, { type: MIME });
+    });
+  }
+
+  // ─── Read ────────────────────────────────────────────────────────────────────
+
+  function isArchive(file) {
+    return ZipStore.isZip(file);
+  }
+
+  /** Open an archive; resolves to {zip, manifest} after checking format and version. */
+  function open(file) {
+    return ZipStore.open(file).then(function (zip) {
+      if (!zip.has("manifest.json")) throw new Error("Not an IPS project archive");
+      return zip.json("manifest.json").then(function (manifest) {
+        if (manifest.format !== FORMAT) throw new Error("Not an IPS project archive");
+        if (manifest.version > FORMAT_VERSION) {
+          throw new Error("Project was saved by a newer version (format " + manifest.version + ")");
+        }
+        return { zip: zip, manifest: manifest };
+      });
+    });
+  }
+
+  /** projectData (loadProject shape) without the image and RSRP grids. */
+  function readProject(archive) {
+    var zip = archive.zip;
+    return Promise.all([
+      zip.json("settings.json"),
+      zip.json("antennas.json"),
+      zip.has("floorplanes.json") ? zip.json("floorplanes.json") : [],
+      decodeWalls(zip),
+      zip.has("coverage.json") ? zip.json("coverage.json") : null
+    ]).then(function (s) {
+      var projectData = s[0];
+      var antennas = decodeAntennas(s[1]);
+      projectData.aps = antennas.aps;
+      projectData.antennaPatterns = antennas.antennaPatterns;
+      projectData.defaultAntennaPatternIndex = antennas.defaultAntennaPatternIndex;
+      projectData.floorPlanes = s[2];
+      projectData.walls = s[3];
+      if (s[4]) projectData.csvCoverageData = s[4];
+      return projectData;
+    });
+  }
+
+  /** Background image as an HTMLImageElement (null when the project has none). */
+  function readImage(archive) {
+    var info = archive.manifest.image;
+    if (!info || !archive.zip.has("image.bin")) return Promise.resolve(null);
+    return archive.zip.blob("image.bin", info.type).then(function (blob) {
+      return new Promise(function (resolve, reject) {
+        var url = URL.createObjectURL(blob);
+        var img = new Image();
+        img.onload = function () {
+          URL.revokeObjectURL(url);
+          img.ipsSourceBlob = blob;      // re-saved as-is, without a re-encode
+          resolve(img);
+        };
+        img.onerror = function () {
+          URL.revokeObjectURL(url);
+          reject(new Error("Failed to load image"));
+        };
+        img.src = url;
+      });
+    });
+  }
+
+  /** Cached RSRP grids: {antIds, fingerprints, bins, w, h, grids: {antId: Float32Array}}, or null. */
+  function readRsrp(archive) {
+    var zip = archive.zip;
+    if (!zip.has("rsrp/index.json")) return Promise.resolve(null);
+    return zip.json("rsrp/index.json").then(function (index) {
+      return Promise.all(index.antIds.map(function (antId, i) {
+        return zip.bytes("rsrp/" + i + ".f32");
+      })).then(function (arrays) {
+        index.grids = {};
+        index.antIds.forEach(function (antId, i) {
+          index.grids[antId] = new Float32Array(arrays[i].buffer, arrays[i].byteOffset, arrays[i].byteLength / 4);
+        });
+        return index;
+      });
+    });
+  }
+
+  /** Open + readProject, for callers that only need the plain project data. */
+  function toProjectData(file) {
+    return open(file).then(readProject);
+  }
+
+  return {
+    FORMAT_VERSION: FORMAT_VERSION,
+    EXTENSION: EXTENSION,
+    MIME: MIME,
+    build: build,
+    isArchive: isArchive,
+    open: open,
+    readProject: readProject,
+    readImage: readImage,
+    readRsrp: readRsrp,
+    toProjectData: toProjectData
+  };
+})();
+
+window.ProjectArchive = ProjectArchive;
@@ -1,13 +1,14 @@
 //
 // ProjectIO.js
-// Serializes the entire project state to/from JSON for save/load,
-// handles background image serialization, and DXF import/export.
+// Saves the project state as a binary archive (.ipsz, see ProjectArchive.js) and
+// loads archives or legacy JSON projects; handles background image
+// serialization and DXF import/export.
 //
 // All functions are exposed on window for global access.
 //
 // Depends on: global state, draw(), renderAPs(), renderWalls(),
 //             invalidateHeatmapCache(), updateAntennaPatternsList(),
-//             document.getElementById() and add() helpers
+//             document.getElementById() and add() helpers, ProjectArchive, RsrpSnapshot
 //
 // Called by:
 //   Save Project button — saveProject()
@@ -44,134 +45,138 @@
     });
   }
 
+  /** Serializable copy of the project state; the background image is saved separately. */
+  function buildProjectData() {
+    return {
+      version: "1.0",
+      savedAt: new Date().toISOString(),
+      // Core dimensions
+      w: state.w,
+      h: state.h,
+      res: state.res,
+      // Propagation model settings
+      model: state.model,
+      freq: state.freq,
+      N: state.N,
+      refl: state.refl,
+      noise: state.noise,
+      // View settings
+      view: state.view,
+      viewMode: state.viewMode,
+      viewModeTarget: state.viewModeTarget,
+      minVal: state.minVal,
+      maxVal: state.maxVal,
+      complianceThreshold: state.complianceThreshold,
+      compliancePercentage: state.compliancePercentage,
+      optFinancialCostWeight: state.optFinancialCostWeight,
+      optRsrpWeight: state.optRsrpWeight,
+      optHomogeneityWeight: state.optHomogeneityWeight,
+      optNumTrials: state.optNumTrials,
+      optMaxChanges: state.optMaxChanges,
+      optTemp: state.optTemp,
+      optMinimumTemp: state.optMinimumTemp,
+      weak: state.weak,
+      mid: state.mid,
+      strong: state.strong,
+      showContours: state.showContours,
+      contourThresholds: state.contourThresholds,
+      showTooltip: state.showTooltip,
+      showVisualization: state.showVisualization,
+      // Background image (as base64)
+      backgroundImageAlpha: state.backgroundImageAlpha,
+      // Antennas
+      aps: state.aps.map(function (ap) {
+        var apData = {
+          id: ap.id,
+          x: ap.x,
+          y: ap.y,
+          z: ap.z,
+          tx: ap.tx,
+          gt: ap.gt,
+          ch: ap.ch,
+          azimuth: ap.azimuth,
+          tilt: ap.tilt,
+          enabled: ap.enabled !== undefined ? ap.enabled : true,
+        };
+        if (ap.antennaPattern && ap.antennaPatternFileName) {
+          apData.antennaPattern = ap.antennaPattern;
+          apData.antennaPatternFileName = ap.antennaPatternFileName;
+        }
+        return apData;
+      }),
+      // Walls
+      walls: state.walls.map(function (w) {
+        var wallData = {
+          id: w.id,
+          loss: w.loss,
+          color: w.color,
+          thickness: w.thickness,
+          height: w.height,
+          elementType: w.elementType,
+          width: w.width,
+        };
+        if (w.points && Array.isArray(w.points) && w.points.length >= 2) {
+          wallData.points = w.points.map(function(p) {
+            return { x: p.x, y: p.y };
+          });
+        } else if (w.p1 && w.p2) {
+          wallData.p1 = { x: w.p1.x, y: w.p1.y };
+          wallData.p2 = { x: w.p2.x, y: w.p2.y };
+        }
+        return wallData;
+      }),
+      // Floor planes
+      floorPlanes: state.floorPlanes.map(function (fp) {
+        return {
+          p1: { x: fp.p1.x, y: fp.p1.y },
+          p2: { x: fp.p2.x, y: fp.p2.y },
+          p3: { x: fp.p3.x, y: fp.p3.y },
+          p4: { x: fp.p4.x, y: fp.p4.y },
+          attenuation: fp.attenuation,
+          height: fp.height,
+          type: fp.type,
+          inclination: fp.inclination,
+          inclinationDirection: fp.inclinationDirection,
+          imgP1: fp.imgP1 ? { x: fp.imgP1.x, y: fp.imgP1.y } : null,
+          imgP2: fp.imgP2 ? { x: fp.imgP2.x, y: fp.imgP2.y } : null,
+          imgP3: fp.imgP3 ? { x: fp.imgP3.x, y: fp.imgP3.y } : null,
+          imgP4: fp.imgP4 ? { x: fp.imgP4.x, y: fp.imgP4.y } : null,
+        };
+      }),
+      // Antenna patterns
+      antennaPatterns: state.antennaPatterns,
+      defaultAntennaPatternIndex: state.defaultAntennaPatternIndex,
+      // Ground plane settings
+      groundPlane: state.groundPlane,
+      // 3D view settings
+      cameraRotationX: state.cameraRotationX,
+      cameraRotationY: state.cameraRotationY,
+      cameraZoom: state.cameraZoom,
+      cameraPanX: state.cameraPanX,
+      cameraPanY: state.cameraPanY,
+      // CSV coverage data
+      csvCoverageData: state.csvCoverageData,
+    };
+  }
+
   function saveProject() {
     try {
-      // Create a copy of state with serializable data
-      var projectData = {
-        version: "1.0",
-        savedAt: new Date().toISOString(),
-        // Core dimensions
+      var ext = ProjectArchive.EXTENSION;
+      var blobPromise = ProjectArchive.build(buildProjectData(), {
+        image: state.backgroundImage,
+        rsrp: state.backendRsrpPerAntenna,
+        fingerprints: RsrpSnapshot.fingerprints(),
         w: state.w,
-        h: state.h,
-        res: state.res,
-        // Propagation model settings
-        model: state.model,
-        freq: state.freq,
-        N: state.N,
-        refl: state.refl,
-        noise: state.noise,
-        // View settings
-        view: state.view,
-        viewMode: state.viewMode,
-        viewModeTarget: state.viewModeTarget,
-        minVal: state.minVal,
-        maxVal: state.maxVal,
-        complianceThreshold: state.complianceThreshold,
-        compliancePercentage: state.compliancePercentage,
-        optFinancialCostWeight: state.optFinancialCostWeight,
-        optRsrpWeight: state.optRsrpWeight,
-        optHomogeneityWeight: state.optHomogeneityWeight,
-        optNumTrials: state.optNumTrials,
-        optMaxChanges: state.optMaxChanges,
-        optTemp: state.optTemp,
-        optMinimumTemp: state.optMinimumTemp,
-        weak: state.weak,
-        mid: state.mid,
-        strong: state.strong,
-        showContours: state.showContours,
-        showTooltip: state.showTooltip,
-        showVisualization: state.showVisualization,
-        // Background image (as base64)
-        backgroundImage: state.backgroundImage
-          ? imageToBase64(state.backgroundImage)
-          : null,
-        backgroundImageAlpha: state.backgroundImageAlpha,
-        // Antennas
-        aps: state.aps.map(function (ap) {
-          var apData = {
-            id: ap.id,
-            x: ap.x,
-            y: ap.y,
-            z: ap.z,
-            tx: ap.tx,
-            gt: ap.gt,
-            ch: ap.ch,
-            azimuth: ap.azimuth,
-            tilt: ap.tilt,
-            enabled: ap.enabled !== undefined ? ap.enabled : true,
-          };
-          if (ap.antennaPattern && ap.antennaPatternFileName) {
-            apData.antennaPattern = ap.antennaPattern;
-            apData.antennaPatternFileName = ap.antennaPatternFileName;
-          }
-          return apData;
-        }),
-        // Walls
-        walls: state.walls.map(function (w) {
-          var wallData = {
-            id: w.id,
-            loss: w.loss,
-            color: w.color,
-            thickness: w.thickness,
-            height: w.height,
-            elementType: w.elementType,
-            width: w.width,
-          };
-          if (w.points && Array.isArray(w.points) && w.points.length >= 2) {
-            wallData.points = w.points.map(function(p) {
-              return { x: p.x, y: p.y };
-            });
-          } else if (w.p1 && w.p2) {
-            wallData.p1 = { x: w.p1.x, y: w.p1.y };
-            wallData.p2 = { x: w.p2.x, y: w.p2.y };
-          }
-          return wallData;
-        }),
-        // Floor planes
-        floorPlanes: state.floorPlanes.map(function (fp) {
-          return {
-            p1: { x: fp.p1.x, y: fp.p1.y },
-            p2: { x: fp.p2.x, y: fp.p2.y },
-            p3: { x: fp.p3.x, y: fp.p3.y },
-            p4: { x: fp.p4.x, y: fp.p4.y },
-            attenuation: fp.attenuation,
-            height: fp.height,
-            type: fp.type,
-            inclination: fp.inclination,
-            inclinationDirection: fp.inclinationDirection,
-            imgP1: fp.imgP1 ? { x: fp.imgP1.x, y: fp.imgP1.y } : null,
-            imgP2: fp.imgP2 ? { x: fp.imgP2.x, y: fp.imgP2.y } : null,
-            imgP3: fp.imgP3 ? { x: fp.imgP3.x, y: fp.imgP3.y } : null,
-            imgP4: fp.imgP4 ? { x: fp.imgP4.x, y: fp.imgP4.y } : null,
-          };
-        }),
-        // Antenna patterns
-        antennaPatterns: state.antennaPatterns,
-        defaultAntennaPatternIndex: state.defaultAntennaPatternIndex,
-        // Ground plane settings
-        groundPlane: state.groundPlane,
-        // 3D view settings
-        cameraRotationX: state.cameraRotationX,
-        cameraRotationY: state.cameraRotationY,
-        cameraZoom: state.cameraZoom,
-        cameraPanX: state.cameraPanX,
-        cameraPanY: state.cameraPanY,
-        // CSV coverage data
-        csvCoverageData: state.csvCoverageData,
-      };
+        h: state.h
+      });
 
-      var json = JSON.stringify(projectData, null, 2);
-      var blob = new Blob([json], { type: "application/json" });
-
-      // Determine default filename
+      // Determine default filename (legacy .json / .ipsproject names are saved as archives)
       var defaultFileName =
         state.currentProjectFileName ||
-        "ips-project-" + new Date().toISOString().slice(0, 10) + ".json";
-      if (defaultFileName.endsWith(".ipsproject")) {
-        defaultFileName = defaultFileName.replace(".ipsproject", ".json");
-      } else if (!defaultFileName.endsWith(".json")) {
+        "ips-project-" + new Date().toISOString().slice(0, 10) + ext;
+      if (!defaultFileName.endsWith(ext)) {
         defaultFileName =
-          defaultFileName.replace(/\.[^/.]+$/, "") + ".json";
+          defaultFileName.replace(/\.[^/.]+$/, "") + ext;
       }
 
       // File System Access API only works in top-level frames, not cross-origin iframes (e.g. Anvil)
@@ -185,7 +190,7 @@
               {
                 description: "IPS Studio Project",
                 accept: {
-                  "application/json": [".json"],
+                  "application/zip": [ext],
                 },
               },
             ],
@@ -195,7 +200,9 @@
             return handle.createWritable();
           })
           .then(function (writable) {
-            return writable.write(blob).then(function () {
+            return blobPromise.then(function (blob) {
+              return writable.write(blob);
+            }).then(function () {
               return writable.close();
             });
           })
@@ -210,7 +217,11 @@
           .catch(function (error) {
             if (error.name !== "AbortError") {
               console.error("Error saving project:", error);
-              downloadProject(blob, defaultFileName);
+              blobPromise.then(function (blob) {
+                downloadProject(blob, defaultFileName);
+              }).catch(function (buildError) {
+                NotificationSystem.error("Failed to save project.\n" + buildError.message);
+              });
             }
           });
       } else {
@@ -219,13 +230,18 @@
           "Save Project",
           function(fileName) {
             if (fileName !== null && fileName.trim() !== "") {
-              if (!fileName.endsWith(".json")) {
-                fileName = fileName + ".json";
+              if (!fileName.endsWith(ext)) {
+                fileName = fileName + ext;
               }
-              downloadProject(blob, fileName);
+              blobPromise.then(function (blob) {
+                downloadProject(blob, fileName);
+              }).catch(function (error) {
+                console.error("Error saving project:", error);
+                NotificationSystem.error("Failed to save project.\n" + error.message);
+              });
             }
           },
-          { inputPlaceholder: defaultFileName.replace(".json", ""), confirmLabel: 'Save' }
+          { inputPlaceholder: defaultFileName.replace(ext, ""), confirmLabel: 'Save' }
         );
       }
     } catch (error) {
@@ -252,370 +268,495 @@
     currentAntennaDataFileName = null;
     antennaPositionHistory = [];
 
-    var reader = new FileReader();
-    reader.onload = function (event) {
-      try {
-        var projectData = JSON.parse(event.target.result);
-
-        if (!projectData.version) {
-          NotificationSystem.error("Invalid project file format.");
-          return;
+    ProjectArchive.isArchive(file).then(function (isArchive) {
+      if (isArchive) {
+        loadProjectArchive(file);
+        return;
+      }
+      // Legacy JSON project (image inline as base64)
+      var reader = new FileReader();
+      reader.onload = function (event) {
+        try {
+          applyProjectData(JSON.parse(event.target.result));
+        } catch (error) {
+          console.error("Error loading project:", error);
+          NotificationSystem.error("Error loading project: " + error.message);
         }
+      };
+      reader.readAsText(file);
+    });
+  }
 
-        // Restore core dimensions
-        // For JSON/DXF files, preserve original aspect ratio instead of forcing 30:20
-        var offsetX = 0;
-        var offsetY = 0;
-        
-        if (projectData.w && projectData.h) {
-          var originalAspectRatio = projectData.w / projectData.h;
-          var canvasAspectRatio = 30 / 20;
-          
-          var p = (typeof pad === 'function') ? pad() : 50;
-          var availW = canvas.width - 2 * p;
-          var availH = canvas.height - 2 * p;
-          var canvasAR = availW / availH;
-          
-          if (originalAspectRatio > canvasAspectRatio) {
-              state.w = projectData.w;
-              state.h = state.w / canvasAR;
-          } else {
-              state.h = projectData.h;
-              state.w = state.h * canvasAR;
-          }
+  /**
+   * .ipsz archive: settings and geometry first, then the background image and cached RSRP grids.
+   * The backend is only asked for RSRP once the grids are restored, so it recomputes just the
+   * antennas whose grid is missing or out of date.
+   */
+  function loadProjectArchive(file) {
+    ProjectArchive.open(file).then(function (archive) {
+      return ProjectArchive.readProject(archive).then(function (projectData) {
+        if (!applyProjectData(projectData, { deferBackendSync: true })) return;
+        restoreBackgroundImage(ProjectArchive.readImage(archive), projectData.backgroundImageAlpha);
+        return ProjectArchive.readRsrp(archive).then(restoreRsrpGrids, function (error) {
+          console.warn("[RSRP] Could not read cached grids:", error);
+        }).then(function () {
+          if (window.syncLiveRsrpFromModel) window.syncLiveRsrpFromModel("project_load");
+        });
+      });
+    }).catch(function (error) {
+      console.error("Error loading project:", error);
+      NotificationSystem.error("Error loading project: " + error.message);
+    });
+  }
 
-          offsetX = (state.w - projectData.w) / 2;
-          offsetY = (state.h - projectData.h) / 2;
+  function restoreBackgroundImage(imagePromise, alpha) {
+    return imagePromise
+      .then(function (img) {
+        if (!img) return;
+        state.backgroundImage = img;
+        state.floorPlanImage = img;
+        if (alpha !== undefined) {
+          state.backgroundImageAlpha = alpha;
+        }
+
+        var imgAspectRatio = img.width / img.height;
+        var canvasAspectRatio = state.w / state.h;
 
-          state.backgroundImageAspectRatio = originalAspectRatio;
+        if (imgAspectRatio > canvasAspectRatio) {
           state.backgroundImageDisplayWidth = state.w;
-          state.backgroundImageDisplayHeight = state.h;
+          state.backgroundImageDisplayHeight = state.w / imgAspectRatio;
         } else {
-          if (projectData.w) state.w = projectData.w;
-          if (projectData.h) state.h = projectData.h;
+          state.backgroundImageDisplayWidth = state.h * imgAspectRatio;
+          state.backgroundImageDisplayHeight = state.h;
         }
-        if (projectData.res) state.res = projectData.res;
-
-
-
-        // Restore propagation model
-        if (projectData.model) state.model = projectData.model;
-        if (projectData.freq !== undefined) state.freq = projectData.freq;
-        if (projectData.N !== undefined) state.N = projectData.N;
-        if (projectData.refl !== undefined) state.refl = projectData.refl;
-        if (projectData.noise !== undefined)
-          state.noise = projectData.noise;
-
-        // Restore view settings
-        if (projectData.view) state.view = projectData.view;
-        if (projectData.viewMode) state.viewMode = projectData.viewMode;
-        if (projectData.viewModeTarget)
-          state.viewModeTarget = projectData.viewModeTarget;
-        if (projectData.minVal !== undefined)
-          state.minVal = projectData.minVal;
-        if (projectData.maxVal !== undefined)
-          state.maxVal = projectData.maxVal;
-        if (projectData.complianceThreshold !== undefined)
-          state.complianceThreshold = projectData.complianceThreshold;
-        if (projectData.compliancePercentage !== undefined)
-          state.compliancePercentage = projectData.compliancePercentage;
-        if (projectData.optFinancialCostWeight !== undefined)
-          state.optFinancialCostWeight = projectData.optFinancialCostWeight;
-        if (projectData.optRsrpWeight !== undefined)
-          state.optRsrpWeight = projectData.optRsrpWeight;
-        if (projectData.optHomogeneityWeight !== undefined)
-          state.optHomogeneityWeight = projectData.optHomogeneityWeight;
-        if (projectData.optNumTrials !== undefined)
-          state.optNumTrials = projectData.optNumTrials;
-        if (projectData.optMaxChanges !== undefined)
-          state.optMaxChanges = projectData.optMaxChanges;
-        if (projectData.optTemp !== undefined)
-          state.optTemp = projectData.optTemp;
-        if (projectData.optMinimumTemp !== undefined)
-          state.optMinimumTemp = projectData.optMinimumTemp;
-        if (projectData.weak) state.weak = projectData.weak;
-        if (projectData.mid) state.mid = projectData.mid;
-        if (projectData.strong) state.strong = projectData.strong;
-        if (projectData.showContours !== undefined)
-          state.showContours = projectData.showContours;
-        if (projectData.showTooltip !== undefined)
-          state.showTooltip = projectData.showTooltip;
-        if (projectData.showVisualization !== undefined)
-          state.showVisualization = projectData.showVisualization;
-
-        // Restore background image
-        if (projectData.backgroundImage) {
-          base64ToImage(projectData.backgroundImage)
-            .then(function (img) {
-              state.backgroundImage = img;
-              state.floorPlanImage = img;
-              if (projectData.backgroundImageAlpha !== undefined) {
-                state.backgroundImageAlpha =
-                  projectData.backgroundImageAlpha;
-              }
-              
-              var imgAspectRatio = img.width / img.height;
-              var canvasAspectRatio = state.w / state.h;
-              
-              if (imgAspectRatio > canvasAspectRatio) {
-                state.backgroundImageDisplayWidth = state.w;
-                state.backgroundImageDisplayHeight = state.w / imgAspectRatio;
-              } else {
-                state.backgroundImageDisplayWidth = state.h * imgAspectRatio;
-                state.backgroundImageDisplayHeight = state.h;
-              }
-              state.backgroundImageAspectRatio = imgAspectRatio;
-              
-              updateDeleteImageButton();
-              draw();
-            })
-            .catch(function (error) {
-              console.error("Error loading image:", error);
-              NotificationSystem.warning("Could not load background image.");
-            });
+        state.backgroundImageAspectRatio = imgAspectRatio;
+
+        updateDeleteImageButton();
+        draw();
+      })
+      .catch(function (error) {
+        console.error("Error loading image:", error);
+        NotificationSystem.warning("Could not load background image.");
+      });
+  }
+
+  function clearBackgroundImage() {
+    state.backgroundImage = null;
+    state.floorPlanImage = null;
+    state.backgroundImageAspectRatio = null;
+    state.backgroundImageDisplayWidth = null;
+    state.backgroundImageDisplayHeight = null;
+    updateDeleteImageButton();
+  }
+
+  /** Archived per-antenna grids back into the accurate-engine cache, for antennas whose fingerprint
+   *  (antenna, walls, patterns, backend version) still matches — a refitted floor matches none. */
+  function restoreRsrpGrids(rsrp) {
+    if (!rsrp) return;
+    var restored = RsrpSnapshot.restore(rsrp);
+    console.log("[RSRP] Restored", restored, "of", rsrp.antIds.length, "saved antenna grids");
+    if (!restored) return;
+    invalidateHeatmapCache();   // merges the cache into the accurate-engine grid
+    draw();
+  }
+
+  /**
+   * Restore a parsed project (legacy JSON or ProjectArchive.readProject). Returns the
+   * {offsetX, offsetY} applied to fit the canvas, or null when the data is invalid.
+   * `options.deferBackendSync` leaves syncLiveRsrpFromModel (the RSRP request) to the caller.
+   */
+  function applyProjectData(projectData, options) {
+    try {
+      if (!projectData.version) {
+        NotificationSystem.error("Invalid project file format.");
+        return null;
+      }
+
+      // Restore core dimensions
+      // For JSON/DXF files, preserve original aspect ratio instead of forcing 30:20
+      var offsetX = 0;
+      var offsetY = 0;
+      
+      if (projectData.w && projectData.h) {
+        var originalAspectRatio = projectData.w / projectData.h;
+        var canvasAspectRatio = 30 / 20;
+        
+        var p = (typeof pad === 'function') ? pad() : 50;
+        var availW = canvas.width - 2 * p;
+        var availH = canvas.height - 2 * p;
+        var canvasAR = availW / availH;
+        
+        if (originalAspectRatio > canvasAspectRatio) {
+            state.w = projectData.w;
+            state.h = state.w / canvasAR;
         } else {
-          state.backgroundImage = null;
-          state.floorPlanImage = null;
-          state.backgroundImageAspectRatio = null;
-          state.backgroundImageDisplayWidth = null;
-          state.backgroundImageDisplayHeight = null;
-          updateDeleteImageButton();
+            state.h = projectData.h;
+            state.w = state.h * canvasAR;
         }
 
-        // Restore antennas
-        state.aps = [];
-        if (projectData.aps && Array.isArray(projectData.aps)) {
-          projectData.aps.forEach(function (apData) {
-            var ap = {
-              id: apData.id || "AP" + (state.aps.length + 1),
-              x: (apData.x || 0) + offsetX,
-              y: (apData.y || 0) + offsetY,
-              z: apData.z,
-              tx: apData.tx || 10,
-              gt: apData.gt || 5,
-              ch: apData.ch || 1,
-              azimuth: apData.azimuth || 0,
-              tilt: apData.tilt || 0,
-              enabled: apData.enabled !== undefined ? apData.enabled : true,
-            };
-            if (apData.antennaPattern) {
-              var patternStr = JSON.stringify(apData.antennaPattern);
-              ap.antennaPattern = JSON.parse(patternStr);
-              
-              if (!ap.antennaPattern.horizontalData || !Array.isArray(ap.antennaPattern.horizontalData)) {
-                ap.antennaPattern.horizontalData = [];
-              }
-              if (!ap.antennaPattern.verticalData || !Array.isArray(ap.antennaPattern.verticalData)) {
-                ap.antennaPattern.verticalData = [];
-              }
-              
-              ap.antennaPatternFileName = apData.antennaPatternFileName;
-            }
-            state.aps.push(ap);
-          });
-          state.cachedHeatmap = null;
-          state.heatmapUpdatePending = false;
-        }
+        offsetX = (state.w - projectData.w) / 2;
+        offsetY = (state.h - projectData.h) / 2;
 
-        // Restore walls
-        state.walls = [];
-        var typeCounters = {};
-        if (projectData.walls && Array.isArray(projectData.walls)) {
-          projectData.walls.forEach(function (wData) {
-            var elementType = wData.elementType || "wall";
-            var defaultColor = "#60a5fa";
-            var defaultThickness = 3;
-            var defaultLoss = 3;
-
-            if (elementType === "window") {
-              defaultColor = "#3b82f6";
-              defaultThickness = 2;
-              defaultLoss = 1;
-            } else if (elementType === "door") {
-              defaultColor = "#a16207";
-              defaultThickness = 2;
-              defaultLoss = 4;
-            } else if (elementType === "doubleDoor") {
-              defaultColor = "#a16207";
-              defaultThickness = 2;
-              defaultLoss = 4;
-            }
+        state.backgroundImageAspectRatio = originalAspectRatio;
+        state.backgroundImageDisplayWidth = state.w;
+        state.backgroundImageDisplayHeight = state.h;
+      } else {
+        if (projectData.w) state.w = projectData.w;
+        if (projectData.h) state.h = projectData.h;
+      }
+      if (projectData.res) state.res = projectData.res;
 
-            var wallType = wData.type;
-            if (!wallType && elementType === "wall") {
-              for (var t in wallTypes) {
-                if (wallTypes[t].loss == (wData.loss !== undefined ? wData.loss : defaultLoss) &&
-                  wallTypes[t].color == (wData.color || defaultColor)) {
-                  wallType = t;
-                  break;
-                }
-              }
-            }
 
-            var baseName = "Wall";
-            if (elementType === "window") {
-              baseName = "Window";
-            } else if (elementType === "door") {
-              baseName = "Door";
-            } else if (elementType === "doubleDoor") {
-              baseName = "DoubleDoor";
-            } else if (wallType && wallTypes[wallType]) {
-              baseName = wallTypes[wallType].name;
-            }
 
-            if (!typeCounters[baseName]) typeCounters[baseName] = 0;
-            typeCounters[baseName]++;
-
-            var name = baseName + "_" + typeCounters[baseName];
-
-            var wall = {
-              id: wData.id || "wall-" + Date.now() + "-" + Math.random(),
-              name: wData.name || name,
-              type: wallType,
-              loss: wData.loss !== undefined ? wData.loss : defaultLoss,
-              color: wData.color || defaultColor,
-              thickness: wData.thickness || defaultThickness,
-              height: wData.height,
-              elementType: elementType,
-              width: wData.width,
-            };
+      // Restore propagation model
+      if (projectData.model) state.model = projectData.model;
+      if (projectData.freq !== undefined) state.freq = projectData.freq;
+      if (projectData.N !== undefined) state.N = projectData.N;
+      if (projectData.refl !== undefined) state.refl = projectData.refl;
+      if (projectData.noise !== undefined)
+        state.noise = projectData.noise;
+
+      // Restore view settings
+      if (projectData.view) state.view = projectData.view;
+      if (projectData.viewMode) state.viewMode = projectData.viewMode;
+      if (projectData.viewModeTarget)
+        state.viewModeTarget = projectData.viewModeTarget;
+      if (projectData.minVal !== undefined)
+        state.minVal = projectData.minVal;
+      if (projectData.maxVal !== undefined)
+        state.maxVal = projectData.maxVal;
+      if (projectData.complianceThreshold !== undefined)
+        state.complianceThreshold = projectData.complianceThreshold;
+      if (projectData.compliancePercentage !== undefined)
+        state.compliancePercentage = projectData.compliancePercentage;
+      if (projectData.optFinancialCostWeight !== undefined)
+        state.optFinancialCostWeight = projectData.optFinancialCostWeight;
+      if (projectData.optRsrpWeight !== undefined)
+        state.optRsrpWeight = projectData.optRsrpWeight;
+      if (projectData.optHomogeneityWeight !== undefined)
+        state.optHomogeneityWeight = projectData.optHomogeneityWeight;
+      if (projectData.optNumTrials !== undefined)
+        state.optNumTrials = projectData.optNumTrials;
+      if (projectData.optMaxChanges !== undefined)
+        state.optMaxChanges = projectData.optMaxChanges;
+      if (projectData.optTemp !== undefined)
+        state.optTemp = projectData.optTemp;
+      if (projectData.optMinimumTemp !== undefined)
+        state.optMinimumTemp = projectData.optMinimumTemp;
+      if (projectData.weak) state.weak = projectData.weak;
+      if (projectData.mid) state.mid = projectData.mid;
+      if (projectData.strong) state.strong = projectData.strong;
+      if (projectData.showContours !== undefined)
+        state.showContours = projectData.showContours;
+      if (Array.isArray(projectData.contourThresholds))
+        state.contourThresholds = projectData.contourThresholds.slice();
+      if (projectData.showTooltip !== undefined)
+        state.showTooltip = projectData.showTooltip;
+      if (projectData.showVisualization !== undefined)
+        state.showVisualization = projectData.showVisualization;
+
+      // Restore background image (archives stream it in after the plan is drawn)
+      if (projectData.backgroundImage) {
+        restoreBackgroundImage(base64ToImage(projectData.backgroundImage), projectData.backgroundImageAlpha);
+      } else {
+        clearBackgroundImage();
+      }
+
+      // Restore antennas
+      state.aps = [];
+      if (projectData.aps && Array.isArray(projectData.aps)) {
+        projectData.aps.forEach(function (apData) {
+          var ap = {
+            id: apData.id || "AP" + (state.aps.length + 1),
+            x: (apData.x || 0) + offsetX,
+            y: (apData.y || 0) + offsetY,
+            z: apData.z,
+            tx: apData.tx || 10,
+            gt: apData.gt || 5,
+            ch: apData.ch || 1,
+            azimuth: apData.azimuth || 0,
+            tilt: apData.tilt || 0,
+            enabled: apData.enabled !== undefined ? apData.enabled : true,
+          };
+          if (apData.antennaPattern) {
+            var patternStr = JSON.stringify(apData.antennaPattern);
+            ap.antennaPattern = JSON.parse(patternStr);
             
-            if (wData.points && Array.isArray(wData.points) && wData.points.length >= 2) {
-              wall.points = wData.points.map(function(p) {
-                return { x: p.x + offsetX, y: p.y + offsetY };
-              });
-            } else if (wData.p1 && wData.p2) {
-              wall.p1 = { x: wData.p1.x + offsetX, y: wData.p1.y + offsetY };
-              wall.p2 = { x: wData.p2.x + offsetX, y: wData.p2.y + offsetY };
-            } else {
-              wall.p1 = { x: 0, y: 0 };
-              wall.p2 = { x: 0, y: 0 };
+            if (!ap.antennaPattern.horizontalData || !Array.isArray(ap.antennaPattern.horizontalData)) {
+              ap.antennaPattern.horizontalData = [];
+            }
+            if (!ap.antennaPattern.verticalData || !Array.isArray(ap.antennaPattern.verticalData)) {
+              ap.antennaPattern.verticalData = [];
             }
             
-            state.walls.push(wall);
-          });
-        }
+            ap.antennaPatternFileName = apData.antennaPatternFileName;
+          }
+          state.aps.push(ap);
+        });
+        state.cachedHeatmap = null;
+        state.heatmapUpdatePending = false;
+      }
 
-        // Restore floor planes
-        state.floorPlanes = [];
-        if (
-          projectData.floorPlanes &&
-          Array.isArray(projectData.floorPlanes)
-        ) {
-          projectData.floorPlanes.forEach(function (fpData) {
-            var fp = {
-              p1: fpData.p1 ? { x: fpData.p1.x + offsetX, y: fpData.p1.y + offsetY } : { x: 0, y: 0 },
-              p2: fpData.p2 ? { x: fpData.p2.x + offsetX, y: fpData.p2.y + offsetY } : { x: 0, y: 0 },
-              p3: fpData.p3 ? { x: fpData.p3.x + offsetX, y: fpData.p3.y + offsetY } : { x: 0, y: 0 },
-              p4: fpData.p4 ? { x: fpData.p4.x + offsetX, y: fpData.p4.y + offsetY } : { x: 0, y: 0 },
-              attenuation: fpData.attenuation || 3.0,
-              height: fpData.height || 0,
-              type: fpData.type || "horizontal",
-              inclination: fpData.inclination || 0,
-              inclinationDirection: fpData.inclinationDirection || 0,
-            };
-            if (fpData.imgP1) fp.imgP1 = fpData.imgP1;
-            if (fpData.imgP2) fp.imgP2 = fpData.imgP2;
-            if (fpData.imgP3) fp.imgP3 = fpData.imgP3;
-            if (fpData.imgP4) fp.imgP4 = fpData.imgP4;
-            state.floorPlanes.push(fp);
-          });
-        }
+      // Restore walls
+      state.walls = [];
+      var typeCounters = {};
+      if (projectData.walls && Array.isArray(projectData.walls)) {
+        projectData.walls.forEach(function (wData) {
+          var elementType = wData.elementType || "wall";
+          var defaultColor = "#60a5fa";
+          var defaultThickness = 3;
+          var defaultLoss = 3;
+
+          if (elementType === "window") {
+            defaultColor = "#3b82f6";
+            defaultThickness = 2;
+            defaultLoss = 1;
+          } else if (elementType === "door") {
+            defaultColor = "#a16207";
+            defaultThickness = 2;
+            defaultLoss = 4;
+          } else if (elementType === "doubleDoor") {
+            defaultColor = "#a16207";
+            defaultThickness = 2;
+            defaultLoss = 4;
+          }
 
-        // Restore antenna patterns
-        if (
-          projectData.antennaPatterns &&
-          Array.isArray(projectData.antennaPatterns)
-        ) {
-          var patternsStr = JSON.stringify(projectData.antennaPatterns);
-          state.antennaPatterns = JSON.parse(patternsStr);
-          
-          for (var i = 0; i < state.antennaPatterns.length; i++) {
-            var pattern = state.antennaPatterns[i];
-            if (!pattern.horizontalData || !Array.isArray(pattern.horizontalData)) {
-              pattern.horizontalData = [];
-            }
-            if (!pattern.verticalData || !Array.isArray(pattern.verticalData)) {
-              pattern.verticalData = [];
+          var wallType = wData.type;
+          if (!wallType && elementType === "wall") {
+            for (var t in wallTypes) {
+              if (wallTypes[t].loss == (wData.loss !== undefined ? wData.loss : defaultLoss) &&
+                wallTypes[t].color == (wData.color || defaultColor)) {
+                wallType = t;
+                break;
+              }
             }
           }
-          
-          state.defaultAntennaPatternIndex =
-            projectData.defaultAntennaPatternIndex !== undefined
-              ? projectData.defaultAntennaPatternIndex
-              : -1;
-          updateAntennaPatternsList();
-        }
 
-        // Restore ground plane
-        if (projectData.groundPlane) {
-          state.groundPlane = projectData.groundPlane;
-        }
+          var baseName = "Wall";
+          if (elementType === "window") {
+            baseName = "Window";
+          } else if (elementType === "door") {
+            baseName = "Door";
+          } else if (elementType === "doubleDoor") {
+            baseName = "DoubleDoor";
+          } else if (wallType && wallTypes[wallType]) {
+            baseName = wallTypes[wallType].name;
+          }
 
-        // Restore 3D view settings
-        if (projectData.cameraRotationX !== undefined)
-          state.cameraRotationX = projectData.cameraRotationX;
-        if (projectData.cameraRotationY !== undefined)
-          state.cameraRotationY = projectData.cameraRotationY;
-        if (projectData.cameraZoom !== undefined)
-          state.cameraZoom = projectData.cameraZoom;
-        if (projectData.cameraPanX !== undefined)
-          state.cameraPanX = projectData.cameraPanX;
-        if (projectData.cameraPanY !== undefined)
-          state.cameraPanY = projectData.cameraPanY;
-
-        // Restore CSV coverage data
-        if (projectData.csvCoverageData)
-          state.csvCoverageData = projectData.csvCoverageData;
-
-        // Update UI
-        if (document.getElementById("view")) document.getElementById("view").value = state.view;
-        if (document.getElementById("model")) document.getElementById("model").value = state.model;
-        if (window.syncLiveRsrpFromModel) window.syncLiveRsrpFromModel();
-        if (document.getElementById("minVal")) document.getElementById("minVal").value = state.minVal;
-        if (document.getElementById("maxVal")) document.getElementById("maxVal").value = state.maxVal;
-        if (document.getElementById("complianceThreshold")) document.getElementById("complianceThreshold").value = state.complianceThreshold !== undefined ? state.complianceThreshold : state.minVal;
-        if (document.getElementById("compliancePercentage")) document.getElementById("compliancePercentage").value = state.compliancePercentage !== undefined ? state.compliancePercentage : 80;
-        if (document.getElementById("optFinancialCostWeight")) document.getElementById("optFinancialCostWeight").value = state.optFinancialCostWeight !== undefined ? state.optFinancialCostWeight : 2;
-        if (document.getElementById("optRsrpWeight")) document.getElementById("optRsrpWeight").value = state.optRsrpWeight !== undefined ? state.optRsrpWeight : 0;
-        if (document.getElementById("optHomogeneityWeight")) document.getElementById("optHomogeneityWeight").value = state.optHomogeneityWeight !== undefined ? state.optHomogeneityWeight : 1;
-        if (document.getElementById("optNumTrials")) document.getElementById("optNumTrials").value = state.optNumTrials !== undefined ? state.optNumTrials : 1;
-        if (document.getElementById("optMaxChanges")) document.getElementById("optMaxChanges").value = state.optMaxChanges !== undefined ? state.optMaxChanges : 20;
-        if (document.getElementById("optTemp")) document.getElementById("optTemp").value = state.optTemp !== undefined ? state.optTemp : 10;
-        if (document.getElementById("optMinimumTemp")) document.getElementById("optMinimumTemp").value = state.optMinimumTemp !== undefined ? state.optMinimumTemp : 1;
-        if (document.getElementById("showContours"))
-          document.getElementById("showContours").checked = state.showContours;
-        if (document.getElementById("showTooltip")) document.getElementById("showTooltip").checked = state.showTooltip;
-        if (document.getElementById("showVisualization"))
-          document.getElementById("showVisualization").checked = state.showVisualization;
-        if (document.getElementById("alphaSlider")) {
-          document.getElementById("alphaSlider").value = state.backgroundImageAlpha;
-          var alphaLabel = document.getElementById("alphaLabel");
-          if (alphaLabel) {
-            alphaLabel.textContent =
-              "Image Opacity: " +
-              Math.round(state.backgroundImageAlpha * 100) +
-              "%";
+          if (!typeCounters[baseName]) typeCounters[baseName] = 0;
+          typeCounters[baseName]++;
+
+          var name = baseName + "_" + typeCounters[baseName];
+
+          var wall = {
+            id: wData.id || "wall-" + Date.now() + "-" + Math.random(),
+            name: wData.name || name,
+            type: wallType,
+            loss: wData.loss !== undefined ? wData.loss : defaultLoss,
+            color: wData.color || defaultColor,
+            thickness: wData.thickness || defaultThickness,
+            height: wData.height,
+            elementType: elementType,
+            width: wData.width,
+          };
+          
+          if (wData.points && Array.isArray(wData.points) && wData.points.length >= 2) {
+            wall.points = wData.points.map(function(p) {
+              return { x: p.x + offsetX, y: p.y + offsetY };
+            });
+          } else if (wData.p1 && wData.p2) {
+            wall.p1 = { x: wData.p1.x + offsetX, y: wData.p1.y + offsetY };
+            wall.p2 = { x: wData.p2.x + offsetX, y: wData.p2.y + offsetY };
+          } else {
+            wall.p1 = { x: 0, y: 0 };
+            wall.p2 = { x: 0, y: 0 };
           }
-        }
+          
+          state.walls.push(wall);
+        });
+      }
+
+      // Restore floor planes
+      state.floorPlanes = [];
+      if (
+        projectData.floorPlanes &&
+        Array.isArray(projectData.floorPlanes)
+      ) {
+        projectData.floorPlanes.forEach(function (fpData) {
+          var fp = {
+            p1: fpData.p1 ? { x: fpData.p1.x + offsetX, y: fpData.p1.y + offsetY } : { x: 0, y: 0 },
+            p2: fpData.p2 ? { x: fpData.p2.x + offsetX, y: fpData.p2.y + offsetY } : { x: 0, y: 0 },
+            p3: fpData.p3 ? { x: fpData.p3.x + offsetX, y: fpData.p3.y + offsetY } : { x: 0, y: 0 },
+            p4: fpData.p4 ? { x: fpData.p4.x + offsetX, y: fpData.p4.y + offsetY } : { x: 0, y: 0 },
+            attenuation: fpData.attenuation || 3.0,
+            height: fpData.height || 0,
+            type: fpData.type || "horizontal",
+            inclination: fpData.inclination || 0,
+            inclinationDirection: fpData.inclinationDirection || 0,
+          };
+          if (fpData.imgP1) fp.imgP1 = fpData.imgP1;
+          if (fpData.imgP2) fp.imgP2 = fpData.imgP2;
+          if (fpData.imgP3) fp.imgP3 = fpData.imgP3;
+          if (fpData.imgP4) fp.imgP4 = fpData.imgP4;
+          state.floorPlanes.push(fp);
+        });
+      }
 
-        // Re-render everything
-        renderWalls();
-        renderAPs();
-        updateActiveAntennaStats();
+      // Restore antenna patterns
+      if (
+        projectData.antennaPatterns &&
+        Array.isArray(projectData.antennaPatterns)
+      ) {
+        var patternsStr = JSON.stringify(projectData.antennaPatterns);
+        state.antennaPatterns = JSON.parse(patternsStr);
         
-        // AI COMMENT: Replaced inline heatmap cache invalidation with helper
-        invalidateHeatmapCache();
+        for (var i = 0; i < state.antennaPatterns.length; i++) {
+          var pattern = state.antennaPatterns[i];
+          if (!pattern.horizontalData || !Array.isArray(pattern.horizontalData)) {
+            pattern.horizontalData = [];
+          }
+          if (!pattern.verticalData || !Array.isArray(pattern.verticalData)) {
+            pattern.verticalData = [];
+          }
+        }
         
-        draw();
+        state.defaultAntennaPatternIndex =
+          projectData.defaultAntennaPatternIndex !== undefined
+            ? projectData.defaultAntennaPatternIndex
+            : -1;
+        updateAntennaPatternsList();
+      }
+
+      // Restore ground plane
+      if (projectData.groundPlane) {
+        state.groundPlane = projectData.groundPlane;
+      }
+
+      // Restore 3D view settings
+      if (projectData.cameraRotationX !== undefined)
+        state.cameraRotationX = projectData.cameraRotationX;
+      if (projectData.cameraRotationY !== undefined)
+        state.cameraRotationY = projectData.cameraRotationY;
+      if (projectData.cameraZoom !== undefined)
+        state.cameraZoom = projectData.cameraZoom;
+      if (projectData.cameraPanX !== undefined)
+        state.cameraPanX = projectData.cameraPanX;
+      if (projectData.cameraPanY !== undefined)
+        state.cameraPanY = projectData.cameraPanY;
+
+      // Restore CSV coverage data
+      if (projectData.csvCoverageData)
+        state.csvCoverageData = projectData.csvCoverageData;
+
+      // Update UI
+      if (document.getElementById("view")) document.getElementById("view").value = state.view;
+      if (document.getElementById("model")) document.getElementById("model").value = state.model;
+      if (window.syncLiveRsrpFromModel && !(options && options.deferBackendSync)) window.syncLiveRsrpFromModel("project_load");
+      if (document.getElementById("minVal")) document.getElementById("minVal").value = state.minVal;
+      if (document.getElementById("maxVal")) document.getElementById("maxVal").value = state.maxVal;
+      if (document.getElementById("complianceThreshold")) document.getElementById("complianceThreshold").value = state.complianceThreshold !== undefined ? state.complianceThreshold : state.minVal;
+      if (document.getElementById("compliancePercentage")) document.getElementById("compliancePercentage").value = state.compliancePercentage !== undefined ? state.compliancePercentage : 80;
+      if (document.getElementById("optFinancialCostWeight")) document.getElementById("optFinancialCostWeight").value = state.optFinancialCostWeight !== undefined ? state.optFinancialCostWeight : 2;
+      if (document.getElementById("optRsrpWeight")) document.getElementById("optRsrpWeight").value = state.optRsrpWeight !== undefined ? state.optRsrpWeight : 0;
+      if (document.getElementById("optHomogeneityWeight")) document.getElementById("optHomogeneityWeight").value = state.optHomogeneityWeight !== undefined ? state.optHomogeneityWeight : 1;
+      if (document.getElementById("optNumTrials")) document.getElementById("optNumTrials").value = state.optNumTrials !== undefined ? state.optNumTrials : 1;
+      if (document.getElementById("optMaxChanges")) document.getElementById("optMaxChanges").value = state.optMaxChanges !== undefined ? state.optMaxChanges : 20;
+      if (document.getElementById("optTemp")) document.getElementById("optTemp").value = state.optTemp !== undefined ? state.optTemp : 10;
+      if (document.getElementById("optMinimumTemp")) document.getElementById("optMinimumTemp").value = state.optMinimumTemp !== undefined ? state.optMinimumTemp : 1;
+      if (document.getElementById("showContours"))
+        document.getElementById("showContours").checked = state.showContours;
+      if (document.getElementById("showTooltip")) document.getElementById("showTooltip").checked = state.showTooltip;
+      if (document.getElementById("showVisualization"))
+        document.getElementById("showVisualization").checked = state.showVisualization;
+      if (document.getElementById("alphaSlider")) {
+        document.getElementById("alphaSlider").value = state.backgroundImageAlpha;
+        var alphaLabel = document.getElementById("alphaLabel");
+        if (alphaLabel) {
+          alphaLabel.textContent =
+            "Image Opacity: " +
+            Math.round(state.backgroundImageAlpha * 100) +
+            "%";
+        }
+      }
+
+      // Re-render everything
+      renderWalls();
+      renderAPs();
+      updateActiveAntennaStats();
+      
+      // AI COMMENT: Replaced inline heatmap cache invalidation with helper
+      invalidateHeatmapCache();
+      
+      draw();
+
+      NotificationSystem.success("Project loaded successfully!");
+      return { offsetX: offsetX, offsetY: offsetY };
+    } catch (error) {
+      console.error("Error loading project:", error);
+      NotificationSystem.error("Error loading project: " + error.message);
+      return null;
+    }
+  }
+
+  // For JSON/DXF files, preserve original aspect ratio instead of forcing 30:20
+  function restoreDimensions(projectData) {
+    if (projectData.w && projectData.h) {
+      var originalAspectRatio = projectData.w / projectData.h;
+      var canvasAspectRatio = 30 / 20;
 
-        NotificationSystem.success("Project loaded successfully!");
-      } catch (error) {
-        console.error("Error loading project:", error);
-        NotificationSystem.error("Error loading project: " + error.message);
+      if (originalAspectRatio > canvasAspectRatio) {
+        state.w = 30;
+        state.h = 30 / originalAspectRatio;
+      } else {
+        state.w = 20 * originalAspectRatio;
+        state.h = 20;
       }
+
+      state.backgroundImageAspectRatio = originalAspectRatio;
+      state.backgroundImageDisplayWidth = state.w;
+      state.backgroundImageDisplayHeight = state.h;
+    } else {
+      if (projectData.w) state.w = projectData.w;
+      if (projectData.h) state.h = projectData.h;
+    }
+  }
+
+  function wallFromData(wData) {
+    return {
+      id: wData.id || "wall_" + (state.walls.length + 1),
+      p1: { x: wData.p1.x, y: wData.p1.y },
+      p2: { x: wData.p2.x, y: wData.p2.y },
+      loss: wData.loss || 3,
+      color: wData.color || "#475569",
+      thickness: wData.thickness || 2,
+      height: wData.height || 2.5,
+      elementType: wData.elementType || "wall",
+      width: wData.width || 0,
     };
-    reader.readAsText(file);
+  }
+
+  /**
+   * Add one dxf_walls_batch from the streaming DXF parser ({walls, w, h, stats}).
+   * The first batch of a parse clears the plan; rendering is coalesced to one
+   * frame so a burst of batches does not redraw per batch.
+   */
+  var streamedRenderPending = false;
+  function appendStreamedWalls(batch, first) {
+    if (first) {
+      state.walls = [];
+      state.floorPlanes = [];
+      restoreDimensions(batch);
+    }
+    (batch.walls || []).forEach(function (wData) {
+      state.walls.push(wallFromData(wData));
+    });
+    if (streamedRenderPending) return;
+    streamedRenderPending = true;
+    requestAnimationFrame(function () {
+      streamedRenderPending = false;
+      renderWalls();
+      draw();
+    });
   }
 
   function loadProjectFromData(projectData) {
@@ -625,27 +766,7 @@
         return;
       }
 
-      // Restore core dimensions
-      // For JSON/DXF files, preserve original aspect ratio instead of forcing 30:20
-      if (projectData.w && projectData.h) {
-        var originalAspectRatio = projectData.w / projectData.h;
-        var canvasAspectRatio = 30 / 20;
-        
-        if (originalAspectRatio > canvasAspectRatio) {
-          state.w = 30;
-          state.h = 30 / originalAspectRatio;
-        } else {
-          state.w = 20 * originalAspectRatio;
-          state.h = 20;
-        }
-        
-        state.backgroundImageAspectRatio = originalAspectRatio;
-        state.backgroundImageDisplayWidth = state.w;
-        state.backgroundImageDisplayHeight = state.h;
-      } else {
-        if (projectData.w) state.w = projectData.w;
-        if (projectData.h) state.h = projectData.h;
-      }
+      restoreDimensions(projectData);
       if (projectData.res) state.res = projectData.res;
 
       // Restore propagation model
@@ -735,21 +856,11 @@
         state.heatmapUpdatePending = false;
       }
 
-      // Restore walls
-      state.walls = [];
+      // Restore walls (a streamed DXF already holds the walls sent in dxf_walls_batch)
+      if (!projectData.wallsStreamed) state.walls = [];
       if (projectData.walls && Array.isArray(projectData.walls)) {
         projectData.walls.forEach(function (wData) {
-          state.walls.push({
-            id: wData.id || "wall_" + (state.walls.length + 1),
-            p1: { x: wData.p1.x, y: wData.p1.y },
-            p2: { x: wData.p2.x, y: wData.p2.y },
-            loss: wData.loss || 3,
-            color: wData.color || "#475569",
-            thickness: wData.thickness || 2,
-            height: wData.height || 2.5,
-            elementType: wData.elementType || "wall",
-            width: wData.width || 0,
-          });
+          state.walls.push(wallFromData(wData));
         });
       }
 
@@ -777,7 +888,7 @@
         renderFloorPlanes();
       }
       if (document.getElementById("model")) document.getElementById("model").value = state.model;
-      if (window.syncLiveRsrpFromModel) window.syncLiveRsrpFromModel();
+      if (window.syncLiveRsrpFromModel) window.syncLiveRsrpFromModel("project_load");
       draw();
     } catch (error) {
       console.error("Error loading project data:", error);
@@ -811,5 +922,6 @@
   window.downloadProject = downloadProject;
   window.loadProject = loadProject;
   window.loadProjectFromData = loadProjectFromData;
+  window.appendStreamedWalls = appendStreamedWalls;
 
 })();
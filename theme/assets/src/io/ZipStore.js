@@ -0,0 +1,214 @@
+// ZipStore.js — minimal zip writer and lazy reader (stored or deflated entries, no zip64)
+// Writing: entries are written as-is, so large typed-array payloads go into the
+// archive without being copied into one big buffer; buildAsync() deflates the
+// entries marked `compress` with CompressionStream('deflate-raw') when the
+// browser has it. Reading: open() reads only the central directory; entries
+// are sliced out of the Blob/File (and inflated) when asked for.
+// Depends: nothing
+// Used by: CoverageExport (.npz), ProjectArchive (.ipsz projects)
+
+var ZipStore = (function () {
+
+  var STORED = 0, DEFLATED = 8;
+  var EOCD_MAX_BYTES = 22 + 0xFFFF;   // end record + longest comment
+
+  var CRC_TABLE = (function () {
+    var table = new Uint32Array(256);
+    for (var n = 0; n < 256; n++) {
+      var c = n;
+      for (var k = 0; k < 8; k++) c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+      table[n] = c >>> 0;
+    }
+    return table;
+  })();
+
+  /** CRC-32 over a list of Uint8Array parts. */
+  function crc32(parts) {
+    var crc = 0xFFFFFFFF;
+    for (var p = 0; p < parts.length; p++) {
+      var bytes = parts[p];
+      for (var i = 0; i < bytes.length; i++) crc = CRC_TABLE[(crc ^ bytes[i]) & 0xFF] ^ (crc >>> 8);
+    }
+    return (crc ^ 0xFFFFFFFF) >>> 0;
+  }
+
+  function byteLength(parts) {
+    var size = 0;
+    for (var p = 0; p < parts.length; p++) size += parts[p].length;
+    return size;
+  }
+
+  function dosDateTime(date) {
+    return {
+      time: (date.getHours() << 11) | (date.getMinutes() << 5) | (date.getSeconds() >> 1),
+      date: ((date.getFullYear() - 1980) << 9) | ((date.getMonth() + 1) << 5) | date.getDate()
+    };
+  }
+
+  // ─── Writing ─────────────────────────────────────────────────────────────────
+
+  /** Zip records ({name, parts, method, crc, size}) — `parts` already in `method` form. */
+  function assemble(records) {
+    var out = [], central = [], offset = 0;
+    var stamp = dosDateTime(new Date());
+    var encoder = new TextEncoder();
+    for (var e = 0; e < records.length; e++) {
+      var rec = records[e];
+      var name = encoder.encode(rec.name);
+      var stored = byteLength(rec.parts);
+
+      var local = new DataView(new ArrayBuffer(30));
+      local.setUint32(0, 0x04034b50, true);
+      local.setUint16(4, 20, true);            // version needed
+      local.setUint16(8, rec.method, true);
+      local.setUint16(10, stamp.time, true);
+      local.setUint16(12, stamp.date, true);
+      local.setUint32(14, rec.crc, true);
+      local.setUint32(18, stored, true);
+      local.setUint32(22, rec.size, true);
+      local.setUint16(26, name.length, true);
+      out.push(new Uint8Array(local.buffer), name);
+      for (var p = 0; p < rec.parts.length; p++) out.push(rec.parts[p]);
+
+      var dir = new DataView(new ArrayBuffer(46));
+      dir.setUint32(0, 0x02014b50, true);
+      dir.setUint16(4, 20, true);              // version made by
+      dir.setUint16(6, 20, true);              // version needed
+      dir.setUint16(10, rec.method, true);
+      dir.setUint16(12, stamp.time, true);
+      dir.setUint16(14, stamp.date, true);
+      dir.setUint32(16, rec.crc, true);
+      dir.setUint32(20, stored, true);
+      dir.setUint32(24, rec.size, true);
+      dir.setUint16(28, name.length, true);
+      dir.setUint32(42, offset, true);
+      central.push(new Uint8Array(dir.buffer), name);
+      offset += 30 + name.length + stored;
+    }
+    var dirSize = byteLength(central);
+    var end = new DataView(new ArrayBuffer(22));
+    end.setUint32(0, 0x06054b50, true);
+    end.setUint16(8, records.length, true);
+    end.setUint16(10, records.length, true);
+    end.setUint32(12, dirSize, true);
+    end.setUint32(16, offset, true);
+    return out.concat(central, [new Uint8Array(end.buffer)]);
+  }
+
+  function storedRecord(entry) {
+    return { name: entry.name, parts: entry.parts, method: STORED, crc: crc32(entry.parts), size: byteLength(entry.parts) };
+  }
+
+  /**
+   * Zip `entries` ([{name, parts: [Uint8Array]}]) into a list of Uint8Array parts
+   * (local headers, payloads, central directory) ready for a Blob or file writer.
+   */
+  function build(entries) {
+    return assemble(entries.map(storedRecord));
+  }
+
+  function canDeflate() {
+    return typeof CompressionStream !== "undefined";
+  }
+
+  function streamBytes(stream) {
+    return new Response(stream).arrayBuffer().then(function (buf) { return new Uint8Array(buf); });
+  }
+
+  /** As build(), resolving to the parts; entries with `compress: true` are deflated when supported. */
+  function buildAsync(entries) {
+    return Promise.all(entries.map(function (entry) {
+      var rec = storedRecord(entry);
+      if (!entry.compress || !canDeflate() || !rec.size) return rec;
+      return streamBytes(new Blob(entry.parts).stream().pipeThrough(new CompressionStream("deflate-raw")))
+        .then(function (deflated) {
+          if (deflated.length >= rec.size) return rec;      // incompressible: keep it stored
+          rec.parts = [deflated];
+          rec.method = DEFLATED;
+          return rec;
+        });
+    })).then(assemble);
+  }
+
+  // ─── Reading ─────────────────────────────────────────────────────────────────
+
+  function readBytes(blob, start, end) {
+    return blob.slice(start, end).arrayBuffer().then(function (buf) { return new DataView(buf); });
+  }
+
+  /**
+   * Open a zip Blob/File. Resolves to {names, has(name), size(name), blob(name, type),
+   * bytes(name), text(name), json(name)}; only the central directory is read here.
+   */
+  function open(blob) {
+    var tailStart = Math.max(0, blob.size - EOCD_MAX_BYTES);
+    return readBytes(blob, tailStart, blob.size).then(function (tail) {
+      var eocd = -1;
+      for (var i = tail.byteLength - 22; i >= 0; i--) {
+        if (tail.getUint32(i, true) === 0x06054b50) { eocd = i; break; }
+      }
+      if (eocd < 0) throw new Error("Not a zip archive");
+      var count = tail.getUint16(eocd + 10, true);
+      var dirSize = tail.getUint32(eocd + 12, true);
+      var dirOffset = tail.getUint32(eocd + 16, true);
+      return readBytes(blob, dirOffset, dirOffset + dirSize).then(function (dir) {
+        var decoder = new TextDecoder();
+        var entries = Object.create(null), names = [], pos = 0;
+        for (var n = 0; n < count; n++) {
+          if (dir.getUint32(pos, true) !== 0x02014b50) throw new Error("Corrupt zip directory");
+          var nameLen = dir.getUint16(pos + 28, true);
+          var name = decoder.decode(new Uint8Array(dir.buffer, pos + 46, nameLen));
+          entries[name] = {
+            method: dir.getUint16(pos + 10, true),
+            crc: dir.getUint32(pos + 16, true),
+            stored: dir.getUint32(pos + 20, true),
+            size: dir.getUint32(pos + 24, true),
+            offset: dir.getUint32(pos + 42, true)
+          };
+          names.push(name);
+          pos += 46 + nameLen + dir.getUint16(pos + 30, true) + dir.getUint16(pos + 32, true);
+        }
+        return reader(blob, entries, names);
+      });
+    });
+  }
+
+  function reader(blob, entries, names) {
+    function entryBlob(name, type) {
+      var entry = entries[name];
+      if (!entry) return Promise.reject(new Error("Missing zip entry: " + name));
+      return readBytes(blob, entry.offset, entry.offset + 30).then(function (local) {
+        var start = entry.offset + 30 + local.getUint16(26, true) + local.getUint16(28, true);
+        var data = blob.slice(start, start + entry.stored, type || "");
+        if (entry.method === STORED) return data;
+        if (entry.method !== DEFLATED || typeof DecompressionStream === "undefined") {
+          throw new Error("Cannot read compressed zip entry " + name + " in this browser");
+        }
+        return new Response(data.stream().pipeThrough(new DecompressionStream("deflate-raw"))).blob()
+          .then(function (b) { return type ? b.slice(0, b.size, type) : b; });
+      });
+    }
+    function entryBytes(name) {
+      return entryBlob(name).then(function (b) { return b.arrayBuffer(); }).then(function (buf) { return new Uint8Array(buf); });
+    }
+    return {
+      names: names,
+      has: function (name) { return !!entries[name]; },
+      size: function (name) { return entries[name] ? entries[name].size : 0; },
+      blob: entryBlob,
+      bytes: entryBytes,
+      text: function (name) { return entryBlob(name).then(function (b) { return b.text(); }); },
+      json: function (name) { return entryBlob(name).then(function (b) { return b.text(); }).then(JSON.parse); }
+    };
+  }
+
+  /** True when the Blob/File starts with a zip local header ("PK\x03\x04"). */
+  function isZip(blob) {
+    if (!blob || blob.size < 4) return Promise.resolve(false);
+    return readBytes(blob, 0, 4).then(function (head) { return head.getUint32(0, true) === 0x04034b50; });
+  }
+
+  return { crc32: crc32, build: build, buildAsync: buildAsync, canDeflate: canDeflate, open: open, isZip: isZip };
+})();
+
+window.ZipStore = ZipStore;
@@ -52,10 +52,12 @@
     var dims = computeGridDimensions(totalBins);
     if (!dims) return null;
 
-    var gridData = new Float32Array(totalBins);
+    // Packed frames (RsrpGridCodec) already decode to Float32Array — adopt it as-is.
+    var isTyped = rsrpValues instanceof Float32Array;
+    var gridData = isTyped ? rsrpValues : new Float32Array(totalBins);
     var dataMin = Infinity, dataMax = -Infinity;
     for (var i = 0; i < totalBins; i++) {
-      var val = +rsrpValues[i];       // unary + is faster than Number()
+      var val = isTyped ? gridData[i] : +rsrpValues[i];       // unary + is faster than Number()
       gridData[i] = val;
       if (val !== 0 && val >= -140 && val < 0) {
         if (val < dataMin) dataMin = val;
@@ -97,7 +99,7 @@
     return null;
   }
 
-  /** Bilinear sample at canvas coordinate (x, y) from a grid. */
+  /** Bilinear sample at canvas coordinate (x, y) from a grid; null where it has no value (0 or NaN bins). */
   function lookupRsrpInGrid(bgrid, x, y) {
     if (!bgrid) return null;
     var bx = x / bgrid.dx - 0.5;
@@ -110,7 +112,7 @@
     var row0 = gy0 * bgrid.cols, row1 = gy1 * bgrid.cols;
     var bval = (bgrid.data[row0 + gx0] * (1 - tx) + bgrid.data[row0 + gx1] * tx) * (1 - ty)
              + (bgrid.data[row1 + gx0] * (1 - tx) + bgrid.data[row1 + gx1] * tx) * ty;
-    return (bval !== 0) ? bval : null;
+    return (bval !== 0 && !isNaN(bval)) ? bval : null;
   }
 
   /** RSRP at (x, y) from the active grid. */
@@ -136,76 +138,251 @@
 
   // ─── Per-antenna cache + best-server merge ────────────────────────────────────
 
-  /** Cache RSRP for one antenna and rebuild the merged best-server grid. */
+  /**
+   * Incremental best-server state. Per bin: best value, owning antenna slot, and an
+   * upper bound on every other antenna's value (second). Adding or improving an
+   * antenna touches each bin once; removing or weakening one only rescans the bins
+   * it owned and can no longer hold against `second`.
+   */
+  var merge = null;
+
+  function isValidRsrp(val) { return val !== 0 && val >= -140 && val < 0; }
+
+  function createMerge(totalBins) {
+    var best = new Float32Array(totalBins).fill(-Infinity);
+    var second = new Float32Array(totalBins).fill(-Infinity);
+    var owner = new Int32Array(totalBins).fill(-1);
+    return {
+      totalBins: totalBins,
+      slots: [],                       // slot → RSRP array (null when freed)
+      slotOf: Object.create(null),     // antId → slot
+      best: best, second: second, owner: owner,
+      data: new Float32Array(totalBins) // heatmap grid: best or 0 for no coverage
+    };
+  }
+
+  /** Recompute one bin exactly from every cached antenna. */
+  function rescanBin(m, i) {
+    var best = -Infinity, second = -Infinity, owner = -1;
+    for (var k = 0; k < m.slots.length; k++) {
+      var arr = m.slots[k];
+      if (!arr) continue;
+      var v = +arr[i];
+      if (!isValidRsrp(v)) continue;
+      if (v > best) { second = best; best = v; owner = k; }
+      else if (v > second) second = v;
+    }
+    m.best[i] = best; m.second[i] = second; m.owner[i] = owner;
+    m.data[i] = owner >= 0 ? best : 0;
+  }
+
+  function upsertMergeAntenna(m, antId, values) {
+    var k = m.slotOf[antId];
+    var isNew = k === undefined;
+    if (isNew) {
+      k = m.slots.indexOf(null);
+      if (k < 0) k = m.slots.length;
+      m.slotOf[antId] = k;
+    }
+    m.slots[k] = values;
+    var best = m.best, second = m.second, owner = m.owner, data = m.data;
+    for (var i = 0; i < m.totalBins; i++) {
+      var v = +values[i];
+      if (!isValidRsrp(v)) v = -Infinity;
+      if (owner[i] === k) {
+        if (v > -Infinity && v >= second[i]) { best[i] = v; data[i] = v; }
+        else rescanBin(m, i);            // weakened below the runner-up bound
+      } else if (v > best[i]) {
+        if (best[i] > second[i]) second[i] = best[i];
+        best[i] = v; owner[i] = k; data[i] = v;
+      } else if (v > second[i]) {
+        second[i] = v;
+      }
+    }
+  }
+
+  function removeMergeAntenna(m, antId) {
+    var k = m.slotOf[antId];
+    if (k === undefined) return;
+    delete m.slotOf[antId];
+    m.slots[k] = null;
+    var owner = m.owner;
+    for (var i = 0; i < m.totalBins; i++) {
+      if (owner[i] === k) rescanBin(m, i);
+    }
+  }
+
+  function publishMergedGrid() {
+    if (!merge || !Object.keys(merge.slotOf).length) { state.accurateEngineRsrpGrid = null; return; }
+    var dims = computeGridDimensions(merge.totalBins);
+    if (!dims) return;
+    state.accurateEngineRsrpGrid = {
+      data: merge.data, cols: dims.cols, rows: dims.rows,
+      dx: state.w / dims.cols, dy: state.h / dims.rows
+    };
+  }
+
+  /** Drop cached antennas that are no longer present/enabled, keeping the merge in step. */
+  function pruneDisabledAntennas(cache) {
+    var apIds = Object.create(null);
+    for (var i = 0; i < state.aps.length; i++) {
+      if (state.aps[i].enabled !== false) apIds[state.aps[i].id] = true;
+    }
+    for (var aid in cache) {
+      if (apIds[aid]) continue;
+      delete cache[aid];
+      if (merge) removeMergeAntenna(merge, aid);
+    }
+  }
+
+  /** Cache RSRP for one antenna and update the merged best-server grid incrementally. */
   function cacheLiveRsrpAndMergeBestServer(ant_id, rsrpValues) {
-    state.backendRsrpPerAntenna = state.backendRsrpPerAntenna || {};
+    var cache = state.backendRsrpPerAntenna = state.backendRsrpPerAntenna || {};
     if (!rsrpValues || !rsrpValues.length) {
-      delete state.backendRsrpPerAntenna[ant_id];
+      delete cache[ant_id];
+      if (merge) removeMergeAntenna(merge, ant_id);
     } else {
-      state.backendRsrpPerAntenna[ant_id] = rsrpValues.slice();
+      cache[ant_id] = rsrpValues.slice();
+      if (!merge || merge.totalBins !== rsrpValues.length) {
+        mergeRsrpToBestServerGrid();     // first grid or floor size changed — full build
+        return;
+      }
+      upsertMergeAntenna(merge, ant_id, cache[ant_id]);
     }
-    mergeRsrpToBestServerGrid();
+    pruneDisabledAntennas(cache);
+    publishMergedGrid();
   }
 
+  /** Full rebuild of the merge from the per-antenna cache. */
   function mergeRsrpToBestServerGrid() {
     var cache = state.backendRsrpPerAntenna;
+    merge = null;
     if (!cache) { state.accurateEngineRsrpGrid = null; return; }
 
-    // Build set of enabled antenna IDs for fast membership check
-    var apIds = Object.create(null);
-    for (var i = 0; i < state.aps.length; i++) {
-      if (state.aps[i].enabled !== false) apIds[state.aps[i].id] = true;
-    }
-
-    // Pre-build array of active RSRP arrays — avoids for..in inside the hot bin loop
-    var activeCaches = [];
-    var totalBins = 0;
+    pruneDisabledAntennas(cache);
     for (var aid in cache) {
-      if (!apIds[aid]) { delete cache[aid]; continue; }
       var arr = cache[aid];
-      if (arr && arr.length) {
-        activeCaches.push(arr);
-        if (!totalBins) totalBins = arr.length;
-      }
+      if (!arr || !arr.length) continue;
+      if (!merge) merge = createMerge(arr.length);
+      if (arr.length === merge.totalBins) upsertMergeAntenna(merge, aid, arr);
     }
+    publishMergedGrid();
+  }
 
-    if (!activeCaches.length) { state.accurateEngineRsrpGrid = null; return; }
+  // ─── LOD tiles (large floorplans) ─────────────────────────────────────────────
 
-    var dims = computeGridDimensions(totalBins);
-    if (!dims) return;
+  /**
+   * Above this many 1 m bins the backend grid is not shipped whole: the App asks
+   * RsrpPyramid (server) for the level matching the on-screen resolution and only
+   * the tiles intersecting the viewport. Tiles are assembled into an ordinary
+   * {data, cols, rows, dx, dy} grid; bins not yet received are NaN, so the
+   * heatmap falls back to the local model there until they arrive.
+   */
+  var RSRP_LOD_MIN_BINS = 250000;
+  var TILE_REQUEST_DEBOUNCE_MS = 300;
+  var tiles = null;            // { key, version, level, gridKey, grid, have: {tileId: true} }
+  var tileRequestTimer = null;
+  var lastTileViewport = "";
+
+  function useRsrpTiles() {
+    return Math.round(state.w) * Math.round(state.h) >= RSRP_LOD_MIN_BINS;
+  }
 
-    var gridData = new Float32Array(totalBins);
-    var dataMin = Infinity, dataMax = -Infinity;
-    var n = activeCaches.length;
+  /** Visible plan area in metres and its size in screen pixels. The 2D view always
+   *  shows the whole plan; zooming the 3D view in asks for proportionally more bins. */
+  function rsrpViewport() {
+    var canvas = document.getElementById("plot");
+    var padding = typeof window.pad === "function" ? window.pad() : (window.pad || 0);
+    var zoom = state.viewMode === "3d" ? Math.max(1, state.cameraZoom || 1) : 1;
+    return {
+      x0: 0, y0: 0, x1: state.w, y1: state.h,
+      pixels_w: Math.max(1, Math.round((canvas.width - 2 * padding) * zoom)),
+      pixels_h: Math.max(1, Math.round((canvas.height - 2 * padding) * zoom))
+    };
+  }
 
-    for (var i = 0; i < totalBins; i++) {
-      var best = -Infinity;
-      for (var j = 0; j < n; j++) {
-        var val = +activeCaches[j][i];
-        if (val !== 0 && val >= -140 && val < 0 && val > best) best = val;
-      }
-      if (best > -Infinity) {
-        gridData[i] = best;
-        if (best < dataMin) dataMin = best;
-        if (best > dataMax) dataMax = best;
-      }
-      // else gridData[i] stays 0 (Float32Array default)
-    }
+  function requestRsrpTiles(key) {
+    key = key || (tiles && tiles.key) || "baseline";
+    var viewport = rsrpViewport();
+    lastTileViewport = JSON.stringify(viewport);
+    window.parent.postMessage({
+      type: "request_rsrp_tiles",
+      key: key,
+      viewport: viewport,
+      have: tiles && tiles.key === key ? Object.keys(tiles.have) : []
+    }, "*");
+  }
 
-    state.accurateEngineRsrpGrid = {
-      data: gridData, cols: dims.cols, rows: dims.rows,
-      dx: state.w / dims.cols, dy: state.h / dims.rows
-    };
+  /** Re-request after resize / 3D zoom settles, only if the viewport actually changed. */
+  function scheduleRsrpTileRequest() {
+    if (!tiles || !useRsrpTiles()) return;
+    clearTimeout(tileRequestTimer);
+    tileRequestTimer = setTimeout(function () {
+      if (tiles && JSON.stringify(rsrpViewport()) !== lastTileViewport) requestRsrpTiles(tiles.key);
+    }, TILE_REQUEST_DEBOUNCE_MS);
+  }
+
+  function decodeTile(t) {
+    if (t.rsrp_packed && typeof window.decodeRsrpFrames === "function") {
+      return window.decodeRsrpFrames(t.rsrp_packed.frames, t.rsrp_packed.stream).then(function (grids) {
+        // One keyframe per tile: drop the decoder's base frame for the stream
+        if (typeof window.resetRsrpStreams === "function") window.resetRsrpStreams(t.rsrp_packed.stream);
+        var grid = grids.length ? grids[grids.length - 1] : null;
+        return grid && grid.length ? grid : null;
+      });
+    }
+    return Promise.resolve(t.rsrp || null);
+  }
 
-    // updateLegendFromRsrpRange(dataMin, dataMax);
+  /**
+   * Merge a get_rsrp_tiles response ({key, version, level, cols, rows, dx, dy, tiles})
+   * into the tile grid and publish it as state[gridKey]. A new version or level
+   * starts a fresh grid. Resolves to true when the grid was updated.
+   */
+  function applyRsrpTiles(response, gridKey) {
+    if (!response || !response.tiles || !response.cols || !response.rows) return Promise.resolve(false);
+    gridKey = gridKey || (tiles && tiles.gridKey) || "accurateEngineRsrpGrid";
+    var fresh = !tiles || tiles.key !== response.key || tiles.version !== response.version ||
+                tiles.level !== response.level || tiles.gridKey !== gridKey;
+    if (fresh) {
+      if (!lastTileViewport) lastTileViewport = JSON.stringify(rsrpViewport());
+      var data = new Float32Array(response.cols * response.rows);
+      data.fill(NaN);
+      tiles = {
+        key: response.key, version: response.version, level: response.level, gridKey: gridKey, have: {},
+        grid: { data: data, cols: response.cols, rows: response.rows, level: response.level,
+                dx: response.dx || state.w / response.cols, dy: response.dy || state.h / response.rows }
+      };
+    }
+    var target = tiles;
+    return Promise.all(response.tiles.map(decodeTile)).then(function (decoded) {
+      if (tiles !== target) return false;    // superseded while decoding
+      var grid = target.grid;
+      response.tiles.forEach(function (t, i) {
+        var values = decoded[i];
+        if (!values) return;
+        for (var r = 0; r < t.rows; r++) {
+          var src = r * t.cols, dst = (t.r0 + r) * grid.cols + t.c0;
+          for (var c = 0; c < t.cols; c++) grid.data[dst + c] = +values[src + c];
+        }
+        target.have[t.id] = true;
+      });
+      state[gridKey] = grid;
+      return true;
+    });
   }
 
+  window.addEventListener("resize", scheduleRsrpTileRequest);
+  window.addEventListener("wheel", scheduleRsrpTileRequest, { passive: true });
+
   // ─── Cache / heatmap helpers ──────────────────────────────────────────────────
 
   /** Wipe all backend RSRP grids and per-antenna cache.
    *  @param {boolean} preserveOptimization - if true, keep optimizationRsrpGrid (e.g. when switching to accurate). */
   function clearBackendRsrpCache(preserveOptimization) {
     state.backendRsrpPerAntenna  = {};
+    merge = null;
+    tiles = null;
     if (!preserveOptimization) state.optimizationRsrpGrid = null;
     state.accurateEngineRsrpGrid = null;
     state.p25RsrpGrid            = null;
@@ -240,9 +417,11 @@
   function evictAntennaAndRefreshHeatmap(antId) {
     state.backendRsrpPerAntenna = state.backendRsrpPerAntenna || {};
     delete state.backendRsrpPerAntenna[antId];
+    if (merge) removeMergeAntenna(merge, antId);
     if (Object.keys(state.backendRsrpPerAntenna).length > 0) {
-      mergeRsrpToBestServerGrid();
+      publishMergedGrid();
     } else {
+      merge = null;
       state.accurateEngineRsrpGrid = null;
     }
     refreshHeatmap();
@@ -264,5 +443,9 @@
   window.clearOptimizationRsrpGrid      = clearOptimizationRsrpGrid;
   window.resetHeatmapForLocalModel      = resetHeatmapForLocalModel;
   window.evictAntennaAndRefreshHeatmap  = evictAntennaAndRefreshHeatmap;
+  window.useRsrpTiles                   = useRsrpTiles;
+  window.rsrpViewport                   = rsrpViewport;
+  window.requestRsrpTiles               = requestRsrpTiles;
+  window.applyRsrpTiles                 = applyRsrpTiles;
 
 })();
\ No newline at end of file
@@ -0,0 +1,184 @@
+// RsrpGridCodec.js — decoder for packed RSRP grid frames (server_code/RsrpGridCodec.py)
+// Frames arrive from the App bridge as transferable ArrayBuffers and decode straight
+// into Float32Array, so no per-bin JS numbers are created on the way in.
+// Depends: nothing (DecompressionStream when the server deflates frames)
+// Frames of one stream are decoded strictly in arrival order, across messages too,
+// so a delta always meets the base it was taken against.
+// Used by: AntennaBackendSync (baseline_rsrp / optimization_update / live_rsrp)
+
+(function () {
+
+  var HEADER_BYTES = 20;
+  var DTYPE_INT16 = 1, DTYPE_FLOAT32 = 2;
+  var FLAG_DELTA = 0x01, FLAG_DEFLATE = 0x02;
+  var INT16_SCALE = 10;
+
+  // Last decoded body per stream — the base for the next delta frame on that stream.
+  var streamBases = Object.create(null);
+  // Tail of the decode queue per stream; every decode on a stream waits for the previous one.
+  var streamQueues = Object.create(null);
+  // Bumped by resetRsrpStreams(): decodes started before a reset must not leave bases behind.
+  var generation = 0;
+
+  function readHeader(buffer) {
+    var view = new DataView(buffer, 0, HEADER_BYTES);
+    var magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+    if (magic !== "RSG1") return null;
+    return {
+      dtype:   view.getUint8(4),
+      flags:   view.getUint8(5),
+      count:   view.getUint32(8, true),
+      seq:     view.getUint32(12, true),
+      baseSeq: view.getUint32(16, true)
+    };
+  }
+
+  function inflate(bytes) {
+    if (typeof DecompressionStream !== "function") {
+      return Promise.reject(new Error("DecompressionStream not supported"));
+    }
+    var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream("deflate"));
+    return new Response(stream).arrayBuffer();
+  }
+
+  /** Body bytes (after inflate + un-XOR) → Float32Array of dBm values. */
+  function bodyToFloat32(body, header) {
+    var out = new Float32Array(header.count);
+    if (header.dtype === DTYPE_FLOAT32) {
+      out.set(new Float32Array(body, 0, header.count));
+    } else {
+      var q = new Int16Array(body, 0, header.count);
+      for (var i = 0; i < q.length; i++) out[i] = q[i] / INT16_SCALE;
+    }
+    return out;
+  }
+
+  /** Run `task` after every task queued earlier on `streamKey`; resolves to its result. */
+  function enqueue(streamKey, task) {
+    var key = streamKey || "default";
+    var run = (streamQueues[key] || Promise.resolve()).then(task);
+    var tail = run.then(null, function () {});
+    streamQueues[key] = tail;
+    tail.then(function () { if (streamQueues[key] === tail) delete streamQueues[key]; });
+    return run;
+  }
+
+  /**
+   * Decode one frame. Resolves to a Float32Array (empty for an explicit empty
+   * frame: the antenna has no grid), or null when the frame is a delta against a
+   * base this stream no longer holds (e.g. after a session reset).
+   */
+  function decodeRsrpFrame(buffer, streamKey) {
+    return enqueue(streamKey, function () { return decodeFrameNow(buffer, streamKey); });
+  }
+
+  function decodeFrameNow(buffer, streamKey) {
+    if (typeof buffer === "string") buffer = base64ToArrayBuffer(buffer);
+    if (ArrayBuffer.isView(buffer)) buffer = buffer.buffer.slice(buffer.byteOffset, buffer.byteOffset + buffer.byteLength);
+    var header = readHeader(buffer);
+    if (!header || (header.dtype !== DTYPE_INT16 && header.dtype !== DTYPE_FLOAT32)) {
+      return Promise.reject(new Error("Not an RSRP grid frame"));
+    }
+    // Empty frame: holds a list position, is not part of the delta chain
+    if (header.count === 0) return Promise.resolve(new Float32Array(0));
+    var startGeneration = generation;
+    var raw = buffer.slice(HEADER_BYTES);
+    var bodyPromise = (header.flags & FLAG_DEFLATE) ? inflate(raw) : Promise.resolve(raw);
+
+    return bodyPromise.then(function (body) {
+      var key = streamKey || "default";
+      if (startGeneration !== generation) return null;
+      if (header.flags & FLAG_DELTA) {
+        var base = streamBases[key];
+        if (!base || base.seq !== header.baseSeq || base.body.byteLength !== body.byteLength) {
+          console.warn("[RSRP] Dropping delta frame", header.seq, "on", key, "— missing base", header.baseSeq);
+          return null;
+        }
+        // XOR 32 bits at a time, then the odd tail bytewise.
+        var words = body.byteLength >> 2;
+        var cur32 = new Uint32Array(body, 0, words), base32 = new Uint32Array(base.body, 0, words);
+        for (var i = 0; i < words; i++) cur32[i] ^= base32[i];
+        var cur8 = new Uint8Array(body), base8 = new Uint8Array(base.body);
+        for (var j = words << 2; j < cur8.length; j++) cur8[j] ^= base8[j];
+      }
+      streamBases[key] = { seq: header.seq, body: body.slice(0) };
+      return bodyToFloat32(body, header);
+    });
+  }
+
+  /**
+   * Decode frames of one stream in order, queued behind earlier messages on the
+   * same stream. Resolves to one entry per frame, so positions still line up with
+   * the antennas / steps they belong to: a Float32Array, or null for a dropped delta.
+   */
+  function decodeRsrpFrames(frames, streamKey) {
+    return enqueue(streamKey, function () {
+      var out = [];
+      var chain = Promise.resolve();
+      (frames || []).forEach(function (frame) {
+        chain = chain.then(function () { return decodeFrameNow(frame, streamKey); })
+                     .then(function (grid) { out.push(grid); });
+      });
+      return chain.then(function () { return out; });
+    });
+  }
+
+  /** Forget base frames (all streams, or one) — call when the backend session resets. */
+  function resetRsrpStreams(streamKey) {
+    if (streamKey) {
+      delete streamBases[streamKey];
+      return;
+    }
+    streamBases = Object.create(null);
+    generation++;
+  }
+
+  function base64ToArrayBuffer(b64) {
+    var bin = atob(b64);
+    var bytes = new Uint8Array(bin.length);
+    for (var i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return bytes.buffer;
+  }
+
+  /**
+   * If a bridge message carries `new_bsrv_rsrp_packed` / `rsrpPacked` ({stream, frames}),
+   * decode it in place into `new_bsrv_rsrp` / `rsrp` (latest frame) so the existing
+   * handlers see plain grids. Unpacked live_rsrp messages (e.g. rsrp=null evictions)
+   * queue on their antenna's stream too, so they cannot overtake its packed grids.
+   * Resolves to the same message object.
+   */
+  function unpackRsrpMessage(data) {
+    if (!data) return Promise.resolve(data);
+    if (data.new_bsrv_rsrp_packed) {
+      var packed = data.new_bsrv_rsrp_packed;
+      return decodeRsrpFrames(packed.frames, packed.stream).then(function (grids) {
+        data.new_bsrv_rsrp = grids.map(function (grid) { return grid && grid.length ? grid : null; });
+        delete data.new_bsrv_rsrp_packed;
+        return data;
+      });
+    }
+    if (data.rsrpPacked) {
+      var live = data.rsrpPacked;
+      return decodeRsrpFrames(live.frames, live.stream).then(function (grids) {
+        var last = grids.length ? grids[grids.length - 1] : null;
+        // A dropped delta must not look like rsrp=null (which evicts the antenna).
+        if (!last) data.rsrpDropped = true;
+        else data.rsrp = last.length ? last : null;
+        delete data.rsrpPacked;
+        return data;
+      });
+    }
+    if (data.type === "live_rsrp" && data.ant_id) {
+      return enqueue("live:" + data.ant_id, function () { return data; });
+    }
+    return Promise.resolve(data);
+  }
+
+  // ─── Public API ───────────────────────────────────────────────────────────────
+
+  window.decodeRsrpFrame   = decodeRsrpFrame;
+  window.decodeRsrpFrames  = decodeRsrpFrames;
+  window.resetRsrpStreams  = resetRsrpStreams;
+  window.unpackRsrpMessage = unpackRsrpMessage;
+
+})();
@@ -0,0 +1,186 @@
+// RsrpSnapshot.js — fingerprints of the accurate-engine grids in state.backendRsrpPerAntenna
+// A grid's fingerprint covers what it was computed from: the antenna (position,
+// height, azimuth, tilt, power, pattern name and content), the geometry (walls,
+// floor planes, floor size, frequency, N) and the backend version. Fingerprints
+// are taken when antennas are sent to the backend and travel with the request;
+// the backend echoes the fingerprint each grid was computed for, and only that
+// echoed value is attached to the grid, so a saved project (ProjectArchive rsrp/
+// section) records exactly which configuration each grid belongs to even when
+// replies overtake later edits. On load, grids whose fingerprint still matches
+// are restored and only the other antennas are recomputed.
+// Depends: global state
+// Used by: AntennaBackendSync, AntennaPlacement, ProjectIO
+
+(function () {
+
+  var KEY_SCALE = 1000;        // 3 decimals, as server_code/RsrpCache.py: float noise must not change a key
+
+  var sentFingerprints = Object.create(null);   // antId -> fingerprint of the config last sent
+  var gridFingerprints = Object.create(null);   // antId -> fingerprint of the cached grid
+  var patternHashes = typeof WeakMap === "function" ? new WeakMap() : null;
+
+  // ─── Hashing ─────────────────────────────────────────────────────────────────
+
+  /** Two FNV-1a lanes with different offsets: a 64-bit hex digest without crypto.subtle (sync). */
+  function Hasher() {
+    this.a = 0x811c9dc5;
+    this.b = 0x9747b28c;
+  }
+  Hasher.prototype.add = function (value) {
+    var str = typeof value === "number"
+      ? (isFinite(value) ? String(Math.round(value * KEY_SCALE) / KEY_SCALE) : "")
+      : value === undefined || value === null ? "~" : String(value);
+    var a = this.a, b = this.b;
+    for (var i = 0; i < str.length; i++) {
+      var c = str.charCodeAt(i);
+      a = Math.imul(a ^ c, 0x01000193);
+      b = Math.imul(b ^ c, 0x5bd1e995);
+      b ^= b >>> 15;
+    }
+    // Field separator, so ("1", "23") and ("12", "3") differ
+    this.a = Math.imul(a ^ 0x1f, 0x01000193);
+    this.b = Math.imul(b ^ 0x1f, 0x5bd1e995);
+    return this;
+  };
+  Hasher.prototype.hex = function () {
+    return ("0000000" + (this.a >>> 0).toString(16)).slice(-8) + ("0000000" + (this.b >>> 0).toString(16)).slice(-8);
+  };
+
+  // ─── Fingerprints ────────────────────────────────────────────────────────────
+
+  function engineVersion() {
+    return "accurate:" + (state.backendVersion || "");
+  }
+
+  function patternHash(pattern) {
+    if (!pattern) return "";
+    if (patternHashes && patternHashes.has(pattern)) return patternHashes.get(pattern);
+    var hash = new Hasher().add(JSON.stringify(pattern)).hex();
+    if (patternHashes) patternHashes.set(pattern, hash);
+    return hash;
+  }
+
+  /** Walls, floor planes and the floor-wide settings every grid depends on. */
+  function geometryFingerprint() {
+    var h = new Hasher().add(engineVersion()).add(state.w).add(state.h).add(state.freq).add(state.N);
+    var walls = state.walls || [];
+    h.add(walls.length);
+    for (var i = 0; i < walls.length; i++) {
+      var w = walls[i];
+      var pts = w.points || [w.p1 || {}, w.p2 || {}];
+      h.add(pts.length);
+      for (var k = 0; k < pts.length; k++) h.add(pts[k].x).add(pts[k].y);
+      h.add(w.loss).add(w.thickness).add(w.height).add(w.elementType);
+    }
+    var planes = state.floorPlanes || [];
+    h.add(planes.length);
+    for (var j = 0; j < planes.length; j++) {
+      var fp = planes[j];
+      var corners = [fp.p1, fp.p2, fp.p3, fp.p4];
+      for (var c = 0; c < corners.length; c++) h.add(corners[c] && corners[c].x).add(corners[c] && corners[c].y);
+      h.add(fp.attenuation).add(fp.height).add(fp.type).add(fp.inclination).add(fp.inclinationDirection);
+    }
+    return h.hex();
+  }
+
+  /** Fingerprint of the grid `ap` would get on the geometry `geometryFp`. */
+  function antennaFingerprint(ap, geometryFp) {
+    var pattern = ap.antennaPattern;
+    return new Hasher()
+      .add(geometryFp)
+      .add(ap.x).add(ap.y).add(ap.z || 2.5)
+      .add(ap.azimuth || 0).add(ap.tilt || 0).add(ap.tx)
+      .add(pattern && pattern.name ? pattern.name : "")
+      .add(patternHash(pattern))
+      .hex();
+  }
+
+  // ─── Bookkeeping ─────────────────────────────────────────────────────────────
+
+  /** Antennas about to be sent for RSRP: returns {antId: fingerprint} to send along with them. */
+  function noteSent(aps) {
+    var out = {};
+    if (!aps || !aps.length) return out;
+    var geometryFp = geometryFingerprint();
+    for (var i = 0; i < aps.length; i++) {
+      if (aps[i] && aps[i].id) out[aps[i].id] = sentFingerprints[aps[i].id] = antennaFingerprint(aps[i], geometryFp);
+    }
+    return out;
+  }
+
+  /**
+   * A grid for `antId` arrived (or was evicted when `hasGrid` is false). `fingerprint` is
+   * the one the backend echoed for the config it computed; without it the grid's
+   * provenance is unknown and it is never persisted as current.
+   */
+  function noteReceived(antId, hasGrid, fingerprint) {
+    if (hasGrid && fingerprint) gridFingerprints[antId] = fingerprint;
+    else delete gridFingerprints[antId];
+  }
+
+  /** Fingerprints of the cached grids, for saving: {antId: fingerprint}. */
+  function fingerprints() {
+    var out = {};
+    var cache = state.backendRsrpPerAntenna || {};
+    for (var antId in cache) {
+      if (gridFingerprints[antId]) out[antId] = gridFingerprints[antId];
+    }
+    return out;
+  }
+
+  /**
+   * Put archived grids ({antIds, fingerprints, grids}) back into the per-antenna
+   * cache for every enabled antenna whose fingerprint still matches; antennas that
+   * do not match lose any cached grid. Returns the number of grids restored.
+   */
+  function restore(snapshot) {
+    var cache = state.backendRsrpPerAntenna = state.backendRsrpPerAntenna || {};
+    var saved = Object.create(null);
+    if (snapshot && snapshot.fingerprints) {
+      snapshot.antIds.forEach(function (antId, i) { saved[antId] = snapshot.fingerprints[i]; });
+    }
+    var geometryFp = geometryFingerprint();
+    var restored = 0;
+    (state.aps || []).forEach(function (ap) {
+      if (ap.enabled === false) return;
+      var fp = antennaFingerprint(ap, geometryFp);
+      var grid = snapshot && snapshot.grids[ap.id];
+      if (grid && grid.length === snapshot.bins && saved[ap.id] === fp) {
+        cache[ap.id] = grid;
+        sentFingerprints[ap.id] = gridFingerprints[ap.id] = fp;
+        restored++;
+      } else {
+        delete cache[ap.id];
+        delete gridFingerprints[ap.id];
+      }
+    });
+    return restored;
+  }
+
+  /** Ids of `aps` whose cached grid is current — the backend need not send those again. */
+  function currentIds(aps) {
+    var cache = state.backendRsrpPerAntenna || {};
+    var geometryFp = null;
+    var ids = [];
+    for (var i = 0; i < aps.length; i++) {
+      var ap = aps[i];
+      if (!cache[ap.id] || !gridFingerprints[ap.id]) continue;
+      geometryFp = geometryFp || geometryFingerprint();
+      if (gridFingerprints[ap.id] === antennaFingerprint(ap, geometryFp)) ids.push(ap.id);
+    }
+    return ids;
+  }
+
+  // ─── Public API ───────────────────────────────────────────────────────────────
+
+  window.RsrpSnapshot = {
+    geometryFingerprint: geometryFingerprint,
+    antennaFingerprint:  antennaFingerprint,
+    noteSent:            noteSent,
+    noteReceived:        noteReceived,
+    fingerprints:        fingerprints,
+    restore:             restore,
+    currentIds:          currentIds
+  };
+
+})();
@@ -1,11 +1,12 @@
 // OptimizationSystem — Handles AI antenna optimization polling and updates
 // Depends on: global state, draw(), renderAPs(), NotificationSystem,
-//             logAntennaPositionChange, generateHeatmapAsync, updateLegendBar, DataExportSystem
+//             logAntennaPositionChange, generateHeatmapAsync, updateLegendBar, DataExportSystem,
+//             LatencyTracer
 
 var OptimizationSystem = (function () {
 
   var optimizationPollingInterval = null;
-  var rsrpTimingRows = [];
+  var TRACE_KIND = "optimization_rsrp";
 
   var ACTION_MESSAGES = {
     Sectorization:  'Optimizing sector configuration...',
@@ -29,7 +30,7 @@ var OptimizationSystem = (function () {
   // ── Polling ────────────────────────────────────────────────────────────
 
   function startOptimizationPolling() {
-    rsrpTimingRows = [];  // Reset timing data for new optimization run
+    LatencyTracer.reset(TRACE_KIND);  // Reset timing data for new optimization run
     if (optimizationPollingInterval) clearInterval(optimizationPollingInterval);
     optimizationPollingInterval = setInterval(function () {
       window.parent.postMessage({
@@ -65,11 +66,14 @@ var OptimizationSystem = (function () {
     btn.style.opacity = locked ? '0.5' : '1';
   }
 
-  function refreshHeatmap(onHeatmapShown) {
-    if (!state.showVisualization) return;
+  function refreshHeatmap(traceId) {
+    if (!state.showVisualization) {
+      LatencyTracer.finish(traceId);
+      return;
+    }
     // state.cachedHeatmap = null;
     state.heatmapUpdatePending = false;
-    state.onHeatmapShownCallback = onHeatmapShown || null;
+    if (traceId) LatencyTracer.finishOnPaint([traceId]);
     if (typeof generateHeatmapAsync === 'function') generateHeatmapAsync(null, true);
     // if (typeof draw === 'function') draw();
   }
@@ -107,9 +111,47 @@ var OptimizationSystem = (function () {
     state.compliancePercentFromBackend = null;
   }
 
+  function switchToAccurateEngine() {
+    if (!state.isOptimizing && state.model !== 'accurateEngine') {
+      state.model = 'accurateEngine';
+      var mdl = document.getElementById('model');
+      if (mdl) mdl.value = 'accurateEngine';
+      if (typeof window.syncLiveRsrpFromModel === 'function') window.syncLiveRsrpFromModel();
+    }
+  }
+
+  function applyBaselineCompliance(newCompliance) {
+    if (Array.isArray(newCompliance) && newCompliance.length > 0) {
+      var latest = newCompliance[newCompliance.length - 1];
+      if (latest !== undefined && latest !== null) {
+        var rounded = Math.round(Number(latest));
+        state.optimizationCompliancePercent = rounded;
+        state.compliancePercentFromBackend = rounded;
+        setComplianceDisplay(rounded);
+      }
+    }
+  }
+
+  /** Large-floorplan baseline: LOD tiles for the current viewport instead of the full grid.
+   *  The coverage CSV is not auto-exported here since the tiles are pooled, not per-metre. */
+  function handleBaselineRsrpTiles(data) {
+    if (typeof window.clearBackendRsrpCache === 'function') window.clearBackendRsrpCache();
+    var gridKey = state.isOptimizing ? "optimizationRsrpGrid" : "accurateEngineRsrpGrid";
+    window.applyRsrpTiles(data.rsrp_tiles, gridKey).then(function (updated) {
+      if (updated) switchToAccurateEngine();
+      hideLoadingOverlay();
+      applyBaselineCompliance(data.new_compliance || []);
+      refreshHeatmap();
+    });
+  }
+
   /** Handle baseline RSRP update (place/move or get_accurate_baseline). 
     * When new_bsrv_rsrp null, clear backend grids (antenna turned off). */
   function handleBaselineRsrpUpdate(data) {
+    if (data.rsrp_tiles && typeof window.applyRsrpTiles === 'function') {
+      handleBaselineRsrpTiles(data);
+      return;
+    }
     if (data.new_bsrv_rsrp === null) {
       if (typeof window.clearBackendRsrpCache === 'function') window.clearBackendRsrpCache();
       refreshHeatmap();
@@ -123,26 +165,13 @@ var OptimizationSystem = (function () {
       if (latestRsrp && latestRsrp.length > 0) {
         var build = state.isOptimizing ? window.buildOptimizationRsrpGrid : window.buildAccurateEngineRsrpGrid;
         if (typeof build === 'function') build(latestRsrp);
-        if (!state.isOptimizing && state.model !== 'accurateEngine') {
-          state.model = 'accurateEngine';
-          var mdl = document.getElementById('model');
-          if (mdl) mdl.value = 'accurateEngine';
-          if (typeof window.syncLiveRsrpFromModel === 'function') window.syncLiveRsrpFromModel();
-        }
+        switchToAccurateEngine();
         hideLoadingOverlay();
       }
     } else if (Array.isArray(newCompliance) && newCompliance.length > 0 && typeof window.mergeBackendRsrpFromCache === 'function') {
       window.mergeBackendRsrpFromCache();
     }
-    if (Array.isArray(newCompliance) && newCompliance.length > 0) {
-      var latest = newCompliance[newCompliance.length - 1];
-      if (latest !== undefined && latest !== null) {
-        var rounded = Math.round(Number(latest));
-        state.optimizationCompliancePercent = rounded;
-        state.compliancePercentFromBackend = rounded;
-        setComplianceDisplay(rounded);
-      }
-    }
+    applyBaselineCompliance(newCompliance);
     refreshHeatmap();
     if (data.type === "baseline_rsrp" && Array.isArray(newRsrp) && newRsrp.length > 0 && typeof DataExportSystem !== 'undefined' && DataExportSystem.exportDetailedCoverageData) {
       setTimeout(function () {
@@ -167,11 +196,12 @@ var OptimizationSystem = (function () {
         }, 1000);
       }
       // Timing export only after optimization completes (snapshot & clear immediately to avoid re-export on re-entry)
-      if (typeof DataExportSystem !== 'undefined' && DataExportSystem.exportTimingRowsAsXlsx && rsrpTimingRows.length > 0) {
-        var rowsSnapshot = rsrpTimingRows.slice();
-        rsrpTimingRows = [];
+      var traces = LatencyTracer.toJsonl(TRACE_KIND);
+      if (traces) {
+        LatencyTracer.reset(TRACE_KIND);
         setTimeout(function () {
-          DataExportSystem.exportTimingRowsAsXlsx(rowsSnapshot);
+          var ts3 = new Date().toISOString().replace(/[:.]/g, '-').slice(0, -5);
+          DataExportSystem.exportTracesAsJsonl(traces, 'rsrp_timing_' + ts3 + '.jsonl', traces.split('\n').length);
         }, 2000);
       }
     } else {
@@ -182,37 +212,58 @@ var OptimizationSystem = (function () {
 
   // ── Main Update Handler ───────────────────────────────────────────────
 
+  /**
+   * Trace for one optimization grid: App spans (fetch, forward) plus bridge and decode here.
+   * The trace keeps the App's id and starts at its fetch; the backend send time is on the
+   * server's clock, so backend_to_app is only recorded as a skew-affected span.
+   */
+  function startUpdateTrace(data, serverSendSec) {
+    var trace = (data.traces && data.traces[0]) || {};
+    var traceId = LatencyTracer.start(TRACE_KIND, { skipped: data.rsrp_skipped || 0 },
+      trace.start != null ? trace.start : trace.received, trace.id);
+    if (serverSendSec != null && trace.received != null) {
+      LatencyTracer.span(traceId, "backend_to_app", serverSendSec * 1000, trace.received, null, true);
+    }
+    LatencyTracer.addSpans(traceId, trace.spans);
+    if (trace.sent != null && data.receivedAt != null) {
+      LatencyTracer.span(traceId, "bridge", trace.sent, data.receivedAt);
+    }
+    if (data.decodedAt != null) {
+      LatencyTracer.span(traceId, "decode", data.receivedAt, data.decodedAt);
+    }
+    return traceId;
+  }
+
   function handleOptimizationUpdate(data) {
     try {
-      var toReadable = function (sec) { return new Date(sec * 1000).toISOString().replace('T', ' ').replace('Z', ''); };
       var newActions = data.new_action_configs || [];
       var newRsrp = data.new_bsrv_rsrp || [];
       var newCompliance = data.new_compliance || [];
       var status = data.status;
       var message = data.message;
+      // Backend history skipped ahead: actions are the latest per antenna, the grid the latest one
+      if (data.skipped > 0) {
+        console.log("[OPT] Skipped " + data.skipped + " step(s) to the latest optimization state");
+      }
+      // Latest-only delivery: intermediate grids were dropped before transfer
+      if (data.rsrp_skipped > 0) {
+        window.optimizationFramesSkipped = (window.optimizationFramesSkipped || 0) + data.rsrp_skipped;
+      }
 
       // RSRP grid
       var rsrpUpdated = false;
-      var receiveAtSec = (performance.timeOrigin + performance.now()) / 1000;
+      var traceId = null;
       var serverSendSec = data.rsrp_send_timestamp_sec;
       if (Array.isArray(newRsrp) && newRsrp.length > 0) {
         var latestRsrp = newRsrp[newRsrp.length - 1];
         if (latestRsrp && latestRsrp.length > 0 && typeof window.buildOptimizationRsrpGrid === 'function') {
+          // One trace per delivered grid, from the backend send time when it provides one
+          traceId = startUpdateTrace(data, serverSendSec);
+          var buildAt = LatencyTracer.now();
           window.buildOptimizationRsrpGrid(latestRsrp);
+          LatencyTracer.span(traceId, "build_grid", buildAt, LatencyTracer.now(), latestRsrp.length * 4);
           rsrpUpdated = true;
           hideLoadingOverlay();
-          // Record timing row when backend provides send timestamp (for latency profiling)
-          if (serverSendSec != null) {
-            rsrpTimingRows.push({
-              index: rsrpTimingRows.length + 1,
-              serverSendTime: toReadable(serverSendSec),
-              clientReceiveTime: toReadable(receiveAtSec),
-              heatmapTime: '',           // Filled when heatmap is rendered (onHeatmapShown)
-              serverToClientSec: (receiveAtSec - serverSendSec).toFixed(3),
-              receiveToHeatmapSec: '',  // Filled when heatmap is rendered
-              serverToHeatmapSec: ''    // Filled when heatmap is rendered
-            });
-          }
         }
       }
 
@@ -308,14 +359,9 @@ var OptimizationSystem = (function () {
         if (changesMade) {
           if (window.renderAPs) window.renderAPs();
         }
-        var onHeatmapShown = rsrpUpdated && rsrpTimingRows.length > 0 ? function () {
-          var heatmapSec = (performance.timeOrigin + performance.now()) / 1000;
-          var last = rsrpTimingRows[rsrpTimingRows.length - 1];
-          last.heatmapTime = toReadable(heatmapSec);
-          last.receiveToHeatmapSec = (heatmapSec - receiveAtSec).toFixed(3);  // Client receive → heatmap render
-          last.serverToHeatmapSec = (heatmapSec - serverSendSec).toFixed(3); // End-to-end: server → heatmap
-        } : null;
-        refreshHeatmap(onHeatmapShown);
+        refreshHeatmap(traceId);
+      } else {
+        LatencyTracer.finish(traceId);
       }
 
       handleTerminalStatus(status, data, footerBadge, footerMessage);
@@ -11,6 +11,163 @@
  *   const { PropagationModel25D } = require('./PropagationModel25D.js');
  */
 
+// Below this many walls wallsLoss keeps the plain linear scan
+const WALL_INDEX_MIN_WALLS = 16;
+
+// Angular resolution of compiled pattern gain tables (degrees per entry)
+const GAIN_TABLE_STEP_DEG = 0.1;
+
+// Compiled tables keyed by a hash of the pattern content, shared by every copy of a
+// pattern; least recently used first, at most GAIN_TABLE_CACHE_MAX (~14 KB each)
+const _gainTablesByContent = new Map();
+const GAIN_TABLE_CACHE_MAX = 64;
+// Same tables keyed by the {angle, gain} array itself, so the hot path skips hashing
+const _gainTablesByData = new WeakMap();
+
+// Memory budget for cached per-antenna obstruction rasters (Float32 walls + floor, 8 bytes
+// per bin). The heatmap worker pool splits it between its workers (setObstructionBudget).
+const OBSTRUCTION_CACHE_BYTES = 96 * 1024 * 1024;
+// Rasters are allocated in square blocks of bins as they are first touched, matching the
+// heatmap tile size, so a pool worker only holds the blocks of the tiles it computes.
+const OBSTRUCTION_BLOCK = 48;
+
+/**
+ * Uniform-grid index over wall segments for PropagationModel25D.wallsLoss.
+ * Built once per wall geometry; a tx→rx ray only tests the segments stored in the
+ * cells it crosses. Both segments and rays are rasterised with the same padded
+ * row-span cover, so every true intersection is found in at least one shared cell.
+ */
+class WallSegmentIndex {
+    constructor(walls) {
+        this.walls = walls;
+        const pts = [];          // [p, q] endpoint objects per segment (originals, for segmentsIntersect)
+        const segWall = [];
+        let minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
+        walls.forEach((wall, w) => {
+            for (const [a, b] of WallSegmentIndex.wallSegments(wall)) {
+                pts.push([a, b]);
+                segWall.push(w);
+                minX = Math.min(minX, a.x, b.x); maxX = Math.max(maxX, a.x, b.x);
+                minY = Math.min(minY, a.y, b.y); maxY = Math.max(maxY, a.y, b.y);
+            }
+        });
+        this.segments = pts;
+        this.segWall = Int32Array.from(segWall);
+        this.snapshot = WallSegmentIndex.geometrySnapshot(walls);
+
+        const n = pts.length;
+        const w = Math.max(maxX - minX, 1e-6), h = Math.max(maxY - minY, 1e-6);
+        // ~2 segments per cell on average, capped at 256 cells per axis
+        const cell = Math.max(Math.sqrt((w * h) / Math.max(n / 2, 1)), Math.max(w, h) / 256, 1e-3);
+        this.cell = cell;
+        this.originX = minX; this.originY = minY;
+        this.cols = Math.max(1, Math.ceil(w / cell));
+        this.rows = Math.max(1, Math.ceil(h / cell));
+        this.eps = cell * 1e-6;
+
+        // Two passes (count, fill) into a CSR layout: cellStart[c]..cellStart[c+1] in cellItems
+        const counts = new Int32Array(this.cols * this.rows + 1);
+        for (let s = 0; s < n; s++) this._cover(pts[s][0], pts[s][1], c => { counts[c + 1]++; });
+        for (let c = 0; c < counts.length - 1; c++) counts[c + 1] += counts[c];
+        this.cellStart = counts;
+        this.cellItems = new Int32Array(counts[counts.length - 1]);
+        const fill = counts.slice(0, -1);
+        for (let s = 0; s < n; s++) this._cover(pts[s][0], pts[s][1], c => { this.cellItems[fill[c]++] = s; });
+
+        this.segStamp = new Uint32Array(n);
+        this.wallStamp = new Uint32Array(walls.length);
+        this.stamp = 0;
+    }
+
+    static wallSegments(wall) {
+        const segments = [];
+        if (wall.points && wall.points.length >= 2) {
+            for (let i = 0; i < wall.points.length - 1; i++) {
+                segments.push([wall.points[i], wall.points[i + 1]]);
+            }
+        } else if (wall.p1 && wall.p2) {
+            segments.push([wall.p1, wall.p2]);
+        }
+        return segments;
+    }
+
+    /** Flat copy of every wall coordinate — compared to detect in-place wall edits. */
+    static geometrySnapshot(walls) {
+        const coords = [walls.length];
+        for (const wall of walls) {
+            const segs = WallSegmentIndex.wallSegments(wall);
+            coords.push(segs.length);
+            for (const [a, b] of segs) coords.push(a.x, a.y, b.x, b.y);
+        }
+        return Float64Array.from(coords);
+    }
+
+    /** True while `walls` still has exactly the geometry this index was built from. */
+    matches(walls) {
+        if (walls !== this.walls) return false;
+        const snap = this.snapshot;
+        if (snap[0] !== walls.length) return false;
+        let k = 1;
+        for (const wall of walls) {
+            const segs = WallSegmentIndex.wallSegments(wall);
+            if (snap[k++] !== segs.length) return false;
+            for (const [a, b] of segs) {
+                if (snap[k++] !== a.x || snap[k++] !== a.y || snap[k++] !== b.x || snap[k++] !== b.y) return false;
+            }
+        }
+        return true;
+    }
+
+    /** Visit every cell the segment a→b touches (row spans, padded by eps). */
+    _cover(a, b, visit) {
+        const cell = this.cell, eps = this.eps;
+        const ax = a.x - this.originX, ay = a.y - this.originY;
+        const bx = b.x - this.originX, by = b.y - this.originY;
+        const clampCol = v => Math.max(0, Math.min(this.cols - 1, Math.floor(v / cell)));
+        const clampRow = v => Math.max(0, Math.min(this.rows - 1, Math.floor(v / cell)));
+        const r0 = clampRow(Math.min(ay, by) - eps), r1 = clampRow(Math.max(ay, by) + eps);
+        const dy = by - ay;
+        for (let r = r0; r <= r1; r++) {
+            let xLo, xHi;
+            if (Math.abs(dy) < 1e-12) {
+                xLo = Math.min(ax, bx); xHi = Math.max(ax, bx);
+            } else {
+                const yBandLo = Math.max(r * cell, Math.min(ay, by));
+                const yBandHi = Math.min((r + 1) * cell, Math.max(ay, by));
+                const xa = ax + (bx - ax) * ((yBandLo - ay) / dy);
+                const xb = ax + (bx - ax) * ((yBandHi - ay) / dy);
+                xLo = Math.min(xa, xb); xHi = Math.max(xa, xb);
+            }
+            const c0 = clampCol(xLo - eps), c1 = clampCol(xHi + eps);
+            for (let c = c0; c <= c1; c++) visit(r * this.cols + c);
+        }
+    }
+
+    /**
+     * Indices (ascending) of walls with at least one segment crossing tx→rx.
+     * `intersects(p1, q1, p2, q2)` is the model's own segmentsIntersect.
+     */
+    hitWalls(txPos, rxPos, intersects) {
+        if (++this.stamp === 0xffffffff) { this.segStamp.fill(0); this.wallStamp.fill(0); this.stamp = 1; }
+        const stamp = this.stamp, hits = [];
+        const { cellStart, cellItems, segStamp, wallStamp, segWall, segments } = this;
+        this._cover(txPos, rxPos, c => {
+            for (let k = cellStart[c]; k < cellStart[c + 1]; k++) {
+                const s = cellItems[k];
+                if (segStamp[s] === stamp) continue;
+                segStamp[s] = stamp;
+                const w = segWall[s];
+                if (wallStamp[w] === stamp) continue;
+                if (intersects(txPos, rxPos, segments[s][0], segments[s][1])) {
+                    wallStamp[w] = stamp;
+                    hits.push(w);
+                }
+            }
+        });
+        return hits.sort((x, y) => x - y);
+    }
+}
+
 class PropagationModel25D {
     /**
      * Initialize the propagation model
@@ -28,6 +185,7 @@ class PropagationModel25D {
         this.referenceOffset = config.referenceOffset || 0.0;
         this.minDistance = 0.5;  // Minimum distance in meters
         this._p25dLogged = false;
+        this.obstructionBudget = OBSTRUCTION_CACHE_BYTES;
     }
 
     /**
@@ -166,20 +324,22 @@ class PropagationModel25D {
      * @returns {number} Total wall loss in dB
      */
     wallsLoss(txPos, rxPos, walls, elementTypes = null) {
+        const index = this.getWallIndex(walls);
+        if (index) {
+            // Sum in wall order so totals match the linear scan bit for bit
+            let totalLoss = 0;
+            for (const w of index.hitWalls(txPos, rxPos, this._intersects)) {
+                totalLoss += this.wallLossValue(walls[w], elementTypes);
+            }
+            return totalLoss;
+        }
+
         let totalLoss = 0;
 
         for (const wall of walls) {
             // Get wall segments
-            const segments = [];
-            if (wall.points && wall.points.length >= 2) {
-                for (let i = 0; i < wall.points.length - 1; i++) {
-                    segments.push([wall.points[i], wall.points[i + 1]]);
-                }
-            } else if (wall.p1 && wall.p2) {
-                segments.push([wall.p1, wall.p2]);
-            } else {
-                continue;
-            }
+            const segments = WallSegmentIndex.wallSegments(wall);
+            if (segments.length === 0) continue;
 
             // Check intersection
             let intersects = false;
@@ -191,28 +351,187 @@ class PropagationModel25D {
             }
 
             if (intersects) {
-                // Get loss value
-                let loss = wall.loss || 0;
-                
-                // If no loss specified, try to get from elementTypes
-                if (loss === 0 && elementTypes) {
-                    const elemType = wall.elementType || wall.type;
-                    if (elemType && elementTypes[elemType]) {
-                        loss = elementTypes[elemType].loss || 0;
-                    } else if (wall.type && elementTypes.wall && elementTypes.wall[wall.type]) {
-                        loss = elementTypes.wall[wall.type].loss || 0;
-                    }
-                }
-
-                totalLoss += loss;
+                totalLoss += this.wallLossValue(wall, elementTypes);
             }
         }
 
         return totalLoss;
     }
 
+    /**
+     * Loss of one wall in dB (explicit loss, else from elementTypes)
+     */
+    wallLossValue(wall, elementTypes = null) {
+        // Get loss value
+        let loss = wall.loss || 0;
+
+        // If no loss specified, try to get from elementTypes
+        if (loss === 0 && elementTypes) {
+            const elemType = wall.elementType || wall.type;
+            if (elemType && elementTypes[elemType]) {
+                loss = elementTypes[elemType].loss || 0;
+            } else if (wall.type && elementTypes.wall && elementTypes.wall[wall.type]) {
+                loss = elementTypes.wall[wall.type].loss || 0;
+            }
+        }
+        return loss;
+    }
+
+    /**
+     * Spatial index for `walls`, rebuilt when their geometry changes.
+     * The geometry check runs once per JS task (reset on a microtask), so a heatmap
+     * chunk pays it once rather than per ray. Returns null for small wall sets,
+     * where the linear scan is cheaper.
+     */
+    getWallIndex(walls) {
+        if (!walls || walls.length < WALL_INDEX_MIN_WALLS) return null;
+        if (!this._intersects) this._intersects = this.segmentsIntersect.bind(this);
+        if (this._wallIndex && this._wallIndexChecked && this._wallIndex.walls === walls) {
+            return this._wallIndex;
+        }
+        if (!this._wallIndex || !this._wallIndex.matches(walls)) {
+            this._wallIndex = new WallSegmentIndex(walls);
+        }
+        this._wallIndexChecked = true;
+        Promise.resolve().then(() => { this._wallIndexChecked = false; });
+        return this._wallIndex;
+    }
+
+    /** Drop the wall index (e.g. after bulk wall replacement). */
+    invalidateWallIndex() {
+        this._wallIndex = null;
+        this._wallIndexChecked = false;
+    }
+
+    /**
+     * Declare the receiver grid of the heatmap pass about to run: bin (c, r) is
+     * sampled at ((c + 0.5) * dx, (r + 0.5) * dy). Obstruction losses for those
+     * points are then cached per antenna position, so power/azimuth/tilt edits
+     * only re-apply gain and distance loss on the next pass.
+     */
+    setObstructionRaster(cols, rows, dx, dy) {
+        this._raster = {
+            cols, rows, dx, dy, key: `${cols}x${rows}@${dx},${dy}`,
+            blockCols: Math.ceil(cols / OBSTRUCTION_BLOCK)
+        };
+    }
+
+    /** Byte budget for this model's obstruction rasters (a pool worker gets its share). */
+    setObstructionBudget(bytes) {
+        this.obstructionBudget = bytes;
+    }
+
+    /**
+     * Wall and floor-plane loss between tx and rx: {walls, floor} in dB.
+     * Served from the antenna's obstruction raster when rx is a bin centre of
+     * the current raster and walls/floor planes are unchanged.
+     */
+    obstructionLoss(txPos, rxPos, walls, floorPlanes, elementTypes = null) {
+        const raster = this._raster;
+        let c = -1, r = -1;
+        if (raster) {
+            c = Math.round(rxPos.x / raster.dx - 0.5);
+            r = Math.round(rxPos.y / raster.dy - 0.5);
+            if (!(c >= 0 && c < raster.cols && r >= 0 && r < raster.rows &&
+                  (c + 0.5) * raster.dx === rxPos.x && (r + 0.5) * raster.dy === rxPos.y)) {
+                c = -1;
+            }
+        }
+        if (c < 0) {
+            return {
+                walls: this.wallsLoss(txPos, rxPos, walls, elementTypes),
+                floor: this.floorPlanesLoss(txPos, rxPos, floorPlanes)
+            };
+        }
+
+        const cache = this._obstructionCache(walls, floorPlanes, elementTypes);
+        const entry = this._obstructionEntry(cache, txPos, raster);
+        const blockIndex = Math.floor(r / OBSTRUCTION_BLOCK) * raster.blockCols + Math.floor(c / OBSTRUCTION_BLOCK);
+        let block = entry.blocks[blockIndex];
+        if (!block) {
+            // [walls, floor] per bin
+            block = entry.blocks[blockIndex] = new Float32Array(OBSTRUCTION_BLOCK * OBSTRUCTION_BLOCK * 2).fill(NaN);
+            entry.bytes += block.byteLength;
+            cache.bytes += block.byteLength;
+            this._trimObstructionCache(cache, entry);
+        }
+        const k = 2 * ((r % OBSTRUCTION_BLOCK) * OBSTRUCTION_BLOCK + (c % OBSTRUCTION_BLOCK));
+        if (Number.isNaN(block[k])) {
+            block[k] = this.wallsLoss(txPos, rxPos, walls, elementTypes);
+            block[k + 1] = this.floorPlanesLoss(txPos, rxPos, floorPlanes);
+        }
+        return { walls: block[k], floor: block[k + 1] };
+    }
+
+    /** Raster for one antenna position on the current raster grid (LRU). */
+    _obstructionEntry(cache, txPos, raster) {
+        const key = `${txPos.x},${txPos.y}|${raster.key}`;
+        let entry = cache.entries.get(key);
+        if (entry) {
+            // Re-insert to mark as most recently used
+            cache.entries.delete(key);
+            cache.entries.set(key, entry);
+            return entry;
+        }
+        entry = { blocks: [], bytes: 0 };
+        cache.entries.set(key, entry);
+        return entry;
+    }
+
+    /** Drop least recently used rasters (never `keep`) until the cache fits its budget. */
+    _trimObstructionCache(cache, keep) {
+        for (const [oldKey, old] of cache.entries) {
+            if (cache.bytes <= this.obstructionBudget) break;
+            if (old === keep) continue;
+            cache.entries.delete(oldKey);
+            cache.bytes -= old.bytes;
+        }
+    }
+
+    /**
+     * Raster store for the current walls/floor planes. Their geometry and
+     * resolved losses are compared once per JS task; any change drops every raster.
+     */
+    _obstructionCache(walls, floorPlanes, elementTypes) {
+        const cache = this._obstruction;
+        if (cache && this._obstructionChecked) return cache;
+        const snapshot = this.obstructionSnapshot(walls, floorPlanes, elementTypes);
+        const same = cache && cache.snapshot.length === snapshot.length &&
+            cache.snapshot.every((v, i) => v === snapshot[i] || (Number.isNaN(v) && Number.isNaN(snapshot[i])));
+        if (!same) {
+            this._obstruction = { snapshot, entries: new Map(), bytes: 0 };
+        }
+        this._obstructionChecked = true;
+        Promise.resolve().then(() => { this._obstructionChecked = false; });
+        return this._obstruction;
+    }
+
+    /** Flat list of everything obstruction losses depend on. */
+    obstructionSnapshot(walls, floorPlanes, elementTypes = null) {
+        const values = [walls.length];
+        for (const wall of walls) {
+            const segs = WallSegmentIndex.wallSegments(wall);
+            values.push(segs.length, this.wallLossValue(wall, elementTypes));
+            for (const [a, b] of segs) values.push(a.x, a.y, b.x, b.y);
+        }
+        values.push(floorPlanes.length);
+        for (const fp of floorPlanes) {
+            values.push(fp.attenuation || 0);
+            for (const p of [fp.p1, fp.p2, fp.p3, fp.p4]) values.push(p.x, p.y);
+        }
+        return values;
+    }
+
+    /** Drop all cached obstruction rasters. */
+    invalidateObstructionCache() {
+        this._obstruction = null;
+        this._obstructionChecked = false;
+    }
+
     /**
      * Interpolate gain from antenna pattern
+     * Uses the pattern's compiled gain table (index + lerp); the sorted-array
+     * search below only runs while compiling that table.
      * @param {Array} data - Pattern data [{angle, gain}, ...]
      * @param {number} angle - Angle in degrees
      * @returns {number} Interpolated gain value
@@ -221,6 +540,76 @@ class PropagationModel25D {
         if (!data || data.length === 0) return 0;
         if (data.length === 1) return data[0].gain;
 
+        const table = this.gainTable(data);
+        let pos = ((((angle % 360) + 360) % 360)) / GAIN_TABLE_STEP_DEG;
+        let i = Math.floor(pos);
+        if (i >= table.length - 1) { i = table.length - 2; pos = i + 1; }
+        return table[i] + (pos - i) * (table[i + 1] - table[i]);
+    }
+
+    /**
+     * Gain table for a pattern cut: Float32Array of the interpolated gain every
+     * GAIN_TABLE_STEP_DEG over 0-360° (last entry repeats 0° for the wrap).
+     * Compiled once per pattern content and cached.
+     * @param {Array} data - Pattern data [{angle, gain}, ...]
+     * @returns {Float32Array}
+     */
+    gainTable(data) {
+        const cached = _gainTablesByData.get(data);
+        if (cached && cached.length === data.length) return cached.table;
+
+        const key = PropagationModel25D.patternContentKey(data);
+        let table = _gainTablesByContent.get(key);
+        if (table) {
+            // Re-insert to mark as most recently used
+            _gainTablesByContent.delete(key);
+            _gainTablesByContent.set(key, table);
+        } else {
+            const steps = Math.round(360 / GAIN_TABLE_STEP_DEG);
+            table = new Float32Array(steps + 1);
+            for (let k = 0; k < steps; k++) {
+                table[k] = this.interpolateGainSorted(data, k * GAIN_TABLE_STEP_DEG);
+            }
+            table[steps] = table[0];
+            _gainTablesByContent.set(key, table);
+            if (_gainTablesByContent.size > GAIN_TABLE_CACHE_MAX) {
+                _gainTablesByContent.delete(_gainTablesByContent.keys().next().value);
+            }
+        }
+        _gainTablesByData.set(data, { length: data.length, table });
+        return table;
+    }
+
+    /**
+     * Content key of a pattern cut: point count plus two FNV-1a lanes over the
+     * angle/gain text, so the cache does not hold a copy of every pattern's text.
+     * @param {Array} data - Pattern data [{angle, gain}, ...]
+     * @returns {string}
+     */
+    static patternContentKey(data) {
+        let a = 0x811c9dc5, b = 0x9747b28c;
+        for (const p of data) {
+            const str = `${p.angle}:${p.gain};`;
+            for (let i = 0; i < str.length; i++) {
+                const c = str.charCodeAt(i);
+                a = Math.imul(a ^ c, 0x01000193);
+                b = Math.imul(b ^ c, 0x5bd1e995);
+                b ^= b >>> 15;
+            }
+        }
+        return `${data.length}:${(a >>> 0).toString(16)}:${(b >>> 0).toString(16)}`;
+    }
+
+    /**
+     * Interpolate gain by searching the sorted pattern points directly
+     * @param {Array} data - Pattern data [{angle, gain}, ...]
+     * @param {number} angle - Angle in degrees
+     * @returns {number} Interpolated gain value
+     */
+    interpolateGainSorted(data, angle) {
+        if (!data || data.length === 0) return 0;
+        if (data.length === 1) return data[0].gain;
+
         // Normalize angle to 0-360
         angle = ((angle % 360) + 360) % 360;
 
@@ -424,9 +813,10 @@ class PropagationModel25D {
         const baseLoss = refLoss1m + distanceLoss;
 
         // Environmental losses
-        const wallAttenuation = this.wallsLoss(txPos, rxPos, walls, elementTypes);
+        const obstruction = this.obstructionLoss(txPos, rxPos, walls, floorPlanes, elementTypes);
+        const wallAttenuation = obstruction.walls;
         const groundAttenuation = this.groundPlaneLoss(txPos, rxPos, groundPlaneConfig);
-        const floorPlaneAttenuation = this.floorPlanesLoss(txPos, rxPos, floorPlanes);
+        const floorPlaneAttenuation = obstruction.floor;
         
         const totalLoss = baseLoss + wallAttenuation + groundAttenuation + floorPlaneAttenuation + this.verticalFactor;
         
@@ -506,10 +896,11 @@ class PropagationModel25D {
 
 // Export for use in Node.js or browser
 if (typeof module !== 'undefined' && module.exports) {
-    module.exports = { PropagationModel25D };
+    module.exports = { PropagationModel25D, WallSegmentIndex };
 }
 
 // Export for ES6 modules
 if (typeof window !== 'undefined') {
     window.PropagationModel25D = PropagationModel25D;
+    window.WallSegmentIndex = WallSegmentIndex;
 }
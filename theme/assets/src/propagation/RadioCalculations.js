@@ -142,7 +142,8 @@ var RadioCalculations = (function () {
       if (bval == null && typeof window.getActiveRsrpGrid === 'function' && window.getActiveRsrpGrid() && typeof window.getBackendRsrpAt === 'function') {
         bval = window.getBackendRsrpAt(x, y);
       }
-      if (bval !== null && bval !== undefined) {
+      // Bins without a backend value (NaN) fall back to the local model below
+      if (bval !== null && bval !== undefined && !isNaN(bval)) {
         return bval;
       }
     }
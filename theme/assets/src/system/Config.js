@@ -49,6 +49,7 @@ var state = {
   cachedHeatmap: null,
   cachedHeatmapAntennaCount: 0,
   cachedHeatmapModel: null,
+  heatmapField: null,
   heatmapUpdatePending: false,
   heatmapUpdateRequestId: null,
   heatmapWorker: null,
@@ -78,6 +79,7 @@ var state = {
   calibratingDrag: false,
   calibrationPixels: null,
   showContours: false,
+  contourThresholds: [],
   showTooltip: false,
   showVisualization: true,
   selectedElementType: "",
@@ -0,0 +1,243 @@
+// LatencyTracer.js — span tracing for the antenna-edit → heatmap path
+// One trace id follows an edit from the postMessage in AntennaBackendSync through
+// the App bridge (coalesce, enqueue_antenna_batch, grid fetch) back into the iframe
+// (decode, best-server merge, heatmap paint). Optimization updates get one trace
+// per delivered grid (backend send → poll → decode → paint).
+// Times are epoch milliseconds (performance.timeOrigin + performance.now()) so spans
+// recorded by the App form (parent window) line up with the iframe's own. Spans that
+// compare against another machine's clock (backend send time) are recorded with
+// skew: true, listed as "<stage> (skew)" and kept out of the trace start and total.
+// Depends: DataExportSystem (JSONL download), global state (onHeatmapShownCallback)
+// Used by: AntennaBackendSync, pollOptimizationData
+//
+// Ctrl+Shift+L toggles the percentile summary panel.
+
+var LatencyTracer = (function () {
+
+  var MAX_TRACES = 5000;          // oldest finished traces are dropped past this
+  var OPEN_TRACE_TTL_MS = 60000;  // traces never painted (e.g. hidden heatmap) expire
+
+  var traces = Object.create(null);
+  var order = [];                 // trace ids, oldest first
+  var awaitingPaint = [];         // [{id, start}] ended by the next heatmap paint
+  var panel = null;
+
+  function nowMs() {
+    return performance.timeOrigin + performance.now();
+  }
+
+  function newTraceId() {
+    return "t" + Date.now().toString(36) + Math.random().toString(36).substr(2, 6);
+  }
+
+  // ─── Recording ───────────────────────────────────────────────────────────────
+
+  /** Open a trace; `startMs` defaults to now, `id` (e.g. the App's trace id) to a fresh one. Returns its id. */
+  function start(kind, attrs, startMs, id) {
+    id = id && !traces[id] ? id : newTraceId();
+    traces[id] = { id: id, kind: kind, attrs: attrs || {}, start: startMs != null ? startMs : nowMs(), end: null, spans: [] };
+    order.push(id);
+    prune();
+    return id;
+  }
+
+  /**
+   * One stage of a trace; `bytes` is the payload size moved by the stage (optional).
+   * `skew` marks a span whose ends come from different clocks.
+   */
+  function span(id, stage, startMs, endMs, bytes, skew) {
+    var trace = id && traces[id];
+    if (!trace) return;
+    var s = { stage: stage, start: startMs, end: endMs, ms: endMs - startMs, bytes: bytes != null ? bytes : null };
+    if (skew) s.skew = true;
+    trace.spans.push(s);
+  }
+
+  /** Spans recorded elsewhere (the App form sends [{stage, start, end, bytes}]). */
+  function addSpans(id, spans) {
+    if (!spans) return;
+    for (var i = 0; i < spans.length; i++) {
+      var s = spans[i];
+      span(id, s.stage, s.start, s.end, s.bytes, s.skew);
+    }
+  }
+
+  function finish(id, endMs) {
+    var trace = id && traces[id];
+    if (!trace || trace.end != null) return;
+    trace.end = endMs != null ? endMs : nowMs();
+  }
+
+  /** End the traces with a "paint" span when the next heatmap frame is on screen. */
+  function finishOnPaint(ids) {
+    var t0 = nowMs();
+    for (var i = 0; i < ids.length; i++) {
+      if (ids[i] && traces[ids[i]]) awaitingPaint.push({ id: ids[i], start: t0 });
+    }
+    if (!awaitingPaint.length || state.onHeatmapShownCallback === onPainted) return;
+    var previous = state.onHeatmapShownCallback;
+    state.onHeatmapShownCallback = previous ? function () { previous(); onPainted(); } : onPainted;
+  }
+
+  function onPainted() {
+    var t1 = nowMs();
+    var pending = awaitingPaint;
+    awaitingPaint = [];
+    for (var i = 0; i < pending.length; i++) {
+      span(pending[i].id, "paint", pending[i].start, t1);
+      finish(pending[i].id, t1);
+    }
+  }
+
+  function prune() {
+    var cutoff = nowMs() - OPEN_TRACE_TTL_MS;
+    while (order.length > MAX_TRACES) delete traces[order.shift()];
+    for (var i = 0; i < order.length && i < 64; i++) {
+      var trace = traces[order[i]];
+      if (trace && trace.end == null && trace.start < cutoff) trace.end = trace.start;  // zero-length: excluded from totals
+    }
+  }
+
+  function reset(kind) {
+    order = order.filter(function (id) {
+      if (!kind || traces[id].kind === kind) { delete traces[id]; return false; }
+      return true;
+    });
+  }
+
+  // ─── Summary ─────────────────────────────────────────────────────────────────
+
+  function finished(kind) {
+    var out = [];
+    for (var i = 0; i < order.length; i++) {
+      var trace = traces[order[i]];
+      if (trace.end != null && trace.end > trace.start && (!kind || trace.kind === kind)) out.push(trace);
+    }
+    return out;
+  }
+
+  function percentile(sorted, p) {
+    if (!sorted.length) return null;
+    return sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+  }
+
+  /** Per-stage {count, p50, p95, p99, max, mean, bytesMean} in ms, plus "total" per trace. */
+  function summary(kind) {
+    var durations = Object.create(null), bytes = Object.create(null), stages = [];
+    function add(stage, ms, b) {
+      if (!durations[stage]) { durations[stage] = []; bytes[stage] = []; stages.push(stage); }
+      durations[stage].push(ms);
+      if (b != null) bytes[stage].push(b);
+    }
+    var list = finished(kind);
+    for (var i = 0; i < list.length; i++) {
+      for (var j = 0; j < list[i].spans.length; j++) {
+        var s = list[i].spans[j];
+        add(s.skew ? s.stage + " (skew)" : s.stage, s.ms, s.bytes);
+      }
+      add("total", list[i].end - list[i].start, null);
+    }
+    var out = {};
+    for (var k = 0; k < stages.length; k++) {
+      var sorted = durations[stages[k]].slice().sort(function (a, b) { return a - b; });
+      var sum = 0;
+      for (var m = 0; m < sorted.length; m++) sum += sorted[m];
+      var b = bytes[stages[k]], bsum = 0;
+      for (var n = 0; n < b.length; n++) bsum += b[n];
+      out[stages[k]] = {
+        count: sorted.length, p50: percentile(sorted, 0.5), p95: percentile(sorted, 0.95),
+        p99: percentile(sorted, 0.99), max: sorted[sorted.length - 1], mean: sum / sorted.length,
+        bytesMean: b.length ? bsum / b.length : null
+      };
+    }
+    return out;
+  }
+
+  /** Finished traces as JSON Lines: one {trace_id, kind, attrs, start, total_ms, spans} per line. */
+  function toJsonl(kind) {
+    return finished(kind).map(function (trace) {
+      return JSON.stringify({
+        trace_id: trace.id, kind: trace.kind, attrs: trace.attrs, start: trace.start,
+        total_ms: trace.end - trace.start, spans: trace.spans
+      });
+    }).join("\n");
+  }
+
+  function exportJsonl(kind, fileName) {
+    var text = toJsonl(kind);
+    if (!text) return 0;
+    var count = text.split("\n").length;
+    DataExportSystem.exportTracesAsJsonl(text, fileName, count);
+    return count;
+  }
+
+  // ─── Panel ───────────────────────────────────────────────────────────────────
+
+  function fmt(v) {
+    return v == null ? "–" : v < 10 ? v.toFixed(2) : v.toFixed(0);
+  }
+
+  function renderPanel() {
+    if (!panel) return;
+    var rows = summary();
+    var html = '<div style="font-weight:600;margin-bottom:6px">Latency (ms) — ' + finished().length + ' traces</div>' +
+      '<table style="border-collapse:collapse;font-variant-numeric:tabular-nums">' +
+      '<tr><th align="left">stage</th><th>n</th><th>p50</th><th>p95</th><th>p99</th><th>max</th><th>avg KB</th></tr>';
+    for (var stage in rows) {
+      var r = rows[stage];
+      html += '<tr><td style="padding-right:10px">' + stage + '</td><td align="right">' + r.count +
+        '</td><td align="right">' + fmt(r.p50) + '</td><td align="right">' + fmt(r.p95) +
+        '</td><td align="right">' + fmt(r.p99) + '</td><td align="right">' + fmt(r.max) +
+        '</td><td align="right">' + (r.bytesMean == null ? "–" : fmt(r.bytesMean / 1024)) + '</td></tr>';
+    }
+    html += '</table><div style="margin-top:8px;display:flex;gap:6px">' +
+      '<button data-act="export">Export JSONL</button><button data-act="clear">Clear</button>' +
+      '<button data-act="close">Close</button></div>';
+    panel.innerHTML = html;
+  }
+
+  function togglePanel() {
+    if (panel) {
+      clearInterval(panel.refreshTimer);
+      panel.parentNode.removeChild(panel);
+      panel = null;
+      return;
+    }
+    panel = document.createElement("div");
+    panel.id = "latency-tracer-panel";
+    panel.style.cssText = "position:fixed;right:16px;bottom:48px;z-index:10001;padding:10px 12px;font:12px monospace;" +
+      "background:rgba(20,24,32,0.92);color:#e5e7eb;border-radius:6px;box-shadow:0 4px 16px rgba(0,0,0,0.3);";
+    panel.addEventListener("click", function (e) {
+      var act = e.target && e.target.getAttribute("data-act");
+      if (act === "export") exportJsonl();
+      else if (act === "clear") { reset(); renderPanel(); }
+      else if (act === "close") togglePanel();
+    });
+    document.body.appendChild(panel);
+    renderPanel();
+    panel.refreshTimer = setInterval(renderPanel, 1000);
+  }
+
+  document.addEventListener("keydown", function (e) {
+    if (e.ctrlKey && e.shiftKey && (e.key === "L" || e.key === "l")) {
+      e.preventDefault();
+      togglePanel();
+    }
+  });
+
+  return {
+    now: nowMs,
+    start: start,
+    span: span,
+    addSpans: addSpans,
+    finish: finish,
+    finishOnPaint: finishOnPaint,
+    reset: reset,
+    summary: summary,
+    toJsonl: toJsonl,
+    exportJsonl: exportJsonl,
+    togglePanel: togglePanel
+  };
+})();
+
+window.LatencyTracer = LatencyTracer;
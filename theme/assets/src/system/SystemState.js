@@ -194,6 +194,7 @@
           "Restart Application",
           function (confirmed) {
             if (confirmed) {
+              if (typeof window.resetRsrpStreams === "function") window.resetRsrpStreams();
               if (window.parent && window.parent !== window) {
                 window.parent.postMessage({ type: "restart_backend_session" }, "*");
               }
@@ -127,6 +127,9 @@
   var xdLoader = document.getElementById("xdImageLoader");
   if (xdLoader) xdLoader.addEventListener("change", function (e) {
     clearXdPreview();
+    // New image: the backend's cached detections (by image hash) no longer apply
+    window.state.xdImageFile = e.target.files && e.target.files[0] ? e.target.files[0] : null;
+    window.state.xdImageHandle = null;
     var reader = new FileReader();
     reader.onload = function (event) {
       var img = new Image();
@@ -167,6 +170,8 @@
         clearXdPreview();
         window.state.xdImage = null;
         window.state.xdImageBase64 = null;
+        window.state.xdImageFile = null;
+        window.state.xdImageHandle = null;
 
         if (window.state.backgroundImage === window.state.xdImage) {
           window.state.backgroundImage = null;
@@ -256,6 +261,8 @@
     window.parent.postMessage({
       type: "preview_dxf",
       image: window.state.xdImageBase64,
+      imageFile: window.state.xdImageFile || null,
+      handle: window.state.xdImageHandle || null,
       params: getXdParams(),
       requestId: "preview_" + Date.now()
     }, "*");
@@ -272,6 +279,7 @@
 
         window.state.xdPendingPredictions = event.data.predictions;
         window.state.xdPendingImageHeight = event.data.imageHeight;
+        if (event.data.handle) window.state.xdImageHandle = event.data.handle;
 
         var container = document.getElementById("xdPreviewContainer");
         var statsEl = document.getElementById("xdPreviewStats");
@@ -348,6 +356,7 @@
     var payload = {
       type: "generate_dxf",
       image: window.state.xdImageBase64,
+      handle: window.state.xdImageHandle || null,
       params: getXdParams(),
       requestId: "dxf_" + Date.now()
     };
@@ -408,7 +417,7 @@
     }
   }
 
-  function sendParseDxfRequest(content, filename) {
+  function sendParseDxfRequest(file, filename) {
     var targetW = document.getElementById("dxfTargetWidthM");
     var targetH = document.getElementById("dxfTargetHeightM");
     var overlay = document.getElementById("loadingOverlay");
@@ -418,9 +427,10 @@
     if (loadingText) loadingText.textContent = "Parsing DXF...";
     if (subtext) subtext.textContent = "Extracting walls and structures from your CAD file.";
 
+    // The File is posted as-is; the App uploads it in binary chunks
     var payload = {
       type: "parse_dxf_request",
-      content: content,
+      file: file,
       filename: filename,
       requestId: "parse_" + Date.now()
     };
@@ -437,19 +447,36 @@
 
     if (e.target.files && e.target.files[0]) {
       var file = e.target.files[0];
-      var reader = new FileReader();
-      reader.onload = function (event) {
-        window.state.dxfFileContent = event.target.result;
-        window.state.dxfFileName = file.name;
-        sendParseDxfRequest(event.target.result, file.name);
-      };
-      reader.readAsDataURL(file);
+      window.state.dxfFile = file;
+      window.state.dxfFileName = file.name;
+      sendParseDxfRequest(file, file.name);
     } else {
-      window.state.dxfFileContent = null;
+      window.state.dxfFile = null;
       window.state.dxfFileName = null;
     }
   });
 
+  window.addEventListener("message", function (event) {
+    if (!event.data || event.data.type !== "upload_progress" || event.data.kind !== "dxf") return;
+    var subtext = document.getElementById("loadingSubtext");
+    if (subtext) subtext.textContent = "Uploading " + event.data.filename + ": " +
+      Math.round(100 * event.data.sent / event.data.total) + "%";
+  });
+
+  // Streaming DXF parse: walls arrive in batches while the upload continues
+  var dxfStreamRequestId = null;
+  window.addEventListener("message", function (event) {
+    if (!event.data || event.data.type !== "dxf_walls_batch") return;
+    var first = event.data.requestId !== dxfStreamRequestId;
+    dxfStreamRequestId = event.data.requestId;
+    if (typeof window.appendStreamedWalls === "function") window.appendStreamedWalls(event.data, first);
+    var stats = event.data.stats, subtext = document.getElementById("loadingSubtext");
+    if (stats && subtext) {
+      subtext.textContent = "Parsed " + stats.walls + " walls from " + stats.kept + " entities (" +
+        (stats.skipped_type + stats.skipped_layer) + " skipped, " + stats.mb_per_s + " MB/s)";
+    }
+  });
+
   window.addEventListener("message", function (event) {
     if (!event.data || event.data.type !== "dxf_parsed_response") return;
 
@@ -469,11 +496,11 @@
 
   var dxfCalibrateBtn = document.getElementById("dxfCalibrateScaleBtn");
   if (dxfCalibrateBtn) dxfCalibrateBtn.addEventListener("click", function () {
-    if (!window.state.dxfFileContent || !window.state.dxfFileName) {
+    if (!window.state.dxfFile || !window.state.dxfFileName) {
       NotificationSystem.warning("Please upload a DXF file first.");
       return;
     }
-    sendParseDxfRequest(window.state.dxfFileContent, window.state.dxfFileName);
+    sendParseDxfRequest(window.state.dxfFile, window.state.dxfFileName);
   });
 
   var delDxfBtn = document.getElementById("deleteDxfBtn");
@@ -484,7 +511,7 @@
         var dxfLoader = document.getElementById("dxfLoader");
         if (dxfLoader) dxfLoader.value = "";
 
-        window.state.dxfFileContent = null;
+        window.state.dxfFile = null;
         window.state.dxfFileName = null;
         window.state.walls = [];
         window.state.floorPlanes = [];
@@ -647,10 +674,10 @@
     if (loadingText) loadingText.textContent = "Calculating Accurate Baseline...";
     if (subtext) subtext.textContent = "Processing antenna configurations with the accurate engine. This may take a moment.";
 
-    window.parent.postMessage({
-      type: "start_accurate_baseline",
-      requestId: "baseline_" + Date.now()
-    }, "*");
+    var msg = { type: "start_accurate_baseline", requestId: "baseline_" + Date.now() };
+    // Large floorplans get the baseline as LOD tiles for the current viewport
+    if (typeof window.useRsrpTiles === "function" && window.useRsrpTiles()) msg.viewport = window.rsrpViewport();
+    window.parent.postMessage(msg, "*");
   });
 
   function bindNum(id, key) {
@@ -688,7 +715,8 @@
     }
   }
 
-  function syncLiveRsrpFromModel() {
+  /** `source` ("project_load", ...) is passed on with the RSRP request so the App form can tell a reload from a repeat. */
+  function syncLiveRsrpFromModel(source) {
     var model = (window.state && window.state.model) || (document.getElementById("model") || {}).value || "p25d";
     var enabled = model === "accurateEngine";
     if (!enabled && typeof window.clearBackendRsrpCache === "function") window.clearBackendRsrpCache();
@@ -698,7 +726,7 @@
       window.parent.postMessage({ type: "set_send_live_rsrp", enabled: enabled }, "*");
       console.log("[RSRP] Accurate Engine:", enabled ? "ON" : "OFF", "| model:", model);
       if (enabled && typeof window.requestRsrpForCurrentConfigs === "function") {
-        window.requestRsrpForCurrentConfigs();
+        window.requestRsrpForCurrentConfigs(source);
       }
     }
   }
@@ -1104,6 +1132,19 @@
     }
   });
 
+  // Server-side coverage report over saved projects
+  var reportBtn = document.getElementById("exportCoverageReportBtn");
+  var reportInput = document.getElementById("coverageReportInput");
+  if (reportBtn && reportInput) {
+    reportBtn.addEventListener("click", function () { reportInput.click(); });
+    reportInput.addEventListener("change", function () {
+      if (typeof window.DataExportSystem !== 'undefined' && reportInput.files.length) {
+        window.DataExportSystem.exportCoverageReport(Array.prototype.slice.call(reportInput.files));
+      }
+      reportInput.value = "";
+    });
+  }
+
   // Export functions for global access
   window.updateDeleteImageButton = updateDeleteImageButton;
   window.updateDeleteDxfButton = updateDeleteDxfButton;
@@ -1,12 +1,20 @@
 //
 // ContourRenderer.js
-// Draws contour lines on the canvas using a marching-squares approach to
-// show signal strength zone boundaries (weak/mid and mid/strong thresholds).
+// Draws contour lines on the canvas to show signal strength zone boundaries
+// (weak/mid and mid/strong thresholds) plus any user-chosen thresholds
+// (state.contourThresholds, e.g. the compliance threshold).
+//
+// Isolines are extracted once per heatmap revision: HeatmapEngine publishes the
+// values of each finished pass as state.heatmapField, ContourWorker.js runs
+// marching squares over it, and the polylines are kept as a Path2D in plan
+// coordinates per threshold (plus a copy scaled to the current canvas size).
+// A redraw only replays those paths; until a new revision's lines arrive the
+// previous ones stay on screen.
 //
 // All functions are exposed on window for global access.
 //
-// Depends on: global state, ctx, getValueAt (monolith), mx/my (monolith),
-//             colorZone (ColorSystem), hypot (GeometryUtils)
+// Depends on: global state, ctx, draw(), pad() (CoordinateSystem),
+//             MarchingSquares (fallback when workers are unavailable)
 //
 // Called by:
 //   draw() — renders contour overlay after the heatmap when state.showContours is true
@@ -15,205 +23,193 @@
 (function () {
   "use strict";
 
-  function drawContours() {
-    if (
-      !state.showContours ||
-      state.view === "best" ||
-      state.view === "servch"
-    )
-      return;
+  var ZONE_STYLE = { color: "#1a1a1a", width: 4, dash: [] };
+  var USER_STYLE = { color: "#1a1a1a", width: 2, dash: [8, 6] };
+  var MIN_LINE_POINTS = 3;     // shorter lines are single-cell noise
 
-    var cols = Math.max(20, Math.floor(state.w / state.res));
-    var rows = Math.max(14, Math.floor(state.h / state.res));
-    var dx = state.w / cols,
-      dy = state.h / rows;
+  var worker = null;
+  var workerFailed = false;
+  var workerRevision = 0;      // field revision the worker holds
+  var nextJobId = 1;
+  var cache = { revision: 0, lines: {} };   // threshold key -> line
+  var previous = null;                      // last revision's lines, shown until the new ones arrive
+  var pending = {};                         // threshold key -> true while the worker computes it
+  var redrawScheduled = false;
 
+  function zoneThresholds() {
     var range = state.maxVal - state.minVal;
-    var weakMidThreshold = state.minVal + range * 0.33;
-    var midStrongThreshold = state.minVal + range * 0.67;
+    return [state.minVal + range * 0.33, state.minVal + range * 0.67];
+  }
 
-    drawContourLine(cols, rows, dx, dy, weakMidThreshold, "#1a1a1a", 4);
-    drawContourLine(cols, rows, dx, dy, midStrongThreshold, "#1a1a1a", 4);
+  function userThresholds() {
+    return (state.contourThresholds || []).filter(function (t) { return typeof t === "number" && isFinite(t); });
+  }
 
-    ctx.setLineDash([]);
-    ctx.lineWidth = 1;
+  function thresholdKey(threshold) {
+    return String(Math.round(threshold * 1000) / 1000);
   }
 
-  function drawContourLine(
-    cols,
-    rows,
-    dx,
-    dy,
-    threshold,
-    color,
-    lineWidth
-  ) {
-    lineWidth = lineWidth || 4;
-    var savedStrokeStyle = ctx.strokeStyle;
-    var savedLineWidth = ctx.lineWidth;
-    var savedLineDash = ctx.getLineDash ? ctx.getLineDash() : [];
-    var savedLineCap = ctx.lineCap;
-    var savedLineJoin = ctx.lineJoin;
-
-    ctx.strokeStyle = color;
-    ctx.lineWidth = lineWidth;
-    ctx.setLineDash([]);
-    ctx.lineCap = "round";
-    ctx.lineJoin = "round";
+  // ─── Extraction ───
+
+  function getWorker() {
+    if (worker || workerFailed) return worker;
+    try {
+      if (typeof Worker !== "function") throw new Error("Worker unavailable");
+      worker = new Worker("ui/ContourWorker.js");
+      worker.onmessage = onWorkerMessage;
+      worker.onerror = function (err) {
+        console.warn("[Contours] Worker failed, extracting isolines on the main thread:", err.message || err);
+        worker.terminate();
+        worker = null;
+        workerFailed = true;
+        pending = {};
+        scheduleRedraw();
+      };
+    } catch (err) {
+      workerFailed = true;
+      worker = null;
+    }
+    return worker;
+  }
+
+  function onWorkerMessage(e) {
+    var msg = e.data;
+    if (msg.type !== "isolines" || msg.revision !== cache.revision) return;
+    for (var i = 0; i < msg.lines.length; i++) storeLine(msg.lines[i]);
+    scheduleRedraw();
+  }
+
+  function scheduleRedraw() {
+    if (redrawScheduled) return;
+    redrawScheduled = true;
+    requestAnimationFrame(function () {
+      redrawScheduled = false;
+      draw();
+    });
+  }
 
-    var fineFactor = 4;
-    var fineDx = dx / fineFactor;
-    var fineDy = dy / fineFactor;
-    var fineCols = cols * fineFactor;
-    var fineRows = rows * fineFactor;
-
-    var points = [];
-    var i, j;
-
-    for (i = 0; i <= fineRows; i++) {
-      var y = i * fineDy;
-      for (j = 0; j < fineCols; j++) {
-        var x1 = j * fineDx;
-        var x2 = (j + 1) * fineDx;
-        var val1 = getValueAt(x1, y);
-        var val2 = getValueAt(x2, y);
-
-        if (Math.abs(val2 - val1) > 0.001) {
-          if (
-            (val1 < threshold && val2 >= threshold) ||
-            (val1 >= threshold && val2 < threshold)
-          ) {
-            var t = (threshold - val1) / (val2 - val1);
-            if (t >= 0 && t <= 1) {
-              var px = x1 + t * (x2 - x1);
-              points.push({
-                x: px,
-                y: y,
-                edge: "h",
-                idx: i * fineCols + j,
-              });
-            }
-          }
-        }
+  /** Plan-coordinate Path2D of a {coords, starts, closed} polyline set, smoothed through segment midpoints. */
+  function buildPath(line) {
+    var path = new Path2D();
+    var c = line.coords;
+    for (var n = 0; n + 1 < line.starts.length; n++) {
+      var a = line.starts[n], b = line.starts[n + 1];
+      if (b - a < MIN_LINE_POINTS) continue;
+      path.moveTo(c[2 * a], c[2 * a + 1]);
+      for (var p = a + 1; p < b - 1; p++) {
+        path.quadraticCurveTo(c[2 * p], c[2 * p + 1], (c[2 * p] + c[2 * p + 2]) / 2, (c[2 * p + 1] + c[2 * p + 3]) / 2);
       }
+      path.lineTo(c[2 * (b - 1)], c[2 * (b - 1) + 1]);
+      if (line.closed[n]) path.closePath();
     }
+    return path;
+  }
+
+  function storeLine(line) {
+    var key = thresholdKey(line.threshold);
+    delete pending[key];
+    cache.lines[key] = { threshold: line.threshold, path: buildPath(line), screen: null, screenKey: "" };
+  }
 
-    for (i = 0; i < fineRows; i++) {
-      var y1 = i * fineDy;
-      var y2 = (i + 1) * fineDy;
-      for (j = 0; j <= fineCols; j++) {
-        var x = j * fineDx;
-        var val1 = getValueAt(x, y1);
-        var val2 = getValueAt(x, y2);
-
-        if (Math.abs(val2 - val1) > 0.001) {
-          if (
-            (val1 < threshold && val2 >= threshold) ||
-            (val1 >= threshold && val2 < threshold)
-          ) {
-            var t = (threshold - val1) / (val2 - val1);
-            if (t >= 0 && t <= 1) {
-              var py = y1 + t * (y2 - y1);
-              points.push({
-                x: x,
-                y: py,
-                edge: "v",
-                idx: i * (fineCols + 1) + j,
-              });
-            }
-          }
-        }
+  /** Start extraction of the thresholds `field` has no lines for yet. */
+  function ensureLines(field, thresholds) {
+    if (cache.revision !== field.revision) {
+      previous = cache.revision ? cache : previous;
+      cache = { revision: field.revision, lines: {} };
+      pending = {};
+    }
+    var missing = thresholds.filter(function (t) {
+      var key = thresholdKey(t);
+      return !cache.lines[key] && !pending[key];
+    });
+    if (!missing.length) return;
+
+    var w = getWorker();
+    if (w) {
+      if (workerRevision !== field.revision) {
+        var values = field.data.slice();
+        w.postMessage({ type: "field", revision: field.revision, values: values,
+                        cols: field.cols, rows: field.rows, dx: field.dx, dy: field.dy }, [values.buffer]);
+        workerRevision = field.revision;
       }
+      missing.forEach(function (t) { pending[thresholdKey(t)] = true; });
+      w.postMessage({ type: "isolines", jobId: nextJobId++, revision: field.revision, thresholds: missing });
+      return;
     }
+    missing.forEach(function (t) {
+      var line = MarchingSquares.isolines(field.data, field.cols, field.rows, field.dx, field.dy, t);
+      line.threshold = t;
+      storeLine(line);
+    });
+  }
 
-    if (points.length > 1) {
-      var used = [];
-      var contours = [];
-      var maxConnectionDist = Math.max(dx, dy) * 1.8;
-
-      for (i = 0; i < points.length; i++) {
-        if (used[i]) continue;
-
-        var contour = [points[i]];
-        used[i] = true;
-        var current = points[i];
-        var found = true;
-        var iterations = 0;
-        var maxIterations = points.length;
-
-        while (found && iterations < maxIterations) {
-          iterations++;
-          found = false;
-          var minDist = maxConnectionDist;
-          var closestIdx = -1;
-
-          for (j = 0; j < points.length; j++) {
-            if (used[j]) continue;
-            var dist = hypot(
-              points[j].x - current.x,
-              points[j].y - current.y
-            );
-            if (dist < minDist) {
-              minDist = dist;
-              closestIdx = j;
-              found = true;
-            }
-          }
-
-          if (found) {
-            contour.push(points[closestIdx]);
-            used[closestIdx] = true;
-            current = points[closestIdx];
-          }
-        }
-
-        if (contour.length > 2) {
-          contours.push(contour);
-        }
-      }
+  // ─── Drawing ───
 
-      for (var c = 0; c < contours.length; c++) {
-        var contour = contours[c];
-        if (contour.length < 2) continue;
-
-        ctx.beginPath();
-        ctx.moveTo(mx(contour[0].x), my(contour[0].y));
-
-        for (var p = 1; p < contour.length; p++) {
-          if (p === contour.length - 1) {
-            ctx.lineTo(mx(contour[p].x), my(contour[p].y));
-          } else {
-            var midX = (contour[p].x + contour[p + 1].x) / 2;
-            var midY = (contour[p].y + contour[p + 1].y) / 2;
-            ctx.quadraticCurveTo(
-              mx(contour[p].x),
-              my(contour[p].y),
-              mx(midX),
-              my(midY)
-            );
-          }
-        }
-
-        if (contour.length > 3) {
-          var first = contour[0];
-          var last = contour[contour.length - 1];
-          var distToStart = hypot(last.x - first.x, last.y - first.y);
-          if (distToStart < maxConnectionDist * 2) {
-            ctx.closePath();
-          }
-        }
-
-        ctx.stroke();
-      }
+  /** The line for `threshold`: this revision's, else the previous revision's while it computes. */
+  function lineFor(threshold) {
+    var key = thresholdKey(threshold);
+    return cache.lines[key] || (previous && previous.lines[key]) || null;
+  }
+
+  /** Path in canvas pixels, rebuilt only when the plot size changes. */
+  function screenPath(line) {
+    var p = typeof pad === "function" ? pad() : 0;
+    var sx = (ctx.canvas.width - 2 * p) / state.w;
+    var sy = (ctx.canvas.height - 2 * p) / state.h;
+    var key = sx + ":" + sy + ":" + p;
+    if (line.screenKey !== key) {
+      line.screen = new Path2D();
+      line.screen.addPath(line.path, { a: sx, b: 0, c: 0, d: sy, e: p, f: p });
+      line.screenKey = key;
+    }
+    return line.screen;
+  }
+
+  function strokeLines(thresholds, style) {
+    ctx.save();
+    ctx.strokeStyle = style.color;
+    ctx.lineWidth = style.width;
+    ctx.setLineDash(style.dash);
+    ctx.lineCap = "round";
+    ctx.lineJoin = "round";
+    for (var i = 0; i < thresholds.length; i++) {
+      var line = lineFor(thresholds[i]);
+      if (line) ctx.stroke(screenPath(line));
     }
+    ctx.restore();
+  }
+
+  function drawContours() {
+    if (
+      !state.showContours ||
+      !state.showVisualization ||
+      state.view === "best" ||
+      state.view === "servch"
+    )
+      return;
+    // Plan-view overlay; the drag preview heatmap has no value field
+    if (state.viewModeTransition > 0 || state.isDraggingAntenna) return;
+
+    var field = state.heatmapField;
+    if (!field || field.view !== state.view) return;
+
+    var zones = zoneThresholds();
+    var extra = userThresholds();
+    ensureLines(field, zones.concat(extra));
+    if (previous && zones.concat(extra).every(function (t) { return cache.lines[thresholdKey(t)]; })) {
+      previous = null;
+    }
+
+    strokeLines(zones, ZONE_STYLE);
+    strokeLines(extra, USER_STYLE);
+  }
 
-    ctx.strokeStyle = savedStrokeStyle;
-    ctx.lineWidth = savedLineWidth;
-    ctx.setLineDash(savedLineDash);
-    ctx.lineCap = savedLineCap;
-    ctx.lineJoin = savedLineJoin;
+  /** Extra isolines at the given values (same unit as the current view), drawn dashed. */
+  function setContourThresholds(thresholds) {
+    state.contourThresholds = (thresholds || []).map(Number).filter(function (t) { return isFinite(t); });
+    draw();
   }
 
   window.drawContours = drawContours;
-  window.drawContourLine = drawContourLine;
+  window.setContourThresholds = setContourThresholds;
 })();
@@ -0,0 +1,38 @@
+//
+// ContourWorker.js
+// Web worker for ContourRenderer.js. Keeps the last heatmap value field and
+// extracts isolines from it with MarchingSquares, so contour lines are
+// computed once per heatmap revision and never on the main thread.
+//
+// Messages in:
+//   { type: "field", revision, values: Float32Array, cols, rows, dx, dy }
+//       — a finished heatmap pass (values transferred). Replaces the last field.
+//   { type: "isolines", jobId, revision, thresholds: [number] }
+//
+// Messages out:
+//   { type: "isolines", jobId, revision, lines: [{ threshold, coords, starts, closed }] }
+//       — typed arrays transferred; `lines` is empty when `revision` is not the
+//         field this worker holds (superseded by a newer pass).
+//
+
+importScripts("MarchingSquares.js");
+
+var field = null;
+
+self.onmessage = function (e) {
+  var msg = e.data;
+  if (msg.type === "field") {
+    field = msg;
+  } else if (msg.type === "isolines") {
+    var lines = [], transfer = [];
+    if (field && field.revision === msg.revision) {
+      for (var i = 0; i < msg.thresholds.length; i++) {
+        var line = MarchingSquares.isolines(field.values, field.cols, field.rows, field.dx, field.dy, msg.thresholds[i]);
+        line.threshold = msg.thresholds[i];
+        lines.push(line);
+        transfer.push(line.coords.buffer, line.starts.buffer, line.closed.buffer);
+      }
+    }
+    self.postMessage({ type: "isolines", jobId: msg.jobId, revision: msg.revision, lines: lines }, transfer);
+  }
+};
@@ -1,8 +1,8 @@
 //
 // HeatmapEngine.js
 // Asynchronously generates the heatmap image (pixel-by-pixel signal
-// computation) using chunked rendering or a web worker, and manages
-// the heatmap cache invalidation.
+// computation) using chunked rendering or a pool of web workers
+// (ui/HeatmapWorker.js), and manages the heatmap cache invalidation.
 //
 // All functions are exposed on window for global access.
 //
@@ -16,6 +16,10 @@
 //   generateHeatmapAsync   — invalidateHeatmapCache, drag handlers, AP operations
 //   initHeatmapWorker      — startup initialization
 //
+// Every finished pass also publishes the values it coloured as
+// state.heatmapField ({data, cols, rows, dx, dy, view, revision}), which
+// ContourRenderer extracts its isolines from once per revision.
+//
 
 (function () {
 
@@ -45,56 +49,274 @@
     }
   }
 
-  // Initialize Web Worker for heatmap generation
-  function initHeatmapWorker() {
-    try {
-      // state.heatmapWorker = new Worker("heatmap-worker.js");
-      state.heatmapWorker.onmessage = function (e) {
-        var data = e.data;
-        if (data.type === "complete") {
-          // Heatmap generation complete
-          var imgData = new ImageData(
-            new Uint8ClampedArray(data.imageData),
-            data.cols,
-            data.rows
-          );
-          var off = document.createElement("canvas");
-          off.width = data.cols;
-          off.height = data.rows;
-          var offCtx = off.getContext("2d");
-          offCtx.imageSmoothingEnabled = true;
-          offCtx.imageSmoothingQuality = "high";
-          offCtx.putImageData(imgData, 0, 0);
+  // ─── Value field (contours) ───
 
-          state.cachedHeatmap = off;
-          state.cachedHeatmapAntennaCount = state.aps.length;
-          state.cachedHeatmapModel = state.model || "p25d";
-          state.heatmapUpdatePending = false;
+  var heatmapFieldRevision = 0;
 
-          // Call stored callback if any
-          if (state.heatmapWorkerCallback) {
-            state.heatmapWorkerCallback(off);
-            state.heatmapWorkerCallback = null;
-          }
+  /** Views whose per-bin values are a scalar field; best/servch are categorical. */
+  function hasValueField(view) {
+    return view !== "best" && view !== "servch";
+  }
 
-          // Redraw to show updated heatmap
-          // Use requestAnimationFrame to ensure the update is rendered
-          requestAnimationFrame(function () {
-            draw();
-            if (state.onHeatmapShownCallback) {
-              var cb = state.onHeatmapShownCallback;
-              state.onHeatmapShownCallback = null;
-              try { cb(); } catch (e) { console.error("[HeatmapEngine] onHeatmapShown error:", e); }
-            }
-          });
-        }
-      };
-      state.heatmapWorker.onerror = function (error) {
-        console.error("Heatmap worker error:", error);
-        state.heatmapUpdatePending = false;
-        state.heatmapWorker = null;
-        generateHeatmapAsync(null, true);
+  function createValueField(cols, rows, view) {
+    return hasValueField(view) ? new Float32Array(cols * rows).fill(NaN) : null;
+  }
+
+  function publishHeatmapField(values, cols, rows, dx, dy, view) {
+    state.heatmapField = values
+      ? { data: values, cols: cols, rows: rows, dx: dx, dy: dy, view: view, revision: ++heatmapFieldRevision }
+      : null;
+  }
+
+  // ─── Heatmap worker pool ───
+  // state.heatmapWorker holds a pool of HeatmapWorker.js workers (one per core,
+  // capped). Each pass splits the cols×rows grid into tiles handed out round-robin,
+  // so a worker keeps the same tiles pass after pass and its obstruction cache stays
+  // warm. Walls, floor planes and patterns are sent only when they change; tiles
+  // come back as values and are coloured and composited into state.cachedHeatmap
+  // as they arrive.
+
+  var HEATMAP_TILE_SIZE = 48;      // = OBSTRUCTION_BLOCK (PropagationModel25DN.js): one raster block per tile
+  var HEATMAP_MAX_WORKERS = 8;
+
+  var _patternIds = typeof WeakMap === "function" ? new WeakMap() : null;
+  var _nextPatternId = 1;
+
+  function patternIdFor(pattern) {
+    if (!pattern || !_patternIds) return null;
+    var id = _patternIds.get(pattern);
+    if (!id) {
+      id = _nextPatternId++;
+      _patternIds.set(pattern, id);
+    }
+    return id;
+  }
+
+  function createHeatmapPool() {
+    var size = Math.max(1, Math.min(HEATMAP_MAX_WORKERS, navigator.hardwareConcurrency || 4));
+    var pool = {
+      workers: [],
+      staticSnapshot: null,
+      passId: 0,
+      pass: null,
+      terminate: function () {
+        pool.pass = null;
+        pool.workers.forEach(function (w) { w.worker.terminate(); });
+        pool.workers = [];
+      }
+    };
+    for (var i = 0; i < size; i++) {
+      var worker = new Worker("ui/HeatmapWorker.js");
+      var entry = { worker: worker, patterns: {}, queue: [], busy: false };
+      worker.onmessage = onPoolMessage.bind(null, pool, entry);
+      worker.onerror = onPoolError.bind(null, pool);
+      pool.workers.push(entry);
+    }
+    return pool;
+  }
+
+  // Post walls/floor planes to every worker when their packed form changed
+  function syncPoolStatic(pool) {
+    var snap = _propModel.obstructionSnapshot(state.walls || [], state.floorPlanes || [], state.elementTypes || null);
+    var prev = pool.staticSnapshot;
+    var same = prev && prev.length === snap.length && snap.every(function (v, i) { return v === prev[i]; });
+    if (same) return;
+    pool.staticSnapshot = snap;
+    var shared = typeof SharedArrayBuffer === "function" && self.crossOriginIsolated;
+    var sharedBuf = null;
+    if (shared) {
+      sharedBuf = new SharedArrayBuffer(snap.length * 8);
+      new Float64Array(sharedBuf).set(snap);
+    }
+    pool.workers.forEach(function (w) {
+      if (sharedBuf) {
+        w.worker.postMessage({ type: "static", obstruction: sharedBuf });
+      } else {
+        var packed = Float64Array.from(snap);
+        w.worker.postMessage({ type: "static", obstruction: packed.buffer }, [packed.buffer]);
+      }
+    });
+  }
+
+  function patternPayload(p) {
+    return { horizontalData: p.horizontalData || [], verticalData: p.verticalData || [], _maxValue: p._maxValue, gain: p.gain };
+  }
+
+  function startPoolPass(pool, useLowRes) {
+    var resolutionMultiplier = useLowRes === true ? 1 : 1.5;
+    var baseCols = Math.max(20, Math.floor(state.w / state.res));
+    var baseRows = Math.max(14, Math.floor(state.h / state.res));
+    var cols = Math.max(20, Math.floor(baseCols * resolutionMultiplier));
+    var rows = Math.max(14, Math.floor(baseRows * resolutionMultiplier));
+    var dx = state.w / cols;
+    var dy = state.h / rows;
+
+    syncPoolStatic(pool);
+
+    var selectedIndex = -1, newPatterns = {}, i;
+    var aps = state.aps.map(function (ap, idx) {
+      if (ap.id === state.selectedApId && state.highlight && ap.enabled !== false) selectedIndex = idx;
+      var pattern = ap.antennaPattern && typeof ap.antennaPattern === "object" ? ap.antennaPattern : null;
+      var pid = patternIdFor(pattern);
+      if (pid) newPatterns[pid] = pattern;
+      return {
+        id: ap.id, x: ap.x, y: ap.y, z: ap.z, tx: ap.tx, gt: ap.gt, gain: ap.gain, ch: ap.ch,
+        enabled: ap.enabled, azimuth: ap.azimuth, heading: ap.heading, tilt: ap.tilt,
+        patternId: pid
       };
+    });
+
+    var passId = ++pool.passId;
+    var passMsg = {
+      type: "pass", passId: passId, cols: cols, rows: rows, dx: dx, dy: dy,
+      model: state.model || "p25d", view: state.view, freq: state.freq, N: state.N,
+      noise: state.noise, groundPlane: state.groundPlane || null,
+      aps: aps, selectedIndex: selectedIndex, poolSize: pool.workers.length
+    };
+    pool.workers.forEach(function (w) {
+      var missing = {}, any = false;
+      for (var pid in newPatterns) {
+        if (!w.patterns[pid]) {
+          missing[pid] = patternPayload(newPatterns[pid]);
+          w.patterns[pid] = true;
+          any = true;
+        }
+      }
+      if (any) w.worker.postMessage({ type: "patterns", patterns: missing });
+      w.worker.postMessage(passMsg);
+      w.queue = [];
+      w.busy = false;
+    });
+
+    // Composite into a fresh canvas, seeded with the previous heatmap so
+    // unfinished tiles show the old picture instead of a hole
+    var off = document.createElement("canvas");
+    off.width = cols;
+    off.height = rows;
+    var offCtx = off.getContext("2d");
+    offCtx.imageSmoothingEnabled = true;
+    offCtx.imageSmoothingQuality = "high";
+    if (state.cachedHeatmap) offCtx.drawImage(state.cachedHeatmap, 0, 0, cols, rows);
+
+    var tiles = 0;
+    for (var r0 = 0; r0 < rows; r0 += HEATMAP_TILE_SIZE) {
+      for (var c0 = 0; c0 < cols; c0 += HEATMAP_TILE_SIZE) {
+        pool.workers[tiles % pool.workers.length].queue.push({
+          type: "tile", passId: passId, tileId: tiles,
+          c0: c0, r0: r0, c1: Math.min(cols, c0 + HEATMAP_TILE_SIZE), r1: Math.min(rows, r0 + HEATMAP_TILE_SIZE)
+        });
+        tiles++;
+      }
+    }
+
+    pool.pass = {
+      id: passId, cols: cols, rows: rows, dx: dx, dy: dy, canvas: off, ctx: offCtx, aps: state.aps.slice(),
+      view: state.view, values: createValueField(cols, rows, state.view),
+      remaining: tiles, useLowRes: useLowRes, drawScheduled: false
+    };
+    state.heatmapUpdatePending = true;
+    for (i = 0; i < pool.workers.length; i++) feedWorker(pool.workers[i]);
+  }
+
+  // One tile in flight per worker, so a superseded pass is dropped quickly
+  function feedWorker(entry) {
+    if (entry.busy || entry.queue.length === 0) return;
+    entry.busy = true;
+    entry.worker.postMessage(entry.queue.shift());
+  }
+
+  function colorTile(pass, msg) {
+    var w = msg.c1 - msg.c0, h = msg.r1 - msg.r0;
+    var img = pass.ctx.createImageData(w, h);
+    for (var k = 0; k < w * h; k++) {
+      var ap = msg.apIndex[k] >= 0 ? pass.aps[msg.apIndex[k]] : null;
+      var col;
+      if (pass.view === "best") {
+        col = ap ? colorForAP(ap.id) : [200, 200, 200, 230];
+      } else if (pass.view === "servch") {
+        col = colorForChannel(ap ? ap.ch : 0);
+      } else if (pass.view === "cci") {
+        col = colorForCount(msg.values[k]);
+      } else {
+        col = colorNumeric(msg.values[k]);
+      }
+      img.data[4 * k] = col[0];
+      img.data[4 * k + 1] = col[1];
+      img.data[4 * k + 2] = col[2];
+      img.data[4 * k + 3] = col[3];
+    }
+    pass.ctx.putImageData(img, msg.c0, msg.r0);
+    if (pass.values) {
+      for (var r = 0; r < h; r++) pass.values.set(msg.values.subarray(r * w, (r + 1) * w), (msg.r0 + r) * pass.cols + msg.c0);
+    }
+  }
+
+  function onPoolMessage(pool, entry, e) {
+    var msg = e.data;
+    if (msg.type !== "tile") return;
+    entry.busy = false;
+    var pass = pool.pass;
+    if (!pass || msg.passId !== pass.id) return;
+    if (state.isDraggingAntenna) {
+      // Drag renders its own low-detail heatmap; this pass is stale on release
+      pool.pass = null;
+      return;
+    }
+
+    colorTile(pass, msg);
+    state.cachedHeatmap = pass.canvas;
+    pass.remaining--;
+    feedWorker(entry);
+
+    if (pass.remaining > 0) {
+      if (!pass.drawScheduled) {
+        pass.drawScheduled = true;
+        requestAnimationFrame(function () {
+          pass.drawScheduled = false;
+          if (pool.pass === pass) draw();
+        });
+      }
+      return;
+    }
+
+    pool.pass = null;
+    publishHeatmapField(pass.values, pass.cols, pass.rows, pass.dx, pass.dy, pass.view);
+    state.cachedHeatmapAntennaCount = state.aps.length;
+    state.cachedHeatmapModel = state.model || "p25d";
+    state.heatmapUpdatePending = false;
+    requestAnimationFrame(function () {
+      draw();
+      if (state.onHeatmapShownCallback) {
+        var cb = state.onHeatmapShownCallback;
+        state.onHeatmapShownCallback = null;
+        try { cb(); } catch (err) { console.error("[HeatmapEngine] onHeatmapShown error:", err); }
+      }
+    });
+    if (pass.useLowRes === true) {
+      // Same progression as the chunked path: low-res first, then full quality
+      setTimeout(function () {
+        if (pool.passId === pass.id) generateHeatmapAsync(state.heatmapWorkerCallback, false);
+      }, 50);
+    } else if (state.heatmapWorkerCallback) {
+      var done = state.heatmapWorkerCallback;
+      state.heatmapWorkerCallback = null;
+      done(pass.canvas);
+    }
+  }
+
+  function onPoolError(pool, error) {
+    console.error("Heatmap worker error:", error);
+    pool.terminate();
+    if (state.heatmapWorker === pool) state.heatmapWorker = null;
+    state.heatmapUpdatePending = false;
+    generateHeatmapAsync(null, true);
+  }
+
+  // Initialize the heatmap worker pool
+  function initHeatmapWorker() {
+    try {
+      if (typeof Worker !== "function") throw new Error("Worker unavailable");
+      state.heatmapWorker = createHeatmapPool();
     } catch (error) {
       console.warn(
         "Web Workers not supported, falling back to synchronous generation:",
@@ -120,104 +342,19 @@
     if (state.highlight && state.selectedApId && (state.model || "p25d") === "accurateEngine" && typeof window.getRsrpGridForAntenna === "function") {
       usePerAntennaGrid = !!window.getRsrpGridForAntenna(state.selectedApId);
     }
-    if (state.heatmapWorker && !state.isDraggingAntenna && !activeGrid && !usePerAntennaGrid) {
-      state.heatmapUpdatePending = true;
-
-      var resolutionMultiplier = useLowRes === true ? 1 : 1.5;
-      var baseCols = Math.max(20, Math.floor(state.w / state.res));
-      var baseRows = Math.max(14, Math.floor(state.h / state.res));
-      var cols = Math.max(20, Math.floor(baseCols * resolutionMultiplier));
-      var rows = Math.max(14, Math.floor(baseRows * resolutionMultiplier));
-      var dx = state.w / cols;
-      var dy = state.h / rows;
-
-      // Prepare data for worker
-      var workerData = {
-        cols: cols,
-        rows: rows,
-        dx: dx,
-        dy: dy,
-        aps: state.aps.map(function (ap) {
-          // Ensure pattern data is properly structured for the worker
-          var patternData = null;
-          if (ap.antennaPattern) {
-            // Verify pattern has required data arrays
-            var hasHorizontalData = ap.antennaPattern.horizontalData && 
-                                    Array.isArray(ap.antennaPattern.horizontalData) && 
-                                    ap.antennaPattern.horizontalData.length > 0;
-            var hasVerticalData = ap.antennaPattern.verticalData && 
-                                  Array.isArray(ap.antennaPattern.verticalData) && 
-                                  ap.antennaPattern.verticalData.length > 0;
-            
-            // Only include pattern if it has valid data
-            if (hasHorizontalData || hasVerticalData) {
-              patternData = {
-                horizontalData: hasHorizontalData ? ap.antennaPattern.horizontalData : [],
-                verticalData: hasVerticalData ? ap.antennaPattern.verticalData : [],
-                _maxValue: ap.antennaPattern._maxValue !== undefined ? ap.antennaPattern._maxValue : undefined,
-              };
-            }
-          }
-          
-          return {
-            id: ap.id,
-            x: ap.x,
-            y: ap.y,
-            z: ap.z || 2.5,
-            tx: ap.tx,
-            gt: ap.gt,
-            ch: ap.ch,
-            enabled: ap.enabled !== false,
-            azimuth: ap.azimuth || 0,
-            tilt: ap.tilt || 0,
-            antennaPattern: patternData,
-          };
-        }),
-        model: state.model,
-        view: state.view,
-        noise: state.noise,
-        minVal: state.minVal,
-        maxVal: state.maxVal,
-        weak: state.weak,
-        mid: state.mid,
-        strong: state.strong,
-        selectedApId: state.selectedApId,
-        highlight: state.highlight,
-        defaultPattern:
-          state.defaultAntennaPatternIndex >= 0 &&
-            state.antennaPatterns[state.defaultAntennaPatternIndex]
-            ? {
-              horizontalData:
-                state.antennaPatterns[state.defaultAntennaPatternIndex]
-                  .horizontalData,
-              verticalData:
-                state.antennaPatterns[state.defaultAntennaPatternIndex]
-                  .verticalData,
-              _maxValue:
-                state.antennaPatterns[state.defaultAntennaPatternIndex]
-                  ._maxValue,
-            }
-            : null,
-        apColorMap: state.apColorMap,
-        freq: state.freq || 2400,
-        N: state.N || 2.5,
-        walls: state.walls || [],
-        floorPlanes: state.floorPlanes || [],
-        groundPlane: state.groundPlane || { enabled: false, attenuation: 3.0 },
-        elementTypes: elementTypes || {},
-        csvCoverageGrid: state.csvCoverageGrid || null,
-        showContours: state.showContours || false,
-      };
-
-      // Store callback
+    if (state.heatmapWorker && !state.isDraggingAntenna && !activeGrid && !usePerAntennaGrid && !state.isOptimizing &&
+        state.showVisualization && typeof _propModel.obstructionSnapshot === "function") {
       if (callback) {
         state.heatmapWorkerCallback = callback;
       }
-
-      // Send to worker
-      state.heatmapWorker.postMessage(workerData);
+      startPoolPass(state.heatmapWorker, useLowRes);
       return;
     }
+    if (state.heatmapWorker) {
+      // Chunked path takes over: drop any pool pass still running
+      state.heatmapWorker.passId++;
+      state.heatmapWorker.pass = null;
+    }
 
     // Fallback to original chunked processing
     state.heatmapUpdatePending = true;
@@ -252,6 +389,8 @@
         var dx = state.w / cols,
           dy = state.h / rows;
         var img = ctx.createImageData(cols, rows);
+        var view = state.view;
+        var values = createValueField(cols, rows, view);
 
         var selectedAP = null,
           i;
@@ -263,6 +402,11 @@
         }
         var useOnlySelected = state.highlight && selectedAP && selectedAP.enabled !== false;
 
+        // Reuse per-antenna wall/floor-plane losses for this grid across passes
+        if (_propModel && typeof _propModel.setObstructionRaster === "function") {
+          _propModel.setObstructionRaster(cols, rows, dx, dy);
+        }
+
         // Process in chunks to avoid blocking - use smaller chunks for faster visual updates
         var chunkSize = 50; // Process 50 rows at a time for faster updates
         var currentRow = 0;
@@ -308,6 +452,7 @@
                 var bval = v0 * (1 - ty) + v1 * ty;
                 
                 if (!isNaN(bval)) {
+                  if (values) values[r * cols + c] = bval;
                   var bcolor = colorNumeric(bval);
                   img.data[idx] = bcolor[0];
                   img.data[idx + 1] = bcolor[1];
@@ -394,6 +539,7 @@
                 value = bestN.rssiDbm;
               }
 
+              if (values) values[r * cols + c] = value;
               var col;
               if (state.view === "cci") {
                 // Use discrete color map for count values
@@ -425,6 +571,7 @@
             offCtx.putImageData(img, 0, 0);
 
             state.cachedHeatmap = off;
+            publishHeatmapField(values, cols, rows, dx, dy, view);
             state.cachedHeatmapAntennaCount = state.aps.length;
             state.cachedHeatmapModel = state.model || "p25d";
 
@@ -718,6 +865,10 @@
           }
           var useOnlySelected = state.highlight && selectedAP && selectedAP.enabled !== false;
 
+          if (_propModel && typeof _propModel.setObstructionRaster === "function") {
+            _propModel.setObstructionRaster(cols, rows, dx, dy);
+          }
+
           for (var r = 0; r < rows; r++) {
             var y = (r + 0.5) * dy;
             for (var c = 0; c < cols; c++) {
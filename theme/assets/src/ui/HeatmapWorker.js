@@ -0,0 +1,214 @@
+//
+// HeatmapWorker.js
+// Web worker for the heatmap pool in HeatmapEngine.js. Computes one tile of
+// the cols×rows heatmap grid at a time with PropagationModel25D and returns
+// numeric values (plus the serving AP index); colouring and compositing stay
+// on the main thread so ColorSystem is not duplicated here.
+//
+// Messages in:
+//   { type: "static", revision, obstruction }   — walls + floor planes, packed
+//       as PropagationModel25D.obstructionSnapshot (Float64Array, transferred
+//       or on a SharedArrayBuffer). Sent only when they change.
+//   { type: "patterns", patterns: { id: {horizontalData, verticalData, _maxValue, gain} } }
+//       — pattern data not yet sent to this worker.
+//   { type: "pass", passId, cols, rows, dx, dy, model, view, freq, N, noise,
+//       aps, selectedIndex, poolSize }           — per-pass inputs (small).
+//       poolSize splits the obstruction raster budget between the workers.
+//   { type: "tile", passId, tileId, c0, r0, c1, r1 }
+//
+// Messages out:
+//   { type: "tile", passId, tileId, c0, r0, c1, r1, values: Float32Array,
+//     apIndex: Int16Array }                      — buffers transferred.
+//
+
+importScripts("../propagation/PropagationModel25DN.js");
+
+var model = new PropagationModel25D({ verticalFactor: 2.0, shapeFactor: 3.0, referenceOffset: 0.0 });
+model._p25dLogged = true;
+
+var walls = [];
+var floorPlanes = [];
+var patterns = {};
+var pass = null;
+
+// ─── Static inputs ───
+
+// Rebuild wall / floor-plane objects from the packed snapshot. Each wall keeps
+// its resolved loss, so no element types are needed here.
+function unpackObstruction(snap) {
+  var k = 0, i, j;
+  var outWalls = [], outFloors = [];
+  var nWalls = snap[k++];
+  for (i = 0; i < nWalls; i++) {
+    var nSegs = snap[k++], loss = snap[k++], points = [];
+    for (j = 0; j < nSegs; j++) {
+      if (j === 0) points.push({ x: snap[k], y: snap[k + 1] });
+      points.push({ x: snap[k + 2], y: snap[k + 3] });
+      k += 4;
+    }
+    outWalls.push({ points: points, loss: loss });
+  }
+  var nFloors = snap[k++];
+  for (i = 0; i < nFloors; i++) {
+    var fp = { attenuation: snap[k++] };
+    fp.p1 = { x: snap[k], y: snap[k + 1] };
+    fp.p2 = { x: snap[k + 2], y: snap[k + 3] };
+    fp.p3 = { x: snap[k + 4], y: snap[k + 5] };
+    fp.p4 = { x: snap[k + 6], y: snap[k + 7] };
+    k += 8;
+    outFloors.push(fp);
+  }
+  walls = outWalls;
+  floorPlanes = outFloors;
+}
+
+// ─── Radio helpers (mirror RadioCalculations.js) ───
+
+function dbmToLin(dBm) {
+  return Math.pow(10, dBm / 10);
+}
+function linToDbm(lin) {
+  return 10 * (Math.log(Math.max(lin, 1e-12)) / Math.log(10));
+}
+
+function modelLoss(ax, ay, x, y) {
+  if (pass.model === "p525") {
+    var d = Math.max(Math.hypot(x - ax, y - ay), 0.5);
+    return model.fspl(pass.freq, d) +
+      model.groundPlaneLoss({ x: ax, y: ay }, { x: x, y: y }, pass.groundPlane) +
+      model.floorPlanesLoss({ x: ax, y: ay }, { x: x, y: y }, floorPlanes);
+  }
+  return model.p25dLoss({ x: ax, y: ay }, { x: x, y: y }, walls, floorPlanes, pass.groundPlane, null);
+}
+
+function rssiFrom(ap, x, y) {
+  return model.rssi(ap.tx, model.getAngleDependentGain(ap, { x: x, y: y }), modelLoss(ap.x, ap.y, x, y));
+}
+
+function bestApAt(x, y) {
+  var best = -1e9, idx = -1;
+  for (var i = 0; i < pass.aps.length; i++) {
+    var a = pass.aps[i];
+    if (a.enabled === false) continue;
+    var pr = rssiFrom(a, x, y);
+    if (pr > best) {
+      best = pr;
+      idx = i;
+    }
+  }
+  return { index: idx, rssiDbm: best };
+}
+
+function cciAt(x, y, servingIndex) {
+  if (servingIndex < 0) return -200;
+  var serving = pass.aps[servingIndex], sumLin = 0;
+  for (var i = 0; i < pass.aps.length; i++) {
+    var ap = pass.aps[i];
+    if (ap.enabled === false || i === servingIndex || ap.ch !== serving.ch) continue;
+    sumLin += dbmToLin(rssiFrom(ap, x, y));
+  }
+  if (sumLin <= 0) return -200;
+  return linToDbm(sumLin);
+}
+
+function countInterferingAntennas(x, y, servingIndex) {
+  if (servingIndex < 0) return 0;
+  var serving = pass.aps[servingIndex], count = 0;
+  for (var i = 0; i < pass.aps.length; i++) {
+    var ap = pass.aps[i];
+    if (ap.enabled === false || i === servingIndex || ap.ch !== serving.ch) continue;
+    if (rssiFrom(ap, x, y) > -85) count++;
+  }
+  return count;
+}
+
+function sinrAt(rssiDbm, cciDbm) {
+  var I = cciDbm < -150 ? 0 : dbmToLin(cciDbm);
+  var N = dbmToLin(pass.noise);
+  return 10 * (Math.log(dbmToLin(rssiDbm) / Math.max(I + N, 1e-12)) / Math.log(10));
+}
+
+function throughputFromSinr(sinr) {
+  var T = [
+    { t: -5, r: 0 },
+    { t: 0, r: 6.5 },
+    { t: 5, r: 13 },
+    { t: 10, r: 26 },
+    { t: 15, r: 39 },
+    { t: 20, r: 58.5 },
+    { t: 25, r: 72.2 },
+  ];
+  var rate = 0;
+  for (var i = 0; i < T.length; i++) {
+    if (sinr >= T[i].t) rate = T[i].r;
+  }
+  return rate;
+}
+
+// ─── Tile computation (same per-bin logic as the chunked loop in HeatmapEngine) ───
+
+function computeTile(msg) {
+  var tileCols = msg.c1 - msg.c0, tileRows = msg.r1 - msg.r0;
+  var values = new Float32Array(tileCols * tileRows);
+  var apIndex = new Int16Array(tileCols * tileRows);
+  var view = pass.view, sel = pass.selectedIndex;
+
+  for (var r = msg.r0; r < msg.r1; r++) {
+    var y = (r + 0.5) * pass.dy;
+    for (var c = msg.c0; c < msg.c1; c++) {
+      var x = (c + 0.5) * pass.dx;
+      var o = (r - msg.r0) * tileCols + (c - msg.c0);
+
+      var best = bestApAt(x, y);
+      if (sel >= 0) {
+        best.index = sel;
+        best.rssiDbm = rssiFrom(pass.aps[sel], x, y);
+      }
+      apIndex[o] = best.index;
+
+      var value;
+      if (view === "best" || view === "servch" || view === "rssi") {
+        value = best.rssiDbm;
+      } else if (view === "snr") {
+        value = best.rssiDbm - pass.noise;
+      } else if (view === "sinr") {
+        value = sinrAt(best.rssiDbm, cciAt(x, y, best.index));
+      } else if (view === "cci") {
+        value = countInterferingAntennas(x, y, best.index);
+      } else if (view === "thr") {
+        value = throughputFromSinr(sinrAt(best.rssiDbm, cciAt(x, y, best.index)));
+      } else {
+        value = best.rssiDbm;
+      }
+      values[o] = value;
+    }
+  }
+
+  self.postMessage({
+    type: "tile", passId: msg.passId, tileId: msg.tileId,
+    c0: msg.c0, r0: msg.r0, c1: msg.c1, r1: msg.r1,
+    values: values, apIndex: apIndex
+  }, [values.buffer, apIndex.buffer]);
+}
+
+self.onmessage = function (e) {
+  var msg = e.data;
+  if (msg.type === "static") {
+    unpackObstruction(new Float64Array(msg.obstruction));
+  } else if (msg.type === "patterns") {
+    for (var id in msg.patterns) patterns[id] = msg.patterns[id];
+  } else if (msg.type === "pass") {
+    pass = msg;
+    model.freq = msg.freq;
+    model.N = msg.N;
+    pass.aps.forEach(function (ap) {
+      ap.antennaPattern = ap.patternId != null ? patterns[ap.patternId] || null : null;
+    });
+    // Bin centres are fixed for the pass, so obstruction losses are cached per antenna
+    model.setObstructionRaster(msg.cols, msg.rows, msg.dx, msg.dy);
+    model.setObstructionBudget(OBSTRUCTION_CACHE_BYTES / Math.max(1, msg.poolSize || 1));
+  } else if (msg.type === "tile") {
+    if (!pass || msg.passId !== pass.passId) return;
+    computeTile(msg);
+  }
+};
@@ -0,0 +1,126 @@
+//
+// MarchingSquares.js
+// Isolines of a cols×rows value grid (row-major, one value per bin centre) by
+// marching squares. Crossings are interpolated linearly along cell edges,
+// saddles are resolved by the cell-centre average, and segments are chained
+// into polylines through the edges they share, so no nearest-point search is
+// needed. Bins that are NaN (no value) break the lines around them.
+//
+// Loaded as a page script and by ContourWorker.js (importScripts).
+//
+// Depends on: nothing
+//
+// Used by:
+//   ContourWorker.js — isolines per heatmap revision, off the main thread
+//   ContourRenderer  — same computation when workers are unavailable
+//
+
+var MarchingSquares = (function () {
+  "use strict";
+
+  // Cell edges: 0 top, 1 right, 2 bottom, 3 left. Segments per corner code
+  // (TL=8, TR=4, BR=2, BL=1 set when the corner is >= threshold); the saddles
+  // 5 and 10 are chosen per cell from its centre value.
+  var SEGMENTS = [
+    [], [3, 2], [2, 1], [3, 1], [0, 1], null, [0, 2], [3, 0],
+    [3, 0], [0, 2], null, [0, 1], [3, 1], [2, 1], [3, 2], []
+  ];
+
+  /**
+   * Polylines where the grid crosses `threshold`, in world units
+   * (bin (c, r) sits at ((c + 0.5) * dx, (r + 0.5) * dy)):
+   *   { coords: Float32Array [x0, y0, x1, y1, ...],
+   *     starts: Uint32Array (line count + 1, offsets into points),
+   *     closed: Uint8Array  (1 = the line is a loop) }
+   */
+  function isolines(values, cols, rows, dx, dy, threshold) {
+    if (cols < 2 || rows < 2) return pack([], [0], []);
+    var hCount = rows * (cols - 1);
+    var edgeCount = hCount + (rows - 1) * cols;
+    var px = new Float32Array(edgeCount), py = new Float32Array(edgeCount);
+    var link0 = new Int32Array(edgeCount).fill(-1), link1 = new Int32Array(edgeCount).fill(-1);
+    var i, j;
+
+    function hEdge(r, c) { return r * (cols - 1) + c; }
+    function vEdge(r, c) { return hCount + r * cols + c; }
+
+    function point(edge, va, vb, xa, ya, xb, yb) {
+      if (link0[edge] >= 0) return;      // already placed by the neighbouring cell
+      var t = (threshold - va) / (vb - va);
+      if (!(t >= 0)) t = 0; else if (t > 1) t = 1;
+      px[edge] = xa + t * (xb - xa);
+      py[edge] = ya + t * (yb - ya);
+    }
+
+    function connect(a, b) {
+      if (link0[a] < 0) link0[a] = b; else link1[a] = b;
+      if (link0[b] < 0) link0[b] = a; else link1[b] = a;
+    }
+
+    for (i = 0; i < rows - 1; i++) {
+      var y0 = (i + 0.5) * dy, y1 = y0 + dy;
+      for (j = 0; j < cols - 1; j++) {
+        var k = i * cols + j;
+        var v0 = values[k], v1 = values[k + 1], v2 = values[k + cols + 1], v3 = values[k + cols];
+        if (v0 !== v0 || v1 !== v1 || v2 !== v2 || v3 !== v3) continue;    // NaN corner
+        var code = (v0 >= threshold ? 8 : 0) | (v1 >= threshold ? 4 : 0) |
+                   (v2 >= threshold ? 2 : 0) | (v3 >= threshold ? 1 : 0);
+        if (code === 0 || code === 15) continue;
+
+        var x0 = (j + 0.5) * dx, x1 = x0 + dx;
+        var edges = [hEdge(i, j), vEdge(i, j + 1), hEdge(i + 1, j), vEdge(i, j)];
+        var segs = SEGMENTS[code];
+        if (!segs) {
+          var centreHigh = (v0 + v1 + v2 + v3) / 4 >= threshold;
+          if (code === 5) segs = centreHigh ? [3, 0, 1, 2] : [0, 1, 3, 2];
+          else segs = centreHigh ? [0, 1, 3, 2] : [3, 0, 1, 2];
+        }
+        for (var s = 0; s < segs.length; s += 2) {
+          for (var e = s; e < s + 2; e++) {
+            var side = segs[e];
+            if (side === 0) point(edges[0], v0, v1, x0, y0, x1, y0);
+            else if (side === 1) point(edges[1], v1, v2, x1, y0, x1, y1);
+            else if (side === 2) point(edges[2], v3, v2, x0, y1, x1, y1);
+            else point(edges[3], v0, v3, x0, y0, x0, y1);
+          }
+          connect(edges[segs[s]], edges[segs[s + 1]]);
+        }
+      }
+    }
+
+    // Chain segments: open lines start at edges with one link, then the loops remain
+    var visited = new Uint8Array(edgeCount);
+    var coords = [], starts = [0], closed = [];
+
+    function trace(start) {
+      var prev = -1, cur = start, count = 0;
+      while (cur >= 0) {
+        visited[cur] = 1;
+        coords.push(px[cur], py[cur]);
+        count++;
+        var next = link0[cur] !== prev && link0[cur] >= 0 && !visited[link0[cur]] ? link0[cur]
+                 : link1[cur] !== prev && link1[cur] >= 0 && !visited[link1[cur]] ? link1[cur] : -1;
+        prev = cur;
+        cur = next;
+      }
+      starts.push(starts[starts.length - 1] + count);
+      closed.push(count > 2 && (link0[prev] === start || link1[prev] === start) ? 1 : 0);
+    }
+
+    for (i = 0; i < edgeCount; i++) {
+      if (!visited[i] && link0[i] >= 0 && link1[i] < 0) trace(i);
+    }
+    for (i = 0; i < edgeCount; i++) {
+      if (!visited[i] && link0[i] >= 0) trace(i);
+    }
+    return pack(coords, starts, closed);
+  }
+
+  function pack(coords, starts, closed) {
+    return { coords: new Float32Array(coords), starts: new Uint32Array(starts), closed: new Uint8Array(closed) };
+  }
+
+  return { isolines: isolines };
+})();
+
+if (typeof window !== "undefined") window.MarchingSquares = MarchingSquares;